@@ -1,12 +1,29 @@
-"""Allow running as: uv run python -m ai_monitor"""
+"""Allow running as: uv run python -m ai_monitor [--workers N]
+
+With ``--workers`` above 1, one worker is elected to write and the others
+forward their writes to it (see ai_monitor.cluster).
+"""
+
+import argparse
+import os
+import secrets
 
 import uvicorn
 
 from ai_monitor.config import settings
 
+parser = argparse.ArgumentParser(prog="python -m ai_monitor", description="Run the AI Monitor server.")
+parser.add_argument("--workers", type=int, default=settings.workers, help="worker processes (default: WORKERS or 1)")
+args = parser.parse_args()
+
+# Worker processes read their settings from the environment
+os.environ["WORKERS"] = str(args.workers)
+os.environ["WRITER_IPC_KEY"] = settings.writer_ipc_key or secrets.token_hex(16)
+
 uvicorn.run(
     "ai_monitor.main:app",
     host=settings.ai_monitor_host,
     port=settings.ai_monitor_port,
     reload=False,
+    workers=args.workers,
 )
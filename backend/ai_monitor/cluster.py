@@ -0,0 +1,373 @@
+"""Multi-worker serving: one elected writer process, the others serve reads.
+
+With ``WORKERS`` above 1, uvicorn runs several copies of the app. Each
+copy reads through its own database connection. SQLite takes one writer
+at a time, and the watcher, session expiry and backfill must each run
+exactly once, so one process owns all writes:
+
+- **Election**: every worker tries to bind the IPC listener on
+  ``127.0.0.1:WRITER_IPC_PORT``. The worker that succeeds becomes the
+  writer and starts the writer services. The port is freed when that
+  process exits. The readers then notice the lost link and race to bind
+  it again, so one of them takes over.
+- **Forwarded writes**: readers send hook events and admin writes to the
+  writer over an authenticated :mod:`multiprocessing.connection` link
+  (``WRITER_IPC_KEY``, which ``python -m ai_monitor`` generates). Events
+  are fire-and-forget. Calls wait for the writer's result or exception.
+  Functions travel by reference, so they must be module-level.
+- **Change relay**: the writer pushes its change notifications and its
+  ETag generation to every reader in batches. Readers republish them
+  locally, so ``/api/stream``, session tails and conditional GETs behave
+  the same on every worker.
+
+With one worker (the default) none of this runs. The process is its own
+writer, and :meth:`Cluster.submit` and :meth:`Cluster.call` run the
+function in place.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Awaitable, Callable
+
+from ai_monitor import etag
+from ai_monitor.config import settings
+from ai_monitor.services import change_stream
+
+logger = logging.getLogger(__name__)
+
+enabled = settings.workers > 1
+
+# How long a forwarded write keeps retrying while a new writer is elected
+_RETRY_SECONDS = 0.2
+_ATTEMPTS = 25
+
+_LINK_ERRORS = (OSError, EOFError, AuthenticationError)
+
+
+def _address() -> tuple[str, int]:
+    return ("127.0.0.1", settings.writer_ipc_port)
+
+
+def _authkey() -> bytes:
+    return settings.writer_ipc_key.encode()
+
+
+def _close(conn: Connection | None) -> None:
+    if conn is not None:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+class Cluster:
+    """This process's role among the workers and its links to the others."""
+
+    def __init__(self) -> None:
+        self.role = "writer"
+        self.writer_pid: int | None = os.getpid()
+        self.forwarded = 0
+        self.relayed = 0
+        self._stopping = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._on_elected: Callable[[], Awaitable[None]] | None = None
+        self._hooked = False
+        # Writer side
+        self._listener: Listener | None = None
+        self._followers: list[Connection] = []
+        self._followers_lock = threading.Lock()
+        self._outbox: deque[tuple] = deque()
+        self._outbox_cond = threading.Condition()
+        # Reader side
+        self._follow_link: Connection | None = None
+        self._submit_link: Connection | None = None
+        self._submit_lock = threading.Lock()
+        self._call_links: list[Connection] = []
+        self._call_lock = threading.Lock()
+
+    @property
+    def is_writer(self) -> bool:
+        return self.role == "writer"
+
+    async def start(self, on_elected: Callable[[], Awaitable[None]]) -> None:
+        """Take part in the election; ``on_elected`` starts the writer services.
+
+        It is awaited here if this process wins, or later on this event
+        loop if it takes over from a writer that went away.
+        """
+        self._on_elected = on_elected
+        self._loop = asyncio.get_running_loop()
+        if not enabled:
+            await on_elected()
+            return
+        if not settings.writer_ipc_key:
+            raise RuntimeError("WORKERS > 1 needs WRITER_IPC_KEY; start with python -m ai_monitor")
+        self._stopping.clear()
+        if self._elect():
+            await on_elected()
+            return
+        self.role = "reader"
+        self.writer_pid = None
+        logger.info("Worker %d serving reads; writes go to the elected writer", os.getpid())
+        threading.Thread(target=self._follow, name="cluster-follow", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._listener is not None:
+            # accept() doesn't return when the socket is closed under it
+            try:
+                _close(Client(_address(), authkey=_authkey()))
+            except _LINK_ERRORS:
+                pass
+            self._listener.close()
+            self._listener = None
+        with self._outbox_cond:
+            self._outbox_cond.notify_all()
+        with self._followers_lock:
+            followers, self._followers = self._followers, []
+        for conn in followers:
+            _close(conn)
+        _close(self._follow_link)
+        self._drop_links()
+        change_stream.hub.relay = None
+        self.role = "writer"
+        self.writer_pid = os.getpid()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "workers": settings.workers,
+            "role": self.role,
+            "pid": os.getpid(),
+            "writer_pid": self.writer_pid,
+            "followers": len(self._followers),
+            "forwarded": self.forwarded,
+            "relayed": self.relayed,
+        }
+
+    # ── Forwarding (any process) ─────────────────────────────────
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Run ``fn`` in the writer without waiting for it to finish."""
+        for _ in range(_ATTEMPTS):
+            if self.is_writer:
+                fn(*args, **kwargs)
+                return
+            try:
+                with self._submit_lock:
+                    if self._submit_link is None:
+                        self._submit_link = self._connect("submit")
+                    self._submit_link.send(("submit", fn, args, kwargs))
+                self.forwarded += 1
+                return
+            except _LINK_ERRORS:
+                with self._submit_lock:
+                    _close(self._submit_link)
+                    self._submit_link = None
+                time.sleep(_RETRY_SECONDS)
+        logger.error("No writer reachable; dropped %s", fn.__qualname__)
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn`` in the writer and return its result or raise its exception.
+
+        Blocks until the writer answers, so call it from a worker thread.
+        """
+        for _ in range(_ATTEMPTS):
+            if self.is_writer:
+                return fn(*args, **kwargs)
+            conn = None
+            try:
+                with self._call_lock:
+                    conn = self._call_links.pop() if self._call_links else None
+                if conn is None:
+                    conn = self._connect("call")
+                conn.send(("call", fn, args, kwargs))
+                ok, value = conn.recv()
+            except _LINK_ERRORS:
+                _close(conn)
+                time.sleep(_RETRY_SECONDS)
+                continue
+            with self._call_lock:
+                self._call_links.append(conn)
+            self.forwarded += 1
+            if not ok:
+                raise value
+            return value
+        raise RuntimeError("No writer reachable")
+
+    def _connect(self, kind: str) -> Connection:
+        conn = Client(_address(), authkey=_authkey())
+        conn.send((kind, os.getpid()))
+        return conn
+
+    def _drop_links(self) -> None:
+        with self._submit_lock:
+            _close(self._submit_link)
+            self._submit_link = None
+        with self._call_lock:
+            links, self._call_links = self._call_links, []
+        for conn in links:
+            _close(conn)
+
+    # ── Writer ───────────────────────────────────────────────────
+
+    def _elect(self) -> bool:
+        """Try to become the writer by binding the IPC listener."""
+        try:
+            self._listener = Listener(_address(), authkey=_authkey())
+        except OSError:
+            return False
+        self.role = "writer"
+        self.writer_pid = os.getpid()
+        # A new writer counts generations afresh; a new boot id keeps its
+        # ETags from colliding with the ones its predecessor issued
+        etag.new_epoch()
+        change_stream.hub.relay = self._relay
+        if not self._hooked:
+            self._hooked = True
+            etag.add_bump_listener(self._relay_generation)
+        threading.Thread(target=self._accept, name="cluster-accept", daemon=True).start()
+        threading.Thread(target=self._broadcast, name="cluster-relay", daemon=True).start()
+        logger.info("Worker %d elected writer", os.getpid())
+        return True
+
+    def _accept(self) -> None:
+        listener = self._listener
+        while not self._stopping.is_set() and listener is not None:
+            try:
+                conn = listener.accept()
+            except _LINK_ERRORS:
+                continue
+            if self._stopping.is_set():
+                _close(conn)
+                return
+            threading.Thread(target=self._serve, args=(conn,), name="cluster-link", daemon=True).start()
+
+    def _serve(self, conn: Connection) -> None:
+        """Handle one reader link: a follower, or a stream of submits or calls."""
+        try:
+            kind, pid = conn.recv()
+            if kind == "follow":
+                # Under the lock so no broadcast is sent on this link before
+                # the welcome, and none sent after it is missed
+                with self._followers_lock:
+                    boot_id, generation = etag.current()
+                    conn.send(("welcome", os.getpid(), boot_id, generation))
+                    self._followers.append(conn)
+                return
+            while True:
+                _, fn, args, kwargs = conn.recv()
+                if kind == "submit":
+                    try:
+                        fn(*args, **kwargs)
+                    except Exception:
+                        logger.exception("Forwarded %s from worker %d failed", fn.__qualname__, pid)
+                    continue
+                try:
+                    reply = (True, fn(*args, **kwargs))
+                except Exception as exc:
+                    reply = (False, exc)
+                try:
+                    conn.send(reply)
+                except _LINK_ERRORS:
+                    raise
+                except Exception:
+                    # The result or exception doesn't pickle
+                    conn.send((False, RuntimeError(repr(reply[1]))))
+        except _LINK_ERRORS:
+            _close(conn)
+
+    def _relay(self, type_: str, session_id: str | None, fields: dict[str, Any]) -> None:
+        if self._followers:
+            self._post(("change", type_, session_id, fields))
+
+    def _relay_generation(self, generation: int) -> None:
+        if self._followers:
+            self._post(("generation", generation))
+
+    def _post(self, item: tuple) -> None:
+        with self._outbox_cond:
+            self._outbox.append(item)
+            self._outbox_cond.notify()
+
+    def _broadcast(self) -> None:
+        """Send queued changes to every follower, as one message per wakeup."""
+        while True:
+            with self._outbox_cond:
+                while not self._outbox and not self._stopping.is_set():
+                    self._outbox_cond.wait()
+                if self._stopping.is_set():
+                    return
+                batch = list(self._outbox)
+                self._outbox.clear()
+            message = ("changes", etag.current()[0], batch)
+            with self._followers_lock:
+                followers = list(self._followers)
+            for conn in followers:
+                try:
+                    conn.send(message)
+                except _LINK_ERRORS:
+                    _close(conn)
+                    with self._followers_lock:
+                        if conn in self._followers:
+                            self._followers.remove(conn)
+            self.relayed += len(batch)
+
+    # ── Reader ───────────────────────────────────────────────────
+
+    def _follow(self) -> None:
+        """Apply the writer's changes; take over when it goes away."""
+        while not self._stopping.is_set():
+            try:
+                conn = self._connect("follow")
+                _, writer_pid, boot_id, generation = conn.recv()
+            except _LINK_ERRORS:
+                if self._stopping.is_set():
+                    return
+                if self._elect():
+                    self._drop_links()
+                    self._promote()
+                    return
+                time.sleep(_RETRY_SECONDS)
+                continue
+            self._follow_link = conn
+            self.writer_pid = writer_pid
+            etag.adopt(boot_id, generation)
+            try:
+                while True:
+                    _, boot_id, batch = conn.recv()
+                    self._apply(boot_id, batch)
+            except _LINK_ERRORS:
+                _close(conn)
+                if self._stopping.is_set():
+                    return
+                logger.warning("Lost the writer (pid %s); electing a new one", writer_pid)
+                self.writer_pid = None
+                self._drop_links()
+
+    def _apply(self, boot_id: str, batch: list[tuple]) -> None:
+        for item in batch:
+            if item[0] == "generation":
+                etag.adopt(boot_id, item[1])
+            else:
+                _, type_, session_id, fields = item
+                change_stream.hub.publish(type_, session_id, **fields)
+        self.relayed += len(batch)
+
+    def _promote(self) -> None:
+        logger.warning("Worker %d taking over as writer", os.getpid())
+        if self._loop is None or self._loop.is_closed() or self._on_elected is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._on_elected(), self._loop)
+        try:
+            future.result()
+        except Exception:
+            logger.exception("Starting the writer services failed")
+
+
+cluster = Cluster()
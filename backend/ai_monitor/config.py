@@ -1,6 +1,7 @@
 """Application configuration from environment variables."""
 
 import os
+import socket
 from pathlib import Path
 
 from pydantic_settings import BaseSettings
@@ -10,8 +11,39 @@ class Settings(BaseSettings):
     ai_monitor_port: int = 6821
     ai_monitor_host: str = "0.0.0.0"
     ai_monitor_db_path: str = "./data/ai_monitor.db"
+    workers: int = 1
+    writer_ipc_port: int = 6822
+    writer_ipc_key: str = ""
+    host_name: str = socket.gethostname()
+    collector_url: str = ""
+    collector_token: str = ""
+    collector_dedup_days: float = 7.0
+    forward_batch_size: int = 500
+    forward_max_backoff_seconds: float = 60.0
+    forward_outbox_max_rows: int = 1_000_000
+    metrics_enabled: bool = True
+    query_profiling: bool = True
+    slow_query_ms: float = 100.0
+    query_n_plus_one_threshold: int = 20
     claude_projects_dir: str = os.path.expanduser("~/.claude/projects")
-    session_stale_timeout_minutes: int = 5
+    session_stale_timeout_minutes: float = 5
+    payload_preview_chars: int = 512
+    response_compression_min_bytes: int = 1024
+    stream_queue_size: int = 256
+    stream_heartbeat_seconds: float = 15.0
+    tail_coalesce_seconds: float = 0.1
+    tail_queue_size: int = 32
+    transcript_scan_workers: int = 0
+    transcript_scan_batch_size: int = 200
+    watcher_workers: int = 2
+    watcher_coalesce_seconds: float = 0.5
+    watcher_max_delay_seconds: float = 3.0
+    watcher_max_pending: int = 10000
+    watcher_max_hot_dirs: int = 64
+    watcher_hot_ttl_seconds: float = 1800.0
+    watcher_sweep_seconds: float = 30.0
+    watcher_polling: bool = False
+    watcher_poll_seconds: float = 1.0
 
     model_config = {"env_file": str(Path(__file__).resolve().parents[2] / ".env")}
 
@@ -2,11 +2,41 @@
 
 import os
 import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
 
+from ai_monitor import query_profile
 from ai_monitor.config import settings
+from ai_monitor.query_profile import ProfiledConnection
 
 _connection: sqlite3.Connection | None = None
 
+# The connection is shared by request handlers, the watcher's workers,
+# backfill, session expiry and the cluster link. A commit ends the
+# connection's transaction whichever thread's writes are in it, so every
+# writer holds this lock from its first write to its commit. Re-entrant,
+# so a writer can call code that takes it again.
+write_lock = threading.RLock()
+
+
+class _BatchedCommits:
+    """Connection mixin: ``commit()`` waits for the end of :func:`batched_commits`."""
+
+    batch_depth = 0
+
+    def commit(self) -> None:
+        if not self.batch_depth:
+            super().commit()  # type: ignore[misc]
+
+
+class Connection(_BatchedCommits, sqlite3.Connection):
+    pass
+
+
+class ProfiledDBConnection(_BatchedCommits, ProfiledConnection):
+    pass
+
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS projects (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -28,7 +58,10 @@ CREATE TABLE IF NOT EXISTS sessions (
     output_tokens INTEGER NOT NULL DEFAULT 0,
     cache_read_tokens INTEGER NOT NULL DEFAULT 0,
     cache_write_tokens INTEGER NOT NULL DEFAULT 0,
-    estimated_cost REAL NOT NULL DEFAULT 0.0
+    estimated_cost REAL NOT NULL DEFAULT 0.0,
+    version INTEGER NOT NULL DEFAULT 0,
+    change_seq INTEGER NOT NULL DEFAULT 0,
+    host TEXT
 );
 
 CREATE TABLE IF NOT EXISTS tool_calls (
@@ -41,7 +74,11 @@ CREATE TABLE IF NOT EXISTS tool_calls (
     error TEXT,
     started_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
     ended_at TEXT,
-    duration_ms INTEGER
+    duration_ms INTEGER,
+    tool_input_size INTEGER,
+    tool_response_size INTEGER,
+    agent_id INTEGER REFERENCES agents(id),
+    change_seq INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS agents (
@@ -49,16 +86,285 @@ CREATE TABLE IF NOT EXISTS agents (
     session_id TEXT NOT NULL,
     agent_name TEXT,
     agent_type TEXT,
+    hook_agent_id TEXT,
+    parent_agent_id INTEGER REFERENCES agents(id),
     task_tool_call_id INTEGER REFERENCES tool_calls(id),
     status TEXT NOT NULL DEFAULT 'active',
     started_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
-    ended_at TEXT
+    ended_at TEXT,
+    change_seq INTEGER NOT NULL DEFAULT 0
+);
+
+-- Closure table of the agent hierarchy: one row per (ancestor, descendant)
+-- pair including each agent with itself at depth 0
+CREATE TABLE IF NOT EXISTS agent_closure (
+    ancestor_id INTEGER NOT NULL REFERENCES agents(id),
+    descendant_id INTEGER NOT NULL REFERENCES agents(id),
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+
+-- Incremental transcript parsing: how far each .jsonl file has been read
+-- and the totals accumulated up to that byte offset
+CREATE TABLE IF NOT EXISTS transcript_files (
+    path TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime_ns INTEGER,
+    offset INTEGER NOT NULL DEFAULT 0,
+    head_hash TEXT,
+    tail_hash TEXT,
+    session_id TEXT,
+    model TEXT,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+    turns INTEGER NOT NULL DEFAULT 0,
+    parsed_at TEXT
 );
 
 CREATE INDEX IF NOT EXISTS idx_sessions_project_id ON sessions(project_id);
 CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions(status);
 CREATE INDEX IF NOT EXISTS idx_tool_calls_session_id ON tool_calls(session_id);
 CREATE INDEX IF NOT EXISTS idx_agents_session_id ON agents(session_id);
+CREATE INDEX IF NOT EXISTS idx_tool_calls_session_started ON tool_calls(session_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_agents_session_started ON agents(session_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_agent_closure_descendant ON agent_closure(descendant_id, depth);
+"""
+
+# Change sequence for delta sync: every insert/update of a session, tool
+# call or agent stamps the row with the next value of a single counter, so
+# a row always carries the sequence of its latest write (superseded updates
+# compact away). Rows are never deleted, so no tombstones are needed.
+CHANGE_SEQ_TABLES = ("sessions", "tool_calls", "agents")
+
+CHANGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS change_counter (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    seq INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO change_counter (id, seq) VALUES (1, 0);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_change_seq ON sessions(change_seq);
+CREATE INDEX IF NOT EXISTS idx_tool_calls_change_seq ON tool_calls(change_seq);
+CREATE INDEX IF NOT EXISTS idx_agents_change_seq ON agents(change_seq);
+""" + "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS {table}_change_seq_insert AFTER INSERT ON {table} BEGIN
+    UPDATE change_counter SET seq = seq + 1 WHERE id = 1;
+    UPDATE {table} SET change_seq = (SELECT seq FROM change_counter WHERE id = 1)
+    WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS {table}_change_seq_update AFTER UPDATE ON {table}
+WHEN new.change_seq = old.change_seq BEGIN
+    UPDATE change_counter SET seq = seq + 1 WHERE id = 1;
+    UPDATE {table} SET change_seq = (SELECT seq FROM change_counter WHERE id = 1)
+    WHERE id = new.id;
+END;
+"""
+    for table in CHANGE_SEQ_TABLES
+)
+
+# Created after the migrations below so the columns exist on old databases
+AGENT_ATTRIBUTION_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_tool_calls_agent_started ON tool_calls(agent_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_agents_session_hook_agent ON agents(session_id, hook_agent_id);
+"""
+
+# Per-turn usage from transcripts: one row per costTracker entry and model,
+# appended as transcripts grow. Turns are numbered per transcript file, and
+# a session can have several (its subagents write their own). Hourly
+# totals are kept current by triggers, so charts read a handful of rollup
+# rows instead of the ledger, and a session created after its transcript
+# was parsed picks up its totals.
+USAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_ledger (
+    session_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0.0,
+    PRIMARY KEY (session_id, path, turn, model)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS usage_hourly (
+    hour TEXT NOT NULL,
+    model TEXT NOT NULL,
+    turns INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0.0,
+    PRIMARY KEY (hour, model)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS usage_ledger_hourly_insert AFTER INSERT ON usage_ledger BEGIN
+    INSERT INTO usage_hourly (hour, model, turns, input_tokens, output_tokens,
+                              cache_read_tokens, cache_write_tokens, cost)
+    VALUES (strftime('%Y-%m-%dT%H:00:00Z', new.timestamp), new.model, 1, new.input_tokens,
+            new.output_tokens, new.cache_read_tokens, new.cache_write_tokens, new.cost)
+    ON CONFLICT (hour, model) DO UPDATE SET
+        turns = turns + 1,
+        input_tokens = input_tokens + excluded.input_tokens,
+        output_tokens = output_tokens + excluded.output_tokens,
+        cache_read_tokens = cache_read_tokens + excluded.cache_read_tokens,
+        cache_write_tokens = cache_write_tokens + excluded.cache_write_tokens,
+        cost = cost + excluded.cost;
+END;
+
+CREATE TRIGGER IF NOT EXISTS usage_ledger_hourly_delete AFTER DELETE ON usage_ledger BEGIN
+    UPDATE usage_hourly SET
+        turns = turns - 1,
+        input_tokens = input_tokens - old.input_tokens,
+        output_tokens = output_tokens - old.output_tokens,
+        cache_read_tokens = cache_read_tokens - old.cache_read_tokens,
+        cache_write_tokens = cache_write_tokens - old.cache_write_tokens,
+        cost = cost - old.cost
+    WHERE hour = strftime('%Y-%m-%dT%H:00:00Z', old.timestamp) AND model = old.model;
+    DELETE FROM usage_hourly
+    WHERE hour = strftime('%Y-%m-%dT%H:00:00Z', old.timestamp) AND model = old.model
+      AND turns = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sessions_usage_insert AFTER INSERT ON sessions
+WHEN EXISTS (SELECT 1 FROM usage_ledger WHERE session_id = new.session_id) BEGIN
+    UPDATE sessions SET (input_tokens, output_tokens, cache_read_tokens,
+                         cache_write_tokens, estimated_cost) = (
+        SELECT SUM(input_tokens), SUM(output_tokens), SUM(cache_read_tokens),
+               SUM(cache_write_tokens), SUM(cost)
+        FROM usage_ledger WHERE session_id = new.session_id)
+    WHERE id = new.id;
+END;
+"""
+
+# Model prices per million tokens, with the date each takes effect; see
+# ai_monitor.services.pricing for how a model's price is picked. The seed
+# rows are the original built-in prices ('' matches any model).
+PRICING_SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_pricing (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pattern TEXT NOT NULL,
+    effective_from TEXT NOT NULL,
+    input REAL NOT NULL,
+    output REAL NOT NULL,
+    cache_read REAL NOT NULL,
+    cache_write REAL NOT NULL,
+    UNIQUE (pattern, effective_from)
+);
+"""
+
+PRICING_SEED = """
+INSERT INTO model_pricing (pattern, effective_from, input, output, cache_read, cache_write) VALUES
+    ('', '1970-01-01', 3.0, 15.0, 0.3, 3.75),
+    ('sonnet', '1970-01-01', 3.0, 15.0, 0.3, 3.75),
+    ('opus', '1970-01-01', 15.0, 75.0, 1.5, 18.75),
+    ('haiku', '1970-01-01', 0.25, 1.25, 0.025, 0.3125);
+"""
+
+# Federation. An agent queues every hook event it ingests in the outbox
+# until the collector acknowledges it. A collector remembers the event ids
+# it applied per host, so a batch re-sent after a lost acknowledgement is
+# not applied twice.
+FEDERATION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forward_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL,
+    received_at TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS collected_events (
+    host TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    received_at TEXT NOT NULL,
+    PRIMARY KEY (host, event_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_collected_events_received_at ON collected_events(received_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_host_started ON sessions(host, started_at);
+"""
+
+# Full-text search index (FTS5, trigram tokenizer for substring matches on
+# paths and commands). Kept in sync by triggers so every ingestion write
+# updates it incrementally; the view is the single definition of what gets
+# indexed for a tool call.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+    session_id, project_name, project_path, tokenize = 'trigram'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS tool_calls_fts USING fts5(
+    tool_name, input_text, error, tokenize = 'trigram'
+);
+
+CREATE VIEW IF NOT EXISTS sessions_search_source AS
+SELECT s.id, s.session_id, p.name AS project_name, p.path AS project_path
+FROM sessions s
+LEFT JOIN projects p ON s.project_id = p.id;
+
+CREATE VIEW IF NOT EXISTS tool_calls_search_source AS
+SELECT id, tool_name, error,
+       CASE json_type(CASE WHEN json_valid(tool_input) THEN tool_input END)
+           WHEN 'object' THEN
+               COALESCE(json_extract(tool_input, '$.command') || ' ', '') ||
+               COALESCE(json_extract(tool_input, '$.file_path') || ' ', '') ||
+               COALESCE(json_extract(tool_input, '$.notebook_path') || ' ', '') ||
+               COALESCE(json_extract(tool_input, '$.path') || ' ', '') ||
+               COALESCE(json_extract(tool_input, '$.pattern') || ' ', '') ||
+               COALESCE(json_extract(tool_input, '$.glob') || ' ', '') ||
+               COALESCE(json_extract(tool_input, '$.url') || ' ', '') ||
+               COALESCE(json_extract(tool_input, '$.query') || ' ', '') ||
+               COALESCE(json_extract(tool_input, '$.description') || ' ', '') ||
+               COALESCE(substr(json_extract(tool_input, '$.prompt'), 1, 1000), '')
+           WHEN 'text' THEN substr(json_extract(tool_input, '$'), 1, 1000)
+           ELSE substr(tool_input, 1, 1000)
+       END AS input_text
+FROM tool_calls;
+
+CREATE TRIGGER IF NOT EXISTS sessions_fts_insert AFTER INSERT ON sessions BEGIN
+    INSERT INTO sessions_fts (rowid, session_id, project_name, project_path)
+    SELECT id, session_id, project_name, project_path
+    FROM sessions_search_source WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sessions_fts_update AFTER UPDATE OF project_id ON sessions BEGIN
+    DELETE FROM sessions_fts WHERE rowid = old.id;
+    INSERT INTO sessions_fts (rowid, session_id, project_name, project_path)
+    SELECT id, session_id, project_name, project_path
+    FROM sessions_search_source WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sessions_fts_project_update
+AFTER UPDATE OF name, path ON projects BEGIN
+    DELETE FROM sessions_fts
+    WHERE rowid IN (SELECT id FROM sessions WHERE project_id = new.id);
+    INSERT INTO sessions_fts (rowid, session_id, project_name, project_path)
+    SELECT id, session_id, project_name, project_path
+    FROM sessions_search_source
+    WHERE id IN (SELECT id FROM sessions WHERE project_id = new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tool_calls_fts_insert AFTER INSERT ON tool_calls BEGIN
+    INSERT INTO tool_calls_fts (rowid, tool_name, input_text, error)
+    SELECT id, tool_name, input_text, error
+    FROM tool_calls_search_source WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tool_calls_fts_update
+AFTER UPDATE OF tool_name, tool_input, error ON tool_calls BEGIN
+    DELETE FROM tool_calls_fts WHERE rowid = old.id;
+    INSERT INTO tool_calls_fts (rowid, tool_name, input_text, error)
+    SELECT id, tool_name, input_text, error
+    FROM tool_calls_search_source WHERE id = new.id;
+END;
 """
 
 
@@ -68,7 +374,11 @@ def get_db() -> sqlite3.Connection:
     if _connection is None:
         db_path = os.path.expanduser(settings.ai_monitor_db_path)
         os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
-        _connection = sqlite3.connect(db_path, check_same_thread=False)
+        _connection = sqlite3.connect(
+            db_path,
+            check_same_thread=False,
+            factory=ProfiledDBConnection if query_profile.enabled else Connection,
+        )
         _connection.row_factory = sqlite3.Row
         _connection.execute("PRAGMA journal_mode=WAL")
         _connection.execute("PRAGMA busy_timeout=5000")
@@ -82,7 +392,20 @@ def get_db() -> sqlite3.Connection:
         _connection.execute(
             "CREATE INDEX IF NOT EXISTS idx_sessions_last_event_at ON sessions(last_event_at)"
         )
+        # Active sessions only: session expiry rebuilds its deadlines from this
+        _connection.execute(
+            """CREATE INDEX IF NOT EXISTS idx_sessions_active
+               ON sessions(last_event_at, started_at, session_id) WHERE status = 'active'"""
+        )
         _connection.commit()
+        # Migrate: add version column (bumped on every write to the session)
+        try:
+            _connection.execute(
+                "ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+            _connection.commit()
+        except sqlite3.OperationalError:
+            pass  # Column already exists
         # Migrate: add task_tool_call_id column to agents for existing databases
         try:
             _connection.execute(
@@ -91,6 +414,134 @@ def get_db() -> sqlite3.Connection:
             _connection.commit()
         except sqlite3.OperationalError:
             pass  # Column already exists
+        # Migrate: add payload size columns to tool_calls for existing databases
+        for col in ("tool_input", "tool_response"):
+            try:
+                _connection.execute(f"ALTER TABLE tool_calls ADD COLUMN {col}_size INTEGER")
+                _connection.execute(
+                    f"UPDATE tool_calls SET {col}_size = length(CAST({col} AS BLOB)) "
+                    f"WHERE {col} IS NOT NULL"
+                )
+                _connection.commit()
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+        # Migrate: attribute tool calls to their owning agent
+        try:
+            _connection.execute("ALTER TABLE agents ADD COLUMN hook_agent_id TEXT")
+            _connection.commit()
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+        try:
+            _connection.execute(
+                "ALTER TABLE tool_calls ADD COLUMN agent_id INTEGER REFERENCES agents(id)"
+            )
+            # Existing rows predate attribution: assign them by agent time
+            # window, but only where exactly one agent was active.
+            _connection.execute(
+                """UPDATE tool_calls SET agent_id = (
+                       SELECT MIN(a.id) FROM agents a
+                       WHERE a.session_id = tool_calls.session_id
+                         AND tool_calls.started_at >= a.started_at
+                         AND (a.ended_at IS NULL OR tool_calls.started_at <= a.ended_at)
+                         AND tool_calls.id IS NOT a.task_tool_call_id)
+                   WHERE (
+                       SELECT COUNT(*) FROM agents a
+                       WHERE a.session_id = tool_calls.session_id
+                         AND tool_calls.started_at >= a.started_at
+                         AND (a.ended_at IS NULL OR tool_calls.started_at <= a.ended_at)
+                         AND tool_calls.id IS NOT a.task_tool_call_id) = 1"""
+            )
+            _connection.commit()
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+        _connection.executescript(AGENT_ATTRIBUTION_SCHEMA)
+        # Migrate: agent hierarchy, parent = owner of the spawning Task call
+        try:
+            _connection.execute(
+                "ALTER TABLE agents ADD COLUMN parent_agent_id INTEGER REFERENCES agents(id)"
+            )
+            _connection.execute(
+                """UPDATE agents SET parent_agent_id = (
+                       SELECT tc.agent_id FROM tool_calls tc WHERE tc.id = agents.task_tool_call_id)
+                   WHERE task_tool_call_id IS NOT NULL"""
+            )
+            _connection.commit()
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+        has_closure_rows = _connection.execute("SELECT 1 FROM agent_closure LIMIT 1").fetchone()
+        if not has_closure_rows:
+            _connection.execute(
+                """INSERT INTO agent_closure (ancestor_id, descendant_id, depth)
+                   WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+                       SELECT id, id, 0 FROM agents
+                       UNION ALL
+                       SELECT a.parent_agent_id, t.descendant_id, t.depth + 1
+                       FROM tree t JOIN agents a ON a.id = t.ancestor_id
+                       WHERE a.parent_agent_id IS NOT NULL
+                   )
+                   SELECT ancestor_id, descendant_id, depth FROM tree"""
+            )
+            _connection.commit()
+        # Migrate: change sequence columns
+        for table in CHANGE_SEQ_TABLES:
+            try:
+                _connection.execute(
+                    f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"
+                )
+                _connection.commit()
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+        _connection.executescript(CHANGES_SCHEMA)
+        # Rows written before the triggers existed still have 0, which no
+        # sync (``change_seq > since``) returns: number them past the counter
+        for table in CHANGE_SEQ_TABLES:
+            if _connection.execute(f"SELECT 1 FROM {table} WHERE change_seq = 0 LIMIT 1").fetchone():
+                _connection.execute(
+                    f"""UPDATE {table} SET change_seq =
+                            (SELECT seq FROM change_counter WHERE id = 1) + id
+                        WHERE change_seq = 0"""
+                )
+                _connection.execute(
+                    f"""UPDATE change_counter SET seq = MAX(seq, (SELECT MAX(change_seq) FROM {table}))
+                        WHERE id = 1"""
+                )
+        _connection.commit()
+        # Migrate: startup manifest columns on transcript_files
+        for col in ("mtime_ns INTEGER", "tail_hash TEXT", "turns INTEGER NOT NULL DEFAULT 0"):
+            try:
+                _connection.execute(f"ALTER TABLE transcript_files ADD COLUMN {col}")
+                _connection.commit()
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+        # Migrate: seed the pricing table on first run
+        has_pricing = _connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'model_pricing'"
+        ).fetchone()
+        _connection.executescript(PRICING_SCHEMA)
+        if not has_pricing:
+            _connection.executescript(PRICING_SEED)
+        _connection.commit()
+        # Migrate: the usage ledger is filled by the transcript scan, so on
+        # first run, or when its key gained the transcript path, forget the
+        # manifest and let the next scan start over
+        ledger_columns = {
+            row["name"] for row in _connection.execute("PRAGMA table_info(usage_ledger)")
+        }
+        if ledger_columns and "path" not in ledger_columns:
+            # Dropping the ledger drops its triggers, so clear the rollup by hand
+            _connection.executescript("DROP TABLE usage_ledger; DELETE FROM usage_hourly;")
+        _connection.executescript(USAGE_SCHEMA)
+        if "path" not in ledger_columns:
+            _connection.execute("DELETE FROM transcript_files")
+        _connection.commit()
+        # Migrate: host column; existing sessions were recorded on this machine
+        try:
+            _connection.execute("ALTER TABLE sessions ADD COLUMN host TEXT")
+            _connection.execute("UPDATE sessions SET host = ?", (settings.host_name,))
+            _connection.commit()
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+        _connection.executescript(FEDERATION_SCHEMA)
         # Migrate existing timestamps to ISO 8601 UTC format
         for table, cols in [
             ("projects", ["created_at"]),
@@ -104,9 +555,50 @@ def get_db() -> sqlite3.Connection:
                     f"WHERE {col} IS NOT NULL AND {col} NOT LIKE '%Z'"
                 )
         _connection.commit()
+        # Migrate: build the search index from existing rows on first run
+        has_search_index = _connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tool_calls_fts'"
+        ).fetchone()
+        _connection.executescript(SEARCH_SCHEMA)
+        if not has_search_index:
+            _connection.execute(
+                """INSERT INTO sessions_fts (rowid, session_id, project_name, project_path)
+                   SELECT id, session_id, project_name, project_path FROM sessions_search_source"""
+            )
+            _connection.execute(
+                """INSERT INTO tool_calls_fts (rowid, tool_name, input_text, error)
+                   SELECT id, tool_name, input_text, error FROM tool_calls_search_source"""
+            )
+        _connection.commit()
     return _connection
 
 
+@contextmanager
+def batched_commits() -> Iterator[sqlite3.Connection]:
+    """Commit the block's writes once, when it exits; roll them back if it raises.
+
+    ``commit()`` calls inside the block are skipped, so code written to
+    commit per write can be run many times over in one transaction. The
+    block holds :data:`write_lock`, so no other thread's writes join it.
+    """
+    with write_lock:
+        db = get_db()
+        if not db.batch_depth and not db.in_transaction:
+            # Explicit, so savepoints inside the block don't each commit on release
+            db.execute("BEGIN")
+        db.batch_depth += 1
+        try:
+            yield db
+        except BaseException:
+            db.batch_depth -= 1
+            if not db.batch_depth:
+                db.rollback()
+            raise
+        db.batch_depth -= 1
+        if not db.batch_depth:
+            db.commit()
+
+
 def close_db() -> None:
     """Close the database connection."""
     global _connection
@@ -0,0 +1,131 @@
+"""ETag / conditional GET support driven by data versions.
+
+Every committed write bumps an in-process *write generation*; writes that
+touch a session also bump that session's persisted ``version`` column.
+Responses carry a weak ETag built from these counters so polling clients
+can be answered with ``304 Not Modified`` without re-running any queries
+when nothing has changed.
+
+With several workers only the writer bumps the generation; readers
+:func:`adopt` its boot id and generation as they are relayed (see
+:mod:`ai_monitor.cluster`), so every worker issues the same ETags.
+"""
+
+import itertools
+import uuid
+from datetime import datetime, timezone
+from typing import Callable
+
+from fastapi import Request, Response
+
+from ai_monitor.db import get_db
+from ai_monitor.metrics import etag_requests
+
+# Distinguishes ETags across restarts, since the generation is in-memory
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+_counter = itertools.count(1)
+_generation = 0
+_bump_listeners: list[Callable[[int], None]] = []
+
+
+def bump_generation() -> None:
+    """Record that a write has been committed."""
+    global _generation
+    # next() on itertools.count is atomic under the GIL, so concurrent
+    # writers never hand out the same generation.
+    _generation = generation = next(_counter)
+    for listener in _bump_listeners:
+        listener(generation)
+
+
+def add_bump_listener(listener: Callable[[int], None]) -> None:
+    """Call ``listener(generation)`` after every bump, in the writer's thread."""
+    _bump_listeners.append(listener)
+
+
+def current() -> tuple[str, int]:
+    """The boot id and write generation ETags are issued at."""
+    return _BOOT_ID, _generation
+
+
+def adopt(boot_id: str, generation: int) -> None:
+    """Issue ETags at another process's boot id and generation."""
+    global _BOOT_ID, _generation
+    _BOOT_ID, _generation = boot_id, generation
+
+
+def new_epoch() -> None:
+    """Start a fresh boot id, invalidating every ETag issued so far."""
+    global _BOOT_ID
+    _BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def global_etag(*extra: object) -> str:
+    """ETag for responses that depend on all data (lists, aggregates)."""
+    parts = [_BOOT_ID, str(_generation), *(str(e) for e in extra)]
+    return f'W/"{".".join(parts)}"'
+
+
+def session_etag(session_version: int) -> str:
+    """ETag for a single session's representation."""
+    return f'W/"{_BOOT_ID}.{_generation}.s{session_version}"'
+
+
+def today() -> str:
+    """Current UTC date, for ETags of responses with rolling date windows."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _client_etags(request: Request) -> list[str]:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return []
+    return [t.strip() for t in header.split(",") if t.strip()]
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Response | None:
+    """Attach ``etag`` to ``response``; return a 304 if the client already has it."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    tags = _client_etags(request)
+    if etag in tags or "*" in tags:
+        return _not_modified_response(etag)
+    etag_requests.inc("miss")
+    return None
+
+
+def _not_modified_response(etag: str) -> Response:
+    etag_requests.inc("hit")
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def session_not_modified(request: Request, response: Response, session_id: str) -> Response | None:
+    """Conditional GET for a single session's resources.
+
+    Answers 304 without touching the database when the client's ETag was
+    issued at the current write generation; otherwise falls back to the
+    session's ``version`` (a primary-key lookup) so writes to other
+    sessions don't invalidate this one.
+    """
+    tags = _client_etags(request)
+    generation_prefix = f'W/"{_BOOT_ID}.{_generation}.s'
+    for tag in tags:
+        if tag.startswith(generation_prefix):
+            return _not_modified_response(tag)
+
+    row = get_db().execute(
+        "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    if row is None:
+        etag_requests.inc("miss")
+        return None  # Let the route produce its 404
+
+    etag = session_etag(row["version"])
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    suffix = f'.s{row["version"]}"'
+    if any(t.startswith(f'W/"{_BOOT_ID}.') and t.endswith(suffix) for t in tags):
+        return _not_modified_response(etag)
+    etag_requests.inc("miss")
+    return None
@@ -0,0 +1,355 @@
+"""Replay hook events against a running server at a controlled rate.
+
+    uv run python -m ai_monitor.loadgen --rate 200 --concurrency 8 --sessions 50 --duration 60
+    uv run python -m ai_monitor.loadgen --replay events.jsonl --rate 500 --json report.json
+
+Events are either synthetic or read from a JSONL file of recorded hook
+payloads (one ``POST /api/events`` body per line). Synthetic traffic
+models ``--sessions`` concurrent sessions. Each one starts, runs
+PreToolUse/PostToolUse pairs (some failing), spawns subagents whose tool
+calls carry their ``agent_id``, and stops. A finished session is
+replaced by a new one.
+
+Sends are scheduled as a Poisson process at ``--rate`` events/sec. That
+is the arrival pattern of many independent sessions, so the intervals
+between events are exponential rather than evenly spaced. Each session
+is pinned to one of ``--concurrency`` keep-alive connections, so its
+events stay in order, as they do from real hooks.
+
+The report gives:
+- achieved throughput and ack latency percentiles;
+- errors by status, with 429s counted on their own;
+- how far sends fell behind schedule;
+- visibility lag: from posting a sampled PreToolUse to its tool call
+  being counted in ``GET /api/sessions/{id}``.
+
+Only the standard library is used, so it runs wherever the server does.
+"""
+
+import argparse
+import http.client
+import json
+import math
+import queue
+import random
+import statistics
+import threading
+import time
+import uuid
+from typing import Any, Iterator
+from urllib.parse import urlsplit
+
+from ai_monitor.config import settings
+
+_TOOLS = (("Read", 30), ("Bash", 22), ("Edit", 14), ("Grep", 9), ("Glob", 5), ("Write", 5), ("Task", 3))
+_FAILURE_RATE = 0.05
+
+
+class _Connection:
+    """A keep-alive HTTP connection that reconnects after an error."""
+
+    def __init__(self, url: str, timeout: float) -> None:
+        parts = urlsplit(url)
+        self._factory = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._host = parts.netloc
+        self._timeout = timeout
+        self._conn: http.client.HTTPConnection | None = None
+
+    def request(self, method: str, path: str, body: bytes | None = None) -> tuple[int, bytes]:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        reused = self._conn is not None
+        if self._conn is None:
+            self._conn = self._factory(self._host, timeout=self._timeout)
+        try:
+            self._conn.request(method, path, body=body, headers=headers)
+        except (BrokenPipeError, ConnectionResetError):
+            # The server closed an idle keep-alive connection before this
+            # request reached it: safe to send again on a new one
+            self._conn.close()
+            self._conn = None
+            if not reused:
+                raise
+            return self.request(method, path, body)
+        try:
+            resp = self._conn.getresponse()
+            return resp.status, resp.read()
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            self._conn = None
+            raise
+
+
+class _Session:
+    """One simulated Claude Code session, yielding ``(event, probe)`` pairs.
+
+    ``probe`` is the tool call count the session will show once the event
+    is processed, for PreToolUse events, and None otherwise.
+    """
+
+    def __init__(self, rng: random.Random, prefix: str, n: int, subagent_rate: float) -> None:
+        self.session_id = f"{prefix}-{n:06d}"
+        self._rng = rng
+        self._subagent_rate = subagent_rate
+        self._calls = max(1, round(rng.lognormvariate(math.log(40), 1.0)))
+        self._started = 0
+        self.events = self._events()
+
+    def _tool_call(self, agent_id: str | None) -> Iterator[tuple[dict, int | None]]:
+        rng = self._rng
+        tool = rng.choices([t for t, _ in _TOOLS], [w for _, w in _TOOLS])[0]
+        base = {"session_id": self.session_id, "tool_name": tool, "agent_id": agent_id}
+        self._started += 1
+        yield {**base, "hook_event_name": "PreToolUse", "tool_input": {"command": f"step {self._started}"}}, self._started
+        if rng.random() < _FAILURE_RATE:
+            yield {**base, "hook_event_name": "PostToolUseFailure", "error": "exit code 1"}, None
+        else:
+            yield {**base, "hook_event_name": "PostToolUse",
+                   "tool_response": {"output": "x" * int(rng.lognormvariate(math.log(800), 1.0))}}, None
+
+    def _events(self) -> Iterator[tuple[dict, int | None]]:
+        rng = self._rng
+        cwd = f"/tmp/loadgen/{self.session_id}"
+        yield {"session_id": self.session_id, "hook_event_name": "SessionStart", "cwd": cwd}, None
+        remaining = self._calls
+        while remaining > 0:
+            if rng.random() < self._subagent_rate:
+                agent_id = f"{self.session_id}-{uuid.UUID(int=rng.getrandbits(128)).hex[:8]}"
+                yield {"session_id": self.session_id, "hook_event_name": "SubagentStart",
+                       "agent_id": agent_id, "agent_type": "general-purpose"}, None
+                for _ in range(min(remaining, rng.randint(2, 12))):
+                    yield from self._tool_call(agent_id)
+                    remaining -= 1
+                yield {"session_id": self.session_id, "hook_event_name": "SubagentStop",
+                       "agent_id": agent_id, "agent_type": "general-purpose"}, None
+            else:
+                yield from self._tool_call(None)
+                remaining -= 1
+        yield {"session_id": self.session_id, "hook_event_name": "Stop", "cwd": cwd}, None
+
+
+def synthetic_events(sessions: int, subagent_rate: float, seed: int, prefix: str) -> Iterator[tuple[dict, int | None]]:
+    """Interleaved events of ``sessions`` concurrent sessions, endlessly."""
+    rng = random.Random(seed)
+    started = 0
+    active = []
+    for _ in range(sessions):
+        active.append(_Session(rng, prefix, started, subagent_rate))
+        started += 1
+    while True:
+        i = rng.randrange(len(active))
+        try:
+            yield next(active[i].events)
+        except StopIteration:
+            active[i] = _Session(rng, prefix, started, subagent_rate)
+            started += 1
+
+
+def replayed_events(path: str, prefix: str | None) -> Iterator[tuple[dict, int | None]]:
+    """Recorded hook payloads, with session ids prefixed so runs don't collide."""
+    started: dict[str, int] = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if prefix:
+                event["session_id"] = f"{prefix}-{event['session_id']}"
+            probe = None
+            if event.get("hook_event_name") == "PreToolUse":
+                probe = started[event["session_id"]] = started.get(event["session_id"], 0) + 1
+            yield event, probe
+
+
+class LoadGenerator:
+    """Send events on schedule from worker threads and collect the report."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self._queues = [queue.Queue(maxsize=10_000) for _ in range(args.concurrency)]
+        self._probes: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._acks: list[float] = []
+        self._behind: list[float] = []
+        self._lags: list[float] = []
+        self._statuses: dict[str, int] = {}
+        self.probe_timeouts = 0
+        self.sent = 0
+        self.started = 0.0
+
+    def _record(self, status: str, latency_ms: float | None, behind_ms: float) -> None:
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+            if latency_ms is not None:
+                self._acks.append(latency_ms)
+            self._behind.append(behind_ms)
+
+    def _worker(self, q: queue.Queue) -> None:
+        conn = _Connection(self.args.url, self.args.timeout)
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            due, event, probe = item
+            sent = time.perf_counter()
+            try:
+                status, _ = conn.request("POST", "/api/events", json.dumps(event).encode())
+            except (OSError, http.client.HTTPException) as e:
+                self._record(type(e).__name__, None, (sent - due) * 1000)
+                continue
+            self._record(str(status), (time.perf_counter() - sent) * 1000, (sent - due) * 1000)
+            if status == 200 and probe is not None:
+                self._probes.put((event["session_id"], probe, sent))
+
+    def _prober(self) -> None:
+        conn = _Connection(self.args.url, self.args.timeout)
+        while True:
+            item = self._probes.get()
+            if item is None:
+                return
+            session_id, expected, sent = item
+            deadline = sent + self.args.visibility_timeout
+            while True:
+                try:
+                    status, body = conn.request("GET", f"/api/sessions/{session_id}")
+                    if status == 200 and json.loads(body).get("tool_call_count", 0) >= expected:
+                        with self._lock:
+                            self._lags.append((time.perf_counter() - sent) * 1000)
+                        break
+                except (OSError, http.client.HTTPException, ValueError):
+                    pass
+                if time.perf_counter() > deadline:
+                    with self._lock:
+                        self.probe_timeouts += 1
+                    break
+                time.sleep(0.005)
+
+    def run(self, events: Iterator[tuple[dict, int | None]]) -> dict[str, Any]:
+        args = self.args
+        workers = [threading.Thread(target=self._worker, args=(q,), daemon=True) for q in self._queues]
+        # Several probers, so a slow probe doesn't delay the next one's first look
+        probers = [threading.Thread(target=self._prober, daemon=True) for _ in range(args.probers)]
+        for t in (*workers, *probers):
+            t.start()
+        rng = random.Random(args.seed)
+        pre_seen = 0
+        self.started = due = time.perf_counter()
+        stop_at = self.started + args.duration if args.duration else math.inf
+        for event, probe in events:
+            if args.events and self.sent >= args.events:
+                break
+            due += rng.expovariate(args.rate)
+            if due >= stop_at:
+                break
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            if probe is not None:
+                pre_seen += 1
+                if pre_seen % args.probe_every:
+                    probe = None
+            shard = hash(event["session_id"]) % len(self._queues)
+            self._queues[shard].put((due, event, probe))
+            self.sent += 1
+        for q in self._queues:
+            q.put(None)
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - self.started
+        for t in probers:
+            self._probes.put(None)
+        for t in probers:
+            t.join()
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict[str, Any]:
+        acked = self._statuses.get("200", 0)
+        errors = {status: n for status, n in self._statuses.items() if status != "200"}
+        return {
+            "url": self.args.url,
+            "target_rate": self.args.rate,
+            "concurrency": self.args.concurrency,
+            "elapsed_s": round(elapsed, 2),
+            "sent": self.sent,
+            "acked": acked,
+            "throughput": round(acked / elapsed, 1) if elapsed else 0.0,
+            "errors": errors,
+            "error_rate": round(sum(errors.values()) / self.sent, 4) if self.sent else 0.0,
+            "rate_limited": errors.get("429", 0),
+            "ack_ms": _percentiles(self._acks),
+            "behind_schedule_ms": _percentiles(self._behind),
+            "visibility_lag_ms": _percentiles(self._lags),
+            "visibility_probes": len(self._lags) + self.probe_timeouts,
+            "visibility_timeouts": self.probe_timeouts,
+        }
+
+
+def _percentiles(samples: list[float]) -> dict[str, float] | None:
+    if not samples:
+        return None
+    if len(samples) == 1:
+        cuts = samples * 99
+    else:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50": round(cuts[49], 2), "p90": round(cuts[89], 2),
+        "p99": round(cuts[98], 2), "max": round(max(samples), 2),
+    }
+
+
+def _print_report(r: dict[str, Any]) -> None:
+    print(f"{r['sent']} events in {r['elapsed_s']}s to {r['url']} "
+          f"(target {r['target_rate']}/s, concurrency {r['concurrency']})")
+    print(f"throughput: {r['throughput']} events/s acked, error rate {r['error_rate']:.2%} "
+          f"({r['rate_limited']} rate limited)")
+    for status, n in sorted(r["errors"].items()):
+        print(f"  {status}: {n}")
+    for label, key in (("ack latency", "ack_ms"), ("behind schedule", "behind_schedule_ms"),
+                       ("visibility lag", "visibility_lag_ms")):
+        p = r[key]
+        if p is None:
+            print(f"{label:<16} -")
+        else:
+            print(f"{label:<16} p50 {p['p50']:>8.2f} ms  p90 {p['p90']:>8.2f} ms  "
+                  f"p99 {p['p99']:>8.2f} ms  max {p['max']:>8.2f} ms")
+    if r["visibility_timeouts"]:
+        print(f"{r['visibility_timeouts']} of {r['visibility_probes']} probes never became visible")
+
+
+def main(argv: list[str] | None = None) -> dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=f"http://localhost:{settings.ai_monitor_port}")
+    parser.add_argument("--rate", type=float, default=100.0, help="target events/sec (Poisson arrivals)")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel keep-alive connections")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run (0 = until --events)")
+    parser.add_argument("--events", type=int, default=0, help="stop after this many events (0 = no limit)")
+    parser.add_argument("--sessions", type=int, default=20, help="simultaneous synthetic sessions")
+    parser.add_argument("--subagent-rate", type=float, default=0.05,
+                        help="chance that a tool call step spawns a subagent")
+    parser.add_argument("--replay", help="JSONL file of recorded hook payloads to send instead")
+    parser.add_argument("--keep-ids", action="store_true", help="don't prefix replayed session ids")
+    parser.add_argument("--probe-every", type=int, default=20,
+                        help="measure visibility lag on every Nth PreToolUse")
+    parser.add_argument("--probers", type=int, default=4, help="threads polling for visibility")
+    parser.add_argument("--visibility-timeout", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=10.0, help="HTTP timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+    if not args.duration and not args.events:
+        parser.error("set --duration or --events")
+
+    prefix = f"loadgen-{uuid.uuid4().hex[:8]}"
+    if args.replay:
+        events = replayed_events(args.replay, None if args.keep_ids else prefix)
+    else:
+        events = synthetic_events(args.sessions, args.subagent_rate, args.seed, prefix)
+    report = LoadGenerator(args).run(events)
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
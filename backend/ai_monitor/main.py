@@ -1,35 +1,77 @@
 """FastAPI application entry point."""
 
-import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
+from ai_monitor import metrics, query_profile
+from ai_monitor.cluster import cluster
+from ai_monitor.compression import CompressionMiddleware
 from ai_monitor.config import settings
 from ai_monitor.db import close_db, get_db
-from ai_monitor.routes import agents, dashboard, events, projects, sessions, tools
-from ai_monitor.services.session_reaper import reap_stale_sessions
-from ai_monitor.services.transcript_parser import scan_transcripts_dir
+from ai_monitor.routes import (
+    admin,
+    agents,
+    changes,
+    collector,
+    dashboard,
+    events,
+    hosts,
+    projects,
+    search,
+    sessions,
+    stream,
+    tail,
+    tools,
+)
+from ai_monitor.routes import metrics as metrics_routes
+from ai_monitor.services.session_reaper import session_expiry
+from ai_monitor.services.backfill import start_backfill
+from ai_monitor.services.forwarder import forwarder
+from ai_monitor.services.jobs import jobs
 from ai_monitor.watcher import start_watcher, stop_watcher
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
 
-async def _reaper_loop() -> None:
-    """Run the stale session reaper every 30 seconds."""
-    try:
-        while True:
-            await asyncio.sleep(30)
-            reap_stale_sessions()
-    except asyncio.CancelledError:
-        pass
+class WriterServices:
+    """Session expiry, the transcript watcher, the backfill and the forwarder.
+
+    Only the process that owns writes runs them: the single process, or
+    the elected writer among several workers (see ai_monitor.cluster).
+    """
+
+    def __init__(self) -> None:
+        self._backfill = None
+
+    async def start(self) -> None:
+        session_expiry.start()
+        start_watcher()
+        # Backfill in the background so hooks can post events right away
+        self._backfill = start_backfill()
+        forwarder.start()
+
+    async def stop(self) -> None:
+        if self._backfill is None:
+            return
+        backfill_job, backfill_task = self._backfill
+        self._backfill = None
+        forwarder.stop()
+        session_expiry.stop()
+        backfill_job.cancel()
+        await backfill_task
+        stop_watcher()
+
+
+writer_services = WriterServices()
 
 
 @asynccontextmanager
@@ -38,15 +80,14 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting AI Monitor on %s:%s", settings.ai_monitor_host, settings.ai_monitor_port)
     get_db()
-    start_watcher()
-    scan_transcripts_dir(settings.claude_projects_dir)
-    reaper_task = asyncio.create_task(_reaper_loop())
+    await cluster.start(writer_services.start)
+    app.state.ready = True
     logger.info("AI Monitor ready")
     yield
     # Shutdown
-    reaper_task.cancel()
-    await reaper_task
-    stop_watcher()
+    app.state.ready = False
+    await writer_services.stop()
+    cluster.stop()
     close_db()
     logger.info("AI Monitor stopped")
 
@@ -61,20 +102,60 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=settings.response_compression_min_bytes)
+if metrics.enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+if query_profile.enabled:
+    app.add_middleware(query_profile.QueryProfileMiddleware)
+
+
+def backfill_status() -> str | None:
+    backfill = next((job for job in jobs.list() if job.name == "transcript_backfill"), None)
+    return backfill.status if backfill is not None else None
 
 
 @app.get("/api/health")
 async def health():
+    return {
+        "status": "ok",
+        "ready": getattr(app.state, "ready", False),
+        # The backfill runs in the writer process
+        "backfill": backfill_status() if cluster.is_writer else await run_in_threadpool(
+            cluster.call, backfill_status
+        ),
+    }
+
+
+@app.get("/api/health/live")
+async def health_live():
+    """Liveness: the process is up and serving requests."""
     return {"status": "ok"}
 
 
+@app.get("/api/health/ready")
+async def health_ready():
+    """Readiness: startup finished and events can be ingested (backfill may still run)."""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready"}
+
+
 # API routes - registered before static mount so they take priority
 app.include_router(events.router)
+app.include_router(collector.router)
+app.include_router(hosts.router)
 app.include_router(sessions.router)
 app.include_router(projects.router)
 app.include_router(tools.router)
 app.include_router(agents.router)
 app.include_router(dashboard.router)
+app.include_router(search.router)
+app.include_router(stream.router)
+app.include_router(changes.router)
+app.include_router(tail.router)
+app.include_router(admin.router)
+if metrics.enabled:
+    app.include_router(metrics_routes.router)
 
 # Static files (frontend build) - mount LAST so API routes take priority
 static_dir = os.path.join(os.path.dirname(__file__), "..", "static")
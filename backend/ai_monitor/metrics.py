@@ -0,0 +1,214 @@
+"""Prometheus-style metrics for the monitor's own hot paths.
+
+Counters and histograms are sharded per thread: each thread only ever
+writes its own dict, so recording a sample takes no lock and loses no
+increments. A scrape sums the shards. Gauges that already exist
+elsewhere (queue depths, database size) are read at scrape time by the
+``/metrics`` route rather than tracked here.
+
+Everything is off when ``METRICS_ENABLED`` is false. Recording then
+returns straight away, and neither the middleware nor the route is
+installed.
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ai_monitor.config import settings
+
+# Latency buckets in seconds, from sub-millisecond commits to slow scans
+_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+enabled = settings.metrics_enabled
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._shards_lock = threading.Lock()
+        registry.append(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self) -> list[dict]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict() copies in one step under the GIL, so a writer can't resize it mid-read
+        return [dict(shard) for shard in shards]
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: Any, amount: float = 1) -> None:
+        if not enabled:
+            return
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> dict[tuple, float]:
+        totals: dict[tuple, float] = {}
+        for shard in self._snapshots():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def expose(self) -> list[str]:
+        lines = self.header()
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}_total{_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = _LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: Any) -> None:
+        if not enabled:
+            return
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # Per-bucket counts (last one is +Inf), then sum
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def expose(self) -> list[str]:
+        merged: dict[tuple, list] = {}
+        for shard in self._snapshots():
+            for key, state in shard.items():
+                state = list(state)
+                total = merged.get(key)
+                merged[key] = state if total is None else [a + b for a, b in zip(total, state)]
+        lines = self.header()
+        for key, state in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), state):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {state[-1]:.6g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def scraped(
+    name: str, help: str, samples: Iterable[tuple[dict[str, Any], float]], kind: str = "gauge"
+) -> list[str]:
+    """Exposition lines for a value read at scrape time (a counter's ``name`` ends in ``_total``)."""
+    family = name.removesuffix("_total") if kind == "counter" else name
+    lines = [f"# HELP {family} {help}", f"# TYPE {family} {kind}"]
+    for labels, value in samples:
+        names = tuple(labels)
+        lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {value:g}")
+    return lines
+
+
+registry: list[_Metric] = []
+
+http_request_seconds = Histogram(
+    "ai_monitor_http_request_duration_seconds",
+    "Time from request to response start, by route template.",
+    ("method", "route", "status"),
+)
+ingest_commit_seconds = Histogram(
+    "ai_monitor_ingest_commit_seconds",
+    "Time from a hook event's arrival to its writes being committed.",
+    ("hook_event_name",),
+)
+events_total = Counter(
+    "ai_monitor_events",
+    "Hook events received.",
+    ("hook_event_name",),
+)
+transcript_parse_seconds = Histogram(
+    "ai_monitor_transcript_parse_seconds",
+    "Time to scan one transcript's new bytes.",
+)
+transcript_parse_bytes = Counter(
+    "ai_monitor_transcript_parse_bytes",
+    "Transcript bytes scanned; rate() gives parse throughput.",
+)
+collected_events = Counter(
+    "ai_monitor_collected_events",
+    "Forwarded hook events received from agents, by outcome.",
+    ("host", "result"),
+)
+etag_requests = Counter(
+    "ai_monitor_etag_requests",
+    "Conditional GETs answered from the ETag (hit) or by running the query (miss).",
+    ("result",),
+)
+
+
+def expose() -> str:
+    return "\n".join(line for metric in registry for line in metric.expose())
+
+
+class MetricsMiddleware:
+    """Time every HTTP request to its response start, labelled by route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                http_request_seconds.observe(
+                    time.perf_counter() - started,
+                    scope["method"],
+                    getattr(route, "path", "unmatched"),
+                    message["status"],
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
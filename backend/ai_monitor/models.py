@@ -25,12 +25,16 @@ class HookEvent(BaseModel):
         "SubagentStop",
     ]
     cwd: str | None = None
+    transcript_path: str | None = None
     tool_name: str | None = None
     tool_input: Any | None = None
     tool_response: Any | None = None
     error: str | None = None
     agent_name: str | None = None
     agent_type: str | None = None
+    # Set by Claude Code on SubagentStart/SubagentStop and on tool events
+    # fired from inside a subagent
+    agent_id: str | None = None
     model: str | None = None
     timestamp: str | None = None
 
@@ -50,6 +54,7 @@ class Session(BaseModel):
     session_id: str
     project_id: int | None = None
     project_name: str | None = None
+    host: str | None = None
     status: str = "active"
     model: str | None = None
     started_at: str | None = None
@@ -61,6 +66,7 @@ class Session(BaseModel):
     estimated_cost: float = 0.0
     tool_call_count: int = 0
     duration_seconds: float | None = None
+    change_seq: int | None = None
 
 
 class ToolCall(BaseModel):
@@ -69,11 +75,18 @@ class ToolCall(BaseModel):
     tool_name: str
     tool_input: Any | None = None
     tool_response: Any | None = None
+    input_summary: str | None = None
+    tool_input_preview: str | None = None
+    tool_response_preview: str | None = None
+    tool_input_size: int | None = None
+    tool_response_size: int | None = None
     status: str = "pending"
     error: str | None = None
     started_at: str | None = None
     ended_at: str | None = None
     duration_ms: int | None = None
+    agent_id: int | None = None
+    change_seq: int | None = None
 
 
 class Agent(BaseModel):
@@ -81,10 +94,17 @@ class Agent(BaseModel):
     session_id: str
     agent_name: str | None = None
     agent_type: str | None = None
+    hook_agent_id: str | None = None
+    parent_agent_id: int | None = None
     task_tool_call_id: int | None = None
     status: str = "active"
     started_at: str | None = None
     ended_at: str | None = None
+    change_seq: int | None = None
+    # Aggregates over the agent's attributed tool calls (agent endpoints only)
+    tool_call_count: int | None = None
+    error_count: int | None = None
+    total_duration_ms: int | None = None
 
 
 class AgentDetail(Agent):
@@ -128,6 +148,45 @@ class TokensOverTime(BaseModel):
     tokens_out: int = 0
 
 
+class UsageEntry(BaseModel):
+    """One model's share of one transcript turn, from the usage ledger."""
+
+    turn: int
+    model: str
+    timestamp: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    cost: float = 0.0
+
+
+class UsageHour(BaseModel):
+    hour: str
+    model: str | None = None
+    turns: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    cost: float = 0.0
+
+
+class AgentTreeNode(Agent):
+    """An agent with rollups over itself and all of its descendants."""
+
+    depth: int = 0
+    descendant_count: int = 0
+    subtree_tool_call_count: int = 0
+    subtree_error_count: int = 0
+    subtree_duration_ms: int = 0
+    subtree_started_at: str | None = None
+    # NULL while any agent in the subtree is still active
+    subtree_ended_at: str | None = None
+    subtree_wall_seconds: float | None = None
+    children: list["AgentTreeNode"] = Field(default_factory=list)
+
+
 class TimelineEvent(BaseModel):
     type: Literal["tool_call", "agent"]
     timestamp: str | None = None
@@ -135,6 +194,244 @@ class TimelineEvent(BaseModel):
     agent: Agent | None = None
 
 
+class TimelinePage(BaseModel):
+    items: list[TimelineEvent]
+    next_cursor: str | None = None
+
+
+class ChangeSet(BaseModel):
+    """Rows changed since a client-supplied change sequence."""
+
+    seq: int
+    has_more: bool = False
+    sessions: list[Session] = Field(default_factory=list)
+    tool_calls: list[ToolCall] = Field(default_factory=list)
+    agents: list[Agent] = Field(default_factory=list)
+
+
+class TailSubscriberStats(BaseModel):
+    transport: Literal["sse", "websocket"]
+    queued: int
+    delivered: int
+    delivered_seq: int
+    lag_seq: int
+    lag_ms: float
+    resyncs: int
+
+
+class TailTopicStats(BaseModel):
+    session_id: str
+    seq: int
+    subscriber_count: int
+    notifications: int
+    updates: int
+    queries: int
+    last_flush_ms: float | None = None
+    subscribers: list[TailSubscriberStats] = Field(default_factory=list)
+
+
+class TailMetrics(BaseModel):
+    coalesce_seconds: float
+    topic_count: int
+    subscriber_count: int
+    max_lag_seq: int
+    topics: list[TailTopicStats] = Field(default_factory=list)
+
+
+class JobStatus(BaseModel):
+    id: int
+    name: str
+    status: Literal["pending", "running", "completed", "failed", "cancelled"]
+    total: int | None = None
+    done: int = 0
+    skipped: int = 0
+    progress: float | None = None
+    rate_per_second: float | None = None
+    eta_seconds: float | None = None
+    elapsed_seconds: float | None = None
+    started_at: str | None = None
+    finished_at: str | None = None
+    error: str | None = None
+
+
+class ModelPriceIn(BaseModel):
+    """A model price per million tokens (USD), effective from a date on."""
+
+    pattern: str
+    effective_from: str
+    input: float
+    output: float
+    cache_read: float | None = None
+    cache_write: float | None = None
+
+
+class ModelPrice(ModelPriceIn):
+    id: int
+    cache_read: float
+    cache_write: float
+
+
+class ModelCostDiff(BaseModel):
+    model: str
+    rows: int
+    rows_changed: int
+    old_cost: float
+    new_cost: float
+
+
+class SessionCostDiff(BaseModel):
+    session_id: str
+    old_cost: float
+    new_cost: float
+    delta: float
+
+
+class CostRecompute(BaseModel):
+    dry_run: bool
+    ledger_rows: int
+    rows_changed: int
+    sessions_changed: int
+    old_total_cost: float
+    new_total_cost: float
+    models: list[ModelCostDiff] = Field(default_factory=list)
+    sessions: list[SessionCostDiff] = Field(default_factory=list)
+    elapsed_ms: float
+
+
+class QueryStatement(BaseModel):
+    sql: str
+    calls: int
+    rows: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    slow_calls: int = 0
+    n_plus_one_requests: int = 0
+    plan: list[str] | None = None
+
+
+class RouteQueries(BaseModel):
+    route: str
+    requests: int
+    queries: int
+    avg_queries: float
+    max_queries: int
+    total_ms: float
+    avg_ms: float
+    n_plus_one_requests: int = 0
+
+
+class QueryProfile(BaseModel):
+    enabled: bool
+    since: float
+    slow_query_ms: float
+    n_plus_one_threshold: int
+    statements: list[QueryStatement] = []
+    routes: list[RouteQueries] = []
+
+
+class ForwardedEvent(BaseModel):
+    id: str = Field(min_length=1)
+    at: str | None = None
+    event: HookEvent
+
+
+class ForwardedBatch(BaseModel):
+    host: str = Field(min_length=1)
+    events: list[ForwardedEvent]
+
+
+class CollectResult(BaseModel):
+    accepted: int
+    duplicates: int
+    failed: int = 0
+
+
+class ForwarderStatus(BaseModel):
+    enabled: bool
+    collector_url: str | None = None
+    host: str
+    outbox: int = 0
+    sent_events: int = 0
+    sent_batches: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    dropped: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_error: str | None = None
+    last_sent_at: float | None = None
+    retry_in_seconds: float | None = None
+
+
+class HostSummary(BaseModel):
+    host: str
+    session_count: int
+    active_sessions: int
+    last_event_at: str | None = None
+
+
+class ClusterStatus(BaseModel):
+    workers: int
+    role: Literal["writer", "reader"]
+    pid: int
+    writer_pid: int | None = None
+    followers: int = 0
+    forwarded: int = 0
+    relayed: int = 0
+
+
+class ReaperMetrics(BaseModel):
+    timeout_minutes: float
+    tracked_sessions: int
+    heap_size: int
+    next_expiry_seconds: float | None = None
+    expired: int = 0
+    batches: int = 0
+    rearmed: int = 0
+    last_batch_ms: float | None = None
+    rebuilt_sessions: int = 0
+
+
+class WatcherMetrics(BaseModel):
+    workers: int
+    queue_depth: int
+    running: int
+    max_pending: int
+    marked: int
+    parsed: int
+    failed: int
+    overflows: int
+    rescans: int
+    parse_ms_p50: float | None = None
+    parse_ms_p95: float | None = None
+    parse_ms_mean: float | None = None
+    wait_ms_p50: float | None = None
+    wait_ms_p95: float | None = None
+    observer: str | None = None
+    polling: bool = False
+    hot_dirs: int = 0
+    max_hot_dirs: int = 0
+    promotions: int = 0
+    evictions: int = 0
+    sweeps: int = 0
+    sweep_changes: int = 0
+    last_sweep_files: int = 0
+    last_sweep_ms: float | None = None
+
+
+class SearchHit(BaseModel):
+    kind: Literal["session", "tool_call"]
+    session_id: str
+    tool_call_id: int | None = None
+    project_name: str | None = None
+    tool_name: str | None = None
+    status: str | None = None
+    started_at: str | None = None
+    snippet: str
+    rank: float
+
+
 class ProjectDetail(BaseModel):
     id: int | None = None
     name: str
@@ -0,0 +1,77 @@
+"""Manage model prices and recompute stored costs from the command line.
+
+    uv run python -m ai_monitor.pricing list
+    uv run python -m ai_monitor.pricing set opus --from 2025-11-24 --input 5 --output 25
+    uv run python -m ai_monitor.pricing recompute --dry-run
+
+Works on the database in ``AI_MONITOR_DB_PATH`` and is safe to run
+while the server is up. A running server prices new turns at a changed
+price within a second.
+"""
+
+import argparse
+
+from ai_monitor.services import pricing
+
+
+def _print_prices() -> None:
+    print(f"{'pattern':<20} {'from':<12} {'input':>9} {'output':>9} {'cache r':>9} {'cache w':>9}")
+    for p in pricing.list_prices():
+        print(
+            f"{p['pattern'] or '(default)':<20} {p['effective_from']:<12} {p['input']:>9.4g} "
+            f"{p['output']:>9.4g} {p['cache_read']:>9.4g} {p['cache_write']:>9.4g}"
+        )
+
+
+def _print_recompute(report: dict) -> None:
+    verb = "would change" if report["dry_run"] else "changed"
+    print(
+        f"{report['ledger_rows']} ledger rows, {report['rows_changed']} {verb}; "
+        f"{report['sessions_changed']} sessions {verb} ({report['elapsed_ms']:.0f} ms)"
+    )
+    print(f"total cost: ${report['old_total_cost']:.4f} -> ${report['new_total_cost']:.4f}")
+    if report["models"]:
+        print(f"\n{'model':<40} {'rows':>8} {'old':>12} {'new':>12}")
+        for m in report["models"]:
+            print(f"{m['model']:<40} {m['rows']:>8} {m['old_cost']:>12.4f} {m['new_cost']:>12.4f}")
+    if report["sessions"]:
+        print(f"\n{'session':<40} {'old':>12} {'new':>12} {'delta':>12}")
+        for s in report["sessions"]:
+            print(f"{s['session_id']:<40} {s['old_cost']:>12.4f} {s['new_cost']:>12.4f} {s['delta']:>+12.4f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show the pricing table")
+
+    set_cmd = commands.add_parser("set", help="add or replace a price (USD per million tokens)")
+    set_cmd.add_argument("pattern", help="substring of the model name; '' for the default")
+    set_cmd.add_argument("--from", dest="effective_from", required=True, help="effective date, YYYY-MM-DD (or an ISO timestamp)")
+    set_cmd.add_argument("--input", type=float, required=True)
+    set_cmd.add_argument("--output", type=float, required=True)
+    set_cmd.add_argument("--cache-read", type=float, help="default: 10%% of --input")
+    set_cmd.add_argument("--cache-write", type=float, help="default: 125%% of --input")
+
+    recompute = commands.add_parser("recompute", help="re-derive stored costs at the current prices")
+    recompute.add_argument("--dry-run", action="store_true", help="only show what would change")
+    recompute.add_argument("--limit", type=int, default=20, help="sessions to list in the diff")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        _print_prices()
+    elif args.command == "set":
+        try:
+            pricing.set_price(
+                args.pattern, args.effective_from, args.input, args.output,
+                args.cache_read, args.cache_write,
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        _print_prices()
+    else:
+        _print_recompute(pricing.recompute_costs(args.dry_run, args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""SQL profiling: per-statement timing, slow-query log and N+1 detection.
+
+The database connection is created with :class:`ProfiledConnection`,
+whose cursors time every ``execute`` and fetch and count the rows they
+return. Statements are grouped by their text with whitespace collapsed
+and ``IN (?, ?, ...)`` lists folded, so one query shape is one entry
+however many ids it was called with.
+
+:class:`QueryProfileMiddleware` scopes a request: the queries it runs
+(including its background tasks) are tallied per route. A statement
+run ``QUERY_N_PLUS_ONE_THRESHOLD`` or more times in one request is
+flagged as a likely N+1. A statement whose execution and fetching take
+``SLOW_QUERY_MS`` or longer is logged with its ``EXPLAIN QUERY PLAN``.
+
+``QUERY_PROFILING=false`` opens a plain connection instead, and the
+middleware isn't installed.
+"""
+
+import functools
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ai_monitor.config import settings
+
+logger = logging.getLogger(__name__)
+
+enabled = settings.query_profiling
+
+_WHITESPACE = re.compile(r"\s+")
+_PARAM_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize(sql: str) -> str:
+    """The statement's shape: whitespace collapsed, ``?, ?, ?`` lists folded."""
+    return _PARAM_LIST.sub("?, ...", _WHITESPACE.sub(" ", sql).strip())
+
+
+class _RequestQueries:
+    """Queries run on behalf of one HTTP request."""
+
+    __slots__ = ("calls", "elapsed_ms", "by_statement")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.elapsed_ms = 0.0
+        self.by_statement: dict[str, int] = {}
+
+
+_request: ContextVar[_RequestQueries | None] = ContextVar("query_profile_request", default=None)
+
+
+class QueryStats:
+    """Aggregated statement and route statistics since start or the last reset."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements: dict[str, dict[str, Any]] = {}
+            self._routes: dict[str, dict[str, Any]] = {}
+            self.since = time.time()
+
+    def _statement(self, key: str) -> dict[str, Any]:
+        entry = self._statements.get(key)
+        if entry is None:
+            entry = self._statements[key] = {
+                "sql": key, "calls": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "slow_calls": 0, "n_plus_one_requests": 0, "plan": None,
+            }
+        return entry
+
+    def record_time(
+        self, key: str, calls: int, elapsed_ms: float, rows: int, statement_ms: float
+    ) -> None:
+        """Add a cursor's work since its last report; ``statement_ms`` is its total so far."""
+        with self._lock:
+            entry = self._statement(key)
+            entry["calls"] += calls
+            entry["total_ms"] += elapsed_ms
+            entry["rows"] += rows
+            if statement_ms > entry["max_ms"]:
+                entry["max_ms"] = statement_ms
+        request = _request.get()
+        if request is not None:
+            request.elapsed_ms += elapsed_ms
+
+    def record_slow(self, key: str, plan: list[str] | None) -> None:
+        with self._lock:
+            entry = self._statement(key)
+            entry["slow_calls"] += 1
+            if plan is not None:
+                entry["plan"] = plan
+
+    def record_request(self, route: str, request: _RequestQueries) -> None:
+        repeated = {
+            key: count for key, count in request.by_statement.items()
+            if count >= settings.query_n_plus_one_threshold
+        }
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "route": route, "requests": 0, "queries": 0, "max_queries": 0,
+                    "total_ms": 0.0, "n_plus_one_requests": 0,
+                }
+            entry["requests"] += 1
+            entry["queries"] += request.calls
+            entry["max_queries"] = max(entry["max_queries"], request.calls)
+            entry["total_ms"] += request.elapsed_ms
+            if repeated:
+                entry["n_plus_one_requests"] += 1
+                for key in repeated:
+                    self._statement(key)["n_plus_one_requests"] += 1
+        for key, count in repeated.items():
+            logger.warning("Possible N+1 in %s: statement ran %d times: %s", route, count, key)
+
+    def snapshot(self, limit: int = 20) -> dict[str, Any]:
+        with self._lock:
+            statements = [dict(s) for s in self._statements.values()]
+            routes = [dict(r) for r in self._routes.values()]
+        statements.sort(key=lambda s: s["total_ms"], reverse=True)
+        for s in statements:
+            s["avg_ms"] = round(s["total_ms"] / s["calls"], 3) if s["calls"] else 0.0
+            s["total_ms"] = round(s["total_ms"], 3)
+            s["max_ms"] = round(s["max_ms"], 3)
+        for r in routes:
+            r["avg_queries"] = round(r["queries"] / r["requests"], 2)
+            r["avg_ms"] = round(r["total_ms"] / r["requests"], 3)
+            r["total_ms"] = round(r["total_ms"], 3)
+        routes.sort(key=lambda r: r["total_ms"], reverse=True)
+        return {
+            "enabled": enabled,
+            "since": self.since,
+            "slow_query_ms": settings.slow_query_ms,
+            "n_plus_one_threshold": settings.query_n_plus_one_threshold,
+            "statements": statements[:limit],
+            "routes": routes,
+        }
+
+
+stats = QueryStats()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """A cursor that times its statement and counts the rows fetched.
+
+    Time and rows are kept on the cursor and added to :data:`stats` in one
+    step after a fetch call, when iteration ends or when the cursor is
+    reused or collected, so a plain ``execute`` or a row loop takes the
+    stats lock once rather than per row.
+    """
+
+    _key: str | None = None
+    _sql: str = ""
+    _params: Any = ()
+    _elapsed_ms = 0.0
+    _pending_calls = 0
+    _pending_ms = 0.0
+    _pending_rows = 0
+    _logged = False
+
+    def _begin(self, sql: str, params: Any) -> None:
+        self._flush()
+        self._key = key = normalize(sql)
+        self._sql = sql
+        self._params = params
+        self._elapsed_ms = 0.0
+        self._pending_calls = 1
+        self._logged = False
+        request = _request.get()
+        if request is not None:
+            request.calls += 1
+            request.by_statement[key] = request.by_statement.get(key, 0) + 1
+
+    def _finish(self, started: float, rows: int, flush: bool = True) -> None:
+        if self._key is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._elapsed_ms += elapsed_ms
+        self._pending_ms += elapsed_ms
+        self._pending_rows += rows
+        if flush:
+            self._flush()
+        if not self._logged and self._elapsed_ms >= settings.slow_query_ms:
+            self._logged = True
+            plan = self._plan()
+            stats.record_slow(self._key, plan)
+            logger.warning(
+                "Slow query (%.1f ms): %s\n%s", self._elapsed_ms, self._key,
+                "\n".join(plan) if plan else "(no plan)",
+            )
+
+    def _flush(self) -> None:
+        if self._key is None or not (self._pending_calls or self._pending_ms):
+            return
+        stats.record_time(
+            self._key, self._pending_calls, self._pending_ms, self._pending_rows, self._elapsed_ms
+        )
+        self._pending_calls = 0
+        self._pending_ms = 0.0
+        self._pending_rows = 0
+
+    def _plan(self) -> list[str] | None:
+        if self._params is None:
+            return None  # executemany: no single set of parameters
+        try:
+            # The base class's execute, so the plan itself isn't profiled
+            rows = sqlite3.Connection.execute(
+                self.connection, "EXPLAIN QUERY PLAN " + self._sql, self._params
+            ).fetchall()
+        except sqlite3.Error:
+            return None
+        return [row[3] for row in rows] or None
+
+    def execute(self, sql: str, parameters: Any = (), /) -> "ProfiledCursor":
+        self._begin(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._finish(started, 0, flush=False)
+
+    def executemany(self, sql: str, seq_of_parameters: Any, /) -> "ProfiledCursor":
+        self._begin(sql, None)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._finish(started, 0, flush=False)
+
+    def fetchone(self) -> Any:
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._finish(started, row is not None)
+        return row
+
+    def fetchmany(self, size: int | None = None) -> list:
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._finish(started, len(rows))
+        return rows
+
+    def fetchall(self) -> list:
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._finish(started, len(rows))
+        return rows
+
+    def __next__(self) -> Any:
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._finish(started, 0)
+            raise
+        self._finish(started, 1, flush=False)
+        return row
+
+    def __del__(self) -> None:
+        self._flush()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """A connection whose cursors are :class:`ProfiledCursor`.
+
+    ``Connection.execute`` runs the statement without going through the
+    cursor's Python methods, so it is overridden here as well.
+    """
+
+    def cursor(self, factory: type = ProfiledCursor) -> sqlite3.Cursor:  # type: ignore[override]
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any, /) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class QueryProfileMiddleware:
+    """Tally the queries each HTTP request runs, by route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = _RequestQueries()
+        token = _request.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request.reset(token)
+            if request.calls:
+                route = getattr(scope.get("route"), "path", "unmatched")
+                stats.record_request(f"{scope['method']} {route}", request)
@@ -0,0 +1,72 @@
+"""Fast response path: sqlite rows straight to orjson, skipping re-validation.
+
+Routes that return large payloads (session detail, timeline) build plain
+dicts shaped like their response models and return an ``ORJSONResponse``
+directly, so FastAPI neither validates the data again nor serializes it
+with the stdlib json encoder. The models stay declared via
+``response_model=`` for the OpenAPI schema.
+"""
+
+import sqlite3
+from functools import lru_cache
+from typing import Any, Iterable
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def fast_json(content: Any, response: Response | None = None) -> ORJSONResponse:
+    """Return ``content`` via orjson, keeping headers set on the injected ``response``."""
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, headers=headers)
+
+
+@lru_cache(maxsize=None)
+def _field_defaults(model: type[BaseModel]) -> tuple[tuple[str, Any, Any], ...]:
+    """(name, default, default_factory) for every field of ``model``."""
+    return tuple(
+        (name, field.default, field.default_factory)
+        for name, field in model.model_fields.items()
+    )
+
+
+def row_dicts(model: type[BaseModel], rows: Iterable[sqlite3.Row], **overrides: Any) -> list[dict]:
+    """Project rows onto ``model``'s fields without validation.
+
+    The ``model_construct`` equivalent for plain dicts: columns the model
+    doesn't declare are dropped, and fields missing from the row get the
+    model's default. The rows must already hold correctly typed values.
+    """
+    fields = _field_defaults(model)
+    out: list[dict] = []
+    keys: set[str] | None = None
+    for r in rows:
+        if keys is None:
+            keys = set(r.keys())
+        d = {}
+        for name, default, factory in fields:
+            if name in overrides:
+                d[name] = overrides[name]
+            elif name in keys:
+                d[name] = r[name]
+            elif factory is not None:
+                d[name] = factory()
+            elif default is not PydanticUndefined:
+                d[name] = default
+        out.append(d)
+    return out
+
+
+def row_dict(model: type[BaseModel], row: sqlite3.Row, **overrides: Any) -> dict:
+    """Single-row form of :func:`row_dicts`."""
+    return row_dicts(model, [row], **overrides)[0]
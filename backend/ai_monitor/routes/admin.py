@@ -0,0 +1,111 @@
+"""/api/admin/* - Background job progress, watcher, reaper and forwarder metrics, pricing, query profile.
+
+Jobs, the watcher, session expiry, the forwarder and pricing writes live
+in the writer process, so with several workers those routes are answered
+by it.
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+from ai_monitor import query_profile
+from ai_monitor.cluster import cluster
+from ai_monitor.models import (
+    ClusterStatus,
+    CostRecompute,
+    ForwarderStatus,
+    JobStatus,
+    ModelPrice,
+    ModelPriceIn,
+    QueryProfile,
+    ReaperMetrics,
+    WatcherMetrics,
+)
+from ai_monitor.services import pricing
+from ai_monitor.services.forwarder import forwarder
+from ai_monitor.services.jobs import jobs
+from ai_monitor.services.session_reaper import session_expiry
+from ai_monitor.watcher import scheduler, watch_set
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+def _job_snapshots() -> list[dict]:
+    return [job.snapshot() for job in jobs.list()]
+
+
+def _watcher_metrics() -> dict:
+    return {**scheduler.metrics(), **watch_set.metrics()}
+
+
+def _reaper_metrics() -> dict:
+    return session_expiry.metrics()
+
+
+def _forwarder_metrics() -> dict:
+    return forwarder.metrics()
+
+
+@router.get("/jobs")
+async def list_jobs() -> list[JobStatus]:
+    """Background jobs, most recent first, with progress, rate and ETA."""
+    return await run_in_threadpool(cluster.call, _job_snapshots)
+
+
+@router.get("/watcher")
+async def watcher_metrics() -> WatcherMetrics:
+    """Transcript watcher: parse queue depth and latency, hot set and sweeps."""
+    return await run_in_threadpool(cluster.call, _watcher_metrics)
+
+
+@router.get("/reaper")
+async def reaper_metrics() -> ReaperMetrics:
+    """Session expiry: tracked deadlines, the next one due, and expiry batches."""
+    return await run_in_threadpool(cluster.call, _reaper_metrics)
+
+
+@router.get("/forwarder")
+async def forwarder_metrics() -> ForwarderStatus:
+    """Agent mode: events waiting in the outbox, batches sent, failures and backoff."""
+    return await run_in_threadpool(cluster.call, _forwarder_metrics)
+
+
+@router.get("/cluster")
+async def cluster_status() -> ClusterStatus:
+    """This worker's role, the elected writer, and forwarded and relayed counts."""
+    return cluster.status()
+
+
+@router.get("/queries")
+async def query_stats(limit: int = Query(20, ge=1, le=500)) -> QueryProfile:
+    """The ``limit`` statements with the most total time, and queries per request by route."""
+    return query_profile.stats.snapshot(limit)
+
+
+@router.delete("/queries", status_code=204)
+async def reset_query_stats() -> None:
+    """Start profiling afresh."""
+    query_profile.stats.reset()
+
+
+@router.get("/pricing")
+async def list_pricing() -> list[ModelPrice]:
+    """Model prices per million tokens with their effective dates."""
+    return pricing.list_prices()
+
+
+@router.post("/pricing")
+async def set_pricing(price: ModelPriceIn) -> ModelPrice:
+    """Add or replace a price. Stored costs change only on recompute."""
+    try:
+        return await run_in_threadpool(cluster.call, pricing.set_price, **price.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.post("/pricing/recompute")
+async def recompute_pricing(
+    dry_run: bool = False, limit: int = Query(20, ge=0, le=1000)
+) -> CostRecompute:
+    """Re-derive every stored cost at the current prices; ``dry_run`` only reports the diff."""
+    return await run_in_threadpool(cluster.call, pricing.recompute_costs, dry_run, limit)
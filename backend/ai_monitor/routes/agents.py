@@ -1,34 +1,37 @@
 """Agent endpoints."""
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request, Response
 
-from ai_monitor.db import get_db
+from ai_monitor.etag import global_etag, not_modified
 from ai_monitor.models import Agent
+from ai_monitor.services.agents import fetch_agents
 
 router = APIRouter(prefix="/api", tags=["agents"])
 
 
 @router.get("/agents")
 async def list_agents(
+    request: Request,
+    response: Response,
     session_id: str | None = None,
     status: str | None = None,
+    host: str | None = None,
 ) -> list[Agent]:
     """List agents with optional filters."""
-    db = get_db()
-
+    cached = not_modified(request, response, global_etag())
+    if cached:
+        return cached
     conditions = []
     params: list = []
     if session_id:
-        conditions.append("session_id = ?")
+        conditions.append("a.session_id = ?")
         params.append(session_id)
     if status:
-        conditions.append("status = ?")
+        conditions.append("a.status = ?")
         params.append(status)
+    if host is not None:
+        conditions.append("a.session_id IN (SELECT session_id FROM sessions WHERE host = ?)")
+        params.append(host)
 
-    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
-
-    rows = db.execute(
-        f"SELECT * FROM agents {where} ORDER BY started_at DESC",
-        params,
-    ).fetchall()
+    rows = fetch_agents(" AND ".join(conditions), params, order="a.started_at DESC")
     return [Agent(**{k: r[k] for k in r.keys()}) for r in rows]
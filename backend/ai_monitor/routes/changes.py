@@ -0,0 +1,27 @@
+"""GET /api/changes - Delta sync by change sequence."""
+
+from typing import Literal
+
+from fastapi import APIRouter, Query, Response
+
+from ai_monitor.models import ChangeSet
+from ai_monitor.responses import fast_json
+from ai_monitor.services.changes import changes_since
+
+router = APIRouter(prefix="/api", tags=["changes"])
+
+
+@router.get("/changes", response_model=ChangeSet)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    session_id: str | None = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    fields: Literal["summary", "full"] = "summary",
+) -> Response:
+    """Get sessions, tool calls and agents written after change sequence ``since``.
+
+    Each row appears once, in its latest state. Pass the returned ``seq``
+    as the next ``since``; when ``has_more`` is set, keep paging before
+    applying. Tool calls carry ``input_summary`` unless ``fields=full``.
+    """
+    return fast_json(changes_since(since, session_id, limit, fields))
@@ -0,0 +1,59 @@
+"""POST /api/collector/events - Event batches forwarded by other monitors (agent mode)."""
+
+import secrets
+import zlib
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+
+from ai_monitor.cluster import cluster
+from ai_monitor.config import settings
+from ai_monitor.metrics import collected_events
+from ai_monitor.models import CollectResult, ForwardedBatch
+from ai_monitor.services.event_processor import process_batch
+
+router = APIRouter(prefix="/api", tags=["collector"])
+
+# Decompressed size limit of one batch
+_MAX_BATCH_BYTES = 64 * 2**20
+
+
+def _gunzip(body: bytes) -> bytes:
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, _MAX_BATCH_BYTES)
+    except zlib.error as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid gzip body: {exc}") from exc
+    if decompressor.unconsumed_tail:
+        raise HTTPException(status_code=413, detail="Batch too large")
+    return data
+
+
+@router.post("/collector/events")
+async def collect_events(
+    request: Request, authorization: str | None = Header(None)
+) -> CollectResult:
+    """Apply a batch from an agent; acknowledged once committed, duplicates skipped."""
+    if settings.collector_token and not secrets.compare_digest(
+        authorization or "", f"Bearer {settings.collector_token}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid collector token")
+    body = await request.body()
+    if request.headers.get("content-encoding") == "gzip":
+        body = _gunzip(body)
+    elif len(body) > _MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail="Batch too large")
+    try:
+        batch = ForwardedBatch.model_validate_json(body)
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=422, detail=exc.errors(include_url=False, include_context=False)
+        ) from exc
+    result = await run_in_threadpool(
+        cluster.call, process_batch, batch.host, [(e.id, e.at, e.event) for e in batch.events]
+    )
+    for outcome, count in result.items():
+        if count:
+            collected_events.inc(batch.host, outcome, amount=count)
+    return result
@@ -1,14 +1,41 @@
-"""Dashboard statistics endpoint."""
+"""Dashboard statistics endpoints."""
 
-from fastapi import APIRouter
+from datetime import datetime, timezone
 
-from ai_monitor.models import DashboardStats
-from ai_monitor.services.stats import get_dashboard_stats
+from fastapi import APIRouter, Query, Request, Response
+
+from ai_monitor.etag import global_etag, not_modified, today
+from ai_monitor.models import DashboardStats, UsageHour
+from ai_monitor.services.stats import get_dashboard_stats, get_hourly_usage
 
 router = APIRouter(prefix="/api", tags=["dashboard"])
 
 
 @router.get("/dashboard/stats")
-async def dashboard_stats() -> DashboardStats:
-    """Get aggregate dashboard statistics."""
-    return get_dashboard_stats()
+async def dashboard_stats(
+    request: Request, response: Response, host: str | None = None
+) -> DashboardStats:
+    """Get aggregate dashboard statistics, optionally for one host."""
+    cached = not_modified(request, response, global_etag(today()))
+    if cached:
+        return cached
+    return get_dashboard_stats(host)
+
+
+@router.get("/usage/hourly")
+async def hourly_usage(
+    request: Request,
+    response: Response,
+    hours: int = Query(24, ge=1, le=24 * 90),
+    by_model: bool = False,
+) -> list[UsageHour]:
+    """Get tokens and cost per hour, optionally split by model.
+
+    Read from the hourly rollup of the usage ledger; hours without any
+    usage are left out.
+    """
+    hour = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H")
+    cached = not_modified(request, response, global_etag(hour, hours, int(by_model)))
+    if cached:
+        return cached
+    return get_hourly_usage(hours, by_model)
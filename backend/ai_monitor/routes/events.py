@@ -1,9 +1,14 @@
 """POST /api/events - Receive hook events."""
 
+import time
+
 from fastapi import APIRouter, BackgroundTasks
 
+from ai_monitor.cluster import cluster
+from ai_monitor.metrics import events_total
 from ai_monitor.models import HookEvent
 from ai_monitor.services.event_processor import process_event
+from ai_monitor.watcher import watch_set
 
 router = APIRouter(prefix="/api", tags=["events"])
 
@@ -11,5 +16,17 @@ router = APIRouter(prefix="/api", tags=["events"])
 @router.post("/events")
 async def receive_event(event: HookEvent, background_tasks: BackgroundTasks):
     """Accept a hook event and process it. Returns 200 quickly."""
-    background_tasks.add_task(process_event, event)
+    events_total.inc(event.hook_event_name)
+    if not cluster.is_writer:
+        background_tasks.add_task(cluster.submit, ingest, event)
+        return {"status": "ok"}
+    background_tasks.add_task(process_event, event, time.perf_counter())
+    # Keep the session's transcript directory in the watcher's hot set
+    background_tasks.add_task(watch_set.touch_transcript, event.transcript_path, event.cwd)
     return {"status": "ok"}
+
+
+def ingest(event: HookEvent) -> None:
+    """Write an event another worker received; timed from its arrival in the writer."""
+    process_event(event, time.perf_counter())
+    watch_set.touch_transcript(event.transcript_path, event.cwd)
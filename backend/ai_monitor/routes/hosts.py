@@ -0,0 +1,27 @@
+"""Host endpoints: the machines whose sessions this monitor holds."""
+
+from fastapi import APIRouter, Request, Response
+
+from ai_monitor.db import get_db
+from ai_monitor.etag import global_etag, not_modified
+from ai_monitor.models import HostSummary
+
+router = APIRouter(prefix="/api", tags=["hosts"])
+
+
+@router.get("/hosts")
+async def list_hosts(request: Request, response: Response) -> list[HostSummary]:
+    """Hosts with their session counts, most recently active first."""
+    cached = not_modified(request, response, global_etag())
+    if cached:
+        return cached
+    rows = get_db().execute(
+        """SELECT host, COUNT(*) as session_count,
+                  SUM(status = 'active') as active_sessions,
+                  MAX(COALESCE(last_event_at, started_at)) as last_event_at
+           FROM sessions
+           WHERE host IS NOT NULL
+           GROUP BY host
+           ORDER BY last_event_at DESC"""
+    ).fetchall()
+    return [HostSummary(**{k: r[k] for k in r.keys()}) for r in rows]
@@ -0,0 +1,84 @@
+"""GET /metrics - Prometheus text exposition of the monitor's own health."""
+
+import os
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ai_monitor import metrics
+from ai_monitor.config import settings
+from ai_monitor.services import change_stream
+from ai_monitor.services.jobs import jobs
+from ai_monitor.services.session_reaper import session_expiry
+from ai_monitor.services.session_tail import tail_hub
+from ai_monitor.watcher import scheduler, watch_set
+
+router = APIRouter(tags=["metrics"])
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _scraped_lines() -> list[str]:
+    """Values kept by the components themselves, read now."""
+    watcher = scheduler.metrics()
+    expiry = session_expiry.metrics()
+    db_path = os.path.expanduser(settings.ai_monitor_db_path)
+    return [
+        *metrics.scraped(
+            "ai_monitor_watcher_queue_depth", "Transcripts waiting to be parsed.",
+            [({}, watcher["queue_depth"])],
+        ),
+        *metrics.scraped(
+            "ai_monitor_watcher_running", "Transcript parses in progress.",
+            [({}, watcher["running"])],
+        ),
+        *metrics.scraped(
+            "ai_monitor_watcher_parses_total", "Transcript parses run by the watcher.",
+            [({"result": "ok"}, watcher["parsed"]), ({"result": "failed"}, watcher["failed"])],
+            kind="counter",
+        ),
+        *metrics.scraped(
+            "ai_monitor_watcher_hot_dirs", "Project directories watched for changes.",
+            [({}, watch_set.metrics()["hot_dirs"])],
+        ),
+        *metrics.scraped(
+            "ai_monitor_stream_subscribers", "Open /api/stream connections.",
+            [({}, change_stream.hub.subscriber_count)],
+        ),
+        *metrics.scraped(
+            "ai_monitor_tail_subscribers", "Open session tail connections.",
+            [({}, tail_hub.metrics()["subscriber_count"])],
+        ),
+        *metrics.scraped(
+            "ai_monitor_session_expiry_tracked", "Active sessions with an expiry deadline.",
+            [({}, expiry["tracked_sessions"])],
+        ),
+        *metrics.scraped(
+            "ai_monitor_session_expiry_runs_total", "Batched writes that ended stale sessions.",
+            [({}, expiry["batches"])], kind="counter",
+        ),
+        *metrics.scraped(
+            "ai_monitor_sessions_expired_total", "Sessions ended for inactivity.",
+            [({}, expiry["expired"])], kind="counter",
+        ),
+        *metrics.scraped(
+            "ai_monitor_jobs_running", "Background jobs running.",
+            [({}, sum(job.status == "running" for job in jobs.list()))],
+        ),
+        *metrics.scraped(
+            "ai_monitor_db_size_bytes", "Size of the SQLite database and its write-ahead log.",
+            [({"file": "db"}, _file_size(db_path)), ({"file": "wal"}, _file_size(db_path + "-wal"))],
+        ),
+    ]
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Histograms, counters and gauges in the Prometheus text format."""
+    body = "\n".join([metrics.expose(), *_scraped_lines()]) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
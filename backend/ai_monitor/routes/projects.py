@@ -1,8 +1,9 @@
 """Project endpoints."""
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 
 from ai_monitor.db import get_db
+from ai_monitor.etag import global_etag, not_modified, today
 from ai_monitor.models import Project, ProjectDetail
 from ai_monitor.services.stats import get_project_stats
 
@@ -10,8 +11,11 @@ router = APIRouter(prefix="/api", tags=["projects"])
 
 
 @router.get("/projects")
-async def list_projects() -> list[dict]:
+async def list_projects(request: Request, response: Response) -> list[dict]:
     """List all projects with session counts, cost, and token totals."""
+    cached = not_modified(request, response, global_etag())
+    if cached:
+        return cached
     db = get_db()
     rows = db.execute(
         """SELECT p.*,
@@ -40,8 +44,11 @@ async def list_projects() -> list[dict]:
 
 
 @router.get("/projects/{project_id}")
-async def get_project(project_id: int) -> ProjectDetail:
+async def get_project(project_id: int, request: Request, response: Response) -> ProjectDetail:
     """Get project detail with aggregated stats."""
+    cached = not_modified(request, response, global_etag(today()))
+    if cached:
+        return cached
     result = get_project_stats(project_id)
     if result is None:
         raise HTTPException(status_code=404, detail="Project not found")
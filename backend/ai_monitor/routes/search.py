@@ -0,0 +1,19 @@
+"""Full-text search endpoint."""
+
+from fastapi import APIRouter, Query
+
+from ai_monitor.models import SearchHit
+from ai_monitor.services.search import MIN_TERM_LENGTH, search
+
+router = APIRouter(prefix="/api", tags=["search"])
+
+
+@router.get("/search")
+async def search_all(
+    q: str = Query(..., min_length=MIN_TERM_LENGTH),
+    session_id: str | None = None,
+    project_id: int | None = None,
+    limit: int = Query(20, ge=1, le=100),
+) -> list[SearchHit]:
+    """Search sessions, projects, tool inputs and errors, best matches first."""
+    return search(q, limit=limit, session_id=session_id, project_id=project_id)
@@ -1,32 +1,52 @@
 """Session endpoints."""
 
+import base64
 import json
+from typing import Literal
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
+from ai_monitor.config import settings
 from ai_monitor.db import get_db
+from ai_monitor.etag import global_etag, not_modified, session_not_modified
 from ai_monitor.models import (
     Agent,
     AgentDetail,
+    AgentTreeNode,
     PaginatedResponse,
     Session,
     SessionDetail,
-    TimelineEvent,
+    TimelinePage,
     ToolCall,
+    UsageEntry,
+)
+from ai_monitor.responses import fast_json, row_dict, row_dicts
+from ai_monitor.services.agents import fetch_agent_tree, fetch_agents
+from ai_monitor.services.search import (
+    SESSION_FTS_COLUMNS,
+    TOOL_CALL_FTS_COLUMNS,
+    build_match_query,
+    short_term_filter,
 )
 
 router = APIRouter(prefix="/api", tags=["sessions"])
 
 
-@router.get("/sessions")
+@router.get("/sessions", response_model=PaginatedResponse)
 async def list_sessions(
+    request: Request,
+    response: Response,
     status: str | None = None,
     project_id: int | None = None,
+    host: str | None = None,
     search: str | None = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=200),
-) -> PaginatedResponse:
+) -> Response:
     """List sessions with optional filters and pagination."""
+    cached = not_modified(request, response, global_etag())
+    if cached:
+        return cached
     db = get_db()
 
     conditions = []
@@ -37,10 +57,29 @@ async def list_sessions(
     if project_id is not None:
         conditions.append("s.project_id = ?")
         params.append(project_id)
+    if host is not None:
+        conditions.append("s.host = ?")
+        params.append(host)
     if search:
-        conditions.append("(s.session_id LIKE ? OR p.name LIKE ?)")
-        like = f"%{search}%"
-        params.extend([like, like])
+        match = build_match_query(search)
+        if match is not None:
+            # Sessions whose id/project match, or that contain a matching tool call
+            session_terms, session_term_params = short_term_filter(search, SESSION_FTS_COLUMNS)
+            tool_terms, tool_term_params = short_term_filter(search, TOOL_CALL_FTS_COLUMNS)
+            conditions.append(
+                f"""(s.id IN (SELECT rowid FROM sessions_fts
+                              WHERE sessions_fts MATCH ?{session_terms})
+                    OR s.session_id IN (
+                        SELECT tc.session_id FROM tool_calls_fts
+                        JOIN tool_calls tc ON tc.id = tool_calls_fts.rowid
+                        WHERE tool_calls_fts MATCH ?{tool_terms}))"""
+            )
+            params.extend([match, *session_term_params, match, *tool_term_params])
+        else:
+            # Too short for the trigram index
+            conditions.append("(s.session_id LIKE ? OR p.name LIKE ?)")
+            like = f"%{search}%"
+            params.extend([like, like])
 
     where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
@@ -66,13 +105,18 @@ async def list_sessions(
         params + [page_size, offset],
     ).fetchall()
 
-    items = [Session(**{k: r[k] for k in r.keys()}) for r in rows]
-    return PaginatedResponse(items=items, total=total, page=page, page_size=page_size)
+    items = row_dicts(Session, rows)
+    return fast_json(
+        {"items": items, "total": total, "page": page, "page_size": page_size}, response
+    )
 
 
-@router.get("/sessions/{session_id}")
-async def get_session(session_id: str) -> SessionDetail:
-    """Get session detail with tool calls and agents."""
+@router.get("/sessions/{session_id}", response_model=SessionDetail)
+async def get_session(session_id: str, request: Request, response: Response) -> Response:
+    """Get session detail with tool call previews and agents."""
+    cached = session_not_modified(request, response, session_id)
+    if cached:
+        return cached
     db = get_db()
 
     row = db.execute(
@@ -90,26 +134,62 @@ async def get_session(session_id: str) -> SessionDetail:
     if not row:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    session_data = {k: row[k] for k in row.keys()}
-
+    # Metadata plus fixed-size previews; full payloads are served lazily by
+    # /api/tool_calls/{id}/payload so this stays cheap for long sessions.
+    preview = settings.payload_preview_chars
     tool_rows = db.execute(
-        "SELECT * FROM tool_calls WHERE session_id = ? ORDER BY started_at",
-        (session_id,),
+        """SELECT id, session_id, tool_name, status, error, started_at, ended_at,
+                  duration_ms, tool_input_size, tool_response_size, agent_id,
+                  substr(tool_input, 1, ?) as tool_input_preview,
+                  substr(tool_response, 1, ?) as tool_response_preview
+           FROM tool_calls WHERE session_id = ? ORDER BY started_at""",
+        (preview, preview, session_id),
     ).fetchall()
-    tool_calls = [ToolCall(**{k: r[k] for k in r.keys()}) for r in tool_rows]
+    tool_calls = row_dicts(ToolCall, tool_rows)
 
-    agent_rows = db.execute(
-        "SELECT * FROM agents WHERE session_id = ? ORDER BY started_at",
-        (session_id,),
-    ).fetchall()
-    agents = [Agent(**{k: r[k] for k in r.keys()}) for r in agent_rows]
+    agents = row_dicts(Agent, fetch_agents("a.session_id = ?", (session_id,)))
+
+    return fast_json(row_dict(SessionDetail, row, tool_calls=tool_calls, agents=agents), response)
+
+
+# Sort rank of each timeline event type when timestamps tie
+_TIMELINE_KIND_ORDER = {"tool_call": 0, "agent": 1}
 
-    return SessionDetail(**session_data, tool_calls=tool_calls, agents=agents)
 
+def _encode_cursor(timestamp: str, kind_order: int, row_id: int) -> str:
+    raw = json.dumps([timestamp, kind_order, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
 
-@router.get("/sessions/{session_id}/timeline")
-async def get_session_timeline(session_id: str) -> list[TimelineEvent]:
-    """Get chronological timeline of tool calls and agents for a session."""
+
+def _decode_cursor(cursor: str) -> tuple[str, int, int]:
+    try:
+        timestamp, kind_order, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), int(kind_order), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/sessions/{session_id}/timeline", response_model=TimelinePage)
+async def get_session_timeline(
+    session_id: str,
+    request: Request,
+    response: Response,
+    cursor: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    limit: int = Query(500, ge=1, le=5000),
+    fields: Literal["summary", "full"] = "summary",
+) -> Response:
+    """Get a page of the chronological timeline of tool calls and agents.
+
+    Tool calls and agents are merged and ordered in SQL and paged with a
+    keyset cursor. By default tool calls omit their payloads and carry an
+    ``input_summary`` instead; fetch ``/api/tool_calls/{id}`` for the full
+    payload or pass ``fields=full``.
+    """
+    cached = session_not_modified(request, response, session_id)
+    if cached:
+        return cached
     db = get_db()
 
     # Verify session exists
@@ -119,41 +199,132 @@ async def get_session_timeline(session_id: str) -> list[TimelineEvent]:
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    tool_rows = db.execute(
-        "SELECT * FROM tool_calls WHERE session_id = ? ORDER BY started_at",
-        (session_id,),
+    # The same window/cursor predicate is applied to both halves of the
+    # UNION ALL so each can be served in order from its (session_id,
+    # started_at) index.
+    window = ""
+    window_params: list = []
+    if since:
+        window += " AND started_at >= ?"
+        window_params.append(since)
+    if until:
+        window += " AND started_at < ?"
+        window_params.append(until)
+
+    tool_window, agent_window = window, window
+    tool_params, agent_params = list(window_params), list(window_params)
+    if cursor:
+        ts, kind_order, row_id = _decode_cursor(cursor)
+        tool_window += " AND started_at >= ? AND (started_at, 0, id) > (?, ?, ?)"
+        tool_params.extend([ts, ts, kind_order, row_id])
+        agent_window += " AND started_at >= ? AND (started_at, 1, id) > (?, ?, ?)"
+        agent_params.extend([ts, ts, kind_order, row_id])
+
+    if fields == "full":
+        payload_cols = "tc.tool_input, tc.tool_response, NULL as input_summary"
+        payload_join = ""
+    else:
+        payload_cols = "NULL as tool_input, NULL as tool_response, f.input_text as input_summary"
+        payload_join = "LEFT JOIN tool_calls_fts f ON f.rowid = tc.id"
+
+    rows = db.execute(
+        f"""SELECT 0 as kind_order, tc.started_at as ts, tc.id, tc.session_id,
+                   tc.tool_name, NULL as agent_name, NULL as agent_type,
+                   NULL as task_tool_call_id, tc.status, tc.error,
+                   tc.started_at, tc.ended_at, tc.duration_ms,
+                   tc.tool_input_size, tc.tool_response_size, tc.agent_id,
+                   NULL as parent_agent_id, {payload_cols}
+            FROM tool_calls tc {payload_join}
+            WHERE tc.session_id = ?{tool_window}
+            UNION ALL
+            SELECT 1, started_at, id, session_id,
+                   NULL, agent_name, agent_type,
+                   task_tool_call_id, status, NULL,
+                   started_at, ended_at, NULL,
+                   NULL, NULL, NULL, parent_agent_id, NULL, NULL, NULL
+            FROM agents
+            WHERE session_id = ?{agent_window}
+            ORDER BY ts, kind_order, id
+            LIMIT ?""",
+        [session_id, *tool_params, session_id, *agent_params, limit + 1],
     ).fetchall()
 
-    agent_rows = db.execute(
-        "SELECT * FROM agents WHERE session_id = ? ORDER BY started_at",
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last["ts"], last["kind_order"], last["id"])
+
+    items = []
+    for r in rows:
+        if r["kind_order"] == _TIMELINE_KIND_ORDER["tool_call"]:
+            items.append({
+                "type": "tool_call", "timestamp": r["ts"],
+                "tool_call": row_dict(ToolCall, r), "agent": None,
+            })
+        else:
+            items.append({
+                "type": "agent", "timestamp": r["ts"],
+                "tool_call": None, "agent": row_dict(Agent, r),
+            })
+
+    return fast_json({"items": items, "next_cursor": next_cursor}, response)
+
+
+@router.get("/sessions/{session_id}/usage", response_model=list[UsageEntry])
+async def get_session_usage(session_id: str, request: Request, response: Response) -> Response:
+    """Get the session's per-turn usage ledger, one row per turn and model."""
+    cached = session_not_modified(request, response, session_id)
+    if cached:
+        return cached
+    db = get_db()
+    exists = db.execute(
+        "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Session not found")
+    rows = db.execute(
+        """SELECT turn, model, timestamp, input_tokens, output_tokens,
+                  cache_read_tokens, cache_write_tokens, cost
+           FROM usage_ledger WHERE session_id = ?
+           ORDER BY timestamp, path, turn, model""",
         (session_id,),
     ).fetchall()
-
-    events: list[TimelineEvent] = []
-    for r in tool_rows:
-        tc = ToolCall(**{k: r[k] for k in r.keys()})
-        events.append(TimelineEvent(type="tool_call", timestamp=tc.started_at, tool_call=tc))
-    for r in agent_rows:
-        ag = Agent(**{k: r[k] for k in r.keys()})
-        events.append(TimelineEvent(type="agent", timestamp=ag.started_at, agent=ag))
-
-    events.sort(key=lambda e: e.timestamp or "")
-    return events
+    return fast_json(row_dicts(UsageEntry, rows), response)
+
+
+# Declared before /agents/{agent_id} so "tree" isn't parsed as an agent id
+@router.get("/sessions/{session_id}/agents/tree")
+async def get_agent_tree(
+    session_id: str, request: Request, response: Response
+) -> list[AgentTreeNode]:
+    """Get the session's agent hierarchy with rollups over each subtree."""
+    cached = session_not_modified(request, response, session_id)
+    if cached:
+        return cached
+    exists = get_db().execute(
+        "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return fetch_agent_tree(session_id)
 
 
 @router.get("/sessions/{session_id}/agents/{agent_id}")
-async def get_agent_detail(session_id: str, agent_id: int) -> AgentDetail:
+async def get_agent_detail(
+    session_id: str, agent_id: int, request: Request, response: Response
+) -> AgentDetail:
     """Get enriched agent detail with Task tool call data and subagent tools."""
+    cached = session_not_modified(request, response, session_id)
+    if cached:
+        return cached
     db = get_db()
 
-    row = db.execute(
-        "SELECT * FROM agents WHERE id = ? AND session_id = ?",
-        (agent_id, session_id),
-    ).fetchone()
-    if not row:
+    rows = fetch_agents("a.id = ? AND a.session_id = ?", (agent_id, session_id))
+    if not rows:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    agent_data = {k: row[k] for k in row.keys()}
+    agent_data = {k: rows[0][k] for k in rows[0].keys()}
     detail = AgentDetail(**agent_data)
 
     # Enrich from linked Task tool call
@@ -186,22 +357,13 @@ async def get_agent_detail(session_id: str, agent_id: int) -> AgentDetail:
                 except (json.JSONDecodeError, AttributeError):
                     detail.task_response = raw_response
 
-    # Find tool calls that occurred during the agent's active window
-    if detail.started_at:
-        query = """SELECT * FROM tool_calls
-                   WHERE session_id = ? AND started_at >= ?"""
-        params: list = [session_id, detail.started_at]
-        if detail.ended_at:
-            query += " AND started_at <= ?"
-            params.append(detail.ended_at)
-        if detail.task_tool_call_id:
-            query += " AND id != ?"
-            params.append(detail.task_tool_call_id)
-        query += " ORDER BY started_at"
-
-        tool_rows = db.execute(query, params).fetchall()
-        detail.subagent_tools = [
-            ToolCall(**{k: r[k] for k in r.keys()}) for r in tool_rows
-        ]
+    # Tool calls attributed to this agent at ingestion time
+    tool_rows = db.execute(
+        "SELECT * FROM tool_calls WHERE agent_id = ? ORDER BY started_at",
+        (agent_id,),
+    ).fetchall()
+    detail.subagent_tools = [
+        ToolCall(**{k: r[k] for k in r.keys()}) for r in tool_rows
+    ]
 
     return detail
@@ -0,0 +1,49 @@
+"""GET /api/stream - Server-Sent Events change notifications."""
+
+import asyncio
+
+import orjson
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from ai_monitor.config import settings
+from ai_monitor.services.change_stream import Subscriber, hub
+
+router = APIRouter(prefix="/api", tags=["stream"])
+
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    session_id: str | None = None,
+    project_id: int | None = None,
+) -> StreamingResponse:
+    """Push compact change notifications as they are committed.
+
+    Each notification is a ``data:`` line holding a JSON object with a
+    ``type`` (``session``, ``tool_call``, ``agent``, ``stats`` or
+    ``resync``). Idle connections get a ``heartbeat`` event.
+    """
+    subscriber = hub.subscribe(
+        Subscriber(session_id, project_id, loop=asyncio.get_running_loop())
+    )
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                if not await subscriber.wait(settings.stream_heartbeat_seconds):
+                    yield "event: heartbeat\ndata: {}\n\n"
+                    continue
+                for change in subscriber.drain():
+                    seq = change.get("seq")
+                    prefix = f"id: {seq}\n" if seq is not None else ""
+                    yield f"{prefix}data: {orjson.dumps(change).decode()}\n\n"
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,108 @@
+"""Live session tail over SSE and WebSocket, plus hub metrics."""
+
+import asyncio
+
+import orjson
+from fastapi import APIRouter, Query, Request, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from ai_monitor.config import settings
+from ai_monitor.models import TailMetrics
+from ai_monitor.services.changes import changes_since
+from ai_monitor.services.session_tail import TailSubscriber, encode_delta, tail_hub
+
+router = APIRouter(prefix="/api", tags=["tail"])
+
+_HEARTBEAT = orjson.dumps({"type": "heartbeat"}).decode()
+
+
+async def _catch_up(subscriber: TailSubscriber, since: int) -> list[str]:
+    """Deltas from the client's own sequence up to where the shared tail starts."""
+    payloads = []
+    has_more = True
+    while has_more:
+        changes = await run_in_threadpool(changes_since, since, subscriber.session_id, 2000)
+        has_more = changes["has_more"]
+        payloads.append(encode_delta(since, changes))
+        since = changes["seq"]
+    subscriber.skip_to(since)
+    return payloads
+
+
+@router.get("/sessions/{session_id}/tail")
+async def tail_session(
+    request: Request,
+    session_id: str,
+    since: int | None = Query(None, ge=0),
+) -> StreamingResponse:
+    """Stream coalesced deltas for one session as Server-Sent Events.
+
+    Each ``data:`` line is a JSON ``delta`` (``from_seq``, ``seq`` and the
+    changed ``sessions``, ``tool_calls`` and ``agents``) or a ``resync``
+    notice when the client fell behind. With ``since`` the stream starts
+    with the rows written after that sequence.
+    """
+    subscriber = tail_hub.subscribe(
+        TailSubscriber(session_id, "sse", loop=asyncio.get_running_loop())
+    )
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            if since is not None:
+                for payload in await _catch_up(subscriber, since):
+                    yield f"data: {payload}\n\n"
+            while not await request.is_disconnected():
+                if not await subscriber.wait(settings.stream_heartbeat_seconds):
+                    yield "event: heartbeat\ndata: {}\n\n"
+                    continue
+                for payload in subscriber.drain():
+                    yield f"data: {payload}\n\n"
+        finally:
+            tail_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/sessions/{session_id}/tail")
+async def tail_session_ws(websocket: WebSocket, session_id: str, since: int | None = None) -> None:
+    """WebSocket form of the session tail: one JSON text message per delta."""
+    await websocket.accept()
+    subscriber = tail_hub.subscribe(
+        TailSubscriber(session_id, "websocket", loop=asyncio.get_running_loop())
+    )
+
+    async def pump():
+        if since is not None:
+            for payload in await _catch_up(subscriber, since):
+                await websocket.send_text(payload)
+        while True:
+            if not await subscriber.wait(settings.stream_heartbeat_seconds):
+                await websocket.send_text(_HEARTBEAT)
+                continue
+            for payload in subscriber.drain():
+                await websocket.send_text(payload)
+
+    async def listen():
+        # Client messages are ignored; this only notices the disconnect
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(pump()), asyncio.create_task(listen())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        tail_hub.unsubscribe(subscriber)
+
+
+@router.get("/admin/tail")
+async def tail_metrics() -> TailMetrics:
+    """Watched sessions, their subscribers and how far each one lags."""
+    return tail_hub.metrics()
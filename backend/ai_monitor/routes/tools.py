@@ -1,26 +1,40 @@
-"""Tool statistics endpoints."""
+"""Tool statistics and tool call endpoints."""
 
-from fastapi import APIRouter
+import re
+from typing import Iterator, Literal
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
 from ai_monitor.db import get_db
-from ai_monitor.models import ToolStats
+from ai_monitor.etag import global_etag, not_modified
+from ai_monitor.models import ToolCall, ToolStats
+from ai_monitor.responses import fast_json, row_dict
 
 router = APIRouter(prefix="/api", tags=["tools"])
 
 
 @router.get("/tools/stats")
-async def tool_stats() -> list[ToolStats]:
-    """Get tool usage distribution and error rates."""
+async def tool_stats(
+    request: Request, response: Response, host: str | None = None
+) -> list[ToolStats]:
+    """Get tool usage distribution and error rates, optionally for one host."""
+    cached = not_modified(request, response, global_etag())
+    if cached:
+        return cached
     db = get_db()
+    where = "WHERE session_id IN (SELECT session_id FROM sessions WHERE host = ?)" if host else ""
     rows = db.execute(
-        """SELECT
+        f"""SELECT
                tool_name,
                COUNT(*) as count,
                SUM(CASE WHEN status = 'error' THEN 1 ELSE 0 END) as error_count,
                AVG(duration_ms) as avg_duration_ms
            FROM tool_calls
+           {where}
            GROUP BY tool_name
-           ORDER BY count DESC"""
+           ORDER BY count DESC""",
+        [host] if host else [],
     ).fetchall()
 
     results = []
@@ -37,3 +51,102 @@ async def tool_stats() -> list[ToolStats]:
             )
         )
     return results
+
+
+@router.get("/tool_calls/{tool_call_id}", response_model=ToolCall)
+async def get_tool_call(tool_call_id: int) -> Response:
+    """Get a single tool call including its full input and response payloads."""
+    db = get_db()
+    row = db.execute("SELECT * FROM tool_calls WHERE id = ?", (tool_call_id,)).fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Tool call not found")
+    return fast_json(row_dict(ToolCall, row))
+
+
+_PAYLOAD_CHUNK_BYTES = 64 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single-range ``Range`` header into an inclusive (start, end).
+
+    Returns None when the header is not a satisfiable single byte range.
+    """
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = int(m.group(2)) if m.group(2) else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(m.group(2)), 0)
+        end = size - 1
+    end = min(end, size - 1)
+    if start > end:
+        return None
+    return start, end
+
+
+def _iter_payload(tool_call_id: int, column: str, start: int, end: int) -> Iterator[bytes]:
+    """Stream bytes [start, end] of a stored payload using incremental blob I/O."""
+    db = get_db()
+    with db.blobopen("tool_calls", column, tool_call_id, readonly=True) as blob:
+        blob.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = blob.read(min(_PAYLOAD_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@router.get("/tool_calls/{tool_call_id}/payload")
+async def get_tool_call_payload(
+    tool_call_id: int,
+    part: Literal["input", "response"] = "response",
+    range_header: str | None = Header(None, alias="Range"),
+):
+    """Stream a tool call's stored input or response, honouring byte ranges."""
+    column = f"tool_{part}"
+    db = get_db()
+    row = db.execute(
+        f"SELECT {column} IS NOT NULL as present, {column}_size as size FROM tool_calls WHERE id = ?",
+        (tool_call_id,),
+    ).fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Tool call not found")
+    if not row["present"]:
+        raise HTTPException(status_code=404, detail=f"Tool call has no {part} payload")
+
+    size = row["size"]
+    if size is None:
+        size = db.execute(
+            f"SELECT length(CAST({column} AS BLOB)) as size FROM tool_calls WHERE id = ?",
+            (tool_call_id,),
+        ).fetchone()["size"]
+
+    headers = {"Accept-Ranges": "bytes"}
+    media_type = "text/plain; charset=utf-8"
+    if size == 0:
+        return Response(b"", media_type=media_type, headers=headers)
+
+    start, end, status_code = 0, size - 1, 200
+    if range_header:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(
+                status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_payload(tool_call_id, column, start, end),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+    )
@@ -0,0 +1,91 @@
+"""Agent queries shared by the agent and session routes."""
+
+import sqlite3
+from datetime import datetime
+
+from ai_monitor.db import get_db
+from ai_monitor.models import AgentTreeNode
+
+# Per-agent aggregates come straight from the attributed tool calls via
+# idx_tool_calls_agent_started, one indexed range per agent.
+_AGENTS_WITH_STATS = """
+SELECT a.*,
+       COUNT(tc.id) as tool_call_count,
+       COALESCE(SUM(tc.status = 'error'), 0) as error_count,
+       COALESCE(SUM(tc.duration_ms), 0) as total_duration_ms
+FROM agents a
+LEFT JOIN tool_calls tc ON tc.agent_id = a.id
+{where}
+GROUP BY a.id
+ORDER BY {order}
+"""
+
+
+def fetch_agents(
+    where: str = "", params: list | tuple = (), order: str = "a.started_at"
+) -> list[sqlite3.Row]:
+    """Agent rows with tool call aggregates. ``where`` filters on alias ``a``."""
+    sql = _AGENTS_WITH_STATS.format(where=f"WHERE {where}" if where else "", order=order)
+    return get_db().execute(sql, params).fetchall()
+
+
+# Subtree rollups join each agent's own aggregates through the closure
+# table, so a whole tree is summarized without recursion at read time.
+_SUBTREE_ROLLUPS = """
+WITH own AS (
+    SELECT a.id, a.started_at, a.ended_at,
+           COUNT(tc.id) as tool_call_count,
+           COALESCE(SUM(tc.status = 'error'), 0) as error_count,
+           COALESCE(SUM(tc.duration_ms), 0) as total_duration_ms
+    FROM agents a
+    LEFT JOIN tool_calls tc ON tc.agent_id = a.id
+    WHERE a.session_id = ?
+    GROUP BY a.id
+)
+SELECT c.ancestor_id as id,
+       COUNT(*) - 1 as descendant_count,
+       SUM(o.tool_call_count) as subtree_tool_call_count,
+       SUM(o.error_count) as subtree_error_count,
+       SUM(o.total_duration_ms) as subtree_duration_ms,
+       MIN(o.started_at) as subtree_started_at,
+       CASE WHEN MAX(o.ended_at IS NULL) THEN NULL ELSE MAX(o.ended_at) END as subtree_ended_at
+FROM agent_closure c
+JOIN own o ON o.id = c.descendant_id
+WHERE c.ancestor_id IN (SELECT id FROM own)
+GROUP BY c.ancestor_id
+"""
+
+
+def fetch_agent_tree(session_id: str) -> list[AgentTreeNode]:
+    """The session's agent hierarchy as a list of root nodes with subtree rollups."""
+    rollups = {
+        r["id"]: r for r in get_db().execute(_SUBTREE_ROLLUPS, (session_id,)).fetchall()
+    }
+    nodes: dict[int, AgentTreeNode] = {}
+    for r in fetch_agents("a.session_id = ?", (session_id,)):
+        data = {k: r[k] for k in r.keys()}
+        rollup = rollups.get(r["id"])
+        if rollup is not None:
+            data.update({k: rollup[k] for k in rollup.keys() if k != "id"})
+        nodes[r["id"]] = AgentTreeNode(**data)
+
+    roots: list[AgentTreeNode] = []
+    for node in nodes.values():  # Ordered by started_at, so children are too
+        parent = nodes.get(node.parent_agent_id) if node.parent_agent_id else None
+        if parent is None:
+            roots.append(node)
+        else:
+            parent.children.append(node)
+
+    def finish(node: AgentTreeNode, depth: int) -> None:
+        node.depth = depth
+        if node.subtree_started_at and node.subtree_ended_at:
+            start = datetime.fromisoformat(node.subtree_started_at)
+            end = datetime.fromisoformat(node.subtree_ended_at)
+            node.subtree_wall_seconds = round((end - start).total_seconds(), 1)
+        for child in node.children:
+            finish(child, depth + 1)
+
+    for root in roots:
+        finish(root, 0)
+    return roots
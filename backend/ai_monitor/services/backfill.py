@@ -0,0 +1,39 @@
+"""Transcript backfill as a background job.
+
+Startup no longer waits for the transcript scan: the lifespan starts
+this job and the API serves immediately. The scan applies results in
+batched transactions and records each file in the ``transcript_files``
+manifest as it goes, so a backfill interrupted by a restart resumes
+where it stopped: files already applied match the manifest and are
+skipped.
+"""
+
+import asyncio
+import logging
+
+from ai_monitor.config import settings
+from ai_monitor.services.jobs import Job, JobCancelled, jobs
+from ai_monitor.services.transcript_parser import scan_transcripts_dir
+
+logger = logging.getLogger(__name__)
+
+
+def run_backfill(job: Job) -> None:
+    """Scan the projects directory, reporting through ``job``."""
+    job.start()
+    try:
+        scan_transcripts_dir(settings.claude_projects_dir, job=job)
+    except JobCancelled:
+        logger.info("Transcript backfill cancelled after %d files", job.done)
+        job.cancelled()
+    except Exception as e:
+        logger.exception("Transcript backfill failed")
+        job.fail(e)
+    else:
+        job.finish()
+
+
+def start_backfill() -> tuple[Job, asyncio.Task]:
+    """Start a backfill job in a worker thread."""
+    job = jobs.add(Job("transcript_backfill"))
+    return job, asyncio.create_task(asyncio.to_thread(run_backfill, job))
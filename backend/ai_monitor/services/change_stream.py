@@ -0,0 +1,192 @@
+"""In-process pub/sub of compact change notifications for ``/api/stream``.
+
+Writers call :func:`publish` after committing; every subscriber whose
+filter matches gets the notification in its own bounded queue. A slow
+client never blocks the writer or other clients: when its queue is full
+the oldest notification is dropped and the next delivery starts with a
+``resync`` notice so the client knows to refetch everything.
+
+Writers run in worker threads (background tasks, the file watcher), so
+publishing only appends to a deque and wakes the subscriber's event loop
+thread-safely. With several workers the writer process also hands every
+notification to :attr:`ChangeHub.relay`, which republishes it in the
+other workers (see :mod:`ai_monitor.cluster`).
+"""
+
+import asyncio
+import itertools
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from ai_monitor.config import settings
+from ai_monitor.db import get_db
+
+_seq = itertools.count(1)
+
+
+class Subscriber:
+    """One stream client: a filter plus a bounded drop-oldest queue."""
+
+    def __init__(
+        self,
+        session_id: str | None = None,
+        project_id: int | None = None,
+        maxlen: int | None = None,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ) -> None:
+        self.session_id = session_id
+        self.project_id = project_id
+        self.dropped = 0
+        self._queue: deque[dict[str, Any]] = deque(maxlen=maxlen or settings.stream_queue_size)
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._wakeup = asyncio.Event() if loop is not None else None
+
+    def matches(self, change: dict[str, Any]) -> bool:
+        if self.session_id is not None and change.get("session_id") != self.session_id:
+            return False
+        if self.project_id is not None and change.get("project_id") != self.project_id:
+            return False
+        return True
+
+    def offer(self, change: dict[str, Any]) -> None:
+        with self._lock:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(change)
+        self._notify()
+
+    def _notify(self) -> None:
+        """Wake the coroutine waiting in :meth:`wait`, from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # Loop shut down between the check and the call
+
+    def drain(self) -> list[dict[str, Any]]:
+        """Take everything queued, prefixed by a resync notice if any were dropped."""
+        with self._lock:
+            changes = list(self._queue)
+            self._queue.clear()
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            changes.insert(0, {"type": "resync", "dropped": dropped})
+        return changes
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for new notifications; False on timeout."""
+        if self._wakeup is None:
+            raise RuntimeError("Subscriber was created without an event loop")
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._wakeup.clear()
+        return True
+
+
+# Sessions whose project_id is remembered for project filters
+_PROJECT_CACHE_SIZE = 4096
+
+
+class ChangeHub:
+    """Registry of stream subscribers."""
+
+    def __init__(self) -> None:
+        self._subscribers: set[Subscriber] = set()
+        self._listeners: list[Callable[[str, str | None], None]] = []
+        self._lock = threading.Lock()
+        # Set in the writer process when other workers need its notifications
+        self.relay: Callable[[str, str | None, dict[str, Any]], None] | None = None
+        # session_id -> project_id, so project filters don't cost a query per
+        # change; least recently used first, guarded by _lock
+        self._projects: OrderedDict[str, int | None] = OrderedDict()
+
+    def subscribe(self, subscriber: Subscriber) -> Subscriber:
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def add_listener(self, listener: Callable[[str, str | None], None]) -> None:
+        """Call ``listener(type_, session_id)`` on every publish, in the writer's thread."""
+        self._listeners.append(listener)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _project_id(self, session_id: str, project_id: int | None = None) -> int | None:
+        with self._lock:
+            if project_id is None and session_id in self._projects:
+                self._projects.move_to_end(session_id)
+                return self._projects[session_id]
+        if project_id is None:
+            row = get_db().execute(
+                "SELECT project_id FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            project_id = row["project_id"] if row else None
+        with self._lock:
+            self._projects[session_id] = project_id
+            self._projects.move_to_end(session_id)
+            while len(self._projects) > _PROJECT_CACHE_SIZE:
+                self._projects.popitem(last=False)
+        return project_id
+
+    def publish(self, type_: str, session_id: str | None = None, **fields: Any) -> None:
+        if self.relay is not None:
+            self.relay(type_, session_id, fields)
+        for listener in self._listeners:
+            listener(type_, session_id)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        change: dict[str, Any] = {"seq": next(_seq), "type": type_}
+        if session_id is not None:
+            change["session_id"] = session_id
+            change["project_id"] = self._project_id(session_id, fields.get("project_id"))
+        change.update({k: v for k, v in fields.items() if v is not None})
+        for subscriber in subscribers:
+            if subscriber.matches(change):
+                subscriber.offer(change)
+
+
+hub = ChangeHub()
+
+_deferred = threading.local()
+
+
+def publish(type_: str, session_id: str | None = None, **fields: Any) -> None:
+    """Notify stream subscribers of a committed change."""
+    pending = getattr(_deferred, "changes", None)
+    if pending is not None:
+        pending.append((type_, session_id, fields))
+        return
+    hub.publish(type_, session_id, **fields)
+
+
+@contextmanager
+def deferred_publish() -> Iterator[None]:
+    """Hold this thread's notifications until the block exits.
+
+    Used around a whole write (handler plus version bump) so clients that
+    refetch on a notification never see the old ETag for new data.
+    """
+    if getattr(_deferred, "changes", None) is not None:
+        yield  # Already deferring further up the stack
+        return
+    _deferred.changes = []
+    try:
+        yield
+        changes = _deferred.changes
+    finally:
+        _deferred.changes = None
+    for type_, session_id, fields in changes:
+        hub.publish(type_, session_id, **fields)
@@ -0,0 +1,88 @@
+"""Delta sync queries over the change sequence (see ``change_counter``)."""
+
+from typing import Any, Literal
+
+from ai_monitor.db import get_db
+from ai_monitor.models import Agent, Session, ToolCall
+from ai_monitor.responses import row_dicts
+
+
+def current_seq() -> int:
+    """The last change sequence handed out."""
+    return get_db().execute("SELECT seq FROM change_counter WHERE id = 1").fetchone()["seq"]
+
+
+def changes_since(
+    since: int,
+    session_id: str | None = None,
+    limit: int = 1000,
+    fields: Literal["summary", "full"] = "summary",
+) -> dict[str, Any]:
+    """Sessions, tool calls and agents written after ``since``, as response dicts.
+
+    Returns a ``ChangeSet``-shaped dict. The counter is read first, so rows
+    written while the queries run get a larger sequence and are picked up
+    by the next call instead of skipped.
+    """
+    db = get_db()
+    head = current_seq()
+
+    session_filter = " AND s.session_id = ?" if session_id else ""
+    tool_filter = " AND tc.session_id = ?" if session_id else ""
+    agent_filter = " AND session_id = ?" if session_id else ""
+    scope = [session_id] if session_id else []
+
+    session_rows = db.execute(
+        f"""SELECT s.*, p.name as project_name,
+                   (SELECT COUNT(*) FROM tool_calls tc WHERE tc.session_id = s.session_id) as tool_call_count,
+                   CASE WHEN s.ended_at IS NOT NULL
+                        THEN ROUND((julianday(s.ended_at) - julianday(s.started_at)) * 86400, 1)
+                        ELSE NULL END as duration_seconds
+            FROM sessions s
+            LEFT JOIN projects p ON s.project_id = p.id
+            WHERE s.change_seq > ? AND s.change_seq <= ?{session_filter}
+            ORDER BY s.change_seq
+            LIMIT ?""",
+        [since, head, *scope, limit + 1],
+    ).fetchall()
+
+    if fields == "full":
+        payload_cols = "tc.tool_input, tc.tool_response"
+        payload_join = ""
+    else:
+        payload_cols = "f.input_text as input_summary"
+        payload_join = "LEFT JOIN tool_calls_fts f ON f.rowid = tc.id"
+    tool_rows = db.execute(
+        f"""SELECT tc.id, tc.session_id, tc.tool_name, tc.status, tc.error,
+                   tc.started_at, tc.ended_at, tc.duration_ms, tc.tool_input_size,
+                   tc.tool_response_size, tc.agent_id, tc.change_seq, {payload_cols}
+            FROM tool_calls tc {payload_join}
+            WHERE tc.change_seq > ? AND tc.change_seq <= ?{tool_filter}
+            ORDER BY tc.change_seq
+            LIMIT ?""",
+        [since, head, *scope, limit + 1],
+    ).fetchall()
+
+    agent_rows = db.execute(
+        f"""SELECT * FROM agents
+            WHERE change_seq > ? AND change_seq <= ?{agent_filter}
+            ORDER BY change_seq
+            LIMIT ?""",
+        [since, head, *scope, limit + 1],
+    ).fetchall()
+
+    # Keep the ``limit`` lowest sequences across the three tables
+    seqs = sorted(r["change_seq"] for rows in (session_rows, tool_rows, agent_rows) for r in rows)
+    has_more = len(seqs) > limit
+    seq = seqs[limit - 1] if has_more else head
+
+    def upto(rows):
+        return [r for r in rows if r["change_seq"] <= seq]
+
+    return {
+        "seq": seq,
+        "has_more": has_more,
+        "sessions": row_dicts(Session, upto(session_rows)),
+        "tool_calls": row_dicts(ToolCall, upto(tool_rows)),
+        "agents": row_dicts(Agent, upto(agent_rows)),
+    }
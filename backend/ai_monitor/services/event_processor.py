@@ -1,24 +1,65 @@
 """Process hook events from Claude Code."""
 
 import json
+import logging
 import os
-from datetime import datetime, timezone
-
-from ai_monitor.db import get_db
+import sqlite3
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+
+from ai_monitor.config import settings
+from ai_monitor.db import batched_commits, get_db, write_lock
+from ai_monitor.etag import bump_generation
+from ai_monitor.metrics import ingest_commit_seconds
 from ai_monitor.models import HookEvent
+from ai_monitor.services import forwarder
+from ai_monitor.services.change_stream import deferred_publish, publish
+from ai_monitor.services.session_reaper import session_expiry
+
+logger = logging.getLogger(__name__)
+
+
+# When the last hook event arrived; background jobs back off while events flow
+last_event_monotonic = 0.0
+
+# Host and original arrival time of the forwarded event being applied
+_forwarded: ContextVar[tuple[str, str | None] | None] = ContextVar("forwarded_event", default=None)
+
+# When collected event ids were last pruned (monotonic)
+_pruned_at = 0.0
+_PRUNE_INTERVAL_SECONDS = 3600.0
 
 
 def _now() -> str:
+    forwarded = _forwarded.get()
+    if forwarded is not None and forwarded[1] is not None:
+        return forwarded[1]
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
+def _host() -> str:
+    forwarded = _forwarded.get()
+    return forwarded[0] if forwarded is not None else settings.host_name
+
+
+def _payload_size(payload: str | None) -> int | None:
+    """Size in bytes of a serialized payload as stored in the DB."""
+    return len(payload.encode()) if payload is not None else None
+
+
 def _get_or_create_project(cwd: str) -> int:
-    """Find or create a project based on the working directory."""
+    """Find or create a project based on the working directory.
+
+    Directories on other hosts are kept apart as ``host:path``.
+    """
     db = get_db()
+    name = os.path.basename(cwd) or cwd
+    if _forwarded.get() is not None:
+        cwd = f"{_host()}:{cwd}"
     row = db.execute("SELECT id FROM projects WHERE path = ?", (cwd,)).fetchone()
     if row:
         return row["id"]
-    name = os.path.basename(cwd) or cwd
     cur = db.execute(
         "INSERT INTO projects (name, path, created_at) VALUES (?, ?, ?)",
         (name, cwd, _now()),
@@ -28,18 +69,29 @@ def _get_or_create_project(cwd: str) -> int:
 
 
 def _ensure_session(event: HookEvent) -> None:
-    """Auto-create a session row if one doesn't exist for this session_id."""
+    """Auto-create a session row if one doesn't exist for this session_id.
+
+    Also bumps the session's ``version``; it is committed together with the
+    handler's writes, so a reader never sees the new version paired with the
+    old data (see ai_monitor.etag).
+    """
     db = get_db()
     now = _now()
     row = db.execute(
-        "SELECT id FROM sessions WHERE session_id = ?", (event.session_id,)
+        "SELECT id, status FROM sessions WHERE session_id = ?", (event.session_id,)
     ).fetchone()
     if row:
         db.execute(
-            "UPDATE sessions SET last_event_at = ?, status = 'active', ended_at = NULL WHERE session_id = ?",
+            """UPDATE sessions SET last_event_at = ?, status = 'active', ended_at = NULL,
+                   version = version + 1
+               WHERE session_id = ?""",
             (now, event.session_id),
         )
         db.commit()
+        session_expiry.touch(event.session_id, now)
+        if row["status"] != "active":
+            publish("session", event.session_id, op="resumed", status="active")
+            publish("stats", event.session_id, delta={"active_sessions": 1})
         return
 
     project_id = None
@@ -47,15 +99,91 @@ def _ensure_session(event: HookEvent) -> None:
         project_id = _get_or_create_project(event.cwd)
 
     db.execute(
-        """INSERT OR IGNORE INTO sessions (session_id, project_id, status, model, started_at, last_event_at)
-           VALUES (?, ?, 'active', ?, ?, ?)""",
-        (event.session_id, project_id, event.model, now, now),
+        """INSERT OR IGNORE INTO sessions
+               (session_id, project_id, status, model, started_at, last_event_at, host, version)
+           VALUES (?, ?, 'active', ?, ?, ?, ?, 1)""",
+        (event.session_id, project_id, event.model, now, now, _host()),
     )
     db.commit()
+    session_expiry.touch(event.session_id, now)
+    publish("session", event.session_id, op="created", status="active", project_id=project_id)
+    publish("stats", event.session_id, delta={"total_sessions": 1, "active_sessions": 1})
+
+
+def process_event(event: HookEvent, received: float | None = None) -> None:
+    """Route a hook event to the appropriate handler.
+
+    ``received`` is the ``perf_counter`` time the event arrived, for the
+    ingest-to-commit latency metric.
+    """
+    global last_event_monotonic
+    last_event_monotonic = time.monotonic()
+    with write_lock, deferred_publish():
+        if forwarder.enabled:
+            forwarder.enqueue(event, _now())
+        # One commit for the whole event, then the generation moves on
+        with batched_commits():
+            _process_event(event)
+        bump_generation()
+    if received is not None:
+        ingest_commit_seconds.observe(time.perf_counter() - received, event.hook_event_name)
+
+
+def process_batch(host: str, events: list[tuple[str, str | None, HookEvent]]) -> dict[str, int]:
+    """Apply hook events forwarded by the monitor on ``host``.
+
+    ``events`` holds ``(event_id, received_at, event)`` in the order they
+    arrived there; each is recorded at its original time. The batch is
+    written in one transaction, with a savepoint per event so a failing
+    event is skipped without losing the others. Ids already applied for
+    ``host`` are skipped, which makes re-sent batches harmless.
+    """
+    global last_event_monotonic
+    last_event_monotonic = time.monotonic()
+    counts = {"accepted": 0, "duplicates": 0, "failed": 0}
+    with write_lock, deferred_publish():
+        with batched_commits() as db:
+            received_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            for event_id, at, event in events:
+                db.execute("SAVEPOINT forwarded_event")
+                try:
+                    cur = db.execute(
+                        """INSERT OR IGNORE INTO collected_events (host, event_id, received_at)
+                           VALUES (?, ?, ?)""",
+                        (host, event_id, received_at),
+                    )
+                    if cur.rowcount:
+                        token = _forwarded.set((host, at))
+                        try:
+                            _process_event(event)
+                        finally:
+                            _forwarded.reset(token)
+                        counts["accepted"] += 1
+                    else:
+                        counts["duplicates"] += 1
+                except Exception:
+                    db.execute("ROLLBACK TO forwarded_event")
+                    counts["failed"] += 1
+                    logger.exception("Skipped forwarded event %s from %s", event_id, host)
+                db.execute("RELEASE forwarded_event")
+            _prune_collected(db)
+        bump_generation()
+    return counts
+
+
+def _prune_collected(db: sqlite3.Connection) -> None:
+    """Forget applied event ids older than ``COLLECTOR_DEDUP_DAYS``, at most hourly."""
+    global _pruned_at
+    if time.monotonic() - _pruned_at < _PRUNE_INTERVAL_SECONDS:
+        return
+    _pruned_at = time.monotonic()
+    cutoff = (
+        datetime.now(timezone.utc) - timedelta(days=settings.collector_dedup_days)
+    ).strftime("%Y-%m-%dT%H:%M:%SZ")
+    db.execute("DELETE FROM collected_events WHERE received_at < ?", (cutoff,))
 
 
-def process_event(event: HookEvent) -> None:
-    """Route a hook event to the appropriate handler."""
+def _process_event(event: HookEvent) -> None:
     # Always ensure the session exists before processing any event
     _ensure_session(event)
 
@@ -74,6 +202,52 @@ def process_event(event: HookEvent) -> None:
         handler(event)
 
 
+def _resolve_agent(event: HookEvent) -> int | None:
+    """Find the agent that owns a tool event, or None for the main thread.
+
+    Uses the agent context Claude Code attaches to events fired inside a
+    subagent when present. Otherwise falls back to the session's active
+    agents: a tool call is attributed only when exactly one is running,
+    since concurrent subagents can't be told apart without hook context.
+    Clients that do send agent context omit it on the main thread, so the
+    fallback is skipped for agents that were registered with an id.
+    """
+    db = get_db()
+    if event.agent_id:
+        row = db.execute(
+            "SELECT id FROM agents WHERE session_id = ? AND hook_agent_id = ? ORDER BY id DESC LIMIT 1",
+            (event.session_id, event.agent_id),
+        ).fetchone()
+        if row:
+            return row["id"]
+    if event.agent_name:
+        row = db.execute(
+            """SELECT id FROM agents
+               WHERE session_id = ? AND agent_name = ? AND status = 'active'
+               ORDER BY id DESC LIMIT 1""",
+            (event.session_id, event.agent_name),
+        ).fetchone()
+        if row:
+            return row["id"]
+    rows = db.execute(
+        "SELECT id, hook_agent_id FROM agents WHERE session_id = ? AND status = 'active' LIMIT 2",
+        (event.session_id,),
+    ).fetchall()
+    if len(rows) == 1 and rows[0]["hook_agent_id"] is None:
+        return rows[0]["id"]
+    return None
+
+
+def _find_pending_tool_call(event: HookEvent, agent_id: int | None):
+    """Most recent pending call for this session+tool, preferring the same agent."""
+    return get_db().execute(
+        """SELECT id, started_at FROM tool_calls
+           WHERE session_id = ? AND tool_name = ? AND status = 'pending'
+           ORDER BY agent_id IS ? DESC, id DESC LIMIT 1""",
+        (event.session_id, event.tool_name or "unknown", agent_id),
+    ).fetchone()
+
+
 def _handle_session_start(event: HookEvent) -> None:
     db = get_db()
     project_id = None
@@ -90,15 +264,21 @@ def _handle_session_start(event: HookEvent) -> None:
         (event.session_id, project_id, event.model, _now()),
     )
     db.commit()
+    publish("session", event.session_id, op="started", status="active",
+            project_id=project_id, model=event.model)
 
 
 def _handle_session_end(event: HookEvent) -> None:
     db = get_db()
-    db.execute(
-        "UPDATE sessions SET status = 'ended', ended_at = ? WHERE session_id = ?",
+    cur = db.execute(
+        "UPDATE sessions SET status = 'ended', ended_at = ? WHERE session_id = ? AND status != 'ended'",
         (_now(), event.session_id),
     )
     db.commit()
+    session_expiry.forget(event.session_id)
+    if cur.rowcount:
+        publish("session", event.session_id, op="ended", status="ended")
+        publish("stats", event.session_id, delta={"active_sessions": -1})
 
 
 def _handle_pre_tool_use(event: HookEvent) -> None:
@@ -106,12 +286,17 @@ def _handle_pre_tool_use(event: HookEvent) -> None:
     tool_input = None
     if event.tool_input is not None:
         tool_input = json.dumps(event.tool_input) if not isinstance(event.tool_input, str) else event.tool_input
-    db.execute(
-        """INSERT INTO tool_calls (session_id, tool_name, tool_input, status, started_at)
-           VALUES (?, ?, ?, 'pending', ?)""",
-        (event.session_id, event.tool_name or "unknown", tool_input, _now()),
+    agent_id = _resolve_agent(event)
+    cur = db.execute(
+        """INSERT INTO tool_calls (session_id, tool_name, tool_input, tool_input_size, status, started_at, agent_id)
+           VALUES (?, ?, ?, ?, 'pending', ?, ?)""",
+        (event.session_id, event.tool_name or "unknown", tool_input, _payload_size(tool_input), _now(),
+         agent_id),
     )
     db.commit()
+    publish("tool_call", event.session_id, op="start", tool_call_id=cur.lastrowid,
+            tool_name=event.tool_name or "unknown", status="pending", agent_id=agent_id)
+    publish("stats", event.session_id, delta={"total_tool_calls": 1})
 
 
 def _handle_post_tool_use(event: HookEvent) -> None:
@@ -120,41 +305,43 @@ def _handle_post_tool_use(event: HookEvent) -> None:
     if event.tool_response is not None:
         tool_response = json.dumps(event.tool_response) if not isinstance(event.tool_response, str) else event.tool_response
 
-    # Find the most recent pending tool call for this session+tool
-    row = db.execute(
-        """SELECT id, started_at FROM tool_calls
-           WHERE session_id = ? AND tool_name = ? AND status = 'pending'
-           ORDER BY id DESC LIMIT 1""",
-        (event.session_id, event.tool_name or "unknown"),
-    ).fetchone()
+    agent_id = _resolve_agent(event)
+    row = _find_pending_tool_call(event, agent_id)
 
+    duration_ms = None
     if row:
+        tool_call_id = row["id"]
         started = datetime.fromisoformat(row["started_at"])
         duration_ms = int((datetime.fromisoformat(_now()) - started).total_seconds() * 1000)
         db.execute(
-            """UPDATE tool_calls SET tool_response = ?, status = 'success',
+            """UPDATE tool_calls SET tool_response = ?, tool_response_size = ?, status = 'success',
                ended_at = ?, duration_ms = ? WHERE id = ?""",
-            (tool_response, _now(), duration_ms, row["id"]),
+            (tool_response, _payload_size(tool_response), _now(), duration_ms, row["id"]),
         )
     else:
-        db.execute(
-            """INSERT INTO tool_calls (session_id, tool_name, tool_response, status, ended_at)
-               VALUES (?, ?, ?, 'success', ?)""",
-            (event.session_id, event.tool_name or "unknown", tool_response, _now()),
+        cur = db.execute(
+            """INSERT INTO tool_calls (session_id, tool_name, tool_response, tool_response_size, status, ended_at, agent_id)
+               VALUES (?, ?, ?, ?, 'success', ?, ?)""",
+            (event.session_id, event.tool_name or "unknown", tool_response, _payload_size(tool_response), _now(),
+             agent_id),
         )
+        tool_call_id = cur.lastrowid
     db.commit()
+    publish("tool_call", event.session_id, op="end", tool_call_id=tool_call_id,
+            tool_name=event.tool_name or "unknown", status="success",
+            duration_ms=duration_ms, agent_id=agent_id)
+    if not row:
+        publish("stats", event.session_id, delta={"total_tool_calls": 1})
 
 
 def _handle_post_tool_use_failure(event: HookEvent) -> None:
     db = get_db()
-    row = db.execute(
-        """SELECT id, started_at FROM tool_calls
-           WHERE session_id = ? AND tool_name = ? AND status = 'pending'
-           ORDER BY id DESC LIMIT 1""",
-        (event.session_id, event.tool_name or "unknown"),
-    ).fetchone()
+    agent_id = _resolve_agent(event)
+    row = _find_pending_tool_call(event, agent_id)
 
+    duration_ms = None
     if row:
+        tool_call_id = row["id"]
         started = datetime.fromisoformat(row["started_at"])
         duration_ms = int((datetime.fromisoformat(_now()) - started).total_seconds() * 1000)
         db.execute(
@@ -163,12 +350,18 @@ def _handle_post_tool_use_failure(event: HookEvent) -> None:
             (event.error, _now(), duration_ms, row["id"]),
         )
     else:
-        db.execute(
-            """INSERT INTO tool_calls (session_id, tool_name, status, error, ended_at)
-               VALUES (?, ?, 'error', ?, ?)""",
-            (event.session_id, event.tool_name or "unknown", event.error, _now()),
+        cur = db.execute(
+            """INSERT INTO tool_calls (session_id, tool_name, status, error, ended_at, agent_id)
+               VALUES (?, ?, 'error', ?, ?, ?)""",
+            (event.session_id, event.tool_name or "unknown", event.error, _now(), agent_id),
         )
+        tool_call_id = cur.lastrowid
     db.commit()
+    publish("tool_call", event.session_id, op="end", tool_call_id=tool_call_id,
+            tool_name=event.tool_name or "unknown", status="error",
+            duration_ms=duration_ms, agent_id=agent_id)
+    delta = {"tool_errors": 1} if row else {"total_tool_calls": 1, "tool_errors": 1}
+    publish("stats", event.session_id, delta=delta)
 
 
 def _handle_stop(event: HookEvent) -> None:
@@ -184,35 +377,65 @@ def _handle_stop(event: HookEvent) -> None:
 def _handle_subagent_start(event: HookEvent) -> None:
     db = get_db()
     cur = db.execute(
-        """INSERT INTO agents (session_id, agent_name, agent_type, status, started_at)
-           VALUES (?, ?, ?, 'active', ?)""",
-        (event.session_id, event.agent_name, event.agent_type, _now()),
+        """INSERT INTO agents (session_id, agent_name, agent_type, hook_agent_id, status, started_at)
+           VALUES (?, ?, ?, ?, 'active', ?)""",
+        (event.session_id, event.agent_name, event.agent_type, event.agent_id, _now()),
     )
     agent_id = cur.lastrowid
 
-    # Link to the most recent pending Task tool call in this session
+    # Link to the most recent pending Task tool call in this session; the
+    # agent that issued that call is the new agent's parent
     task_row = db.execute(
-        """SELECT id FROM tool_calls
+        """SELECT id, agent_id FROM tool_calls
            WHERE session_id = ? AND tool_name = 'Task' AND status = 'pending'
            ORDER BY id DESC LIMIT 1""",
         (event.session_id,),
     ).fetchone()
+    parent_id = None
     if task_row:
+        parent_id = task_row["agent_id"]
         db.execute(
-            "UPDATE agents SET task_tool_call_id = ? WHERE id = ?",
-            (task_row["id"], agent_id),
+            "UPDATE agents SET task_tool_call_id = ?, parent_agent_id = ? WHERE id = ?",
+            (task_row["id"], parent_id, agent_id),
         )
+    _insert_closure(agent_id, parent_id)
     db.commit()
+    publish("agent", event.session_id, op="start", agent_id=agent_id,
+            parent_agent_id=parent_id, agent_type=event.agent_type)
+
+
+def _insert_closure(agent_id: int, parent_id: int | None) -> None:
+    """Add a new leaf agent to the closure table: itself plus the parent's ancestors."""
+    db = get_db()
+    db.execute(
+        "INSERT INTO agent_closure (ancestor_id, descendant_id, depth) VALUES (?, ?, 0)",
+        (agent_id, agent_id),
+    )
+    if parent_id is not None:
+        db.execute(
+            """INSERT INTO agent_closure (ancestor_id, descendant_id, depth)
+               SELECT ancestor_id, ?, depth + 1 FROM agent_closure WHERE descendant_id = ?""",
+            (agent_id, parent_id),
+        )
 
 
 def _handle_subagent_stop(event: HookEvent) -> None:
     db = get_db()
-    row = db.execute(
-        """SELECT id FROM agents
-           WHERE session_id = ? AND agent_name = ? AND status = 'active'
-           ORDER BY id DESC LIMIT 1""",
-        (event.session_id, event.agent_name),
-    ).fetchone()
+    row = None
+    if event.agent_id:
+        row = db.execute(
+            """SELECT id FROM agents
+               WHERE session_id = ? AND hook_agent_id = ? AND status = 'active'
+               ORDER BY id DESC LIMIT 1""",
+            (event.session_id, event.agent_id),
+        ).fetchone()
+    if row is None:
+        row = db.execute(
+            """SELECT id FROM agents
+               WHERE session_id = ? AND agent_name = ? AND status = 'active'
+               ORDER BY id DESC LIMIT 1""",
+            (event.session_id, event.agent_name),
+        ).fetchone()
 
     if row:
         db.execute(
@@ -220,3 +443,5 @@ def _handle_subagent_stop(event: HookEvent) -> None:
             (_now(), row["id"]),
         )
     db.commit()
+    if row:
+        publish("agent", event.session_id, op="stop", agent_id=row["id"])
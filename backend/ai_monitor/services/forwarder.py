@@ -0,0 +1,234 @@
+"""Agent mode: forward every ingested hook event to a central collector.
+
+When ``COLLECTOR_URL`` is set, each hook event this monitor ingests is
+also written to the ``forward_outbox`` table in the same transaction as
+its own writes, under a fresh event id. A single thread ships the outbox
+in order, in batches of up to ``FORWARD_BATCH_SIZE``. Each batch is
+gzip-compressed JSON that carries this machine's ``HOST_NAME``. Rows are
+deleted only once the collector has acknowledged them, so events survive
+restarts and collector outages.
+
+Failed sends are retried with exponential backoff and jitter, capped at
+``FORWARD_MAX_BACKOFF_SECONDS``. A batch can be sent twice when its
+acknowledgement is lost; the collector skips event ids it has already
+applied. Past ``FORWARD_OUTBOX_MAX_ROWS`` the oldest events are dropped.
+A batch the collector finds too large (413) is sent again in halves, and
+the batch size grows back as batches are accepted; a single event that is
+still too large is dropped like a malformed one.
+
+The thread reads and deletes through its own connection, so a slow
+collector never holds up ingestion.
+"""
+
+import gzip
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Any
+
+import orjson
+
+from ai_monitor.config import settings
+from ai_monitor.db import get_db
+from ai_monitor.models import HookEvent
+
+logger = logging.getLogger(__name__)
+
+enabled = bool(settings.collector_url)
+
+_TIMEOUT_SECONDS = 30.0
+# Rejected as malformed: retrying can't help, so the batch is dropped
+_POISON_STATUSES = {400, 422}
+
+
+def enqueue(event: HookEvent, received_at: str) -> None:
+    """Queue ``event`` for the collector; committed with the caller's writes."""
+    get_db().execute(
+        "INSERT INTO forward_outbox (event_id, received_at, payload) VALUES (?, ?, ?)",
+        (uuid.uuid4().hex, received_at, event.model_dump_json(exclude_none=True)),
+    )
+
+
+class _Rejected(Exception):
+    """The collector refused the batch for good."""
+
+
+class _Resend(Exception):
+    """Send again straight away (with a smaller batch)."""
+
+
+class Forwarder:
+    """Ships the outbox to the collector from one background thread."""
+
+    def __init__(self) -> None:
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._reset_metrics()
+
+    def _reset_metrics(self) -> None:
+        self.sent_events = 0
+        self.sent_batches = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error: str | None = None
+        self.last_sent_at: float | None = None
+        self.retry_at: float | None = None
+        self.batch_size = settings.forward_batch_size
+
+    def start(self) -> None:
+        if not enabled or self._thread is not None:
+            return
+        self._reset_metrics()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="forwarder", daemon=True)
+        self._thread.start()
+        logger.info("Forwarding events as %s to %s", settings.host_name, settings.collector_url)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def metrics(self) -> dict[str, Any]:
+        depth = 0
+        if enabled:
+            depth = get_db().execute("SELECT COUNT(*) FROM forward_outbox").fetchone()[0]
+        return {
+            "enabled": enabled,
+            "collector_url": settings.collector_url or None,
+            "host": settings.host_name,
+            "outbox": depth,
+            "sent_events": self.sent_events,
+            "sent_batches": self.sent_batches,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_sent_at": self.last_sent_at,
+            "retry_in_seconds": (
+                round(max(0.0, self.retry_at - time.time()), 1) if self.retry_at else None
+            ),
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(os.path.expanduser(settings.ai_monitor_db_path))
+        db.execute("PRAGMA busy_timeout=5000")
+        return db
+
+    def _run(self) -> None:
+        db = self._connect()
+        try:
+            while not self._stop.is_set():
+                try:
+                    sent = self._send_next(db)
+                except _Resend:
+                    continue
+                except Exception as exc:
+                    self._failed(db, exc)
+                    continue
+                if not sent:
+                    # Idle: poll the outbox about once a second
+                    self._stop.wait(1.0)
+        finally:
+            db.close()
+
+    def _send_next(self, db: sqlite3.Connection) -> int:
+        """Send the oldest batch; the number of events sent, 0 if the outbox is empty."""
+        rows = db.execute(
+            "SELECT id, event_id, received_at, payload FROM forward_outbox ORDER BY id LIMIT ?",
+            (self.batch_size,),
+        ).fetchall()
+        if not rows:
+            return 0
+        # Payloads are stored as JSON already; splice them in rather than re-encode
+        events = b",".join(
+            b'{"id":%s,"at":%s,"event":%s}'
+            % (orjson.dumps(event_id), orjson.dumps(received_at), payload.encode())
+            for _, event_id, received_at, payload in rows
+        )
+        body = b'{"host":%s,"events":[%s]}' % (orjson.dumps(settings.host_name), events)
+        try:
+            result = self._post(gzip.compress(body, compresslevel=6))
+        except _Rejected as exc:
+            self.rejected += len(rows)
+            logger.error("Collector rejected %d event(s), dropping them: %s", len(rows), exc)
+            self._delete_through(db, rows[-1][0])
+            return len(rows)
+        self._delete_through(db, rows[-1][0])
+        # Grow back after a 413 shrank the batches
+        self.batch_size = min(settings.forward_batch_size, self.batch_size * 2)
+        self.sent_events += len(rows)
+        self.sent_batches += 1
+        self.duplicates += result.get("duplicates", 0)
+        self.consecutive_failures = 0
+        self.retry_at = None
+        self.last_sent_at = time.time()
+        return len(rows)
+
+    def _post(self, body: bytes) -> dict[str, Any]:
+        request = urllib.request.Request(
+            settings.collector_url.rstrip("/") + "/api/collector/events",
+            data=body,
+            method="POST",
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        if settings.collector_token:
+            request.add_header("Authorization", f"Bearer {settings.collector_token}")
+        try:
+            with urllib.request.urlopen(request, timeout=_TIMEOUT_SECONDS) as resp:
+                return orjson.loads(resp.read())
+        except urllib.error.HTTPError as exc:
+            if exc.code == 413 and self.batch_size > 1:
+                # Too large for the collector: halve the batch and retry at once
+                self.batch_size = max(1, self.batch_size // 2)
+                raise _Resend() from exc
+            if exc.code in _POISON_STATUSES or exc.code == 413:
+                raise _Rejected(f"HTTP {exc.code}: {exc.read()[:200]!r}") from exc
+            raise
+
+    def _delete_through(self, db: sqlite3.Connection, last_id: int) -> None:
+        db.execute("DELETE FROM forward_outbox WHERE id <= ?", (last_id,))
+        db.commit()
+
+    def _failed(self, db: sqlite3.Connection, exc: Exception) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = f"{type(exc).__name__}: {exc}"
+        self._trim(db)
+        delay = min(settings.forward_max_backoff_seconds, 0.5 * 2 ** (self.consecutive_failures - 1))
+        delay *= random.uniform(0.5, 1.0)
+        self.retry_at = time.time() + delay
+        if self.consecutive_failures == 1 or self.consecutive_failures % 10 == 0:
+            logger.warning(
+                "Forwarding to %s failed (%d in a row), retrying in %.1fs: %s",
+                settings.collector_url, self.consecutive_failures, delay, self.last_error,
+            )
+        self._stop.wait(delay)
+
+    def _trim(self, db: sqlite3.Connection) -> None:
+        """Drop the oldest events beyond ``FORWARD_OUTBOX_MAX_ROWS``."""
+        # Rows leave from the head only, so ids are contiguous enough to count by
+        cur = db.execute(
+            """DELETE FROM forward_outbox WHERE id <= (
+                   SELECT MAX(id) - ? FROM forward_outbox)""",
+            (settings.forward_outbox_max_rows,),
+        )
+        db.commit()
+        if cur.rowcount > 0:
+            self.dropped += cur.rowcount
+            logger.error("Forward outbox full: dropped the %d oldest event(s)", cur.rowcount)
+
+
+forwarder = Forwarder()
@@ -0,0 +1,134 @@
+"""Background job tracking for ``/api/admin/jobs``.
+
+A job is long-running maintenance work (the transcript backfill) done in
+a worker thread while the API serves requests. It reports progress
+through a :class:`Job`, which computes rate and ETA, and calls
+:meth:`Job.checkpoint` between units of work to honour cancellation and
+to step aside while hook events are being ingested.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any
+
+from ai_monitor.services import event_processor
+
+# Back off while a hook event arrived within this many seconds...
+_INGEST_QUIET_SECONDS = 0.25
+# ...but never stall a job for longer than this per checkpoint
+_MAX_YIELD_SECONDS = 2.0
+# Finished jobs kept for the admin endpoint
+_HISTORY = 20
+
+_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    """Raised at a checkpoint once the job has been asked to stop."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Job:
+    def __init__(self, name: str) -> None:
+        self.id = next(_ids)
+        self.name = name
+        self.status = "pending"
+        self.total: int | None = None
+        self.done = 0
+        self.skipped = 0
+        self.error: str | None = None
+        self.started_at: str | None = None
+        self.finished_at: str | None = None
+        self._started: float | None = None
+        self._finished: float | None = None
+        self._cancel = threading.Event()
+
+    def start(self) -> None:
+        self.status = "running"
+        self.started_at = _now()
+        self._started = time.monotonic()
+
+    def advance(self, count: int = 1) -> None:
+        self.done += count
+
+    def _end(self, status: str) -> None:
+        self.status = status
+        self.finished_at = _now()
+        self._finished = time.monotonic()
+
+    def finish(self) -> None:
+        self._end("completed")
+
+    def fail(self, error: BaseException) -> None:
+        self.error = str(error) or type(error).__name__
+        self._end("failed")
+
+    def cancel(self) -> None:
+        """Ask the job to stop at its next checkpoint."""
+        self._cancel.set()
+
+    def cancelled(self) -> None:
+        self._end("cancelled")
+
+    def checkpoint(self) -> None:
+        """Stop if cancelled; otherwise pause while hook events are arriving."""
+        if self._cancel.is_set():
+            raise JobCancelled
+        deadline = time.monotonic() + _MAX_YIELD_SECONDS
+        while (
+            time.monotonic() - event_processor.last_event_monotonic < _INGEST_QUIET_SECONDS
+            and time.monotonic() < deadline
+        ):
+            if self._cancel.wait(0.05):
+                raise JobCancelled
+
+    def snapshot(self) -> dict[str, Any]:
+        elapsed = None
+        rate = None
+        eta = None
+        if self._started is not None:
+            elapsed = (self._finished or time.monotonic()) - self._started
+            if elapsed > 0:
+                rate = self.done / elapsed
+            if self.status == "running" and rate and self.total is not None:
+                eta = max(self.total - self.done, 0) / rate
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "skipped": self.skipped,
+            "progress": round(self.done / self.total, 4) if self.total else None,
+            "rate_per_second": round(rate, 2) if rate is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "elapsed_seconds": round(elapsed, 1) if elapsed is not None else None,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    def __init__(self) -> None:
+        self._jobs: deque[Job] = deque(maxlen=_HISTORY)
+        self._lock = threading.Lock()
+
+    def add(self, job: Job) -> Job:
+        with self._lock:
+            self._jobs.append(job)
+        return job
+
+    def list(self) -> list[Job]:
+        """Most recent first."""
+        with self._lock:
+            return list(reversed(self._jobs))
+
+
+jobs = JobRegistry()
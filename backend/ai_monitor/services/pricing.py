@@ -0,0 +1,287 @@
+"""Model pricing with effective dates, and bulk recomputation of stored costs.
+
+Prices live in the ``model_pricing`` table, per million tokens. A row
+applies to every model whose lowercased name contains its ``pattern``
+from ``effective_from`` on. When several rows apply, the longest
+pattern wins, then the latest ``effective_from``. The seeded rows
+reproduce the original built-in prices, including the ``''`` fallback
+that prices unknown models like Sonnet.
+
+Costs are stored per ledger row when a transcript is parsed. After a
+price change, :func:`recompute_costs` re-derives every stored cost from
+the token counts in one set-based pass. No transcript is read again.
+
+Prices are cached. A change made through another connection, such as
+``python -m ai_monitor.pricing set`` while the server runs, moves the
+database's ``data_version``; the cache checks it at most once a second
+and reloads.
+"""
+
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any
+
+from ai_monitor.db import get_db, write_lock
+from ai_monitor.etag import bump_generation
+from ai_monitor.services.change_stream import publish
+
+_PRICE_COLUMNS = ("input", "output", "cache_read", "cache_write")
+# Costs closer than this are considered unchanged
+_EPSILON = 1e-9
+
+# How often the cache asks whether another connection changed the database
+_RELOAD_CHECK_SECONDS = 1.0
+
+_lock = threading.Lock()
+# Prices as loaded, with the connection and its data_version at the time
+_prices: tuple[Any, int, list[dict[str, Any]]] | None = None
+_checked_at = 0.0
+
+
+def list_prices() -> list[dict[str, Any]]:
+    """Every pricing row, by pattern then effective date."""
+    rows = get_db().execute(
+        "SELECT * FROM model_pricing ORDER BY pattern, effective_from"
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def _cached_prices() -> list[dict[str, Any]]:
+    global _prices, _checked_at
+    db = get_db()
+    with _lock:
+        now = time.monotonic()
+        if _prices is not None and _prices[0] is db and now - _checked_at < _RELOAD_CHECK_SECONDS:
+            return _prices[2]
+        _checked_at = now
+        # Moves when another connection commits; this one's own writes invalidate
+        version = db.execute("PRAGMA data_version").fetchone()[0]
+        if _prices is None or _prices[0] is not db or _prices[1] != version:
+            _prices = (db, version, list_prices())
+        return _prices[2]
+
+
+def _invalidate() -> None:
+    global _prices
+    with _lock:
+        _prices = None
+
+
+def _effective_from(value: str) -> str:
+    """``value`` as stored: ``YYYY-MM-DD``, or a ``YYYY-MM-DDTHH:MM:SSZ`` UTC timestamp.
+
+    Lookups compare it with ledger timestamps as strings, so anything
+    else would silently misprice; it raises ValueError instead.
+    """
+    try:
+        if len(value) <= 10:
+            return date.fromisoformat(value).isoformat()
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(
+            f"effective_from must be an ISO date (YYYY-MM-DD) or timestamp, not {value!r}"
+        ) from None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _pick(prices: list[dict[str, Any]], model: str, timestamp: str) -> dict[str, Any] | None:
+    """The pricing row in effect for ``model`` at ``timestamp``."""
+    lower = (model or "").lower()
+    best = None
+    for row in prices:
+        if row["pattern"] in lower and row["effective_from"] <= timestamp:
+            key = (len(row["pattern"]), row["effective_from"])
+            if best is None or key > (len(best["pattern"]), best["effective_from"]):
+                best = row
+    return best
+
+
+def cost_of(
+    model: str,
+    timestamp: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_read_tokens: int,
+    cache_write_tokens: int,
+) -> float:
+    """Estimated USD cost of one usage record at the prices of its time."""
+    price = _pick(_cached_prices(), model, timestamp)
+    if price is None:
+        return 0.0
+    return (
+        input_tokens * price["input"]
+        + output_tokens * price["output"]
+        + cache_read_tokens * price["cache_read"]
+        + cache_write_tokens * price["cache_write"]
+    ) / 1_000_000
+
+
+def set_price(
+    pattern: str,
+    effective_from: str,
+    input: float,
+    output: float,
+    cache_read: float | None = None,
+    cache_write: float | None = None,
+) -> dict[str, Any]:
+    """Add or replace the price of ``pattern`` from ``effective_from`` on.
+
+    Cache prices default to 10% (reads) and 125% (writes) of the input
+    price. Costs already stored are left alone until they are recomputed.
+    Raises ValueError if ``effective_from`` isn't an ISO date or timestamp.
+    """
+    effective_from = _effective_from(effective_from)
+    with write_lock:
+        db = get_db()
+        row = db.execute(
+            """INSERT INTO model_pricing (pattern, effective_from, input, output, cache_read, cache_write)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (pattern, effective_from) DO UPDATE SET
+                   input = excluded.input, output = excluded.output,
+                   cache_read = excluded.cache_read, cache_write = excluded.cache_write
+               RETURNING *""",
+            (
+                pattern.lower(), effective_from, input, output,
+                input * 0.1 if cache_read is None else cache_read,
+                input * 1.25 if cache_write is None else cache_write,
+            ),
+        ).fetchone()
+        db.commit()
+    _invalidate()
+    return dict(row)
+
+
+def _periods(prices: list[dict[str, Any]], model: str) -> list[tuple]:
+    """Split time into spans with a single price for ``model``.
+
+    Returns ``(model, starts, ends, *prices)`` rows; ``ends`` is None for
+    the span still in effect. Uses the same precedence as :func:`cost_of`.
+    """
+    lower = (model or "").lower()
+    boundaries = sorted({r["effective_from"] for r in prices if r["pattern"] in lower})
+    spans = []
+    for i, starts in enumerate(boundaries):
+        price = _pick(prices, model, starts)
+        ends = boundaries[i + 1] if i + 1 < len(boundaries) else None
+        spans.append((model, starts, ends, *(price[c] for c in _PRICE_COLUMNS)))
+    return spans
+
+
+def recompute_costs(dry_run: bool = False, limit: int = 20) -> dict[str, Any]:
+    """Re-derive every stored cost from token counts at the current prices.
+
+    Prices are resolved once per model and price span into a temporary
+    table. A single join over the ledger then reprices every row and
+    keeps the rows whose cost moves. Everything after that (the diff,
+    the ledger update and the hourly and session re-sums) only touches
+    those rows. With ``dry_run`` nothing is written. Either way the result
+    is the diff: totals, a per-model breakdown and the ``limit`` sessions
+    whose cost moves most.
+    """
+    # Its temp tables, bulk updates and commit are one writer's transaction
+    with write_lock:
+        return _recompute_costs(dry_run, limit)
+
+
+def _recompute_costs(dry_run: bool, limit: int) -> dict[str, Any]:
+    started = time.perf_counter()
+    db = get_db()
+    prices = list_prices()
+    models = [r["model"] for r in db.execute("SELECT DISTINCT model FROM usage_hourly")]
+
+    db.execute(
+        """CREATE TEMP TABLE IF NOT EXISTS price_periods (
+               model TEXT NOT NULL, starts TEXT NOT NULL, ends TEXT,
+               input REAL, output REAL, cache_read REAL, cache_write REAL)"""
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS temp.idx_price_periods ON price_periods(model, starts)")
+    db.execute("DELETE FROM temp.price_periods")
+    db.executemany(
+        "INSERT INTO temp.price_periods VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [span for model in models for span in _periods(prices, model)],
+    )
+    db.execute("DROP TABLE IF EXISTS temp.repriced")
+    db.execute(
+        f"""CREATE TEMP TABLE repriced AS
+            SELECT * FROM (
+                SELECT l.session_id, l.path, l.turn, l.model,
+                       strftime('%Y-%m-%dT%H:00:00Z', l.timestamp) AS hour,
+                       l.cost AS old_cost,
+                       COALESCE((l.input_tokens * p.input + l.output_tokens * p.output
+                                 + l.cache_read_tokens * p.cache_read
+                                 + l.cache_write_tokens * p.cache_write) / 1000000.0, 0.0) AS new_cost
+                FROM usage_ledger l
+                LEFT JOIN temp.price_periods p
+                  ON p.model = l.model AND l.timestamp >= p.starts
+                 AND (p.ends IS NULL OR l.timestamp < p.ends))
+            WHERE ABS(new_cost - old_cost) > {_EPSILON}"""
+    )
+
+    by_model = [
+        dict(r) for r in db.execute(
+            """SELECT h.model, h.rows, COALESCE(c.rows_changed, 0) AS rows_changed,
+                      h.cost AS old_cost, h.cost + COALESCE(c.delta, 0.0) AS new_cost
+               FROM (SELECT model, SUM(turns) AS rows, SUM(cost) AS cost
+                     FROM usage_hourly GROUP BY model) h
+               LEFT JOIN (SELECT model, COUNT(*) AS rows_changed,
+                                 SUM(new_cost - old_cost) AS delta
+                          FROM temp.repriced GROUP BY model) c ON c.model = h.model
+               ORDER BY h.model"""
+        )
+    ]
+    sessions = [
+        dict(r) for r in db.execute(
+            """SELECT s.session_id, s.estimated_cost AS old_cost,
+                      s.estimated_cost + t.delta AS new_cost
+               FROM (SELECT session_id, SUM(new_cost - old_cost) AS delta
+                     FROM temp.repriced GROUP BY session_id) t
+               JOIN sessions s ON s.session_id = t.session_id
+               ORDER BY ABS(t.delta) DESC"""
+        )
+    ]
+
+    if not dry_run:
+        db.execute(
+            """UPDATE usage_ledger SET cost = r.new_cost
+               FROM temp.repriced r
+               WHERE usage_ledger.session_id = r.session_id AND usage_ledger.path = r.path
+                 AND usage_ledger.turn = r.turn AND usage_ledger.model = r.model"""
+        )
+        db.execute(
+            """UPDATE usage_hourly SET cost = cost + d.delta
+               FROM (SELECT hour, model, SUM(new_cost - old_cost) AS delta
+                     FROM temp.repriced GROUP BY hour, model) d
+               WHERE usage_hourly.hour = d.hour AND usage_hourly.model = d.model"""
+        )
+        db.executemany(
+            """UPDATE sessions SET estimated_cost = ?, version = version + 1
+               WHERE session_id = ?""",
+            [(s["new_cost"], s["session_id"]) for s in sessions],
+        )
+    db.execute("DROP TABLE temp.repriced")
+    db.commit()
+
+    old_total = sum(m["old_cost"] for m in by_model)
+    new_total = sum(m["new_cost"] for m in by_model)
+    if not dry_run and sessions:
+        bump_generation()
+        for s in sessions:
+            publish("session", s["session_id"], op="usage", estimated_cost=s["new_cost"])
+        publish("stats", delta={"total_cost": new_total - old_total})
+
+    return {
+        "dry_run": dry_run,
+        "ledger_rows": sum(m["rows"] for m in by_model),
+        "rows_changed": sum(m["rows_changed"] for m in by_model),
+        "sessions_changed": len(sessions),
+        "old_total_cost": round(old_total, 6),
+        "new_total_cost": round(new_total, 6),
+        "models": by_model,
+        "sessions": [
+            {**s, "delta": s["new_cost"] - s["old_cost"]} for s in sessions[:limit]
+        ],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
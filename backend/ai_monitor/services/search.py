@@ -0,0 +1,113 @@
+"""Full-text search over sessions and tool calls (FTS5)."""
+
+from ai_monitor.db import get_db
+from ai_monitor.models import SearchHit
+
+# The trigram tokenizer cannot match terms shorter than three characters
+MIN_TERM_LENGTH = 3
+
+# Indexed columns, for matching the terms too short for the index
+SESSION_FTS_COLUMNS = (
+    "sessions_fts.session_id", "sessions_fts.project_name", "sessions_fts.project_path"
+)
+TOOL_CALL_FTS_COLUMNS = (
+    "tool_calls_fts.tool_name", "tool_calls_fts.input_text", "tool_calls_fts.error"
+)
+
+_MARK_OPEN = "<mark>"
+_MARK_CLOSE = "</mark>"
+
+
+def build_match_query(text: str) -> str | None:
+    """Turn free text into an FTS5 MATCH expression.
+
+    Every whitespace-separated term is quoted as a phrase (so punctuation in
+    paths and commands is matched literally) and all terms must match.
+    Shorter terms are left out; :func:`short_term_filter` matches them.
+    Returns None when no term is long enough to be searchable.
+    """
+    terms = [t for t in text.split() if len(t) >= MIN_TERM_LENGTH]
+    if not terms:
+        return None
+    return " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def short_term_filter(text: str, columns: tuple[str, ...]) -> tuple[str, list[str]]:
+    """SQL conditions (each prefixed with AND) for the terms the index can't match.
+
+    Each term shorter than MIN_TERM_LENGTH must be a substring of one of
+    ``columns``. Used next to a MATCH on the same row, which keeps the LIKE
+    scans to the rows the long terms already matched.
+    """
+    sql = ""
+    params: list[str] = []
+    for term in text.split():
+        if len(term) >= MIN_TERM_LENGTH:
+            continue
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        sql += " AND (" + " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in columns) + ")"
+        params.extend([f"%{escaped}%"] * len(columns))
+    return sql, params
+
+
+def search(
+    text: str,
+    limit: int = 20,
+    session_id: str | None = None,
+    project_id: int | None = None,
+) -> list[SearchHit]:
+    """Search sessions and tool calls, returning the best-ranked hits first."""
+    match = build_match_query(text)
+    if match is None:
+        return []
+
+    db = get_db()
+
+    conditions = []
+    params: list = []
+    if session_id:
+        conditions.append("s.session_id = ?")
+        params.append(session_id)
+    if project_id is not None:
+        conditions.append("s.project_id = ?")
+        params.append(project_id)
+    scope = "".join(f" AND {c}" for c in conditions)
+    session_terms, session_term_params = short_term_filter(text, SESSION_FTS_COLUMNS)
+    tool_terms, tool_term_params = short_term_filter(text, TOOL_CALL_FTS_COLUMNS)
+
+    session_rows = db.execute(
+        f"""SELECT s.session_id, p.name as project_name, s.status, s.started_at,
+                   snippet(sessions_fts, -1, ?, ?, '…', 64) as snippet,
+                   bm25(sessions_fts) as rank
+            FROM sessions_fts
+            JOIN sessions s ON s.id = sessions_fts.rowid
+            LEFT JOIN projects p ON s.project_id = p.id
+            WHERE sessions_fts MATCH ?{session_terms}{scope}
+            ORDER BY rank
+            LIMIT ?""",
+        [_MARK_OPEN, _MARK_CLOSE, match, *session_term_params, *params, limit],
+    ).fetchall()
+
+    tool_rows = db.execute(
+        f"""SELECT tc.id as tool_call_id, tc.session_id, tc.tool_name, tc.status,
+                   tc.started_at, p.name as project_name,
+                   snippet(tool_calls_fts, -1, ?, ?, '…', 64) as snippet,
+                   bm25(tool_calls_fts) as rank
+            FROM tool_calls_fts
+            JOIN tool_calls tc ON tc.id = tool_calls_fts.rowid
+            LEFT JOIN sessions s ON s.session_id = tc.session_id
+            LEFT JOIN projects p ON s.project_id = p.id
+            WHERE tool_calls_fts MATCH ?{tool_terms}{scope}
+            ORDER BY rank
+            LIMIT ?""",
+        [_MARK_OPEN, _MARK_CLOSE, match, *tool_term_params, *params, limit],
+    ).fetchall()
+
+    hits = [
+        SearchHit(kind="session", **{k: r[k] for k in r.keys()}) for r in session_rows
+    ] + [
+        SearchHit(kind="tool_call", **{k: r[k] for k in r.keys()}) for r in tool_rows
+    ]
+    # bm25() is lower-is-better
+    hits.sort(key=lambda h: h.rank)
+    return hits[:limit]
@@ -1,41 +1,256 @@
-"""Periodic reaper that marks stale active sessions as ended."""
+"""Expire active sessions that stop receiving events.
 
+Every event pushes its session's deadline (last event plus
+``SESSION_STALE_TIMEOUT_MINUTES``) into :class:`SessionExpiry`, a min-heap
+drained by one thread that sleeps until the earliest deadline. Sessions
+due at the same time are ended in one batched write, so a quiet database
+isn't touched at all. The heap is rebuilt from the active sessions at
+startup (a partial index keeps that cheap).
+
+:func:`reap_stale_sessions` is the full-table sweep the heap replaced;
+it's kept for one-off cleanups.
+"""
+
+import heapq
 import logging
+import threading
+import time
 from datetime import datetime, timedelta, timezone
+from typing import Any
 
 from ai_monitor.config import settings
-from ai_monitor.db import get_db
+from ai_monitor.db import get_db, write_lock
+from ai_monitor.etag import bump_generation
+from ai_monitor.services.change_stream import publish
 
 logger = logging.getLogger(__name__)
 
+# Sessions ended per UPDATE statement
+_BATCH_SIZE = 500
+
+
+def _publish_ended(session_ids: list[str]) -> None:
+    bump_generation()
+    for session_id in session_ids:
+        publish("session", session_id, op="ended", status="ended")
+        publish("stats", session_id, delta={"active_sessions": -1})
+
 
 def reap_stale_sessions() -> int:
     """Mark active sessions with no recent events as ended.
 
     Returns the number of sessions reaped.
     """
-    db = get_db()
     cutoff = (
         datetime.now(timezone.utc)
         - timedelta(minutes=settings.session_stale_timeout_minutes)
     ).strftime("%Y-%m-%dT%H:%M:%SZ")
 
-    # Reap sessions with a known last_event_at
-    cur1 = db.execute(
-        """UPDATE sessions SET status = 'ended', ended_at = last_event_at
-           WHERE status = 'active' AND last_event_at IS NOT NULL AND last_event_at < ?""",
-        (cutoff,),
-    )
-
-    # Reap sessions with NULL last_event_at (legacy rows)
-    cur2 = db.execute(
-        """UPDATE sessions SET status = 'ended', ended_at = started_at
-           WHERE status = 'active' AND last_event_at IS NULL AND started_at < ?""",
-        (cutoff,),
-    )
-
-    db.commit()
-    total = cur1.rowcount + cur2.rowcount
+    with write_lock:
+        db = get_db()
+        # Reap sessions with a known last_event_at
+        reaped = db.execute(
+            """UPDATE sessions SET status = 'ended', ended_at = last_event_at, version = version + 1
+               WHERE status = 'active' AND last_event_at IS NOT NULL AND last_event_at < ?
+               RETURNING session_id""",
+            (cutoff,),
+        ).fetchall()
+
+        # Reap sessions with NULL last_event_at (legacy rows)
+        reaped += db.execute(
+            """UPDATE sessions SET status = 'ended', ended_at = started_at, version = version + 1
+               WHERE status = 'active' AND last_event_at IS NULL AND started_at < ?
+               RETURNING session_id""",
+            (cutoff,),
+        ).fetchall()
+
+        db.commit()
+    total = len(reaped)
     if total:
+        _publish_ended([row["session_id"] for row in reaped])
         logger.info("Reaped %d stale session(s)", total)
     return total
+
+
+def _deadline(last_event_at: str) -> float:
+    """Epoch seconds at which a session last active at ``last_event_at`` is stale.
+
+    Timestamps are stored to the second, so the deadline is rounded up to
+    the first second at which ``last_event_at < cutoff`` holds.
+    """
+    at = datetime.fromisoformat(last_event_at).replace(tzinfo=timezone.utc).timestamp()
+    return at + settings.session_stale_timeout_minutes * 60 + 1
+
+
+class SessionExpiry:
+    """Min-heap of active-session deadlines, expired by a single thread.
+
+    The heap holds at most one entry per session. A newer event only
+    moves the session's deadline in ``_deadlines``. When the old heap
+    entry comes due it is pushed back with the new deadline, so a busy
+    session costs a dict write per event rather than a heap push.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, str]] = []
+        self._deadlines: dict[str, float] = {}
+        self._queued: set[str] = set()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._reset_metrics()
+
+    def _reset_metrics(self) -> None:
+        self.expired = 0
+        self.batches = 0
+        self.rearmed = 0
+        self.last_batch_ms: float | None = None
+        self.rebuilt_sessions = 0
+
+    def touch(self, session_id: str, last_event_at: str) -> None:
+        """Record an event: the session now expires ``timeout`` after ``last_event_at``."""
+        deadline = _deadline(last_event_at)
+        with self._cond:
+            if deadline <= self._deadlines.get(session_id, 0.0):
+                return
+            self._deadlines[session_id] = deadline
+            if session_id not in self._queued:
+                self._queued.add(session_id)
+                heapq.heappush(self._heap, (deadline, session_id))
+                if self._heap[0][1] == session_id:
+                    self._cond.notify()
+
+    def forget(self, session_id: str) -> None:
+        """Stop tracking a session that ended on its own."""
+        with self._cond:
+            self._deadlines.pop(session_id, None)
+
+    def rebuild(self) -> int:
+        """Load the deadlines of every active session; returns how many."""
+        rows = get_db().execute(
+            """SELECT session_id, COALESCE(last_event_at, started_at) AS last_event_at
+               FROM sessions WHERE status = 'active'"""
+        ).fetchall()
+        with self._cond:
+            self._deadlines.clear()
+            self._queued.clear()
+            self._heap = [(_deadline(r["last_event_at"]), r["session_id"]) for r in rows]
+            heapq.heapify(self._heap)
+            self._deadlines.update((sid, deadline) for deadline, sid in self._heap)
+            self._queued.update(self._deadlines)
+            self.rebuilt_sessions = len(self._heap)
+            self._cond.notify()
+        return len(rows)
+
+    def start(self) -> None:
+        self._reset_metrics()
+        self.rebuild()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="session-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _due(self) -> list[str] | None:
+        """Pop the sessions whose deadline passed, waiting for the next one. Holds the lock."""
+        while not self._stopping:
+            now = time.time()
+            due: list[str] = []
+            while self._heap and self._heap[0][0] <= now and len(due) < _BATCH_SIZE:
+                deadline, session_id = heapq.heappop(self._heap)
+                current = self._deadlines.get(session_id)
+                if current is None:
+                    self._queued.discard(session_id)
+                elif current > deadline:
+                    heapq.heappush(self._heap, (current, session_id))
+                else:
+                    del self._deadlines[session_id]
+                    self._queued.discard(session_id)
+                    due.append(session_id)
+            if due:
+                return due
+            self._cond.wait(self._heap[0][0] - now if self._heap else None)
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                due = self._due()
+            if due is None:
+                return
+            try:
+                self._expire(due)
+            except Exception:
+                logger.exception("Session expiry failed for %d session(s)", len(due))
+
+    def _expire(self, session_ids: list[str]) -> None:
+        """End the given sessions in one write, re-arming any that saw a newer event."""
+        started = time.perf_counter()
+        db = get_db()
+        cutoff = (
+            datetime.now(timezone.utc)
+            - timedelta(minutes=settings.session_stale_timeout_minutes)
+        ).strftime("%Y-%m-%dT%H:%M:%SZ")
+        placeholders = ", ".join("?" * len(session_ids))
+        # The guard re-checks the stored time: an event committed since the
+        # deadline was computed keeps its session active. Under the write
+        # lock, so the commit is of this update alone
+        with write_lock:
+            ended = [
+                row["session_id"] for row in db.execute(
+                    f"""UPDATE sessions
+                        SET status = 'ended', ended_at = COALESCE(last_event_at, started_at),
+                            version = version + 1
+                        WHERE session_id IN ({placeholders}) AND status = 'active'
+                          AND COALESCE(last_event_at, started_at) < ?
+                        RETURNING session_id""",
+                    (*session_ids, cutoff),
+                ).fetchall()
+            ]
+            db.commit()
+        if ended:
+            _publish_ended(ended)
+            logger.info("Expired %d stale session(s)", len(ended))
+
+        missed = set(session_ids).difference(ended)
+        if missed:
+            rows = db.execute(
+                f"""SELECT session_id, COALESCE(last_event_at, started_at) AS last_event_at
+                    FROM sessions
+                    WHERE session_id IN ({", ".join("?" * len(missed))}) AND status = 'active'""",
+                tuple(missed),
+            ).fetchall()
+            for row in rows:
+                self.touch(row["session_id"], row["last_event_at"])
+            self.rearmed += len(rows)
+        self.expired += len(ended)
+        self.batches += 1
+        self.last_batch_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def metrics(self) -> dict[str, Any]:
+        with self._cond:
+            tracked = len(self._deadlines)
+            heap_size = len(self._heap)
+            next_deadline = min(self._deadlines.values(), default=None)
+        return {
+            "timeout_minutes": settings.session_stale_timeout_minutes,
+            "tracked_sessions": tracked,
+            "heap_size": heap_size,
+            "next_expiry_seconds": (
+                round(max(next_deadline - time.time(), 0.0), 3) if next_deadline is not None else None
+            ),
+            "expired": self.expired,
+            "batches": self.batches,
+            "rearmed": self.rearmed,
+            "last_batch_ms": self.last_batch_ms,
+            "rebuilt_sessions": self.rebuilt_sessions,
+        }
+
+
+session_expiry = SessionExpiry()
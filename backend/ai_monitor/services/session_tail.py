@@ -0,0 +1,210 @@
+"""Live session tail: one coalesced delta per burst, fanned out to every viewer.
+
+Each watched session gets a topic. Change notifications for the session
+(see :mod:`ai_monitor.services.change_stream`) only mark the topic dirty;
+the first one arms a timer and everything arriving within the coalescing
+window is folded into a single ``/api/changes``-style delta. The delta is
+queried and serialized once and the same payload is queued for every
+subscriber, so a hot session costs one query per burst however many tabs
+watch it.
+
+Deltas carry ``from_seq`` and ``seq`` and hold rows in their latest state,
+so applying one twice is harmless. A subscriber whose queue is full has
+its backlog discarded and gets a ``resync`` message instead; the client
+catches up with ``/api/changes?since=`` from its own sequence.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any
+
+import orjson
+
+from ai_monitor.config import settings
+from ai_monitor.db import write_lock
+from ai_monitor.services import change_stream
+from ai_monitor.services.changes import changes_since, current_seq
+
+# Rows per delta query; larger backlogs go out as several deltas
+_DELTA_LIMIT = 2000
+
+
+def encode_delta(from_seq: int, changes: dict[str, Any]) -> str:
+    return orjson.dumps({"type": "delta", "from_seq": from_seq, **changes}).decode()
+
+
+class TailSubscriber(change_stream.Subscriber):
+    """One tail viewer: a bounded queue of encoded deltas, reset on overflow."""
+
+    def __init__(
+        self,
+        session_id: str,
+        transport: str = "sse",
+        maxlen: int | None = None,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ) -> None:
+        super().__init__(session_id, maxlen=maxlen or settings.tail_queue_size, loop=loop)
+        self.transport = transport
+        self.delivered_seq = 0
+        self.delivered = 0
+        self.resyncs = 0
+        self._resync = False
+        self._queued_at: deque[float] = deque()
+
+    def offer(self, seq: int, payload: str) -> None:  # type: ignore[override]
+        with self._lock:
+            if len(self._queue) == self._queue.maxlen:
+                # Older deltas are useless without the newer ones; one resync covers all
+                self._queue.clear()
+                self._queued_at.clear()
+                if not self._resync:
+                    self._resync = True
+                    self.resyncs += 1
+            self._queue.append((seq, payload))
+            self._queued_at.append(time.monotonic())
+        self._notify()
+
+    def drain(self) -> list[str]:  # type: ignore[override]
+        """Take queued payloads, prefixed by a resync notice after an overflow."""
+        with self._lock:
+            items = list(self._queue)
+            self._queue.clear()
+            self._queued_at.clear()
+            resync, self._resync = self._resync, False
+        payloads = [payload for _, payload in items]
+        if resync:
+            payloads.insert(0, orjson.dumps({"type": "resync", "seq": self.delivered_seq}).decode())
+        if items:
+            self.delivered_seq = max(self.delivered_seq, items[-1][0])
+            self.delivered += len(items)
+        return payloads
+
+    def skip_to(self, seq: int) -> None:
+        """Record a delta sent directly (the catch-up on connect)."""
+        self.delivered_seq = max(self.delivered_seq, seq)
+
+    def stats(self, topic_seq: int) -> dict[str, Any]:
+        with self._lock:
+            queued = len(self._queue)
+            oldest = self._queued_at[0] if self._queued_at else None
+        return {
+            "transport": self.transport,
+            "queued": queued,
+            "delivered": self.delivered,
+            "delivered_seq": self.delivered_seq,
+            "lag_seq": max(topic_seq - self.delivered_seq, 0),
+            "lag_ms": round((time.monotonic() - oldest) * 1000, 1) if oldest is not None else 0.0,
+            "resyncs": self.resyncs,
+        }
+
+
+class _Topic:
+    """Subscribers of one session plus its coalescing state."""
+
+    def __init__(self, session_id: str) -> None:
+        self.session_id = session_id
+        self.subscribers: set[TailSubscriber] = set()
+        self.seq = current_seq()
+        self.notifications = 0
+        self.updates = 0
+        self.queries = 0
+        self.last_flush_ms: float | None = None
+        self.timer: threading.Timer | None = None
+        # Serializes flushes so deltas go out in sequence order
+        self.flush_lock = threading.Lock()
+
+
+class SessionTailHub:
+    """Registry of tail topics, fed by change notifications."""
+
+    def __init__(self) -> None:
+        self._topics: dict[str, _Topic] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscriber: TailSubscriber) -> TailSubscriber:
+        with self._lock:
+            topic = self._topics.get(subscriber.session_id)
+            if topic is None:
+                topic = self._topics[subscriber.session_id] = _Topic(subscriber.session_id)
+            topic.subscribers.add(subscriber)
+            subscriber.skip_to(topic.seq)
+        return subscriber
+
+    def unsubscribe(self, subscriber: TailSubscriber) -> None:
+        with self._lock:
+            topic = self._topics.get(subscriber.session_id)
+            if topic is None:
+                return
+            topic.subscribers.discard(subscriber)
+            if not topic.subscribers:
+                if topic.timer is not None:
+                    topic.timer.cancel()
+                del self._topics[subscriber.session_id]
+
+    def on_change(self, type_: str, session_id: str | None) -> None:
+        """Change hub listener: arm the topic's timer on the first change of a burst."""
+        if session_id is None or type_ == "stats":
+            return
+        with self._lock:
+            topic = self._topics.get(session_id)
+            if topic is None:
+                return
+            topic.notifications += 1
+            if topic.timer is not None:
+                return
+            topic.timer = threading.Timer(settings.tail_coalesce_seconds, self.flush, (topic,))
+            topic.timer.daemon = True
+            topic.timer.start()
+
+    def flush(self, topic: _Topic) -> None:
+        """Query the topic's delta once and queue it for every subscriber."""
+        with topic.flush_lock:
+            with self._lock:
+                topic.timer = None
+            started = time.perf_counter()
+            has_more = True
+            while has_more:
+                # Between writers' transactions, so no uncommitted row goes out
+                with write_lock:
+                    changes = changes_since(topic.seq, topic.session_id, _DELTA_LIMIT)
+                topic.queries += 1
+                has_more = changes["has_more"]
+                from_seq, topic.seq = topic.seq, changes["seq"]
+                if not (changes["sessions"] or changes["tool_calls"] or changes["agents"]):
+                    continue
+                payload = encode_delta(from_seq, changes)
+                topic.updates += 1
+                with self._lock:
+                    subscribers = list(topic.subscribers)
+                for subscriber in subscribers:
+                    subscriber.offer(topic.seq, payload)
+            topic.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            topics = [(topic, list(topic.subscribers)) for topic in self._topics.values()]
+        out = []
+        for topic, subscribers in topics:
+            out.append({
+                "session_id": topic.session_id,
+                "seq": topic.seq,
+                "subscriber_count": len(subscribers),
+                "notifications": topic.notifications,
+                "updates": topic.updates,
+                "queries": topic.queries,
+                "last_flush_ms": topic.last_flush_ms,
+                "subscribers": [s.stats(topic.seq) for s in subscribers],
+            })
+        return {
+            "coalesce_seconds": settings.tail_coalesce_seconds,
+            "topic_count": len(out),
+            "subscriber_count": sum(t["subscriber_count"] for t in out),
+            "max_lag_seq": max((s["lag_seq"] for t in out for s in t["subscribers"]), default=0),
+            "topics": out,
+        }
+
+
+tail_hub = SessionTailHub()
+change_stream.hub.add_listener(tail_hub.on_change)
@@ -9,42 +9,52 @@ from ai_monitor.models import (
     TokensOverTime,
     ToolCall,
     ToolStats,
+    UsageHour,
 )
 
 
-def get_dashboard_stats() -> DashboardStats:
-    """Compute aggregate statistics for the dashboard."""
+def get_dashboard_stats(host: str | None = None) -> DashboardStats:
+    """Compute aggregate statistics for the dashboard, optionally for one host."""
     db = get_db()
+    scope = [host] if host else []
+    session_and = "AND host = ?" if host else ""
+    session_where = "WHERE host = ?" if host else ""
+    host_sessions = "session_id IN (SELECT session_id FROM sessions WHERE host = ?)"
+    tool_and = f"AND {host_sessions}" if host else ""
+    tool_where = f"WHERE {host_sessions}" if host else ""
 
     # Session counts
-    total = db.execute("SELECT COUNT(*) as c FROM sessions").fetchone()["c"]
+    total = db.execute(f"SELECT COUNT(*) as c FROM sessions {session_where}", scope).fetchone()["c"]
     active = db.execute(
-        "SELECT COUNT(*) as c FROM sessions WHERE status = 'active'"
+        f"SELECT COUNT(*) as c FROM sessions WHERE status = 'active' {session_and}", scope
     ).fetchone()["c"]
 
     # Token/cost totals
     totals = db.execute(
-        """SELECT
+        f"""SELECT
                COALESCE(SUM(input_tokens), 0) as input_tokens,
                COALESCE(SUM(output_tokens), 0) as output_tokens,
                COALESCE(SUM(estimated_cost), 0) as cost
-           FROM sessions"""
+           FROM sessions {session_where}""",
+        scope,
     ).fetchone()
 
     # Tool call count
-    tool_count = db.execute("SELECT COUNT(*) as c FROM tool_calls").fetchone()["c"]
+    tool_count = db.execute(f"SELECT COUNT(*) as c FROM tool_calls {tool_where}", scope).fetchone()["c"]
 
     # Tool distribution
     tool_rows = db.execute(
-        """SELECT
+        f"""SELECT
                tool_name,
                COUNT(*) as count,
                SUM(CASE WHEN status = 'error' THEN 1 ELSE 0 END) as error_count,
                AVG(duration_ms) as avg_duration_ms
            FROM tool_calls
+           {tool_where}
            GROUP BY tool_name
            ORDER BY count DESC
-           LIMIT 20"""
+           LIMIT 20""",
+        scope,
     ).fetchall()
 
     tool_distribution = []
@@ -63,12 +73,14 @@ def get_dashboard_stats() -> DashboardStats:
 
     # Recent sessions
     recent_rows = db.execute(
-        """SELECT s.*, p.name as project_name,
+        f"""SELECT s.*, p.name as project_name,
                   (SELECT COUNT(*) FROM tool_calls tc WHERE tc.session_id = s.session_id) as tool_call_count
            FROM sessions s
            LEFT JOIN projects p ON s.project_id = p.id
+           {"WHERE s.host = ?" if host else ""}
            ORDER BY s.started_at DESC
-           LIMIT 10"""
+           LIMIT 10""",
+        scope,
     ).fetchall()
 
     recent_sessions = [
@@ -77,27 +89,41 @@ def get_dashboard_stats() -> DashboardStats:
 
     # Sessions over time (last 30 days)
     sessions_time_rows = db.execute(
-        """SELECT DATE(started_at) as date, COUNT(*) as count
+        f"""SELECT DATE(started_at) as date, COUNT(*) as count
            FROM sessions
-           WHERE started_at >= DATE('now', '-30 days')
+           WHERE started_at >= DATE('now', '-30 days') {session_and}
            GROUP BY DATE(started_at)
-           ORDER BY date"""
+           ORDER BY date""",
+        scope,
     ).fetchall()
     sessions_over_time = [
         SessionsOverTime(date=r["date"], count=r["count"])
         for r in sessions_time_rows
     ]
 
-    # Tokens over time (last 30 days)
-    tokens_time_rows = db.execute(
-        """SELECT DATE(started_at) as date,
-                  COALESCE(SUM(input_tokens), 0) as tokens_in,
-                  COALESCE(SUM(output_tokens), 0) as tokens_out
-           FROM sessions
-           WHERE started_at >= DATE('now', '-30 days')
-           GROUP BY DATE(started_at)
-           ORDER BY date"""
-    ).fetchall()
+    # Tokens over time (last 30 days), from the hourly usage rollup; the
+    # rollup has no host, so one host's usage is summed from the ledger
+    if host:
+        tokens_time_rows = db.execute(
+            f"""SELECT substr(timestamp, 1, 10) as date,
+                      SUM(input_tokens) as tokens_in,
+                      SUM(output_tokens) as tokens_out
+               FROM usage_ledger
+               WHERE timestamp >= DATE('now', '-30 days') {tool_and}
+               GROUP BY date
+               ORDER BY date""",
+            scope,
+        ).fetchall()
+    else:
+        tokens_time_rows = db.execute(
+            """SELECT substr(hour, 1, 10) as date,
+                      SUM(input_tokens) as tokens_in,
+                      SUM(output_tokens) as tokens_out
+               FROM usage_hourly
+               WHERE hour >= DATE('now', '-30 days')
+               GROUP BY date
+               ORDER BY date"""
+        ).fetchall()
     tokens_over_time = [
         TokensOverTime(date=r["date"], tokens_in=r["tokens_in"], tokens_out=r["tokens_out"])
         for r in tokens_time_rows
@@ -105,10 +131,11 @@ def get_dashboard_stats() -> DashboardStats:
 
     # Recent errors (last 20 tool call errors)
     error_rows = db.execute(
-        """SELECT * FROM tool_calls
-           WHERE status = 'error'
+        f"""SELECT * FROM tool_calls
+           WHERE status = 'error' {tool_and}
            ORDER BY started_at DESC
-           LIMIT 20"""
+           LIMIT 20""",
+        scope,
     ).fetchall()
     recent_errors = [
         ToolCall(**{k: r[k] for k in r.keys()}) for r in error_rows
@@ -197,14 +224,15 @@ def get_project_stats(project_id: int) -> ProjectDetail | None:
         for r in sessions_time_rows
     ]
 
-    # Tokens over time (last 30 days) scoped to project
+    # Tokens over time (last 30 days) scoped to project, by when each turn happened
     tokens_time_rows = db.execute(
-        """SELECT DATE(started_at) as date,
-                  COALESCE(SUM(input_tokens), 0) as tokens_in,
-                  COALESCE(SUM(output_tokens), 0) as tokens_out
-           FROM sessions
-           WHERE project_id = ? AND started_at >= DATE('now', '-30 days')
-           GROUP BY DATE(started_at)
+        """SELECT DATE(u.timestamp) as date,
+                  SUM(u.input_tokens) as tokens_in,
+                  SUM(u.output_tokens) as tokens_out
+           FROM sessions s
+           JOIN usage_ledger u ON u.session_id = s.session_id
+           WHERE s.project_id = ? AND u.timestamp >= DATE('now', '-30 days')
+           GROUP BY DATE(u.timestamp)
            ORDER BY date""",
         (project_id,),
     ).fetchall()
@@ -227,3 +255,24 @@ def get_project_stats(project_id: int) -> ProjectDetail | None:
         sessions_over_time=sessions_over_time,
         tokens_over_time=tokens_over_time,
     )
+
+
+def get_hourly_usage(hours: int, by_model: bool = False) -> list[UsageHour]:
+    """Token and cost totals per hour over the last ``hours`` hours."""
+    model = "model" if by_model else "NULL as model"
+    group = "hour, model" if by_model else "hour"
+    rows = get_db().execute(
+        f"""SELECT hour, {model},
+                   SUM(turns) as turns,
+                   SUM(input_tokens) as input_tokens,
+                   SUM(output_tokens) as output_tokens,
+                   SUM(cache_read_tokens) as cache_read_tokens,
+                   SUM(cache_write_tokens) as cache_write_tokens,
+                   SUM(cost) as cost
+            FROM usage_hourly
+            WHERE hour >= strftime('%Y-%m-%dT%H:00:00Z', 'now', ?)
+            GROUP BY {group}
+            ORDER BY {group}""",
+        (f"-{hours - 1} hours",),
+    ).fetchall()
+    return [UsageHour(**{k: r[k] for k in r.keys()}) for r in rows]
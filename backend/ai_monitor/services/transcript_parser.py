@@ -1,117 +1,405 @@
 """Parse JSONL transcript files for token usage and cost data."""
 
-import json
+import hashlib
 import logging
+import mmap
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 
-from ai_monitor.db import get_db
+import orjson
+
+from ai_monitor.config import settings
+from ai_monitor.db import get_db, write_lock
+from ai_monitor.etag import bump_generation
+from ai_monitor.metrics import transcript_parse_bytes, transcript_parse_seconds
+from ai_monitor.services.change_stream import publish
+from ai_monitor.services.jobs import Job
+from ai_monitor.services.pricing import cost_of
 
 logger = logging.getLogger(__name__)
 
-# Pricing per million tokens (USD)
-MODEL_PRICING = {
-    "sonnet": {"input": 3.0, "output": 15.0},
-    "opus": {"input": 15.0, "output": 75.0},
-    "haiku": {"input": 0.25, "output": 1.25},
-}
-
-
-def _match_model_pricing(model_name: str) -> dict[str, float]:
-    """Match a model string to pricing. Defaults to sonnet pricing."""
-    lower = model_name.lower() if model_name else ""
-    for key, pricing in MODEL_PRICING.items():
-        if key in lower:
-            return pricing
-    return MODEL_PRICING["sonnet"]
-
-
-def _calculate_cost(
-    input_tokens: int,
-    output_tokens: int,
-    cache_read_tokens: int,
-    cache_write_tokens: int,
-    pricing: dict[str, float],
-) -> float:
-    """Calculate estimated cost in USD."""
-    input_cost = (input_tokens / 1_000_000) * pricing["input"]
-    output_cost = (output_tokens / 1_000_000) * pricing["output"]
-    # Cache read tokens are typically 90% cheaper, write tokens at input price
-    cache_read_cost = (cache_read_tokens / 1_000_000) * pricing["input"] * 0.1
-    cache_write_cost = (cache_write_tokens / 1_000_000) * pricing["input"] * 1.25
-    return input_cost + output_cost + cache_read_cost + cache_write_cost
+# Bytes hashed at each end of the parsed range to recognize a file rewritten in place
+_SAMPLE_BYTES = 4096
+# Below this many changed files a startup scan stays in-process
+_POOL_MIN_FILES = 32
 
+_TOTALS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+_MANIFEST_COLUMNS = (
+    "path", "inode", "size", "mtime_ns", "offset", "head_hash", "tail_hash",
+    "session_id", "model", *_TOTALS, "turns",
+)
 
-def parse_transcript(file_path: str) -> None:
-    """Parse a single JSONL transcript file and update session token counts."""
-    if not os.path.exists(file_path) or not file_path.endswith(".jsonl"):
+# Only lines holding one of these keys are decoded at all
+_COST_TRACKER_KEY = b'"costTracker"'
+_SESSION_ID_KEYS = (b'"sessionId"', b'"session_id"')
+_SESSION_ID_WINDOW = 1 << 16
+
+
+def _sample_hashes(f, offset: int) -> tuple[str, str]:
+    """SHA-1 of the first and of the last ``_SAMPLE_BYTES`` before ``offset``."""
+    f.seek(0)
+    head = hashlib.sha1(f.read(min(offset, _SAMPLE_BYTES))).hexdigest()
+    tail_start = max(offset - _SAMPLE_BYTES, 0)
+    f.seek(tail_start)
+    tail = hashlib.sha1(f.read(offset - tail_start)).hexdigest()
+    return head, tail
+
+
+def _entry_at(mm: mmap.mmap, index: int, start: int, end: int) -> tuple[dict | None, int]:
+    """Decode the JSONL line holding byte ``index``; returns it and the next line's start."""
+    line_start = mm.rfind(b"\n", start, index) + 1 or start
+    line_end = mm.find(b"\n", index, end)
+    if line_end < 0:
+        line_end = end
+    try:
+        entry = orjson.loads(mm[line_start:line_end])
+    except orjson.JSONDecodeError:
+        entry = None
+    return (entry if isinstance(entry, dict) else None), line_end + 1
+
+
+def _entry_timestamp(entry: dict, default: str) -> str:
+    """The entry's own timestamp as ISO 8601 UTC, or ``default``."""
+    value = entry.get("timestamp")
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return default
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc)
+        return parsed.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return default
+
+
+def _add_usage(entry: dict, state: dict) -> None:
+    """Count one costTracker entry as a turn: a ledger row per model, added to the totals."""
+    tracker = entry.get("costTracker")
+    if not isinstance(tracker, dict):
+        return
+    rows = [(model, usage) for model, usage in tracker.items() if isinstance(usage, dict)]
+    if not rows:
         return
+    state["turns"] += 1
+    timestamp = _entry_timestamp(entry, state["scanned_at"])
+    for model, usage in rows:
+        tokens = (
+            usage.get("inputTokens", 0),
+            usage.get("outputTokens", 0),
+            usage.get("cacheReadTokens", 0),
+            usage.get("cacheWriteTokens", 0),
+        )
+        for key, n in zip(_TOTALS, tokens):
+            state[key] += n
+        state["ledger"].append((state["turns"], model, timestamp, *tokens))
+        if not state["model"] and model:
+            state["model"] = model
+
+
+def _scan_range(mm: mmap.mmap, start: int, end: int, state: dict) -> None:
+    """Add the costTracker turns of the complete lines in ``mm[start:end]`` to ``state``.
+
+    Instead of decoding every line, the mapped bytes are searched for the
+    keys that matter and only the lines holding them are decoded. The
+    session ID search stops at the first line that has one.
+    """
+    # Session ID: searched window by window, so a key that never occurs
+    # doesn't cost a pass over the whole range once the ID is found
+    pos = start
+    while not state["session_id"] and pos < end:
+        window_end = min(pos + _SESSION_ID_WINDOW, end)
+        found = [
+            i for i in (mm.find(key, pos, min(window_end + len(key), end)) for key in _SESSION_ID_KEYS)
+            if i >= 0
+        ]
+        if not found:
+            pos = window_end
+            continue
+        entry, pos = _entry_at(mm, min(found), start, end)
+        if entry is not None:
+            state["session_id"] = entry.get("sessionId") or entry.get("session_id")
+
+    pos = start
+    while (index := mm.find(_COST_TRACKER_KEY, pos, end)) >= 0:
+        entry, pos = _entry_at(mm, index, start, end)
+        if entry is not None:
+            _add_usage(entry, state)
 
-    total_input = 0
-    total_output = 0
-    total_cache_read = 0
-    total_cache_write = 0
-    session_id = None
-    model = None
 
+def scan_transcript(file_path: str, previous: dict | None = None) -> dict | None:
+    """Read the new lines of a transcript; no database access.
+
+    ``previous`` is the file's ``transcript_files`` row. Reading resumes at
+    its offset with its running totals, so an appended transcript costs
+    only the appended bytes. The offset always sits after the last
+    complete line; a partially written line is read again once its
+    newline arrives. A file that shrank, was replaced (new inode) or was
+    rewritten in place (sampled hashes differ) is rescanned from the start.
+
+    Returns the new manifest row plus ``resumed``, ``ledger`` (one
+    ``(turn, model, timestamp, *tokens)`` tuple per model of each
+    costTracker entry read) and the bytes and seconds the scan took, or
+    None if the file can't be read. Runs in
+    worker processes during startup scans, so everything in and out is
+    picklable.
+    """
+    started = time.perf_counter()
     try:
-        with open(file_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    entry = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                # Look for costTracker data
-                if "costTracker" in entry:
-                    tracker = entry["costTracker"]
-                    if isinstance(tracker, dict):
-                        for _model_key, usage in tracker.items():
-                            if isinstance(usage, dict):
-                                total_input += usage.get("inputTokens", 0)
-                                total_output += usage.get("outputTokens", 0)
-                                total_cache_read += usage.get("cacheReadTokens", 0)
-                                total_cache_write += usage.get("cacheWriteTokens", 0)
-                                if not model and _model_key:
-                                    model = _model_key
-
-                # Try to extract session ID from various fields
-                if not session_id:
-                    session_id = entry.get("sessionId") or entry.get("session_id")
-
-    except (OSError, PermissionError) as e:
+        with open(file_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            resume = (
+                previous is not None
+                and previous["inode"] == st.st_ino
+                and previous["offset"] <= st.st_size
+                and _sample_hashes(f, previous["offset"])
+                == (previous["head_hash"], previous["tail_hash"])
+            )
+            if resume:
+                state = {k: previous[k] for k in _MANIFEST_COLUMNS}
+            else:
+                if previous is not None:
+                    logger.info("Transcript %s was truncated or replaced, rescanning", file_path)
+                state = {
+                    "session_id": None, "model": None, **dict.fromkeys(_TOTALS, 0),
+                    "turns": 0, "offset": 0,
+                }
+            state["ledger"] = []
+            start_offset = state["offset"]
+            state["scanned_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+            if st.st_size > state["offset"]:
+                with mmap.mmap(f.fileno(), st.st_size, access=mmap.ACCESS_READ) as mm:
+                    end = mm.rfind(b"\n", state["offset"], st.st_size) + 1
+                    if end > state["offset"]:
+                        _scan_range(mm, state["offset"], end, state)
+                        state["offset"] = end
+            head_hash, tail_hash = _sample_hashes(f, state["offset"])
+    except (OSError, PermissionError, ValueError) as e:
         logger.warning("Could not read transcript %s: %s", file_path, e)
-        return
+        return None
+
+    state.update(
+        path=file_path,
+        inode=st.st_ino,
+        size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        head_hash=head_hash,
+        tail_hash=tail_hash,
+        resumed=resume,
+        scanned_bytes=state["offset"] - start_offset,
+        scan_seconds=time.perf_counter() - started,
+    )
+    return state
 
-    if not session_id or (total_input == 0 and total_output == 0):
-        return
 
-    pricing = _match_model_pricing(model or "")
-    cost = _calculate_cost(total_input, total_output, total_cache_read, total_cache_write, pricing)
+def _apply_scan(db, result: dict) -> tuple | None:
+    """Save one scan result; returns what to publish once committed.
 
-    db = get_db()
+    New ledger rows are appended and added to the session's totals. A
+    rescanned file replaces its own rows, leaving those of the session's
+    other transcripts, and the session's totals are summed from the
+    ledger again; so are they when some rows were already recorded.
+    """
     db.execute(
-        """UPDATE sessions SET
-               input_tokens = ?, output_tokens = ?,
-               cache_read_tokens = ?, cache_write_tokens = ?,
-               estimated_cost = ?,
-               model = COALESCE(?, model)
-           WHERE session_id = ?""",
-        (total_input, total_output, total_cache_read, total_cache_write, cost, model, session_id),
+        f"""INSERT OR REPLACE INTO transcript_files ({", ".join(_MANIFEST_COLUMNS)}, parsed_at)
+            VALUES ({", ".join("?" * len(_MANIFEST_COLUMNS))}, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))""",
+        [result[k] for k in _MANIFEST_COLUMNS],
     )
-    db.commit()
 
+    session_id = result["session_id"]
+    if not session_id:
+        return None
+    replaced = 0
+    if not result["resumed"]:
+        replaced = db.execute(
+            "DELETE FROM usage_ledger WHERE session_id = ? AND path = ?",
+            (session_id, result["path"]),
+        ).rowcount
+    rows = [
+        (session_id, result["path"], *row, cost_of(*row[1:]))
+        for row in result["ledger"]
+    ]
+    if not rows and not replaced:
+        return None
+    inserted = db.executemany(
+        """INSERT OR IGNORE INTO usage_ledger
+               (session_id, path, turn, model, timestamp, input_tokens, output_tokens,
+                cache_read_tokens, cache_write_tokens, cost)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    ).rowcount
+
+    previous = db.execute(
+        """SELECT input_tokens, output_tokens, estimated_cost FROM sessions
+           WHERE session_id = ?""",
+        (session_id,),
+    ).fetchone()
+    if previous is None:
+        # Picked up from the ledger when the session is created
+        return None
+    if result["resumed"] and inserted == len(rows):
+        delta = [sum(row[i] for row in rows) for i in range(5, 10)]
+        current = db.execute(
+            """UPDATE sessions SET
+                   input_tokens = input_tokens + ?, output_tokens = output_tokens + ?,
+                   cache_read_tokens = cache_read_tokens + ?,
+                   cache_write_tokens = cache_write_tokens + ?,
+                   estimated_cost = estimated_cost + ?,
+                   model = COALESCE(?, model),
+                   version = version + 1
+               WHERE session_id = ?
+               RETURNING input_tokens, output_tokens, estimated_cost""",
+            (*delta, result["model"], session_id),
+        ).fetchone()
+    else:
+        current = db.execute(
+            """UPDATE sessions SET
+                   (input_tokens, output_tokens, cache_read_tokens,
+                    cache_write_tokens, estimated_cost) = (
+                       SELECT COALESCE(SUM(input_tokens), 0), COALESCE(SUM(output_tokens), 0),
+                              COALESCE(SUM(cache_read_tokens), 0),
+                              COALESCE(SUM(cache_write_tokens), 0), COALESCE(SUM(cost), 0.0)
+                       FROM usage_ledger WHERE session_id = ?1),
+                   model = COALESCE(?2, model),
+                   version = version + 1
+               WHERE session_id = ?1
+               RETURNING input_tokens, output_tokens, estimated_cost""",
+            (session_id, result["model"]),
+        ).fetchone()
+    return (session_id, previous, current["input_tokens"], current["output_tokens"],
+            current["estimated_cost"])
+
+
+def apply_scans(results: list[dict]) -> int:
+    """Save scan results in one transaction, then notify; returns sessions updated."""
+    updates = []
+    with write_lock:
+        db = get_db()
+        for result in results:
+            transcript_parse_bytes.inc(amount=result["scanned_bytes"])
+            transcript_parse_seconds.observe(result["scan_seconds"])
+            update = _apply_scan(db, result)
+            if update is not None:
+                updates.append(update)
+        db.commit()
+    if not updates:
+        return 0
+    bump_generation()
+    for session_id, previous, total_input, total_output, cost in updates:
+        publish("session", session_id, op="usage", input_tokens=total_input,
+                output_tokens=total_output, estimated_cost=cost)
+        publish("stats", session_id, delta={
+            "total_input_tokens": total_input - previous["input_tokens"],
+            "total_output_tokens": total_output - previous["output_tokens"],
+            "total_cost": cost - previous["estimated_cost"],
+        })
+    return len(updates)
+
+
+def parse_transcript(file_path: str) -> None:
+    """Parse new lines of a JSONL transcript file and update session token counts."""
+    if not os.path.exists(file_path) or not file_path.endswith(".jsonl"):
+        return
+    row = get_db().execute(
+        "SELECT * FROM transcript_files WHERE path = ?", (file_path,)
+    ).fetchone()
+    result = scan_transcript(file_path, dict(row) if row is not None else None)
+    if result is not None:
+        apply_scans([result])
+
+
+def scan_transcripts_dir(
+    projects_dir: str, workers: int | None = None, job: Job | None = None
+) -> dict[str, int]:
+    """Bring every transcript under ``projects_dir`` up to date.
 
-def scan_transcripts_dir(projects_dir: str) -> None:
-    """Walk the projects directory and parse all JSONL transcripts."""
+    Files whose inode, size and mtime match the manifest are skipped
+    without being opened. Changed files are scanned in a process pool
+    (``TRANSCRIPT_SCAN_WORKERS``, default one per core) when there are
+    enough of them, and results are applied in batched transactions.
+    With a ``job``, progress is reported to it and it gets a checkpoint
+    after every batch. Returns file counts for logging.
+    """
+    counts = {"files": 0, "skipped": 0, "scanned": 0, "sessions_updated": 0}
     projects_dir = os.path.expanduser(projects_dir)
     if not os.path.isdir(projects_dir):
         logger.info("Projects directory not found: %s", projects_dir)
-        return
+        return counts
 
+    manifest = {
+        row["path"]: dict(row)
+        for row in get_db().execute("SELECT * FROM transcript_files").fetchall()
+    }
+    paths: list[str] = []
+    previous: list[dict | None] = []
     for root, _dirs, files in os.walk(projects_dir):
         for fname in files:
-            if fname.endswith(".jsonl"):
-                parse_transcript(os.path.join(root, fname))
+            if not fname.endswith(".jsonl"):
+                continue
+            path = os.path.join(root, fname)
+            counts["files"] += 1
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            row = manifest.get(path)
+            if (
+                row is not None
+                and row["inode"] == st.st_ino
+                and row["size"] == st.st_size
+                and row["mtime_ns"] == st.st_mtime_ns
+            ):
+                counts["skipped"] += 1
+                continue
+            paths.append(path)
+            previous.append(row)
+
+    if job is not None:
+        job.total = len(paths)
+        job.skipped = counts["skipped"]
+
+    workers = workers or settings.transcript_scan_workers or os.cpu_count() or 1
+    batch_size = settings.transcript_scan_batch_size
+    batch: list[dict] = []
+
+    def flush() -> None:
+        counts["sessions_updated"] += apply_scans(batch)
+        if job is not None:
+            job.advance(len(batch))
+        batch.clear()
+
+    def collect(results) -> None:
+        for result in results:
+            if result is None:
+                if job is not None:
+                    job.advance()
+                continue
+            counts["scanned"] += 1
+            batch.append(result)
+            if len(batch) >= batch_size:
+                flush()
+                if job is not None:
+                    job.checkpoint()
+
+    if workers > 1 and len(paths) >= _POOL_MIN_FILES:
+        # spawn: the server process already runs threads, which fork doesn't copy safely
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            try:
+                collect(pool.map(scan_transcript, paths, previous, chunksize=8))
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+    else:
+        collect(map(scan_transcript, paths, previous))
+    if batch:
+        flush()
+
+    logger.info(
+        "Transcript scan: %(files)d files, %(skipped)d unchanged, %(scanned)d scanned, "
+        "%(sessions_updated)d sessions updated", counts,
+    )
+    return counts
@@ -1,75 +1,484 @@
-"""Watchdog file watcher for Claude transcript JSONL files."""
+"""Watchdog file watcher for Claude transcript JSONL files.
+
+Only project directories with recent activity are watched (the hot set):
+hook events name their transcript, which promotes its project directory,
+and directories idle for ``WATCHER_HOT_TTL_SECONDS`` are dropped. The
+hot set is capped at ``WATCHER_MAX_HOT_DIRS`` so huge projects trees don't
+exhaust inotify watches. Every other directory is covered by a periodic
+stat sweep. When native watches are unavailable (no inotify, or its
+watch limit is reached) the watcher falls back to polling the hot set.
+
+The observer thread only marks changed files dirty. A :class:`ParseScheduler`
+coalesces the marks (trailing edge: a file is parsed once it has been quiet
+for ``WATCHER_COALESCE_SECONDS``, or at the latest ``WATCHER_MAX_DELAY_SECONDS``
+after its first change) and parses on a small pool of worker threads. A file
+is never parsed by two workers at once; changes arriving during a parse
+schedule one more pass after it. Workers read files in parallel but write
+their results under ``ai_monitor.db.write_lock``, one transaction at a
+time. The dirty set is bounded: on overflow new marks are dropped and a
+manifest-based rescan of the projects directory is queued instead, which
+skips unchanged files cheaply.
+"""
 
 import logging
 import os
+import re
+import statistics
 import threading
 import time
+from collections import OrderedDict, deque
+from typing import Any, Callable
 
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 
 from ai_monitor.config import settings
-from ai_monitor.services.transcript_parser import parse_transcript
+from ai_monitor.db import get_db
+from ai_monitor.services.transcript_parser import parse_transcript, scan_transcripts_dir
 
 logger = logging.getLogger(__name__)
 
-_observer: Observer | None = None
+# Parse latencies kept for the percentiles in the metrics
+_LATENCY_SAMPLES = 256
+
+
+class _Pending:
+    __slots__ = ("first_seen", "due")
+
+    def __init__(self, now: float) -> None:
+        self.first_seen = now
+        self.due = now
+
+
+class ParseScheduler:
+    """Dirty-file set drained by worker threads, one parse per file at a time."""
+
+    def __init__(
+        self,
+        parse: Callable[[str], None] = parse_transcript,
+        rescan: Callable[[], Any] | None = None,
+        workers: int | None = None,
+        coalesce_seconds: float | None = None,
+        max_delay_seconds: float | None = None,
+        max_pending: int | None = None,
+    ) -> None:
+        self._parse = parse
+        self._rescan = rescan
+        self.workers = workers or settings.watcher_workers
+        self.coalesce_seconds = (
+            settings.watcher_coalesce_seconds if coalesce_seconds is None else coalesce_seconds
+        )
+        self.max_delay_seconds = (
+            settings.watcher_max_delay_seconds if max_delay_seconds is None else max_delay_seconds
+        )
+        self.max_pending = max_pending or settings.watcher_max_pending
+        self._pending: dict[str, _Pending] = {}
+        self._running: set[str] = set()
+        self._rescan_requested = False
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+        # Metrics
+        self.marked = 0
+        self.parsed = 0
+        self.failed = 0
+        self.overflows = 0
+        self.rescans = 0
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._waits: deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    def start(self) -> None:
+        self._stopping = False
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"transcript-parser-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the workers after their current parse; pending files are left to the next scan."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def mark_dirty(self, path: str) -> None:
+        """Schedule ``path`` for parsing once its writes settle."""
+        now = time.monotonic()
+        with self._cond:
+            self.marked += 1
+            pending = self._pending.get(path)
+            if pending is None:
+                if len(self._pending) >= self.max_pending:
+                    self.overflows += 1
+                    self._rescan_requested = self._rescan is not None
+                    self._cond.notify()
+                    return
+                pending = self._pending[path] = _Pending(now)
+            pending.due = min(now + self.coalesce_seconds, pending.first_seen + self.max_delay_seconds)
+            self._cond.notify()
+
+    def _next(self) -> tuple[str | None, float | None]:
+        """Pick a due file that isn't being parsed; else how long to wait. Holds the lock."""
+        now = time.monotonic()
+        wait = None
+        for path, pending in self._pending.items():
+            if path in self._running:
+                continue
+            if pending.due <= now:
+                return path, None
+            wait = pending.due - now if wait is None else min(wait, pending.due - now)
+        return None, wait
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping:
+                        return
+                    path, wait = self._next()
+                    if path is not None:
+                        pending = self._pending.pop(path)
+                        self._running.add(path)
+                        break
+                    if self._rescan_requested and not self._pending:
+                        self._rescan_requested = False
+                        break
+                    self._cond.wait(wait)
 
-# Debounce: track last-processed time per file
-_last_processed: dict[str, float] = {}
-_DEBOUNCE_SECONDS = 3.0
-_lock = threading.Lock()
+            if path is None:
+                self._run_rescan()
+                continue
+            started = time.monotonic()
+            self._waits.append(started - pending.first_seen)
+            try:
+                self._parse(path)
+                self.parsed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Error parsing transcript: %s", path)
+            finally:
+                self._latencies.append(time.monotonic() - started)
+                with self._cond:
+                    self._running.discard(path)
+                    # A change during the parse left it pending; wake a worker for it
+                    self._cond.notify_all()
+
+    def _run_rescan(self) -> None:
+        self.rescans += 1
+        try:
+            self._rescan()
+        except Exception:
+            logger.exception("Transcript rescan after watcher overflow failed")
+
+    def metrics(self) -> dict[str, Any]:
+        with self._cond:
+            queue_depth = len(self._pending)
+            running = len(self._running)
+        latencies = sorted(self._latencies)
+        waits = sorted(self._waits)
+
+        def percentile(samples: list[float], q: float) -> float | None:
+            if not samples:
+                return None
+            return round(samples[min(int(len(samples) * q), len(samples) - 1)] * 1000, 2)
+
+        return {
+            "workers": self.workers,
+            "queue_depth": queue_depth,
+            "running": running,
+            "max_pending": self.max_pending,
+            "marked": self.marked,
+            "parsed": self.parsed,
+            "failed": self.failed,
+            "overflows": self.overflows,
+            "rescans": self.rescans,
+            "parse_ms_p50": percentile(latencies, 0.5),
+            "parse_ms_p95": percentile(latencies, 0.95),
+            "parse_ms_mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+            "wait_ms_p50": percentile(waits, 0.5),
+            "wait_ms_p95": percentile(waits, 0.95),
+        }
+
+
+scheduler = ParseScheduler(rescan=lambda: scan_transcripts_dir(settings.claude_projects_dir))
 
 
 class TranscriptHandler(FileSystemEventHandler):
-    """Handle changes to .jsonl transcript files."""
+    """Mark changed .jsonl transcript files dirty."""
+
+    def __init__(self, scheduler: ParseScheduler) -> None:
+        self.scheduler = scheduler
 
     def on_modified(self, event):
         if event.is_directory:
             return
         if event.src_path.endswith(".jsonl"):
-            self._debounced_parse(event.src_path)
+            self.scheduler.mark_dirty(event.src_path)
 
     def on_created(self, event):
         if event.is_directory:
             return
         if event.src_path.endswith(".jsonl"):
-            self._debounced_parse(event.src_path)
+            self.scheduler.mark_dirty(event.src_path)
+
+    def on_moved(self, event):
+        # Rotation: the new name is a (possibly different) transcript
+        if event.is_directory:
+            return
+        if event.dest_path.endswith(".jsonl"):
+            self.scheduler.mark_dirty(event.dest_path)
+
 
-    def _debounced_parse(self, path: str) -> None:
-        now = time.time()
-        with _lock:
-            last = _last_processed.get(path, 0)
-            if now - last < _DEBOUNCE_SECONDS:
+class WatchSet:
+    """Hot project directories with live watches, plus a stat sweep of the rest."""
+
+    def __init__(
+        self,
+        scheduler: ParseScheduler,
+        max_hot_dirs: int | None = None,
+        hot_ttl_seconds: float | None = None,
+        sweep_seconds: float | None = None,
+        polling: bool | None = None,
+        observer_factory: Callable[[], Any] = Observer,
+    ) -> None:
+        self.scheduler = scheduler
+        self.max_hot_dirs = max_hot_dirs or settings.watcher_max_hot_dirs
+        self.hot_ttl_seconds = hot_ttl_seconds or settings.watcher_hot_ttl_seconds
+        self.sweep_seconds = sweep_seconds or settings.watcher_sweep_seconds
+        self.polling = settings.watcher_polling if polling is None else polling
+        self._observer_factory = observer_factory
+        self._handler = TranscriptHandler(scheduler)
+        self.root: str | None = None
+        self._observer = None
+        # directory -> (watch, last activity); least recently active first
+        self._hot: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        # transcript path -> (size, mtime_ns) as of the last sweep
+        self._stats: dict[str, tuple[int, int]] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._sweeper: threading.Thread | None = None
+        # Metrics
+        self.promotions = 0
+        self.evictions = 0
+        self.sweeps = 0
+        self.sweep_changes = 0
+        self.last_sweep_ms: float | None = None
+        self.last_sweep_files = 0
+
+    @property
+    def running(self) -> bool:
+        return self._observer is not None
+
+    def start(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        self._stop.clear()
+        self._observer = self._new_observer()
+        self._observer.start()
+        db = get_db()
+        self._stats = {
+            row["path"]: (row["size"], row["mtime_ns"])
+            for row in db.execute("SELECT path, size, mtime_ns FROM transcript_files").fetchall()
+        }
+        # Sessions already running when the server starts are hot from the outset
+        active = db.execute(
+            """SELECT DISTINCT tf.path FROM transcript_files tf
+               JOIN sessions s ON s.session_id = tf.session_id
+               WHERE s.status = 'active'"""
+        ).fetchall()
+        for row in active:
+            self.touch_transcript(row["path"])
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="transcript-sweep", daemon=True)
+        self._sweeper.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+        with self._lock:
+            observer, self._observer = self._observer, None
+            self._hot.clear()
+        if observer is not None:
+            observer.stop()
+            observer.join(timeout=5)
+
+    def _new_observer(self):
+        if self.polling:
+            return PollingObserver(timeout=settings.watcher_poll_seconds)
+        try:
+            return self._observer_factory()
+        except OSError as e:
+            logger.warning("Native file watching unavailable (%s), polling instead", e)
+            self.polling = True
+            return PollingObserver(timeout=settings.watcher_poll_seconds)
+
+    def _fall_back_to_polling(self, error: OSError) -> None:
+        """Swap the native observer for a polling one and move the hot set over."""
+        logger.warning("Native file watch failed (%s), polling the hot set instead", error)
+        old = self._observer
+        self.polling = True
+        self._observer = PollingObserver(timeout=settings.watcher_poll_seconds)
+        self._observer.start()
+        for directory, (_watch, last) in list(self._hot.items()):
+            self._hot[directory] = (self._schedule(directory), last)
+        old.stop()
+
+    def _schedule(self, directory: str):
+        return self._observer.schedule(self._handler, directory, recursive=True)
+
+    def _project_dir(self, path: str) -> str | None:
+        """Top-level project directory under the root holding ``path``."""
+        if self.root is None:
+            return None
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == "." or rel.startswith(".."):
+            return None
+        return os.path.join(self.root, rel.split(os.sep)[0])
+
+    def touch_transcript(self, transcript_path: str | None = None, cwd: str | None = None) -> None:
+        """Note activity on a transcript (or, without its path, on a session's cwd)."""
+        if not self.running:
+            return
+        if transcript_path:
+            directory = self._project_dir(transcript_path)
+        elif cwd and self.root is not None:
+            # Claude Code names project directories after the cwd, non-alphanumerics dashed
+            directory = os.path.join(self.root, re.sub(r"[^A-Za-z0-9]", "-", cwd))
+        else:
+            return
+        if directory is not None:
+            self.touch(directory)
+
+    def touch(self, directory: str) -> None:
+        """Mark a project directory active, watching it if it isn't yet."""
+        now = time.monotonic()
+        with self._lock:
+            if self._observer is None:
                 return
-            _last_processed[path] = now
+            entry = self._hot.get(directory)
+            if entry is not None:
+                self._hot[directory] = (entry[0], now)
+                self._hot.move_to_end(directory)
+                return
+            if not os.path.isdir(directory):
+                return
+            try:
+                watch = self._schedule(directory)
+            except OSError as e:
+                self._fall_back_to_polling(e)
+                watch = self._schedule(directory)
+            self._hot[directory] = (watch, now)
+            self.promotions += 1
+            while len(self._hot) > self.max_hot_dirs:
+                self._demote(next(iter(self._hot)))
 
+    def _demote(self, directory: str) -> None:
+        watch, _last = self._hot.pop(directory)
+        self.evictions += 1
         try:
-            parse_transcript(path)
-        except Exception:
-            logger.exception("Error parsing transcript: %s", path)
+            self._observer.unschedule(watch)
+        except (KeyError, OSError):
+            pass  # Directory already gone
+
+    def hot_dirs(self) -> list[str]:
+        with self._lock:
+            return list(self._hot)
+
+    def sweep(self) -> int:
+        """Stat transcripts outside the hot set; mark changed ones dirty. Returns files changed."""
+        if self.root is None or not os.path.isdir(self.root):
+            return 0
+        started = time.perf_counter()
+        now = time.monotonic()
+        with self._lock:
+            for directory, (_watch, last) in list(self._hot.items()):
+                if now - last > self.hot_ttl_seconds:
+                    self._demote(directory)
+            hot = set(self._hot)
+
+        files = 0
+        changed: list[str] = []
+        try:
+            projects = [e.path for e in os.scandir(self.root) if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            projects = []
+        for project in projects:
+            if project in hot:
+                continue
+            project_changed = False
+            for root, _dirs, names in os.walk(project):
+                for name in names:
+                    if not name.endswith(".jsonl"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files += 1
+                    stat = (st.st_size, st.st_mtime_ns)
+                    if self._stats.get(path) != stat:
+                        self._stats[path] = stat
+                        changed.append(path)
+                        project_changed = True
+            if project_changed:
+                # Written to since the last sweep: likely active, so watch it
+                self.touch(project)
+
+        for path in changed:
+            self.scheduler.mark_dirty(path)
+        self.sweeps += 1
+        self.sweep_changes += len(changed)
+        self.last_sweep_files = files
+        self.last_sweep_ms = round((time.perf_counter() - started) * 1000, 2)
+        return len(changed)
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_seconds):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Transcript sweep failed")
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            observer = type(self._observer).__name__ if self._observer is not None else None
+            hot = len(self._hot)
+        return {
+            "observer": observer,
+            "polling": self.polling,
+            "hot_dirs": hot,
+            "max_hot_dirs": self.max_hot_dirs,
+            "promotions": self.promotions,
+            "evictions": self.evictions,
+            "sweeps": self.sweeps,
+            "sweep_changes": self.sweep_changes,
+            "last_sweep_files": self.last_sweep_files,
+            "last_sweep_ms": self.last_sweep_ms,
+        }
+
+
+watch_set = WatchSet(scheduler)
 
 
 def start_watcher() -> None:
     """Start watching the Claude projects directory for transcript changes."""
-    global _observer
-
     watch_dir = os.path.expanduser(settings.claude_projects_dir)
     if not os.path.isdir(watch_dir):
         logger.info("Projects directory not found, skipping watcher: %s", watch_dir)
         return
 
-    _observer = Observer()
-    _observer.schedule(TranscriptHandler(), watch_dir, recursive=True)
-    _observer.daemon = True
-    _observer.start()
-    logger.info("Watching for transcript changes in: %s", watch_dir)
+    scheduler.start()
+    watch_set.start(watch_dir)
+    logger.info("Watching for transcript changes in: %s (%s)", watch_dir,
+                "polling" if watch_set.polling else "native")
 
 
 def stop_watcher() -> None:
     """Stop the file watcher."""
-    global _observer
-    if _observer is not None:
-        _observer.stop()
-        _observer.join(timeout=5)
-        _observer = None
+    if watch_set.running:
+        watch_set.stop()
+        scheduler.stop()
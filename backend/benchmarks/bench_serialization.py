@@ -0,0 +1,112 @@
+"""Benchmark response building/serialization on big sessions.
+
+Populates a throwaway database with one large session (and a page of small
+ones), then times the heaviest read endpoints through the ASGI app and
+reports median latency and response size.
+
+    cd backend && python -m benchmarks.bench_serialization --tool-calls 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+import ai_monitor.db as db_module
+from ai_monitor.main import app
+
+
+def _populate(tool_calls: int, payload_bytes: int, sessions: int) -> str:
+    db = db_module.get_db()
+    rng = random.Random(42)
+    db.execute("INSERT INTO projects (name, path) VALUES ('bench', '/tmp/bench')")
+    for i in range(sessions):
+        db.execute(
+            """INSERT INTO sessions (session_id, project_id, status, model, started_at, last_event_at,
+                                     input_tokens, output_tokens, estimated_cost)
+               VALUES (?, 1, 'ended', 'claude-sonnet-4-5', ?, ?, ?, ?, ?)""",
+            (f"bench-{i}", f"2025-01-01T00:{i % 60:02d}:00Z", f"2025-01-01T01:{i % 60:02d}:00Z",
+             rng.randint(1, 10**6), rng.randint(1, 10**5), rng.random()),
+        )
+    big = "bench-0"
+    filler = "x" * payload_bytes
+    rows = []
+    for n in range(tool_calls):
+        ts = f"2025-01-01T00:{(n // 60) % 60:02d}:{n % 60:02d}Z"
+        tool_input = json.dumps({"command": f"ls -la /src/{n}", "description": "list files"})
+        tool_response = json.dumps({"stdout": filler, "exit_code": 0})
+        rows.append((big, "Bash", tool_input, len(tool_input), tool_response, len(tool_response),
+                     "success", ts, ts, rng.randint(1, 5000)))
+    db.executemany(
+        """INSERT INTO tool_calls (session_id, tool_name, tool_input, tool_input_size,
+                                   tool_response, tool_response_size, status,
+                                   started_at, ended_at, duration_ms)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+    for n in range(tool_calls // 100):
+        db.execute(
+            "INSERT INTO agents (session_id, agent_name, agent_type, status, started_at) VALUES (?, ?, 'general', 'stopped', ?)",
+            (big, f"agent-{n}", f"2025-01-01T00:{n % 60:02d}:30Z"),
+        )
+    db.commit()
+    return big
+
+
+def _time(client: TestClient, path: str, repeat: int, headers: dict | None = None) -> dict:
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resp = client.get(path, headers=headers or {})
+        samples.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200, (path, resp.status_code)
+        size = int(resp.headers.get("content-length") or len(resp.content))
+    return {
+        "path": path,
+        "encoding": (headers or {}).get("Accept-Encoding", "identity"),
+        "median_ms": round(statistics.median(samples), 1),
+        "bytes": size,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tool-calls", type=int, default=20000)
+    parser.add_argument("--payload-bytes", type=int, default=1024)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_module.settings.ai_monitor_db_path = os.path.join(tmp, "bench.db")
+        db_module._connection = None
+        big = _populate(args.tool_calls, args.payload_bytes, args.sessions)
+        # No context manager: skip the lifespan (watcher, transcript scan)
+        client = TestClient(app)
+        paths = [
+            f"/api/sessions/{big}",
+            f"/api/sessions/{big}/timeline?limit=5000",
+            f"/api/sessions/{big}/timeline?limit=5000&fields=full",
+            "/api/sessions?page_size=200",
+        ]
+        results = []
+        for path in paths:
+            for encoding in (None, "gzip", "br"):
+                headers = {"Accept-Encoding": encoding} if encoding else {"Accept-Encoding": "identity"}
+                results.append(_time(client, path, args.repeat, headers))
+        db_module.close_db()
+
+    print(f"{args.tool_calls} tool calls, {args.payload_bytes} B payloads, median of {args.repeat}")
+    print(f"{'endpoint':<56} {'encoding':<9} {'ms':>8} {'bytes':>12}")
+    for r in results:
+        print(f"{r['path']:<56} {r['encoding']:<9} {r['median_ms']:>8} {r['bytes']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Benchmark the whole service at several data scales and write a JSON report.
+
+For each scale (a number of tool calls), a :class:`~benchmarks.workload.Workload`
+is loaded into a throwaway database and measured:
+
+- **ingest**: hook events/sec through ``POST /api/events``, processing
+  included, plus per-request p50/p99;
+- **endpoints**: p50/p99 of every ``GET /api/*`` route (streams and
+  tails excepted), with path parameters taken from the largest session;
+- **parse**: transcript scan throughput in MB/s and files/s;
+- **startup**: time until the app is ready, and until the transcript
+  backfill finishes on a cold and on a warm manifest.
+
+Requests go through the ASGI app in-process on one event loop (httpx's
+ASGI transport), so the numbers exclude the network and uvicorn but
+include middleware, routing, serialization and background tasks.
+Pass ``--baseline`` with an earlier report to print the changes.
+
+    cd backend && python -m benchmarks.bench_suite --scales 10000,100000,1000000 --output bench.json
+    cd backend && python -m benchmarks.bench_suite --scales 10000 --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+from fastapi.testclient import TestClient
+
+import ai_monitor.db as db_module
+from ai_monitor.main import app
+from ai_monitor.services.jobs import jobs
+from ai_monitor.services.transcript_parser import scan_transcript
+from benchmarks.workload import Workload, hook_events, populate, write_transcripts
+
+# Long-lived streams can't be timed as request/response
+_SKIP_PATHS = {"/api/stream", "/api/sessions/{session_id}/tail"}
+_QUERY = {"/api/search": "q=pytest"}
+
+
+def _percentiles(samples: list[float]) -> dict:
+    cuts = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {"p50_ms": round(cuts[49], 3), "p99_ms": round(cuts[98], 3), "n": len(samples)}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _open_db(path: str) -> sqlite3.Connection:
+    db_module.close_db()
+    db_module.settings.ai_monitor_db_path = path
+    return db_module.get_db()
+
+
+def _path_params(db: sqlite3.Connection) -> dict[str, str]:
+    """Ids from the largest session: the worst case a viewer can open."""
+    session = db.execute(
+        """SELECT s.session_id, s.project_id FROM tool_calls t JOIN sessions s USING (session_id)
+           GROUP BY t.session_id ORDER BY COUNT(*) DESC LIMIT 1"""
+    ).fetchone()
+    tool_call = db.execute(
+        "SELECT MAX(id) FROM tool_calls WHERE session_id = ?", (session["session_id"],)
+    ).fetchone()[0]
+    agent = db.execute(
+        "SELECT MIN(id) FROM agents WHERE session_id = ?", (session["session_id"],)
+    ).fetchone()[0]
+    return {
+        "session_id": session["session_id"],
+        "project_id": str(session["project_id"]),
+        "tool_call_id": str(tool_call),
+        "agent_id": str(agent or 0),
+    }
+
+
+async def _bench_endpoints(client: httpx.AsyncClient, params: dict[str, str], repeat: int) -> dict:
+    results = {}
+    # The OpenAPI schema lists every route, including those of included routers
+    for path, methods in app.openapi()["paths"].items():
+        if "get" not in methods or not path.startswith("/api/") or path in _SKIP_PATHS:
+            continue
+        url = path.format(**params)
+        if path in _QUERY:
+            url += "?" + _QUERY[path]
+        samples = []
+        status = size = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            resp = await client.get(url, headers={"Accept-Encoding": "identity"})
+            samples.append((time.perf_counter() - started) * 1000)
+            status, size = resp.status_code, len(resp.content)
+        results[path] = {**_percentiles(samples), "status": status, "bytes": size}
+    return results
+
+
+async def _bench_ingest(client: httpx.AsyncClient, calls: int, seed: int) -> dict:
+    events = list(hook_events(Workload(calls, seed=seed + 1)))
+    samples = []
+    started = time.perf_counter()
+    for event in events:
+        sent = time.perf_counter()
+        # The ASGI transport returns once the app, background tasks
+        # included, has finished: this is processing, not just the ack
+        await client.post("/api/events", json=event)
+        samples.append((time.perf_counter() - sent) * 1000)
+    elapsed = time.perf_counter() - started
+    return {"events": len(events), "events_per_sec": round(len(events) / elapsed, 1), **_percentiles(samples)}
+
+
+def _bench_parse(root: str) -> dict:
+    paths = [os.path.join(d, f) for d, _, files in os.walk(root) for f in files if f.endswith(".jsonl")]
+    size = sum(os.path.getsize(p) for p in paths)
+    started = time.perf_counter()
+    for path in paths:
+        scan_transcript(path)
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(paths),
+        "mb": round(size / 2**20, 1),
+        "mb_per_sec": round(size / 2**20 / elapsed, 1),
+        "files_per_sec": round(len(paths) / elapsed, 1),
+    }
+
+
+def _startup(db_path: str) -> dict:
+    """Seconds until the app is ready, and until its transcript backfill ends."""
+    db_module.close_db()
+    db_module.settings.ai_monitor_db_path = db_path
+    started = time.perf_counter()
+    with TestClient(app) as client:
+        ready = time.perf_counter() - started
+        assert client.get("/api/health/ready").status_code == 200
+        job = jobs.list()[0]
+        while job.status in ("pending", "running"):
+            time.sleep(0.01)
+        backfilled = time.perf_counter() - started
+    return {"ready_s": round(ready, 3), "backfill_s": round(backfilled, 3), "backfill_status": job.status}
+
+
+def run_scale(tool_calls: int, args: argparse.Namespace, tmp: str) -> dict:
+    workload = Workload(tool_calls, seed=args.seed)
+    db_path = os.path.join(tmp, f"bench-{tool_calls}.db")
+    projects_dir = os.path.join(tmp, f"projects-{tool_calls}")
+    db_module.settings.claude_projects_dir = projects_dir
+
+    db = _open_db(db_path)
+    started = time.perf_counter()
+    populate(db, workload, payload_scale=args.payload_scale)
+    populate_s = time.perf_counter() - started
+    print(f"  populated {workload.summary()} in {populate_s:.1f}s")
+
+    async def requests() -> tuple[dict, dict]:
+        # No lifespan, so no watcher or backfill interferes
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            endpoints = await _bench_endpoints(client, _path_params(db), args.repeat)
+            return endpoints, await _bench_ingest(client, args.ingest_calls, args.seed)
+
+    endpoints, ingest = asyncio.run(requests())
+    print(f"  timed {len(endpoints)} endpoints")
+    print(f"  ingest: {ingest['events_per_sec']} events/s")
+
+    write_transcripts(projects_dir, workload, max_calls=args.transcript_calls)
+    parse = _bench_parse(projects_dir)
+    print(f"  parse: {parse['mb_per_sec']} MB/s over {parse['files']} files")
+    startup = {"cold": _startup(db_path), "warm": _startup(db_path)}
+    print(f"  startup: ready {startup['cold']['ready_s']}s, backfill {startup['cold']['backfill_s']}s cold")
+
+    db_module.close_db()
+    return {
+        "tool_calls": tool_calls,
+        "workload": workload.summary(),
+        "db_mb": round(os.path.getsize(db_path) / 2**20, 1),
+        "populate_s": round(populate_s, 2),
+        "ingest": ingest,
+        "endpoints": endpoints,
+        "parse": parse,
+        "startup": startup,
+    }
+
+
+def _headline(scale: dict) -> dict[str, float]:
+    """The numbers compared between reports; ``/s`` metrics are better when higher."""
+    flat = {
+        "ingest events/s": scale["ingest"]["events_per_sec"],
+        "ingest p99 ms": scale["ingest"]["p99_ms"],
+        "parse MB/s": scale["parse"]["mb_per_sec"],
+        "startup ready s": scale["startup"]["cold"]["ready_s"],
+        "backfill cold s": scale["startup"]["cold"]["backfill_s"],
+        "backfill warm s": scale["startup"]["warm"]["backfill_s"],
+    }
+    for path, r in scale["endpoints"].items():
+        flat[f"{path} p99 ms"] = r["p99_ms"]
+    return flat
+
+
+def compare(report: dict, baseline: dict) -> None:
+    before = {s["tool_calls"]: s for s in baseline["scales"]}
+    for scale in report["scales"]:
+        old = before.get(scale["tool_calls"])
+        if old is None:
+            continue
+        print(f"\n{scale['tool_calls']} tool calls vs {baseline['meta'].get('commit') or 'baseline'}")
+        print(f"{'metric':<58} {'before':>10} {'after':>10} {'change':>8}")
+        old_flat = _headline(old)
+        for name, value in _headline(scale).items():
+            if name not in old_flat or not old_flat[name]:
+                continue
+            change = (value - old_flat[name]) / old_flat[name] * 100
+            print(f"{name:<58} {old_flat[name]:>10.3f} {value:>10.3f} {change:>+7.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10000,100000", help="comma-separated tool-call counts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="requests per endpoint")
+    parser.add_argument("--ingest-calls", type=int, default=1000, help="tool calls replayed as hook events")
+    parser.add_argument("--transcript-calls", type=int, default=100_000,
+                        help="at most this many tool calls are written as transcripts")
+    parser.add_argument("--payload-scale", type=float, default=1.0,
+                        help="multiply payload sizes (lower it to keep 1M-call databases small)")
+    parser.add_argument("--output", default="bench-report.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "scales": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in (int(s) for s in args.scales.split(",")):
+            print(f"scale: {scale} tool calls")
+            report["scales"].append(run_scale(scale, args, tmp))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nreport written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark transcript parsing throughput on a synthetic corpus.
+
+Writes a transcript shaped like Claude Code's (every line carries the
+session ID, large message bodies, a ``costTracker`` line every few dozen
+entries), then times a full scan with the mmap/prefilter scanner against
+the previous line-by-line ``json.loads`` parser and reports MB/s. Both
+run on a warm page cache; the scanner's target is >= 1000 MB/s there,
+at least 10x the line-by-line parser.
+
+    cd backend && python -m benchmarks.bench_transcript_parser --size-mb 2048
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from ai_monitor.services.transcript_parser import scan_transcript
+
+
+def _write_corpus(path: str, size_mb: int, cost_every: int) -> int:
+    rng = random.Random(42)
+    session_id = "bench-transcript"
+    words = ["read", "file", "the", "function", "returns", "value", "error", "test", "import", "class"]
+    target = size_mb * 1024 * 1024
+    written = 0
+    n = 0
+    with open(path, "w") as f:
+        while written < target:
+            n += 1
+            if n % cost_every == 0:
+                entry = {
+                    "type": "summary",
+                    "sessionId": session_id,
+                    "costTracker": {"claude-sonnet-4-5": {
+                        "inputTokens": rng.randint(100, 5000),
+                        "outputTokens": rng.randint(10, 2000),
+                        "cacheReadTokens": rng.randint(0, 50000),
+                        "cacheWriteTokens": rng.randint(0, 5000),
+                    }},
+                }
+            else:
+                text = " ".join(rng.choices(words, k=rng.randint(40, 4000)))
+                entry = {
+                    "type": rng.choice(["user", "assistant"]),
+                    "sessionId": session_id,
+                    "uuid": f"{n:032x}",
+                    "timestamp": "2025-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": [{"type": "text", "text": text}]},
+                }
+            line = json.dumps(entry) + "\n"
+            f.write(line)
+            written += len(line)
+    return written
+
+
+def _line_by_line(path: str) -> dict:
+    """The parser before the scanner: decode every line with the stdlib."""
+    totals = {"input": 0, "output": 0, "session_id": None}
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "costTracker" in entry:
+                for usage in entry["costTracker"].values():
+                    totals["input"] += usage.get("inputTokens", 0)
+                    totals["output"] += usage.get("outputTokens", 0)
+            if not totals["session_id"]:
+                totals["session_id"] = entry.get("sessionId") or entry.get("session_id")
+    return totals
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--cost-every", type=int, default=40, help="one costTracker line per N lines")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-baseline", action="store_true", help="only time the scanner")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transcript.jsonl")
+        size = _write_corpus(path, args.size_mb, args.cost_every)
+        mb = size / (1024 * 1024)
+
+        result = scan_transcript(path)
+        baseline = None if args.skip_baseline else _line_by_line(path)
+        if baseline is not None:
+            assert (result["input_tokens"], result["output_tokens"]) == (baseline["input"], baseline["output"])
+
+        rows = [("scanner (mmap + prefilter + orjson)", _time(lambda: scan_transcript(path), args.repeat))]
+        if baseline is not None:
+            rows.append(("line-by-line json.loads", _time(lambda: _line_by_line(path), args.repeat)))
+
+    print(f"{mb:.0f} MB transcript, costTracker every {args.cost_every} lines, median of {args.repeat}")
+    print(f"{'parser':<40} {'seconds':>9} {'MB/s':>9}")
+    for name, seconds in rows:
+        print(f"{name:<40} {seconds:>9.3f} {mb / seconds:>9.0f}")
+    if len(rows) == 2:
+        print(f"speedup: {rows[1][1] / rows[0][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Deterministic synthetic workload shaped like real Claude Code usage.
+
+A :class:`Workload` plans projects, sessions, tool calls and subagents
+from a seed and a tool-call count. The same arguments always give the
+same data, so benchmark runs on different commits measure the same
+thing. The shape follows what real sessions look like:
+
+- a few busy projects and a long tail of quiet ones;
+- session lengths that are log-normal (most short, a few thousands of calls long);
+- a tool mix dominated by Read, Bash and Edit;
+- payload sizes that are log-normal per tool, with a heavy tail (large
+  file reads, long command output) capped at 512 KiB;
+- ``Task`` calls that spawn subagents, some of which spawn their own.
+
+The plan can be loaded straight into a database (:func:`populate`, for
+large scales), replayed as hook events (:func:`hook_events`), or written
+out as transcripts (:func:`write_transcripts`).
+"""
+
+import json
+import math
+import os
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+# (tool, weight, median response bytes, error rate)
+TOOL_MIX = (
+    ("Read", 30, 4000, 0.01),
+    ("Bash", 22, 1200, 0.08),
+    ("Edit", 14, 300, 0.04),
+    ("Grep", 9, 2000, 0.01),
+    ("TodoWrite", 6, 200, 0.0),
+    ("Glob", 5, 800, 0.0),
+    ("Write", 5, 150, 0.01),
+    ("MultiEdit", 3, 400, 0.05),
+    ("Task", 3, 3000, 0.02),
+    ("WebFetch", 2, 8000, 0.06),
+    ("WebSearch", 1, 5000, 0.02),
+)
+MODELS = (("claude-sonnet-4-5", 70), ("claude-opus-4-1", 20), ("claude-haiku-4-5", 10))
+MAX_PAYLOAD = 512 * 1024
+# Median tool calls per session; the log-normal sigma gives the long tail
+SESSION_MEDIAN_CALLS = 60
+SESSION_SIGMA = 1.2
+SESSIONS_PER_PROJECT = 40
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+_WORDS = (
+    "src", "lib", "test", "api", "model", "service", "handler", "config", "utils", "index",
+    "parser", "client", "server", "route", "schema", "worker", "cache", "store", "view", "hook",
+)
+
+
+def _iso(at: datetime) -> str:
+    return at.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@dataclass
+class ToolCall:
+    tool_name: str
+    tool_input: dict
+    response_bytes: int
+    status: str
+    error: str | None
+    started_at: datetime
+    duration_ms: int
+    agent: int | None = None  # index into the session's agents
+
+
+@dataclass
+class Agent:
+    key: str
+    agent_type: str
+    parent: int | None
+    task_call: int  # index of the Task call that spawned it
+    started_at: datetime
+    ended_at: datetime
+
+
+@dataclass
+class Session:
+    session_id: str
+    project: int
+    model: str
+    started_at: datetime
+    ended_at: datetime
+    tool_calls: list[ToolCall] = field(default_factory=list)
+    agents: list[Agent] = field(default_factory=list)
+
+
+class Workload:
+    """A reproducible plan of ``tool_calls`` tool calls across sessions and projects."""
+
+    def __init__(self, tool_calls: int, seed: int = 42) -> None:
+        self.tool_calls = tool_calls
+        self.seed = seed
+        rng = random.Random(seed)
+        self.sessions: list[Session] = []
+        remaining = tool_calls
+        while remaining > 0:
+            calls = min(remaining, max(1, round(rng.lognormvariate(math.log(SESSION_MEDIAN_CALLS), SESSION_SIGMA))))
+            self.sessions.append(self._plan_session(rng, len(self.sessions), calls))
+            remaining -= calls
+        n_projects = max(1, len(self.sessions) // SESSIONS_PER_PROJECT)
+        self.projects = [f"/home/dev/projects/{_WORDS[i % len(_WORDS)]}-{i}" for i in range(n_projects)]
+        for s in self.sessions:
+            # Zipf-like: low project numbers get most sessions
+            s.project = min(int(rng.paretovariate(1.2)) - 1, n_projects - 1)
+
+    def _plan_session(self, rng: random.Random, n: int, calls: int) -> Session:
+        started = START + timedelta(minutes=n * 37 + rng.randint(0, 30))
+        session = Session(
+            session_id=f"bench-{self.seed}-{n:07d}",
+            project=0,
+            model=rng.choices([m for m, _ in MODELS], [w for _, w in MODELS])[0],
+            started_at=started,
+            ended_at=started,
+        )
+        weights = [t[1] for t in TOOL_MIX]
+        at = started
+        open_agents: list[int] = []
+        for i in range(calls):
+            name, _, median, error_rate = rng.choices(TOOL_MIX, weights)[0]
+            at += timedelta(milliseconds=rng.randint(200, 8000))
+            failed = rng.random() < error_rate
+            call = ToolCall(
+                tool_name=name,
+                tool_input=_tool_input(rng, name),
+                response_bytes=min(MAX_PAYLOAD, int(rng.lognormvariate(math.log(median), 1.0))),
+                status="error" if failed else "success",
+                error=f"{name} failed: exit code {rng.randint(1, 127)}" if failed else None,
+                started_at=at,
+                duration_ms=int(rng.lognormvariate(math.log(150), 1.3)),
+                agent=open_agents[-1] if open_agents and rng.random() < 0.7 else None,
+            )
+            session.tool_calls.append(call)
+            if open_agents and rng.random() < 0.05:
+                session.agents[open_agents.pop()].ended_at = at
+            if name == "Task" and len(open_agents) < 2:
+                parent = open_agents[-1] if open_agents else None
+                session.agents.append(Agent(
+                    key=f"{session.session_id}-a{len(session.agents)}",
+                    agent_type=rng.choice(("general-purpose", "Explore", "Plan")),
+                    parent=parent,
+                    task_call=i,
+                    started_at=at,
+                    ended_at=at,
+                ))
+                open_agents.append(len(session.agents) - 1)
+        for index in open_agents:
+            session.agents[index].ended_at = at
+        session.ended_at = at + timedelta(seconds=5)
+        return session
+
+    def summary(self) -> dict:
+        return {
+            "seed": self.seed,
+            "projects": len(self.projects),
+            "sessions": len(self.sessions),
+            "tool_calls": self.tool_calls,
+            "agents": sum(len(s.agents) for s in self.sessions),
+        }
+
+
+def _tool_input(rng: random.Random, tool: str) -> dict:
+    path = "/".join(rng.choices(_WORDS, k=rng.randint(2, 5))) + rng.choice((".py", ".ts", ".md", ".json"))
+    if tool == "Bash":
+        return {"command": f"{rng.choice(('pytest', 'git status', 'ls -la', 'npm test', 'rg'))} {path}",
+                "description": "run a command"}
+    if tool in ("Read", "Write", "Edit", "MultiEdit"):
+        body = {"file_path": f"/home/dev/{path}"}
+        if tool != "Read":
+            body["content"] = "x" * int(rng.lognormvariate(math.log(400), 1.0))
+        return body
+    if tool in ("Grep", "Glob"):
+        return {"pattern": rng.choice(_WORDS) + ("*" if tool == "Glob" else ""), "path": "/home/dev"}
+    if tool == "Task":
+        return {"description": "investigate", "prompt": " ".join(rng.choices(_WORDS, k=rng.randint(20, 200)))}
+    if tool.startswith("Web"):
+        return {"url": f"https://example.com/{path}", "query": rng.choice(_WORDS)}
+    return {"todos": [{"content": w, "status": "pending"} for w in rng.choices(_WORDS, k=5)]}
+
+
+def _response(call: ToolCall, payload_scale: float = 1.0) -> str:
+    return json.dumps({
+        "output": "x" * int(call.response_bytes * payload_scale),
+        "exit_code": 0 if call.status == "success" else 1,
+    })
+
+
+def populate(db, workload: Workload, payload_scale: float = 1.0, batch: int = 200) -> None:
+    """Insert the workload directly, bypassing ingestion (for large scales).
+
+    Rows go through the schema's triggers (search index, change sequence)
+    like ingested ones do. Response payloads are ``payload_scale`` times
+    their planned size. Commits every ``batch`` sessions.
+    """
+    project_ids = []
+    for path in workload.projects:
+        row = db.execute(
+            "INSERT INTO projects (name, path, created_at) VALUES (?, ?, ?) RETURNING id",
+            (os.path.basename(path), path, _iso(START)),
+        ).fetchone()
+        project_ids.append(row[0])
+    for n, s in enumerate(workload.sessions):
+        db.execute(
+            """INSERT INTO sessions (session_id, project_id, status, model, started_at, ended_at,
+                                     last_event_at)
+               VALUES (?, ?, 'ended', ?, ?, ?, ?)""",
+            (s.session_id, project_ids[s.project], s.model, _iso(s.started_at),
+             _iso(s.ended_at), _iso(s.ended_at)),
+        )
+        agent_ids: list[int] = []
+        for agent in s.agents:
+            parent = agent_ids[agent.parent] if agent.parent is not None else None
+            row = db.execute(
+                """INSERT INTO agents (session_id, agent_name, agent_type, hook_agent_id,
+                                       parent_agent_id, status, started_at, ended_at)
+                   VALUES (?, ?, ?, ?, ?, 'stopped', ?, ?) RETURNING id""",
+                (s.session_id, agent.agent_type, agent.agent_type, agent.key, parent,
+                 _iso(agent.started_at), _iso(agent.ended_at)),
+            ).fetchone()
+            agent_ids.append(row[0])
+            db.execute(
+                "INSERT INTO agent_closure (ancestor_id, descendant_id, depth) VALUES (?, ?, 0)",
+                (row[0], row[0]),
+            )
+            if parent is not None:
+                db.execute(
+                    """INSERT INTO agent_closure (ancestor_id, descendant_id, depth)
+                       SELECT ancestor_id, ?, depth + 1 FROM agent_closure WHERE descendant_id = ?""",
+                    (row[0], parent),
+                )
+        rows = []
+        for call in s.tool_calls:
+            tool_input = json.dumps(call.tool_input)
+            tool_response = _response(call, payload_scale)
+            ended = call.started_at + timedelta(milliseconds=call.duration_ms)
+            rows.append((
+                s.session_id, call.tool_name, tool_input, len(tool_input), tool_response,
+                len(tool_response), call.status, call.error, _iso(call.started_at), _iso(ended),
+                call.duration_ms, agent_ids[call.agent] if call.agent is not None else None,
+            ))
+        db.executemany(
+            """INSERT INTO tool_calls (session_id, tool_name, tool_input, tool_input_size,
+                                       tool_response, tool_response_size, status, error,
+                                       started_at, ended_at, duration_ms, agent_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+        if n % batch == batch - 1:
+            db.commit()
+    db.commit()
+
+
+def hook_events(workload: Workload) -> Iterator[dict]:
+    """The workload as hook events, session by session, in the order Claude Code sends them."""
+    for s in workload.sessions:
+        cwd = workload.projects[s.project]
+        yield {"session_id": s.session_id, "hook_event_name": "SessionStart", "cwd": cwd, "model": s.model}
+        starts = {agent.task_call: agent for agent in s.agents}
+        for i, call in enumerate(s.tool_calls):
+            agent_id = s.agents[call.agent].key if call.agent is not None else None
+            base = {"session_id": s.session_id, "cwd": cwd, "tool_name": call.tool_name, "agent_id": agent_id}
+            yield {**base, "hook_event_name": "PreToolUse", "tool_input": call.tool_input}
+            if call.status == "success":
+                yield {**base, "hook_event_name": "PostToolUse", "tool_response": _response(call)}
+            else:
+                yield {**base, "hook_event_name": "PostToolUseFailure", "error": call.error}
+            agent = starts.get(i)
+            if agent is not None:
+                yield {"session_id": s.session_id, "hook_event_name": "SubagentStart",
+                       "agent_id": agent.key, "agent_type": agent.agent_type}
+        for agent in s.agents:
+            yield {"session_id": s.session_id, "hook_event_name": "SubagentStop",
+                   "agent_id": agent.key, "agent_type": agent.agent_type}
+        yield {"session_id": s.session_id, "hook_event_name": "Stop", "cwd": cwd}
+
+
+def write_transcripts(
+    root: str, workload: Workload, max_calls: int | None = None, turn_every: int = 4
+) -> int:
+    """Write one transcript per session under ``root``, one costTracker turn per ``turn_every`` calls.
+
+    Stops after the session that reaches ``max_calls`` tool calls.
+    Returns the bytes written.
+    """
+    rng = random.Random(workload.seed)
+    written = calls = 0
+    for s in workload.sessions:
+        if max_calls is not None and calls >= max_calls:
+            break
+        calls += len(s.tool_calls)
+        directory = os.path.join(root, workload.projects[s.project].strip("/").replace("/", "-"))
+        os.makedirs(directory, exist_ok=True)
+        lines = []
+        for i, call in enumerate(s.tool_calls):
+            ts = _iso(call.started_at)
+            lines.append({
+                "type": "assistant", "sessionId": s.session_id, "timestamp": ts,
+                "message": {"role": "assistant", "content": [
+                    {"type": "tool_use", "name": call.tool_name, "input": call.tool_input},
+                ]},
+            })
+            lines.append({
+                "type": "user", "sessionId": s.session_id, "timestamp": ts,
+                "message": {"role": "user", "content": [
+                    {"type": "tool_result", "content": "x" * min(call.response_bytes, 64 * 1024)},
+                ]},
+            })
+            if i % turn_every == turn_every - 1:
+                lines.append({"type": "summary", "sessionId": s.session_id, "timestamp": ts, "costTracker": {
+                    s.model: {
+                        "inputTokens": rng.randint(100, 5000),
+                        "outputTokens": rng.randint(10, 2000),
+                        "cacheReadTokens": rng.randint(0, 50000),
+                        "cacheWriteTokens": rng.randint(0, 5000),
+                    },
+                }})
+        body = "".join(json.dumps(line) + "\n" for line in lines)
+        with open(os.path.join(directory, f"{s.session_id}.jsonl"), "w") as f:
+            f.write(body)
+        written += len(body)
+    return written
@@ -1,5 +1,6 @@
 """Test fixtures and shared BDD step definitions for AI Monitor backend tests."""
 
+import json
 import time
 
 import pytest
@@ -60,6 +61,27 @@ def pending_tool_call(client, session_id, tool):
     time.sleep(0.2)
 
 
+@given(parsers.parse("a tool call with input for session \"{session_id}\" with tool \"{tool}\" and input '{tool_input}'"))
+def tool_call_with_input(client, session_id, tool, tool_input):
+    input_data = json.loads(tool_input)
+    resp = client.post("/api/events", json={
+        "session_id": session_id,
+        "hook_event_name": "PreToolUse",
+        "tool_name": tool,
+        "tool_input": input_data,
+    })
+    assert resp.status_code == 200
+    time.sleep(0.2)
+    resp = client.post("/api/events", json={
+        "session_id": session_id,
+        "hook_event_name": "PostToolUse",
+        "tool_name": tool,
+        "tool_response": "ok",
+    })
+    assert resp.status_code == 200
+    time.sleep(0.2)
+
+
 @when(parsers.parse('I post a PostToolUseFailure event for session "{session_id}" with tool "{tool}" and error "{error}"'))
 def post_tool_failure(client, session_id, tool, error):
     resp = client.post("/api/events", json={
@@ -70,3 +92,47 @@ def post_tool_failure(client, session_id, tool, error):
     })
     assert resp.status_code == 200
     time.sleep(0.2)
+
+
+def _post_event(client, payload):
+    resp = client.post("/api/events", json=payload)
+    assert resp.status_code == 200
+    time.sleep(0.2)
+
+
+@when(parsers.parse('subagent "{agent_key}" starts in session "{session_id}"'))
+def subagent_starts(client, agent_key, session_id):
+    _post_event(client, {
+        "session_id": session_id,
+        "hook_event_name": "SubagentStart",
+        "agent_id": agent_key,
+        "agent_type": "general-purpose",
+    })
+
+
+@when(parsers.parse('subagent "{agent_key}" runs tool "{tool}" in session "{session_id}"'))
+def subagent_runs_tool(client, agent_key, tool, session_id):
+    for event in ("PreToolUse", "PostToolUse"):
+        _post_event(client, {
+            "session_id": session_id,
+            "hook_event_name": event,
+            "tool_name": tool,
+            "agent_id": agent_key,
+        })
+
+
+@when(parsers.parse('subagent "{agent_key}" fails tool "{tool}" in session "{session_id}" with error "{error}"'))
+def subagent_fails_tool(client, agent_key, tool, session_id, error):
+    _post_event(client, {
+        "session_id": session_id,
+        "hook_event_name": "PreToolUse",
+        "tool_name": tool,
+        "agent_id": agent_key,
+    })
+    _post_event(client, {
+        "session_id": session_id,
+        "hook_event_name": "PostToolUseFailure",
+        "tool_name": tool,
+        "agent_id": agent_key,
+        "error": error,
+    })
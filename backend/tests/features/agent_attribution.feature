@@ -0,0 +1,28 @@
+Feature: Agent attribution
+  Tool calls are tagged with their owning agent when they are ingested.
+
+  Scenario: Concurrent subagents keep their own tool calls
+    Given the API is running
+    And a session "attr-1" exists
+    When subagent "a1" starts in session "attr-1"
+    And subagent "a2" starts in session "attr-1"
+    And subagent "a1" runs tool "Read" in session "attr-1"
+    And subagent "a2" runs tool "Grep" in session "attr-1"
+    And subagent "a2" fails tool "Bash" in session "attr-1" with error "boom"
+    Then agent "a1" in session "attr-1" should list tools "Read"
+    And agent "a2" in session "attr-1" should list tools "Grep,Bash"
+    And agent "a2" in session "attr-1" should report 2 tool calls and 1 error
+
+  Scenario: Without agent context the single active agent owns the tool call
+    Given the API is running
+    And a session "attr-2" exists
+    When subagent "researcher" starts in session "attr-2" without an agent id
+    And a tool "Read" starts in session "attr-2" without agent context
+    Then the "Read" tool call in session "attr-2" should belong to agent "researcher"
+
+  Scenario: Main thread tool calls are not attributed to a subagent
+    Given the API is running
+    And a session "attr-3" exists
+    When subagent "a1" starts in session "attr-3"
+    And a tool "Task" starts in session "attr-3" without agent context
+    Then the "Task" tool call in session "attr-3" should have no agent
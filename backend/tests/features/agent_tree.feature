@@ -0,0 +1,20 @@
+Feature: Agent tree
+  Nested subagents form a hierarchy with rollups over each subtree.
+
+  Scenario: Nested subagents roll up into their ancestors
+    Given the API is running
+    And a session "tree-1" exists
+    When subagent "lead" starts in session "tree-1"
+    And subagent "lead" runs tool "Read" in session "tree-1"
+    And subagent "lead" spawns subagent "worker" in session "tree-1"
+    And subagent "worker" runs tool "Grep" in session "tree-1"
+    And subagent "worker" fails tool "Bash" in session "tree-1" with error "boom"
+    And I request the agent tree for session "tree-1"
+    Then the tree should have 1 root agent "lead" with child "worker"
+    And tree node "lead" should roll up 4 tool calls and 1 error over 1 descendant
+    And tree node "worker" should roll up 2 tool calls and 1 error over 0 descendants
+
+  Scenario: Agent tree of an unknown session
+    Given the API is running
+    When I request the agent tree for session "missing"
+    Then the agent tree response status should be 404
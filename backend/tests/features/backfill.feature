@@ -0,0 +1,15 @@
+Feature: Background transcript backfill
+  Startup serves requests immediately while transcripts are backfilled by a job.
+
+  Scenario: The backfill runs as a job while the API is ready
+    Given a projects directory with 5 transcripts to backfill
+    When the server starts
+    Then the API should be live and ready
+    And the transcript backfill job should complete with 5 of 5 files done
+
+  Scenario: A restarted backfill skips transcripts it already applied
+    Given a projects directory with 5 transcripts to backfill
+    When the server starts
+    And the transcript backfill job has completed
+    And the server restarts
+    Then the transcript backfill job should complete with 0 of 0 files done and 5 skipped
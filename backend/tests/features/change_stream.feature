@@ -0,0 +1,33 @@
+Feature: Change stream
+  Writers publish compact change notifications to stream subscribers.
+
+  Scenario: Tool call start and end are published for a session
+    Given the API is running
+    And a session "cs-1" exists
+    And a stream subscriber for session "cs-1"
+    When I post a PreToolUse event for session "cs-1" with tool "Read" to the stream test
+    And I post a PostToolUse event for session "cs-1" with tool "Read" to the stream test
+    Then the subscriber should have received "tool_call.start,stats,tool_call.end"
+
+  Scenario: Subscribers only see their own session
+    Given the API is running
+    And a session "cs-2" exists
+    And a session "cs-3" exists
+    And a stream subscriber for session "cs-2"
+    When I post a PreToolUse event for session "cs-3" with tool "Read" to the stream test
+    Then the subscriber should have received nothing
+
+  Scenario: A full queue drops the oldest notifications and asks for a resync
+    Given the API is running
+    And a session "cs-4" exists
+    And a stream subscriber for session "cs-4" with a queue of 2
+    When I post a PreToolUse event for session "cs-4" with tool "Read" to the stream test
+    And I post a PostToolUse event for session "cs-4" with tool "Read" to the stream test
+    Then the subscriber should have received "resync,stats,tool_call.end"
+
+  Scenario: The session-to-project cache stays bounded
+    Given the API is running
+    And a stream subscriber for session "cs-5"
+    And the stream hub remembers the projects of at most 3 sessions
+    When changes are published for sessions "cs-5,cs-6,cs-7,cs-8,cs-9"
+    Then the stream hub should remember the projects of sessions "cs-7,cs-8,cs-9"
@@ -0,0 +1,40 @@
+Feature: Delta sync
+  Clients fetch only the rows changed since a change sequence.
+
+  Scenario: A sync returns only rows changed since the last sequence
+    Given the API is running
+    And a session "dc-1" exists
+    And a pending tool call for session "dc-1" with tool "Read" exists
+    When I sync changes for session "dc-1" from the start
+    And I post a PostToolUse event for session "dc-1" with tool "Read" for delta sync
+    And I sync changes for session "dc-1" from the last sequence
+    Then the change set should contain 1 session(s), 1 tool call(s) and 0 agent(s)
+    And the synced tool call should have status "success"
+
+  Scenario: Repeated updates to a row are compacted
+    Given the API is running
+    And a session "dc-2" exists
+    And a pending tool call for session "dc-2" with tool "Bash" exists
+    When I post a PostToolUse event for session "dc-2" with tool "Bash" for delta sync
+    And I sync changes for session "dc-2" from the start
+    Then the change set should contain 1 session(s), 1 tool call(s) and 0 agent(s)
+
+  Scenario: Large change sets are paged
+    Given the API is running
+    And a session "dc-3" exists
+    And a pending tool call for session "dc-3" with tool "Read" exists
+    And a pending tool call for session "dc-3" with tool "Grep" exists
+    When I sync changes for session "dc-3" from the start with limit 2
+    Then the change set should have more pages
+    When I sync changes for session "dc-3" from the last sequence with limit 2
+    Then the change set should contain 0 session(s), 1 tool call(s) and 0 agent(s)
+
+  Scenario: Rows recorded before change sequences existed are synced from the start
+    Given a database from before change sequences with a tool call for session "dc-old"
+    And the API is running
+    When I sync changes for session "dc-old" from the start
+    Then the change set should contain 1 session(s), 1 tool call(s) and 0 agent(s)
+    When I post a PostToolUse event for session "dc-old" with tool "Read" for delta sync
+    And I sync changes for session "dc-old" from the last sequence
+    Then the change set should contain 1 session(s), 1 tool call(s) and 0 agent(s)
+    And the synced tool call should have status "success"
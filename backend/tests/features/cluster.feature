@@ -0,0 +1,23 @@
+Feature: Multi-worker serving
+  With --workers N one worker is elected to write. The others serve reads
+  from their own connections and forward writes to it.
+
+  Scenario: Events posted to any worker are written by the elected writer
+    Given the server is running with 3 workers
+    When 60 tool events are posted over separate connections
+    Then every worker should name the same writer
+    And 60 tool calls should be stored
+
+  Scenario: List ETags agree across workers and move on together
+    Given the server is running with 3 workers
+    When 5 tool events are posted over separate connections
+    Then every worker should give the session list the same ETag
+    When one more tool event is posted
+    Then every worker should give the session list the same, new ETag
+
+  Scenario: A reader takes over when the writer dies
+    Given the server is running with 2 workers
+    When the writer process is killed
+    And 20 tool events are posted over separate connections
+    Then 20 tool calls should be stored
+    And every worker should name the same writer, not the killed one
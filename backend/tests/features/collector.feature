@@ -0,0 +1,43 @@
+Feature: Central collector
+  Monitors in agent mode forward gzip-compressed event batches, tagged
+  with their host, to a collector. The collector skips event ids it has
+  already applied and can filter its views by host.
+
+  Scenario: A forwarded batch is applied under the agent's host
+    Given the API is running
+    When host "dev-1" forwards a batch of 3 tool events for session "fed-s1"
+    Then the collector should report 3 accepted and 0 duplicates
+    And session "fed-s1" should belong to host "dev-1"
+    And listing sessions for host "dev-1" should return 1 session
+    And listing sessions for host "dev-2" should return 0 sessions
+    And the hosts list should include "dev-1" with 1 session
+
+  Scenario: A resent batch is skipped
+    Given the API is running
+    When host "dev-1" forwards a batch of 3 tool events for session "fed-s2"
+    And the same batch is forwarded again
+    Then the collector should report 0 accepted and 3 duplicates
+    And session "fed-s2" should have 3 tool calls
+
+  Scenario: The collector token is required when set
+    Given the API is running
+    And the collector token is "s3cret"
+    When host "dev-1" forwards a batch of 1 tool events for session "fed-s3"
+    Then the collector response status should be 401
+
+  Scenario: An agent buffers events until the collector comes up
+    Given an agent for host "laptop-a" forwarding to a collector that is not running
+    When 30 tool events are posted to the agent
+    Then the agent should hold 30 events in its outbox
+    When the collector starts
+    Then the collector should store 30 tool calls from host "laptop-a"
+    And the agent's outbox should be empty
+
+  Scenario: An event too large for the collector is dropped and batches grow back
+    Given the API is running
+    And the forwarder sends batches of up to 8 events
+    And the collector refuses any batch holding session "fed-huge" as too large
+    And 1 event for session "fed-huge" and 8 events for session "fed-s5" are queued for the collector
+    When the forwarder drains its outbox
+    Then the forwarder should have sent 8 events and rejected 1
+    And the forwarder batch size should be back at 8
@@ -0,0 +1,22 @@
+Feature: Response compression
+  Large responses are compressed when the client accepts it.
+
+  Scenario: A large session detail is gzip compressed
+    Given the API is running
+    And a session "gz-1" has 20 tool calls with large inputs
+    When I request "/api/sessions/gz-1" accepting "gzip"
+    Then the response should be encoded with "gzip"
+    And the decoded response should list 20 tool calls
+
+  Scenario: Small responses are sent uncompressed
+    Given the API is running
+    When I request "/api/health" accepting "gzip"
+    Then the response should not be encoded
+
+  Scenario: A coding refused with any zero q-value is not used
+    Given the API is running
+    And a session "gz-2" has 20 tool calls with large inputs
+    When I request "/api/sessions/gz-2" accepting "gzip;q=0.0"
+    Then the response should not be encoded
+    When I request "/api/sessions/gz-2" accepting "gzip; q=0.5"
+    Then the response should be encoded with "gzip"
@@ -0,0 +1,34 @@
+Feature: Conditional GET
+  Polled endpoints return ETags and answer unchanged requests with 304.
+
+  Scenario: Unchanged dashboard stats return 304
+    Given the API is running
+    And a session "etag-1" exists
+    When I request "/api/dashboard/stats" and remember its ETag
+    And I request "/api/dashboard/stats" with the remembered ETag
+    Then the conditional response status should be 304
+
+  Scenario: A new event invalidates the sessions list ETag
+    Given the API is running
+    And a session "etag-2" exists
+    When I request "/api/sessions" and remember its ETag
+    And I post a PostToolUseFailure event for session "etag-2" with tool "Bash" and error "boom"
+    And I request "/api/sessions" with the remembered ETag
+    Then the conditional response status should be 200
+
+  Scenario: Writes to another session keep a session detail ETag valid
+    Given the API is running
+    And a session "etag-3" exists
+    And a session "etag-4" exists
+    When I request "/api/sessions/etag-3" and remember its ETag
+    And I post a PostToolUseFailure event for session "etag-4" with tool "Bash" and error "boom"
+    And I request "/api/sessions/etag-3" with the remembered ETag
+    Then the conditional response status should be 304
+
+  Scenario: Writes to the session invalidate its detail ETag
+    Given the API is running
+    And a session "etag-5" exists
+    When I request "/api/sessions/etag-5" and remember its ETag
+    And I post a PostToolUseFailure event for session "etag-5" with tool "Bash" and error "boom"
+    And I request "/api/sessions/etag-5" with the remembered ETag
+    Then the conditional response status should be 200
@@ -0,0 +1,17 @@
+Feature: Hook-event load generator
+  python -m ai_monitor.loadgen sends synthetic or recorded hook events
+  to a running server and reports throughput, latency and visibility lag.
+
+  Scenario: Synthetic sessions are sent and become visible
+    Given the API is served over HTTP
+    When the load generator sends 120 synthetic events at 400 per second
+    Then all 120 events should have been acknowledged
+    And the report should have ack latency and visibility lag percentiles
+    And the generated sessions should have tool calls
+
+  Scenario: A recorded event stream is replayed in order
+    Given the API is served over HTTP
+    And a recorded stream with a subagent for session "rec-1"
+    When the load generator replays it keeping session ids
+    Then all 6 events should have been acknowledged
+    And session "rec-1" should have 2 tool calls, 1 of them from agent "rec-agent"
@@ -0,0 +1,30 @@
+Feature: Prometheus metrics
+  The monitor exposes its own hot-path latencies, counters and gauges
+  at /metrics in the Prometheus text format.
+
+  Scenario: Hook events are counted by event name and their commits timed
+    Given the API is running
+    And the current metrics are recorded
+    When I post a PreToolUse event for session "m-1" with tool "Bash"
+    Then the metric 'ai_monitor_events_total{hook_event_name="PreToolUse"}' should have grown by 1
+    And the metric 'ai_monitor_ingest_commit_seconds_count{hook_event_name="PreToolUse"}' should have grown by 1
+
+  Scenario: Requests are timed by route template
+    Given the API is running
+    And a session "m-2" exists
+    When I request session "m-2"
+    Then the metrics should include 'ai_monitor_http_request_duration_seconds_count{method="GET",route="/api/sessions/{session_id}",status="200"}'
+
+  Scenario: Conditional GETs are counted as ETag hits and misses
+    Given the API is running
+    And the current metrics are recorded
+    When I list sessions twice, revalidating with the ETag
+    Then the metric 'ai_monitor_etag_requests_total{result="miss"}' should have grown by 1
+    And the metric 'ai_monitor_etag_requests_total{result="hit"}' should have grown by 1
+
+  Scenario: Gauges are read at scrape time
+    Given the API is running
+    When I scrape the metrics
+    Then the response should be Prometheus text
+    And the metric 'ai_monitor_db_size_bytes{file="db"}' should be positive
+    And the metrics should include 'ai_monitor_watcher_queue_depth'
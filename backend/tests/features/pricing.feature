@@ -0,0 +1,56 @@
+Feature: Versioned model pricing
+  Prices are stored with effective dates, and stored costs can be
+  recomputed from token counts after a price change.
+
+  Scenario: The default prices are seeded
+    Given the API is running
+    When I list the model prices
+    Then the price of "opus" from "1970-01-01" should be 15.0 in and 75.0 out
+
+  Scenario: A dry run reports the diff without writing it
+    Given the API is running
+    And a session "pr-1" exists
+    And a transcript for session "pr-1" with 1000000 opus input tokens on "2025-01-10" and on "2025-03-10"
+    When the transcript is parsed
+    And the price of "opus" from "2025-02-01" is set to 5.0 in and 25.0 out
+    And costs are recomputed as a dry run
+    Then the recompute should report 1 changed row and 1 changed session
+    And the recompute should report session "pr-1" going from 30.0 to 20.0
+    And session "pr-1" should cost 30.0
+
+  Scenario: Recomputing applies new prices from their effective date
+    Given the API is running
+    And a session "pr-2" exists
+    And a transcript for session "pr-2" with 1000000 opus input tokens on "2025-01-10" and on "2025-03-10"
+    When the transcript is parsed
+    And the price of "opus" from "2025-02-01" is set to 5.0 in and 25.0 out
+    And costs are recomputed
+    Then session "pr-2" should cost 20.0
+    And the usage ledger of session "pr-2" should cost 15.0 then 5.0
+    And the hourly rollup should cost 20.0
+    When costs are recomputed
+    Then the recompute should report 0 changed rows and 0 changed sessions
+
+  Scenario: New turns are priced at the prices of their time
+    Given the API is running
+    And a session "pr-3" exists
+    When the price of "opus" from "2025-02-01" is set to 5.0 in and 25.0 out
+    And a transcript for session "pr-3" with 1000000 opus input tokens on "2025-01-10" and on "2025-03-10"
+    And the transcript is parsed
+    Then session "pr-3" should cost 20.0
+
+  Scenario: A price set from the command line reaches the running server
+    Given the API is running
+    And a session "pr-4" exists
+    And a transcript for session "pr-4" with 1000000 opus input tokens on "2025-01-10" and on "2025-01-11"
+    When the transcript is parsed
+    And the price of "opus" from "2025-02-01" is set to 5.0 in and 25.0 out from the command line
+    And a turn with 1000000 opus input tokens on "2025-03-10" is appended
+    And the transcript is parsed
+    Then session "pr-4" should cost 35.0
+
+  Scenario: A price with an effective date that isn't ISO is rejected
+    Given the API is running
+    When the price of "opus" from "2025/11/24" is posted
+    Then the pricing response status should be 400
+    And no price of "opus" from "2025/11/24" should be stored
@@ -0,0 +1,45 @@
+Feature: SQL query profiling
+  Every statement is timed and counted, per statement shape and per
+  request, and shown at /api/admin/queries.
+
+  Scenario: Statements are ranked by total time with queries counted per route
+    Given the API is running
+    And query profiling was reset
+    And a session "qp-1" exists
+    When I request session "qp-1"
+    And I fetch the query profile
+    Then the statements should be ordered by total time
+    And route "GET /api/sessions/{session_id}" should show 1 request with queries
+
+  Scenario: Statements differing only in their IN list are one entry
+    Given the API is running
+    And query profiling was reset
+    When sessions are looked up by 2 ids and then by 5 ids
+    And I fetch the query profile
+    Then the statement "SELECT session_id FROM sessions WHERE session_id IN (?, ...)" should show 2 calls
+
+  Scenario: Slow statements are logged with their query plan
+    Given the API is running
+    And a session "qp-3" exists
+    And query profiling was reset
+    And the slow query threshold is 0 ms
+    When I request session "qp-3"
+    And I fetch the query profile
+    Then a statement on the sessions table should be slow with a plan using its index
+    And a slow query should have been logged
+
+  Scenario: A statement repeated within one request is flagged as N+1
+    Given the API is running
+    And a session "qp-4" exists
+    And query profiling was reset
+    And the N+1 threshold is 1
+    When I request session "qp-4"
+    And I fetch the query profile
+    Then route "GET /api/sessions/{session_id}" should have 1 N+1 request
+
+  Scenario: The profile can be reset
+    Given the API is running
+    And a session "qp-5" exists
+    When I reset the query profile
+    And I fetch the query profile
+    Then no route should have been profiled
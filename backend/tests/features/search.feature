@@ -0,0 +1,53 @@
+Feature: Full-text Search
+  The API searches sessions, projects, tool inputs and errors via an FTS5 index.
+
+  Scenario: Search finds a tool call by command text
+    Given the API is running
+    And a session "fts-1" exists
+    And a tool call with input for session "fts-1" with tool "Bash" and input '{"command": "pytest backend/tests"}'
+    When I search for "backend/tests"
+    Then the search should return a "tool_call" hit for session "fts-1"
+    And the first search hit snippet should highlight "backend/tests"
+
+  Scenario: Search finds a tool call by error message
+    Given the API is running
+    And a session "fts-2" exists
+    And a pending tool call for session "fts-2" with tool "Bash" exists
+    When I post a PostToolUseFailure event for session "fts-2" with tool "Bash" and error "segmentation fault"
+    And I search for "segmentation"
+    Then the search should return a "tool_call" hit for session "fts-2"
+
+  Scenario: Search finds a session by project path
+    Given the API is running
+    And a session "fts-3" exists
+    When I search for "/tmp/fts-3"
+    Then the search should return a "session" hit for session "fts-3"
+
+  Scenario: Session list search matches file paths in tool inputs
+    Given the API is running
+    And a session "fts-4" exists
+    And a session "fts-5" exists
+    And a tool call with input for session "fts-4" with tool "Read" and input '{"file_path": "/src/widget.py"}'
+    When I search sessions with query "widget.py"
+    Then the search response should contain 1 sessions
+
+  Scenario: Renaming a project reindexes its sessions
+    Given the API is running
+    And a session "fts-6" exists
+    When the project of session "fts-6" is moved to "/srv/relocated-app"
+    And I search for "relocated-app"
+    Then the search should return a "session" hit for session "fts-6"
+    When I search for "/tmp/fts-6"
+    Then the search should return no hit for session "fts-6"
+
+  Scenario: Terms too short for the index still have to match
+    Given the API is running
+    And a session "fts-7" exists
+    And a session "fts-8" exists
+    And a tool call with input for session "fts-7" with tool "Bash" and input '{"command": "ls gadgetry"}'
+    And a tool call with input for session "fts-8" with tool "Bash" and input '{"command": "cat gadgetry"}'
+    When I search for "ls gadgetry"
+    Then the search should return a "tool_call" hit for session "fts-7"
+    And the search should return no hit for session "fts-8"
+    When I search sessions with query "ls gadgetry"
+    Then the search response should contain 1 sessions
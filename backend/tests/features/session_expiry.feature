@@ -0,0 +1,39 @@
+Feature: Session expiry by deadline
+  Active sessions end when their stale timeout passes, without a
+  periodic scan of the sessions table.
+
+  Scenario: An idle session ends at its deadline
+    Given the API is running
+    And the stale session timeout is 1.2 seconds
+    And a session "ex-1" exists
+    Then session "ex-1" should end within 4 seconds
+    And its ended_at should be its last event time
+    And the reaper should have expired 1 session
+
+  Scenario: A session with a newer stored event is re-armed instead of ended
+    Given the API is running
+    And a session "ex-2" exists
+    When a deadline from 15 minutes ago for session "ex-2" comes due
+    Then session "ex-2" should still be active
+    And the deadline of session "ex-2" should have been re-armed
+
+  Scenario: Deadlines are rebuilt from the active sessions at startup
+    Given the API is running
+    And an active session "ex-3" whose last event was 15 minutes ago
+    When the session deadlines are rebuilt
+    Then session "ex-3" should end within 3 seconds
+
+  Scenario: A session that ends on its own is no longer tracked
+    Given the API is running
+    And a session "ex-4" exists
+    When I post a SessionEnd event for session "ex-4"
+    Then the reaper should track 0 sessions
+
+  Scenario: Expiry does not commit another writer's pending changes
+    Given the API is running
+    And an active session "ex-5" whose last event was 15 minutes ago
+    When another writer holds the database write lock with an uncommitted session "ex-6"
+    And the deadline for session "ex-5" comes due meanwhile
+    And the other writer rolls back
+    Then session "ex-5" should end within 3 seconds
+    And session "ex-6" should not exist
@@ -0,0 +1,29 @@
+Feature: Live session tail
+  Viewers of a session share one coalesced delta per burst of writes.
+
+  Scenario: A burst of tool events reaches every viewer as one update
+    Given the API is running
+    And a session "tail-1" exists
+    And the tail coalescing window is 0.5 seconds
+    And 2 tail subscribers for session "tail-1"
+    When I post a PreToolUse and a PostToolUse event for session "tail-1" with tool "Read"
+    Then every tail subscriber should have received 1 delta with 1 tool call
+    And the tail metrics for session "tail-1" should show 2 subscribers, 1 update and 1 query
+
+  Scenario: A slow viewer is told to resync instead of buffering
+    Given the API is running
+    And a session "tail-2" exists
+    And the tail coalescing window is 0.05 seconds
+    And a tail subscriber for session "tail-2" with a queue of 1
+    When I post a PreToolUse event for session "tail-2" with tool "Read" and wait
+    And I post a PostToolUse event for session "tail-2" with tool "Read" and wait
+    Then the tail subscriber should have received "resync,delta"
+    And the tail metrics for session "tail-2" should show 1 resync
+
+  Scenario: A WebSocket viewer catches up and then follows the session
+    Given the API is running
+    And a session "tail-3" exists
+    And the tail coalescing window is 0.05 seconds
+    When I open a tail WebSocket for session "tail-3" since sequence 0
+    Then the first tail message should be a delta holding session "tail-3"
+    And a tool call posted for session "tail-3" should arrive over the WebSocket
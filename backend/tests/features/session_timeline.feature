@@ -8,7 +8,8 @@ Feature: Session Timeline API
     When I request the timeline for session "timeline-1"
     Then the timeline should contain 1 events
     And the first timeline event should be type "tool_call"
-    And the first timeline event should have tool_input data
+    And the first timeline event should have input summary "/tmp/test.txt"
+    And the first timeline event should not include payloads
 
   Scenario: Timeline interleaves agents and tool calls
     Given the API is running
@@ -25,3 +26,28 @@ Feature: Session Timeline API
     When I post a PostToolUseFailure event for session "timeline-3" with tool "Bash" and error "command failed"
     And I request the timeline for session "timeline-3"
     Then the first timeline event should have error "command failed"
+
+  Scenario: Full timeline includes tool payloads
+    Given the API is running
+    And a session "timeline-4" exists
+    And a tool call with input for session "timeline-4" with tool "Read" and input '{"file_path": "/tmp/test.txt"}'
+    When I request the full timeline for session "timeline-4"
+    Then the first timeline event should have tool_input data
+
+  Scenario: Timeline is paged with a cursor
+    Given the API is running
+    And a session "timeline-5" exists
+    And a pending tool call for session "timeline-5" with tool "Read" exists
+    And a pending tool call for session "timeline-5" with tool "Grep" exists
+    And an agent "researcher" is started for session "timeline-5"
+    When I page through the timeline for session "timeline-5" 2 events at a time
+    Then the timeline pages should contain 2 and 1 events
+    And the paged timeline should list "Read", "Grep", "researcher" in order
+
+  Scenario: Tool call payload is fetched on demand
+    Given the API is running
+    And a session "timeline-6" exists
+    And a tool call with input for session "timeline-6" with tool "Bash" and input '{"command": "ls"}'
+    When I request the timeline for session "timeline-6"
+    And I request the first timeline tool call
+    Then the tool call should have tool_input data
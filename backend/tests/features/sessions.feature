@@ -24,3 +24,12 @@ Feature: Sessions API
     When I request the detail for session "detail-1"
     Then the response should include 1 tool calls
     And the response should include tool "Grep"
+
+  Scenario: Session detail returns payload previews instead of full payloads
+    Given the API is running
+    And a session "detail-2" exists
+    And a tool call with input for session "detail-2" with tool "Bash" and input '{"command": "ls -la"}'
+    When I request the detail for session "detail-2"
+    Then the first tool call should have an input preview containing "ls -la"
+    And the first tool call should report an input size of 21 bytes
+    And the first tool call should not include payloads
@@ -0,0 +1,26 @@
+Feature: Tool Call Payloads
+  Full tool call payloads are fetched lazily and support byte ranges.
+
+  Scenario: Fetch a full tool call payload
+    Given the API is running
+    And a session "payload-1" exists
+    And a tool call with input for session "payload-1" with tool "Bash" and input '{"command": "echo hello"}'
+    When I request the input payload of the latest tool call in session "payload-1"
+    Then the payload response status should be 200
+    And the payload body should be '{"command": "echo hello"}'
+
+  Scenario: Fetch a byte range of a tool call payload
+    Given the API is running
+    And a session "payload-2" exists
+    And a tool call with input for session "payload-2" with tool "Bash" and input '{"command": "echo hello"}'
+    When I request bytes "2-8" of the input payload of the latest tool call in session "payload-2"
+    Then the payload response status should be 206
+    And the payload body should be 'command'
+    And the payload Content-Range should be "bytes 2-8/25"
+
+  Scenario: Unsatisfiable byte range is rejected
+    Given the API is running
+    And a session "payload-3" exists
+    And a tool call with input for session "payload-3" with tool "Bash" and input '{"command": "ls"}'
+    When I request bytes "500-" of the input payload of the latest tool call in session "payload-3"
+    Then the payload response status should be 416
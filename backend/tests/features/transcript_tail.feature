@@ -0,0 +1,63 @@
+Feature: Incremental transcript parsing
+  Transcripts are parsed from the last saved byte offset, not from the start.
+
+  Scenario: Appended lines add to the saved totals
+    Given the API is running
+    And a session "tx-1" exists
+    And a transcript for session "tx-1" with usage 100 in and 50 out
+    When the transcript is parsed
+    And usage 10 in and 5 out is appended to the transcript
+    And the transcript is parsed
+    Then session "tx-1" should have 110 input and 55 output tokens
+    And the saved offset should be the end of the transcript
+
+  Scenario: A partially written line waits for its newline
+    Given the API is running
+    And a session "tx-2" exists
+    And a transcript for session "tx-2" with usage 100 in and 50 out
+    When the transcript is parsed
+    And half a line with usage 7 in and 3 out is appended to the transcript
+    And the transcript is parsed
+    Then session "tx-2" should have 100 input and 50 output tokens
+    When the rest of the line is appended to the transcript
+    And the transcript is parsed
+    Then session "tx-2" should have 107 input and 53 output tokens
+
+  Scenario: A truncated transcript is rescanned from the start
+    Given the API is running
+    And a session "tx-3" exists
+    And a transcript for session "tx-3" with usage 100 in and 50 out
+    When the transcript is parsed
+    And the transcript is truncated and rewritten with usage 20 in and 4 out
+    And the transcript is parsed
+    Then session "tx-3" should have 20 input and 4 output tokens
+
+  Scenario: A transcript rewritten in place is rescanned from the start
+    Given the API is running
+    And a session "tx-4" exists
+    And a transcript for session "tx-4" with usage 100 in and 50 out
+    When the transcript is parsed
+    And the transcript is rewritten in place with usage 300 in and 1 out and 200 in and 2 out
+    And the transcript is parsed
+    Then session "tx-4" should have 500 input and 3 output tokens
+
+  Scenario: A startup scan skips transcripts unchanged since the last scan
+    Given the API is running
+    And a projects directory with 3 transcripts
+    When the projects directory is scanned
+    And usage 10 in and 5 out is appended to transcript 1
+    And the projects directory is scanned again
+    Then the last scan should have skipped 2 and scanned 1 transcripts
+
+  Scenario: A startup scan in a process pool applies every transcript
+    Given the API is running
+    And a projects directory with 40 transcripts
+    When the projects directory is scanned with 2 workers
+    Then every transcript session should have its usage applied
+
+  Scenario: Only top-level costTracker entries and session IDs are counted
+    Given the API is running
+    And a session "tx-5" exists
+    And a transcript for session "tx-5" whose first lines only mention the keys in nested content
+    When the transcript is parsed
+    Then session "tx-5" should have 40 input and 4 output tokens
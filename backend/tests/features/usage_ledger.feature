@@ -0,0 +1,64 @@
+Feature: Per-turn usage ledger
+  Every costTracker entry in a transcript is recorded per model with its
+  timestamp; session totals and hourly charts are kept from the new rows.
+
+  Scenario: Each turn is recorded once per model and priced by its own model
+    Given the API is running
+    And a session "ul-1" exists
+    And a transcript for session "ul-1" with a turn 2 hours ago using 1000000 sonnet and 1000000 opus input tokens
+    When the transcript is parsed
+    Then the usage ledger of session "ul-1" should have 2 rows for turn 1
+    And session "ul-1" should have 2000000 input tokens costing 18.0
+
+  Scenario: Appended turns are added to the session totals
+    Given the API is running
+    And a session "ul-2" exists
+    And a transcript for session "ul-2" with a turn 2 hours ago using 100 sonnet and 0 opus input tokens
+    When the transcript is parsed
+    And a turn 1 hours ago using 50 sonnet input tokens is appended
+    And the transcript is parsed
+    Then the usage ledger of session "ul-2" should have turns 1, 2
+    And session "ul-2" should have 150 input tokens
+
+  Scenario: Hourly usage is rolled up from the ledger
+    Given the API is running
+    And a session "ul-3" exists
+    And a transcript for session "ul-3" with a turn 2 hours ago using 100 sonnet and 10 opus input tokens
+    When the transcript is parsed
+    And a turn 2 hours ago using 30 sonnet input tokens is appended
+    And a turn 1 hours ago using 5 sonnet input tokens is appended
+    And the transcript is parsed
+    Then hourly usage over 3 hours should be 140 then 5 input tokens
+    And hourly sonnet usage over 3 hours should be 130 then 5 input tokens
+
+  Scenario: A rescanned transcript replaces the session's ledger
+    Given the API is running
+    And a session "ul-4" exists
+    And a transcript for session "ul-4" with a turn 2 hours ago using 100 sonnet and 10 opus input tokens
+    When the transcript is parsed
+    And the transcript is rewritten with a turn 1 hours ago using 7 sonnet input tokens
+    And the transcript is parsed
+    Then the usage ledger of session "ul-4" should have turns 1
+    And hourly usage over 3 hours should be 7 input tokens
+    And session "ul-4" should have 7 input tokens
+
+  Scenario: A session created after its transcript was parsed picks up its usage
+    Given the API is running
+    And a transcript for session "ul-5" with a turn 2 hours ago using 100 sonnet and 10 opus input tokens
+    When the transcript is parsed
+    And the session "ul-5" starts
+    Then session "ul-5" should have 110 input tokens
+
+  Scenario: A subagent transcript adds to its session's ledger without replacing it
+    Given the API is running
+    And a session "ul-6" exists
+    And a transcript for session "ul-6" with a turn 2 hours ago using 100 sonnet and 10 opus input tokens
+    And a subagent transcript for session "ul-6" with a turn 1 hours ago using 40 sonnet input tokens
+    When both transcripts are parsed
+    Then the usage ledger of session "ul-6" should have 3 rows
+    And session "ul-6" should have 150 input tokens
+    When the subagent transcript is rewritten with a turn 1 hours ago using 7 sonnet input tokens
+    And both transcripts are parsed
+    Then the usage ledger of session "ul-6" should have 3 rows
+    And session "ul-6" should have 117 input tokens
+    And hourly usage over 3 hours should be 110 then 7 input tokens
@@ -0,0 +1,59 @@
+Feature: Transcript watcher scheduler
+  Changed transcripts are coalesced, parsed off the observer thread, one parse per file at a time.
+
+  Scenario: A burst of writes is parsed once, after the last write
+    Given the API is running
+    And a session "w-1" exists
+    And a parse scheduler with a 0.2 second coalescing window
+    When the transcript of session "w-1" gets 5 writes marked dirty in quick succession
+    Then the transcript should have been parsed 1 time
+    And session "w-1" should have 50 input and 5 output tokens from the watcher
+    And the watcher metrics should show a queue depth of 0 and a parse latency
+
+  Scenario: A file changed during its parse is parsed again, never concurrently
+    Given a parse scheduler with 2 workers and a slow parser
+    When a file is marked dirty while it is being parsed
+    Then the file should have been parsed 2 times without overlap
+
+  Scenario: Overflowing the dirty set falls back to a rescan
+    Given a parse scheduler holding at most 2 pending files
+    When 3 different files are marked dirty
+    Then the scheduler should report 1 overflow and run 1 rescan
+
+  Scenario: Watcher metrics are exposed
+    Given the API is running
+    When I request the watcher metrics
+    Then the response should contain the queue depth and parse latency fields
+
+  Scenario: A hook event puts its transcript directory in the hot set
+    Given a projects directory with projects "alpha,beta" watched by the server
+    When a hook event for session "hot-1" names a transcript in project "alpha"
+    And usage 30 in and 3 out is written to that transcript
+    Then the watcher should have 1 hot directory
+    And session "hot-1" should reach 30 input tokens from the watcher
+
+  Scenario: Cold directories are covered by the stat sweep
+    Given a watch set over projects "alpha,beta"
+    When a transcript in project "beta" is written
+    And the watch set sweeps
+    Then the transcript in project "beta" should be marked dirty
+    And the hot set should be "beta"
+
+  Scenario: The hot set is capped, least recently active first out
+    Given a watch set over projects "alpha,beta,gamma" holding at most 2 hot directories
+    When projects "alpha,beta,gamma" become active in that order
+    Then the hot set should be "beta,gamma"
+    And the watch set should report 1 eviction
+
+  Scenario: Without native watches the watcher polls the hot set
+    Given a watch set over projects "alpha" whose native watches fail
+    When projects "alpha" become active in that order
+    Then the watch set should be polling
+    And the hot set should be "alpha"
+
+  Scenario: Parses on several workers and hook ingestion don't mix their writes
+    Given the API is running
+    And a parse scheduler with 4 workers parsing transcripts
+    When 8 transcripts grow and are parsed while 400 hook events are ingested
+    Then every transcript's session should have its tokens
+    And 400 tool calls should have been ingested alongside
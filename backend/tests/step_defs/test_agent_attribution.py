@@ -0,0 +1,75 @@
+"""Step definitions for agent_attribution.feature."""
+
+import time
+
+from pytest_bdd import when, then, scenarios, parsers
+
+from ai_monitor.db import get_db
+
+scenarios("../features/agent_attribution.feature")
+
+
+def _post(client, payload):
+    resp = client.post("/api/events", json=payload)
+    assert resp.status_code == 200
+    time.sleep(0.2)
+
+
+def _agent_row(session_id, agent_key):
+    return get_db().execute(
+        "SELECT * FROM agents WHERE session_id = ? AND hook_agent_id = ?",
+        (session_id, agent_key),
+    ).fetchone()
+
+
+@when(parsers.parse('subagent "{agent_name}" starts in session "{session_id}" without an agent id'))
+def subagent_starts_without_id(client, agent_name, session_id):
+    _post(client, {
+        "session_id": session_id,
+        "hook_event_name": "SubagentStart",
+        "agent_name": agent_name,
+    })
+
+
+@when(parsers.parse('a tool "{tool}" starts in session "{session_id}" without agent context'))
+def tool_starts_without_context(client, tool, session_id):
+    _post(client, {
+        "session_id": session_id,
+        "hook_event_name": "PreToolUse",
+        "tool_name": tool,
+    })
+
+
+@then(parsers.parse('agent "{agent_key}" in session "{session_id}" should list tools "{tools}"'))
+def agent_lists_tools(client, agent_key, session_id, tools):
+    agent = _agent_row(session_id, agent_key)
+    resp = client.get(f"/api/sessions/{session_id}/agents/{agent['id']}")
+    assert resp.status_code == 200
+    assert [t["tool_name"] for t in resp.json()["subagent_tools"]] == tools.split(",")
+
+
+@then(parsers.parse('agent "{agent_key}" in session "{session_id}" should report {count:d} tool calls and {errors:d} error'))
+def agent_reports_aggregates(client, agent_key, session_id, count, errors):
+    agent = _agent_row(session_id, agent_key)
+    listed = {a["id"]: a for a in client.get(f"/api/agents?session_id={session_id}").json()}
+    assert listed[agent["id"]]["tool_call_count"] == count
+    assert listed[agent["id"]]["error_count"] == errors
+
+
+@then(parsers.parse('the "{tool}" tool call in session "{session_id}" should belong to agent "{agent_name}"'))
+def tool_call_belongs_to(tool, session_id, agent_name):
+    row = get_db().execute(
+        """SELECT a.agent_name FROM tool_calls tc JOIN agents a ON a.id = tc.agent_id
+           WHERE tc.session_id = ? AND tc.tool_name = ?""",
+        (session_id, tool),
+    ).fetchone()
+    assert row is not None and row["agent_name"] == agent_name
+
+
+@then(parsers.parse('the "{tool}" tool call in session "{session_id}" should have no agent'))
+def tool_call_has_no_agent(tool, session_id):
+    row = get_db().execute(
+        "SELECT agent_id FROM tool_calls WHERE session_id = ? AND tool_name = ?",
+        (session_id, tool),
+    ).fetchone()
+    assert row is not None and row["agent_id"] is None
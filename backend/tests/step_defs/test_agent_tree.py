@@ -0,0 +1,59 @@
+"""Step definitions for agent_tree.feature."""
+
+import time
+
+import pytest
+from pytest_bdd import when, then, scenarios, parsers
+
+scenarios("../features/agent_tree.feature")
+
+
+@when(parsers.parse('subagent "{parent}" spawns subagent "{child}" in session "{session_id}"'))
+def subagent_spawns(client, parent, child, session_id):
+    for payload in (
+        {"hook_event_name": "PreToolUse", "tool_name": "Task", "agent_id": parent},
+        {"hook_event_name": "SubagentStart", "agent_id": child, "agent_type": "general-purpose"},
+    ):
+        resp = client.post("/api/events", json={"session_id": session_id, **payload})
+        assert resp.status_code == 200
+        time.sleep(0.2)
+
+
+@when(parsers.parse('I request the agent tree for session "{session_id}"'))
+def request_agent_tree(client, session_id):
+    pytest.agent_tree_response = client.get(f"/api/sessions/{session_id}/agents/tree")
+
+
+def _nodes():
+    """Flatten the tree into {hook agent id: node}."""
+    found = {}
+    stack = list(pytest.agent_tree_response.json())
+    while stack:
+        node = stack.pop()
+        found[node["hook_agent_id"]] = node
+        stack.extend(node["children"])
+    return found
+
+
+@then(parsers.parse('the tree should have 1 root agent "{root}" with child "{child}"'))
+def tree_shape(root, child):
+    assert pytest.agent_tree_response.status_code == 200
+    roots = pytest.agent_tree_response.json()
+    assert [r["hook_agent_id"] for r in roots] == [root]
+    assert [c["hook_agent_id"] for c in roots[0]["children"]] == [child]
+    assert roots[0]["children"][0]["depth"] == 1
+
+
+@then(parsers.parse(
+    'tree node "{agent}" should roll up {count:d} tool calls and {errors:d} error over {descendants:d} {noun}'
+))
+def tree_rollup(agent, count, errors, descendants, noun):
+    node = _nodes()[agent]
+    assert node["subtree_tool_call_count"] == count
+    assert node["subtree_error_count"] == errors
+    assert node["descendant_count"] == descendants
+
+
+@then(parsers.parse("the agent tree response status should be {status:d}"))
+def agent_tree_status(status):
+    assert pytest.agent_tree_response.status_code == status
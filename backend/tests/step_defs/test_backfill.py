@@ -0,0 +1,89 @@
+"""Step definitions for backfill.feature."""
+
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor.config import settings
+from ai_monitor.main import app
+
+scenarios("../features/backfill.feature")
+
+
+@pytest.fixture
+def server():
+    state = {}
+    yield state
+    if "client" in state:
+        state["client"].__exit__(None, None, None)
+
+
+def _start(server):
+    server["client"] = TestClient(app, raise_server_exceptions=False).__enter__()
+
+
+def _backfill_job(client, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = next(j for j in client.get("/api/admin/jobs").json() if j["name"] == "transcript_backfill")
+        if job["status"] != "running" or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+@given(parsers.parse("a projects directory with {count:d} transcripts to backfill"))
+def projects_to_backfill(tmp_path, monkeypatch, count):
+    projects = tmp_path / "projects" / "demo"
+    projects.mkdir(parents=True)
+    for i in range(count):
+        (projects / f"bf-{i}.jsonl").write_text(json.dumps({
+            "sessionId": f"bf-{i}",
+            "costTracker": {"claude-sonnet-4-5": {"inputTokens": 10, "outputTokens": 1}},
+        }) + "\n")
+    monkeypatch.setattr(settings, "claude_projects_dir", str(tmp_path / "projects"))
+
+
+@when("the server starts")
+def server_starts(server):
+    _start(server)
+
+
+@when("the transcript backfill job has completed")
+def backfill_completed(server):
+    assert _backfill_job(server["client"])["status"] == "completed"
+
+
+@when("the server restarts")
+def server_restarts(server):
+    server.pop("client").__exit__(None, None, None)
+    _start(server)
+
+
+@then("the API should be live and ready")
+def live_and_ready(server):
+    client = server["client"]
+    assert client.get("/api/health/live").json() == {"status": "ok"}
+    resp = client.get("/api/health/ready")
+    assert resp.status_code == 200
+    assert resp.json() == {"status": "ready"}
+    assert client.get("/api/health").json()["ready"] is True
+
+
+@then(parsers.parse("the transcript backfill job should complete with {done:d} of {total:d} files done"))
+def backfill_done(server, done, total):
+    job = _backfill_job(server["client"])
+    assert job["status"] == "completed"
+    assert (job["done"], job["total"]) == (done, total)
+    assert job["eta_seconds"] is None
+
+
+@then(parsers.parse(
+    "the transcript backfill job should complete with {done:d} of {total:d} files done and {skipped:d} skipped"
+))
+def backfill_done_skipped(server, done, total, skipped):
+    job = _backfill_job(server["client"])
+    assert job["status"] == "completed"
+    assert (job["done"], job["total"], job["skipped"]) == (done, total, skipped)
@@ -0,0 +1,70 @@
+"""Step definitions for change_stream.feature."""
+
+import time
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor.services import change_stream
+from ai_monitor.services.change_stream import Subscriber, hub
+
+scenarios("../features/change_stream.feature")
+
+
+@pytest.fixture
+def subscribers():
+    created = []
+    yield created
+    for subscriber in created:
+        hub.unsubscribe(subscriber)
+
+
+@given(parsers.parse('a stream subscriber for session "{session_id}"'))
+def stream_subscriber(subscribers, session_id):
+    subscribers.append(hub.subscribe(Subscriber(session_id=session_id)))
+
+
+@given(parsers.parse('a stream subscriber for session "{session_id}" with a queue of {size:d}'))
+def bounded_stream_subscriber(subscribers, session_id, size):
+    subscribers.append(hub.subscribe(Subscriber(session_id=session_id, maxlen=size)))
+
+
+@given(parsers.parse("the stream hub remembers the projects of at most {size:d} sessions"))
+def project_cache_size(monkeypatch, size):
+    monkeypatch.setattr(change_stream, "_PROJECT_CACHE_SIZE", size)
+
+
+@when(parsers.parse('changes are published for sessions "{session_ids}"'))
+def publish_for_sessions(session_ids):
+    for session_id in session_ids.split(","):
+        hub.publish("session", session_id, op="updated")
+
+
+@when(parsers.parse('I post a {hook_event} event for session "{session_id}" with tool "{tool}" to the stream test'))
+def post_tool_event(client, hook_event, session_id, tool):
+    resp = client.post("/api/events", json={
+        "session_id": session_id,
+        "hook_event_name": hook_event,
+        "tool_name": tool,
+    })
+    assert resp.status_code == 200
+    time.sleep(0.2)
+
+
+@then(parsers.parse('the subscriber should have received "{expected}"'))
+def subscriber_received(subscribers, expected):
+    changes = subscribers[0].drain()
+    received = [
+        f"{c['type']}.{c['op']}" if "op" in c else c["type"] for c in changes
+    ]
+    assert received == expected.split(",")
+
+
+@then("the subscriber should have received nothing")
+def subscriber_received_nothing(subscribers):
+    assert subscribers[0].drain() == []
+
+
+@then(parsers.parse('the stream hub should remember the projects of sessions "{session_ids}"'))
+def project_cache_holds(session_ids):
+    assert list(hub._projects) == session_ids.split(",")
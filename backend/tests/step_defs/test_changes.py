@@ -0,0 +1,136 @@
+"""Step definitions for changes.feature."""
+
+import sqlite3
+import time
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+import ai_monitor.db as db_module
+
+scenarios("../features/changes.feature")
+
+
+# The three tables as they were before change sequences were added
+PRE_CHANGE_SEQ_SCHEMA = """
+CREATE TABLE projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+);
+CREATE TABLE sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL UNIQUE,
+    project_id INTEGER REFERENCES projects(id),
+    status TEXT NOT NULL DEFAULT 'active',
+    model TEXT,
+    started_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+    ended_at TEXT,
+    last_event_at TEXT,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+    estimated_cost REAL NOT NULL DEFAULT 0.0,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE tool_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    tool_name TEXT NOT NULL,
+    tool_input TEXT,
+    tool_response TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    started_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+    ended_at TEXT,
+    duration_ms INTEGER,
+    tool_input_size INTEGER,
+    tool_response_size INTEGER,
+    agent_id INTEGER REFERENCES agents(id)
+);
+CREATE TABLE agents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    agent_name TEXT,
+    agent_type TEXT,
+    hook_agent_id TEXT,
+    parent_agent_id INTEGER REFERENCES agents(id),
+    task_tool_call_id INTEGER REFERENCES tool_calls(id),
+    status TEXT NOT NULL DEFAULT 'active',
+    started_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+    ended_at TEXT
+);
+"""
+
+
+@given(parsers.parse('a database from before change sequences with a tool call for session "{session_id}"'))
+def pre_change_seq_database(session_id):
+    db_module.close_db()
+    with sqlite3.connect(db_module.settings.ai_monitor_db_path) as db:
+        db.executescript(PRE_CHANGE_SEQ_SCHEMA)
+        db.execute(
+            "INSERT INTO sessions (session_id, last_event_at) VALUES (?, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))",
+            (session_id,),
+        )
+        db.execute("INSERT INTO tool_calls (session_id, tool_name) VALUES (?, 'Read')", (session_id,))
+    db.close()
+
+
+def _sync(client, session_id, since, limit=1000):
+    resp = client.get(f"/api/changes?since={since}&session_id={session_id}&limit={limit}")
+    assert resp.status_code == 200
+    pytest.change_set = resp.json()
+    pytest.change_seq = pytest.change_set["seq"]
+
+
+@when(parsers.parse('I sync changes for session "{session_id}" from the start'))
+def sync_from_start(client, session_id):
+    _sync(client, session_id, 0)
+
+
+@when(parsers.parse('I sync changes for session "{session_id}" from the start with limit {limit:d}'))
+def sync_from_start_limited(client, session_id, limit):
+    _sync(client, session_id, 0, limit)
+
+
+@when(parsers.parse('I sync changes for session "{session_id}" from the last sequence'))
+def sync_from_last(client, session_id):
+    _sync(client, session_id, pytest.change_seq)
+
+
+@when(parsers.parse('I sync changes for session "{session_id}" from the last sequence with limit {limit:d}'))
+def sync_from_last_limited(client, session_id, limit):
+    _sync(client, session_id, pytest.change_seq, limit)
+
+
+@when(parsers.parse('I post a PostToolUse event for session "{session_id}" with tool "{tool}" for delta sync'))
+def post_tool_use(client, session_id, tool):
+    resp = client.post("/api/events", json={
+        "session_id": session_id,
+        "hook_event_name": "PostToolUse",
+        "tool_name": tool,
+    })
+    assert resp.status_code == 200
+    time.sleep(0.2)
+
+
+@then(parsers.parse(
+    "the change set should contain {sessions:d} session(s), {tool_calls:d} tool call(s) and {agents:d} agent(s)"
+))
+def change_set_counts(sessions, tool_calls, agents):
+    change_set = pytest.change_set
+    assert len(change_set["sessions"]) == sessions
+    assert len(change_set["tool_calls"]) == tool_calls
+    assert len(change_set["agents"]) == agents
+
+
+@then(parsers.parse('the synced tool call should have status "{status}"'))
+def synced_tool_status(status):
+    assert pytest.change_set["tool_calls"][0]["status"] == status
+
+
+@then("the change set should have more pages")
+def change_set_has_more():
+    assert pytest.change_set["has_more"] is True
@@ -0,0 +1,145 @@
+"""Step definitions for cluster.feature."""
+
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+scenarios("../features/cluster.feature")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def context():
+    return {"posted": 0}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str) -> httpx.Response:
+    # A new connection per request, so requests spread over the workers
+    with httpx.Client() as client:
+        return client.get(url)
+
+
+def _statuses(server: dict, count: int = 20) -> list[dict]:
+    return [_get(server["url"] + "/api/admin/cluster").json() for _ in range(count)]
+
+
+@given(parsers.parse("the server is running with {workers:d} workers"), target_fixture="server")
+def running_server(tmp_path, workers):
+    env = {
+        **os.environ,
+        "AI_MONITOR_HOST": "127.0.0.1",
+        "AI_MONITOR_PORT": str(_free_port()),
+        "WRITER_IPC_PORT": str(_free_port()),
+        "AI_MONITOR_DB_PATH": str(tmp_path / "cluster.db"),
+        "CLAUDE_PROJECTS_DIR": str(tmp_path / "projects"),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "ai_monitor", "--workers", str(workers)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    server = {"url": f"http://127.0.0.1:{env['AI_MONITOR_PORT']}", "db": env["AI_MONITOR_DB_PATH"]}
+    deadline = time.monotonic() + 30
+    while True:
+        assert process.poll() is None, "server exited"
+        assert time.monotonic() < deadline, "server did not start"
+        try:
+            statuses = _statuses(server, 10)
+        except httpx.HTTPError:
+            time.sleep(0.1)
+            continue
+        # Every worker that answered has finished its election
+        if all(s["writer_pid"] for s in statuses):
+            break
+        time.sleep(0.1)
+    yield server
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+@when("one more tool event is posted")
+def post_one_event(server, context):
+    post_events(server, context, 1)
+
+
+@when(parsers.parse("{count:d} tool events are posted over separate connections"))
+def post_events(server, context, count):
+    for n in range(count):
+        with httpx.Client() as client:
+            resp = client.post(server["url"] + "/api/events", json={
+                "session_id": f"cluster-{n % 4}",
+                "hook_event_name": "PreToolUse",
+                "tool_name": "Bash",
+                "cwd": "/tmp/cluster",
+            })
+        assert resp.status_code == 200
+    context["posted"] += count
+
+
+@when("the writer process is killed")
+def kill_writer(server, context):
+    writer_pid = _statuses(server, 1)[0]["writer_pid"]
+    os.kill(writer_pid, signal.SIGKILL)
+    context["killed"] = writer_pid
+
+
+@then(parsers.parse("{count:d} tool calls should be stored"))
+def tool_calls_stored(server, count):
+    deadline = time.monotonic() + 10
+    with sqlite3.connect(server["db"]) as db:
+        while True:
+            stored = db.execute("SELECT COUNT(*) FROM tool_calls").fetchone()[0]
+            if stored >= count or time.monotonic() > deadline:
+                break
+            time.sleep(0.1)
+    assert stored == count
+
+
+@then("every worker should name the same writer")
+def same_writer(server, context):
+    writer_pids = {s["writer_pid"] for s in _statuses(server)}
+    assert len(writer_pids) == 1
+    context["writer_pid"] = writer_pids.pop()
+
+
+@then("every worker should name the same writer, not the killed one")
+def new_writer(server, context):
+    same_writer(server, context)
+    assert context["writer_pid"] != context["killed"]
+
+
+def _list_etags(server: dict) -> set[str]:
+    # Writes are relayed to the readers asynchronously; wait for them to settle
+    time.sleep(0.5)
+    return {_get(server["url"] + "/api/sessions").headers["etag"] for _ in range(20)}
+
+
+@then("every worker should give the session list the same ETag")
+def same_etag(server, context):
+    etags = _list_etags(server)
+    assert len(etags) == 1
+    context["etag"] = etags.pop()
+
+
+@then("every worker should give the session list the same, new ETag")
+def same_new_etag(server, context):
+    etags = _list_etags(server)
+    assert len(etags) == 1
+    assert etags.pop() != context["etag"]
@@ -0,0 +1,304 @@
+"""Step definitions for collector.feature."""
+
+import gzip
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import httpx
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor.config import settings
+from ai_monitor.db import get_db
+from ai_monitor.models import HookEvent
+from ai_monitor.services import forwarder
+
+scenarios("../features/collector.feature")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def context():
+    return {"processes": []}
+
+
+@pytest.fixture(autouse=True)
+def stop_processes(context):
+    yield
+    for process in context["processes"]:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _post_batch(client, batch: dict):
+    return client.post(
+        "/api/collector/events",
+        content=gzip.compress(json.dumps(batch).encode()),
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+
+
+def _wait_for(predicate, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        value = predicate()
+        if value or time.monotonic() > deadline:
+            return value
+        time.sleep(0.1)
+
+
+# ── In-process collector ─────────────────────────────────────────
+
+
+@given(parsers.parse("the forwarder sends batches of up to {size:d} events"))
+def forwarder_batches(monkeypatch, context, size):
+    monkeypatch.setattr(settings, "forward_batch_size", size)
+    monkeypatch.setattr(settings, "collector_url", "http://collector.test")
+    context["forwarder"] = forwarder.Forwarder()
+
+
+@given(parsers.parse('the collector refuses any batch holding session "{session_id}" as too large'))
+def collector_refuses_session(monkeypatch, session_id):
+    class Response:
+        def __init__(self, accepted):
+            self.body = json.dumps({"accepted": accepted, "duplicates": 0, "failed": 0}).encode()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def read(self):
+            return self.body
+
+    def urlopen(request, timeout=None):
+        events = json.loads(gzip.decompress(request.data))["events"]
+        if any(e["event"]["session_id"] == session_id for e in events):
+            raise urllib.error.HTTPError(request.full_url, 413, "Batch too large", {}, None)
+        return Response(len(events))
+
+    monkeypatch.setattr(urllib.request, "urlopen", urlopen)
+
+
+@given(parsers.parse(
+    '{huge:d} event for session "{huge_session}" and {count:d} events for session '
+    '"{session_id}" are queued for the collector'
+))
+def queued_events(client, huge, huge_session, count, session_id):
+    db = get_db()
+    for sid, n in ((huge_session, huge), (session_id, count)):
+        for _ in range(n):
+            forwarder.enqueue(
+                HookEvent(session_id=sid, hook_event_name="PreToolUse", tool_name="Read"),
+                "2025-01-01T00:00:00Z",
+            )
+    db.commit()
+
+
+@when("the forwarder drains its outbox")
+def forwarder_drains(context):
+    sender = context["forwarder"]
+    db = get_db()
+    for _ in range(50):
+        try:
+            if not sender._send_next(db):
+                return
+        except forwarder._Resend:
+            continue
+    raise AssertionError("the outbox did not drain")
+
+
+@then(parsers.parse("the forwarder should have sent {sent:d} events and rejected {rejected:d}"))
+def forwarder_sent(context, sent, rejected):
+    assert context["forwarder"].sent_events == sent
+    assert context["forwarder"].rejected == rejected
+
+
+@then(parsers.parse("the forwarder batch size should be back at {size:d}"))
+def forwarder_batch_size(context, size):
+    assert context["forwarder"].batch_size == size
+
+
+@given(parsers.parse('the collector token is "{token}"'))
+def collector_token(monkeypatch, token):
+    monkeypatch.setattr(settings, "collector_token", token)
+
+
+@when(parsers.parse('host "{host}" forwards a batch of {count:d} tool events for session "{session_id}"'))
+def forward_batch(client, context, host, count, session_id):
+    context["batch"] = {
+        "host": host,
+        "events": [
+            {
+                "id": uuid.uuid4().hex,
+                "at": "2026-01-01T00:00:00Z",
+                "event": {
+                    "session_id": session_id,
+                    "hook_event_name": "PreToolUse",
+                    "tool_name": "Bash",
+                    "cwd": "/home/dev/app",
+                },
+            }
+            for _ in range(count)
+        ],
+    }
+    context["response"] = _post_batch(client, context["batch"])
+
+
+@when("the same batch is forwarded again")
+def forward_again(client, context):
+    context["response"] = _post_batch(client, context["batch"])
+
+
+@then(parsers.parse("the collector should report {accepted:d} accepted and {duplicates:d} duplicates"))
+def collector_result(context, accepted, duplicates):
+    assert context["response"].status_code == 200
+    assert context["response"].json() == {"accepted": accepted, "duplicates": duplicates, "failed": 0}
+
+
+@then(parsers.parse("the collector response status should be {status:d}"))
+def collector_status(context, status):
+    assert context["response"].status_code == status
+
+
+@then(parsers.parse('session "{session_id}" should belong to host "{host}"'))
+def session_host(client, session_id, host):
+    session = client.get(f"/api/sessions/{session_id}").json()
+    assert session["host"] == host
+    assert session["project_name"] == "app"
+
+
+@then(parsers.parse('session "{session_id}" should have {count:d} tool calls'))
+def session_tool_calls(client, session_id, count):
+    assert client.get(f"/api/sessions/{session_id}").json()["tool_call_count"] == count
+
+
+@then(parsers.parse('listing sessions for host "{host}" should return {count:d} session'))
+@then(parsers.parse('listing sessions for host "{host}" should return {count:d} sessions'))
+def sessions_for_host(client, host, count):
+    assert client.get("/api/sessions", params={"host": host}).json()["total"] == count
+
+
+@then(parsers.parse('the hosts list should include "{host}" with {count:d} session'))
+def hosts_list(client, host, count):
+    hosts = {h["host"]: h for h in client.get("/api/hosts").json()}
+    assert hosts[host]["session_count"] == count
+
+
+# ── Two processes: an agent and a collector ──────────────────────
+
+
+def _start(context: dict, tmp_path, name: str, **env: str) -> dict:
+    env = {
+        **os.environ,
+        "AI_MONITOR_HOST": "127.0.0.1",
+        "AI_MONITOR_PORT": str(_free_port()),
+        "WRITER_IPC_PORT": str(_free_port()),
+        "AI_MONITOR_DB_PATH": str(tmp_path / f"{name}.db"),
+        "CLAUDE_PROJECTS_DIR": str(tmp_path / f"{name}-projects"),
+        **env,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "ai_monitor"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    context["processes"].append(process)
+    server = {"url": f"http://127.0.0.1:{env['AI_MONITOR_PORT']}", "db": env["AI_MONITOR_DB_PATH"]}
+
+    def ready() -> bool:
+        assert process.poll() is None, f"{name} exited"
+        try:
+            return httpx.get(server["url"] + "/api/health").status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    assert _wait_for(ready, 30), f"{name} did not start"
+    return server
+
+
+@given(
+    parsers.parse('an agent for host "{host}" forwarding to a collector that is not running'),
+    target_fixture="agent",
+)
+def agent_without_collector(tmp_path, context, host):
+    context["collector_port"] = _free_port()
+    return _start(
+        context, tmp_path, "agent",
+        HOST_NAME=host,
+        COLLECTOR_URL=f"http://127.0.0.1:{context['collector_port']}",
+        FORWARD_MAX_BACKOFF_SECONDS="0.5",
+    )
+
+
+@when(parsers.parse("{count:d} tool events are posted to the agent"))
+def post_to_agent(agent, count):
+    with httpx.Client() as client:
+        for n in range(count):
+            resp = client.post(agent["url"] + "/api/events", json={
+                "session_id": f"agent-{n % 3}",
+                "hook_event_name": "PreToolUse",
+                "tool_name": "Bash",
+                "cwd": "/home/a/app",
+            })
+            assert resp.status_code == 200
+
+
+def _forwarder(agent: dict) -> dict:
+    return httpx.get(agent["url"] + "/api/admin/forwarder").json()
+
+
+@then(parsers.parse("the agent should hold {count:d} events in its outbox"))
+def agent_outbox(agent, count):
+    status = _wait_for(lambda: (s := _forwarder(agent))["failures"] and s)
+    assert status["outbox"] == count
+    assert status["sent_events"] == 0
+
+
+@when("the collector starts")
+def collector_starts(tmp_path, context):
+    # Both processes run on this machine; HOST_NAME tells them apart
+    context["collector"] = _start(
+        context, tmp_path, "collector",
+        HOST_NAME="central",
+        AI_MONITOR_PORT=str(context["collector_port"]),
+    )
+
+
+@then(parsers.parse('the collector should store {count:d} tool calls from host "{host}"'))
+def collector_stored(context, count, host):
+    def stored() -> int:
+        with sqlite3.connect(context["collector"]["db"]) as db:
+            return db.execute(
+                """SELECT COUNT(*) FROM tool_calls t JOIN sessions s USING (session_id)
+                   WHERE s.host = ?""",
+                (host,),
+            ).fetchone()[0]
+
+    assert _wait_for(lambda: stored() >= count) and stored() == count
+
+
+@then("the agent's outbox should be empty")
+def agent_outbox_empty(agent):
+    status = _wait_for(lambda: (s := _forwarder(agent))["outbox"] == 0 and s)
+    assert status["outbox"] == 0
+    assert status["sent_events"] == 30
@@ -0,0 +1,47 @@
+"""Step definitions for compression.feature."""
+
+import json
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+scenarios("../features/compression.feature")
+
+
+@given(parsers.parse('a session "{session_id}" has {count:d} tool calls with large inputs'))
+def session_with_large_tool_calls(client, session_id, count):
+    from ai_monitor.db import get_db
+    db = get_db()
+    db.execute("INSERT INTO sessions (session_id) VALUES (?)", (session_id,))
+    tool_input = json.dumps({"command": "echo " + "x" * 2000})
+    db.executemany(
+        "INSERT INTO tool_calls (session_id, tool_name, tool_input, tool_input_size, status) "
+        "VALUES (?, 'Bash', ?, ?, 'success')",
+        [(session_id, tool_input, len(tool_input))] * count,
+    )
+    db.commit()
+
+
+@when(parsers.parse('I request "{path}" accepting "{encoding}"'))
+def request_accepting(client, path, encoding):
+    pytest.compressed_response = client.get(path, headers={"Accept-Encoding": encoding})
+    assert pytest.compressed_response.status_code == 200
+
+
+@then(parsers.parse('the response should be encoded with "{encoding}"'))
+def response_encoded(encoding):
+    resp = pytest.compressed_response
+    assert resp.headers.get("content-encoding") == encoding
+    assert "Accept-Encoding" in resp.headers.get("vary", "")
+    # Content-Length is the compressed size; httpx has already decoded the body
+    assert int(resp.headers["content-length"]) < len(resp.content)
+
+
+@then(parsers.parse("the decoded response should list {count:d} tool calls"))
+def decoded_tool_calls(count):
+    assert len(pytest.compressed_response.json()["tool_calls"]) == count
+
+
+@then("the response should not be encoded")
+def response_not_encoded():
+    assert "content-encoding" not in pytest.compressed_response.headers
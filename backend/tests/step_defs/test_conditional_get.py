@@ -0,0 +1,26 @@
+"""Step definitions for conditional_get.feature."""
+
+import pytest
+from pytest_bdd import when, then, scenarios, parsers
+
+scenarios("../features/conditional_get.feature")
+
+
+@when(parsers.parse('I request "{path}" and remember its ETag'))
+def request_and_remember_etag(client, path):
+    resp = client.get(path)
+    assert resp.status_code == 200
+    assert resp.headers.get("etag"), "Response has no ETag"
+    pytest.remembered_etag = resp.headers["etag"]
+
+
+@when(parsers.parse('I request "{path}" with the remembered ETag'))
+def request_with_etag(client, path):
+    pytest.conditional_response = client.get(
+        path, headers={"If-None-Match": pytest.remembered_etag}
+    )
+
+
+@then(parsers.parse("the conditional response status should be {status:d}"))
+def conditional_status(status):
+    assert pytest.conditional_response.status_code == status
@@ -0,0 +1,117 @@
+"""Step definitions for loadgen.feature."""
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor import loadgen
+from ai_monitor.config import settings
+from ai_monitor.db import get_db
+from ai_monitor.main import app
+
+scenarios("../features/loadgen.feature")
+
+
+@pytest.fixture
+def context():
+    return {}
+
+
+@given("the API is served over HTTP", target_fixture="server_url")
+def served_api(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "claude_projects_dir", str(tmp_path / "projects"))
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(10)
+
+
+@given(parsers.parse('a recorded stream with a subagent for session "{session_id}"'))
+def recorded_stream(tmp_path, context, session_id):
+    events = [
+        {"session_id": session_id, "hook_event_name": "SessionStart", "cwd": "/tmp/rec"},
+        {"session_id": session_id, "hook_event_name": "PreToolUse", "tool_name": "Read"},
+        {"session_id": session_id, "hook_event_name": "PostToolUse", "tool_name": "Read"},
+        {"session_id": session_id, "hook_event_name": "SubagentStart", "agent_id": "rec-agent",
+         "agent_type": "Explore"},
+        {"session_id": session_id, "hook_event_name": "PreToolUse", "tool_name": "Grep",
+         "agent_id": "rec-agent"},
+        {"session_id": session_id, "hook_event_name": "PostToolUse", "tool_name": "Grep",
+         "agent_id": "rec-agent"},
+    ]
+    path = tmp_path / "recorded.jsonl"
+    path.write_text("".join(json.dumps(e) + "\n" for e in events))
+    context["recording"] = str(path)
+
+
+@when(parsers.parse("the load generator sends {count:d} synthetic events at {rate:d} per second"))
+def send_synthetic(server_url, context, count, rate):
+    context["report"] = loadgen.main([
+        "--url", server_url, "--rate", str(rate), "--events", str(count), "--duration", "0",
+        "--concurrency", "4", "--sessions", "5", "--probe-every", "2",
+    ])
+
+
+@when("the load generator replays it keeping session ids")
+def replay(server_url, context):
+    context["report"] = loadgen.main([
+        "--url", server_url, "--replay", context["recording"], "--keep-ids",
+        "--rate", "200", "--events", "100", "--duration", "0",
+    ])
+
+
+@then(parsers.parse("all {count:d} events should have been acknowledged"))
+def all_acked(context, count):
+    report = context["report"]
+    assert report["sent"] == count
+    assert report["acked"] == count
+    assert report["errors"] == {}
+
+
+@then("the report should have ack latency and visibility lag percentiles")
+def has_percentiles(context):
+    report = context["report"]
+    assert report["ack_ms"]["p50"] <= report["ack_ms"]["p99"]
+    assert report["visibility_probes"] > 0
+    assert report["visibility_timeouts"] == 0
+    assert report["visibility_lag_ms"]["p50"] > 0
+
+
+@then("the generated sessions should have tool calls")
+def sessions_have_tool_calls():
+    count = get_db().execute(
+        "SELECT COUNT(*) FROM tool_calls WHERE session_id LIKE 'loadgen-%'"
+    ).fetchone()[0]
+    assert count > 0
+
+
+@then(parsers.parse('session "{session_id}" should have {total:d} tool calls, {n:d} of them from agent "{agent}"'))
+def replayed_tool_calls(session_id, total, n, agent):
+    # Acknowledged events may still be on their way to the database
+    deadline = time.monotonic() + 10
+    while True:
+        rows = get_db().execute(
+            """SELECT a.hook_agent_id FROM tool_calls t LEFT JOIN agents a ON a.id = t.agent_id
+               WHERE t.session_id = ?""",
+            (session_id,),
+        ).fetchall()
+        from_agent = sum(r["hook_agent_id"] == agent for r in rows)
+        if (len(rows), from_agent) == (total, n) or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert len(rows) == total
+    assert from_agent == n
@@ -0,0 +1,84 @@
+"""Step definitions for metrics.feature."""
+
+import time
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+scenarios("../features/metrics.feature")
+
+
+@pytest.fixture
+def context():
+    return {}
+
+
+def _samples(client):
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    samples = {}
+    for line in resp.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+@given("the current metrics are recorded")
+def record_metrics(client, context):
+    context["before"] = _samples(client)
+
+
+@when(parsers.parse('I post a PreToolUse event for session "{session_id}" with tool "{tool}"'))
+def post_pre_tool_use(client, session_id, tool):
+    resp = client.post("/api/events", json={
+        "session_id": session_id,
+        "hook_event_name": "PreToolUse",
+        "tool_name": tool,
+        "tool_use_id": f"{session_id}-tu",
+        "tool_input": {"command": "ls"},
+    })
+    assert resp.status_code == 200
+    time.sleep(0.2)
+
+
+@when(parsers.parse('I request session "{session_id}"'))
+def request_session(client, session_id):
+    assert client.get(f"/api/sessions/{session_id}").status_code == 200
+
+
+@when("I list sessions twice, revalidating with the ETag")
+def list_sessions_twice(client):
+    first = client.get("/api/sessions")
+    assert first.status_code == 200
+    second = client.get("/api/sessions", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
+
+
+@when("I scrape the metrics")
+def scrape_metrics(client, context):
+    context["response"] = client.get("/metrics")
+
+
+@then(parsers.parse("the metric '{sample}' should have grown by {amount:d}"))
+def metric_grew(client, context, sample, amount):
+    after = _samples(client)
+    assert after.get(sample, 0) - context["before"].get(sample, 0) == amount
+
+
+@then(parsers.parse("the metrics should include '{sample}'"))
+def metrics_include(client, sample):
+    assert sample in _samples(client)
+
+
+@then("the response should be Prometheus text")
+def prometheus_text(context):
+    resp = context["response"]
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE ai_monitor_http_request_duration_seconds histogram" in resp.text
+
+
+@then(parsers.parse("the metric '{sample}' should be positive"))
+def metric_positive(client, sample):
+    assert _samples(client)[sample] > 0
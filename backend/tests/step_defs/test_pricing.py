@@ -0,0 +1,160 @@
+"""Step definitions for pricing.feature."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor.config import settings
+from ai_monitor.db import get_db
+from ai_monitor.services import pricing
+from ai_monitor.services.transcript_parser import parse_transcript
+
+scenarios("../features/pricing.feature")
+
+
+@pytest.fixture
+def context():
+    return {}
+
+
+@pytest.fixture
+def transcript(tmp_path):
+    return {"path": str(tmp_path / "transcript.jsonl")}
+
+
+@when("I list the model prices")
+def list_prices(client, context):
+    resp = client.get("/api/admin/pricing")
+    assert resp.status_code == 200
+    context["prices"] = resp.json()
+
+
+@then(parsers.parse('the price of "{pattern}" from "{date}" should be {inp:f} in and {out:f} out'))
+def price_listed(context, pattern, date, inp, out):
+    price = next(p for p in context["prices"] if (p["pattern"], p["effective_from"]) == (pattern, date))
+    assert (price["input"], price["output"]) == (inp, out)
+
+
+@given(parsers.parse(
+    'a transcript for session "{session_id}" with {tokens:d} opus input tokens on "{day1}" and on "{day2}"'
+))
+@when(parsers.parse(
+    'a transcript for session "{session_id}" with {tokens:d} opus input tokens on "{day1}" and on "{day2}"'
+))
+def write_transcript(transcript, session_id, tokens, day1, day2):
+    with open(transcript["path"], "w") as f:
+        for day in (day1, day2):
+            f.write(json.dumps({
+                "sessionId": session_id,
+                "timestamp": f"{day}T12:00:00.000Z",
+                "costTracker": {"claude-opus-4-1": {"inputTokens": tokens, "outputTokens": 0}},
+            }) + "\n")
+
+
+@when("the transcript is parsed")
+def parse(transcript):
+    parse_transcript(transcript["path"])
+
+
+@when(parsers.parse('the price of "{pattern}" from "{date}" is set to {inp:f} in and {out:f} out'))
+def set_price(client, pattern, date, inp, out):
+    resp = client.post("/api/admin/pricing", json={
+        "pattern": pattern, "effective_from": date, "input": inp, "output": out,
+    })
+    assert resp.status_code == 200
+    assert resp.json()["cache_read"] == pytest.approx(inp * 0.1)
+
+
+@when(parsers.parse(
+    'the price of "{pattern}" from "{date}" is set to {inp:f} in and {out:f} out from the command line'
+))
+def set_price_from_cli(monkeypatch, pattern, date, inp, out):
+    subprocess.run(
+        [sys.executable, "-m", "ai_monitor.pricing", "set", pattern, "--from", date,
+         "--input", str(inp), "--output", str(out)],
+        env={**os.environ, "AI_MONITOR_DB_PATH": settings.ai_monitor_db_path},
+        check=True, capture_output=True,
+    )
+    # Don't wait out the once-a-second check
+    monkeypatch.setattr(pricing, "_RELOAD_CHECK_SECONDS", 0.0)
+
+
+@when(parsers.parse('a turn with {tokens:d} opus input tokens on "{day}" is appended'))
+def append_turn(transcript, tokens, day):
+    with open(transcript["path"]) as f:
+        session_id = json.loads(f.readline())["sessionId"]
+    with open(transcript["path"], "a") as f:
+        f.write(json.dumps({
+            "sessionId": session_id,
+            "timestamp": f"{day}T12:00:00.000Z",
+            "costTracker": {"claude-opus-4-1": {"inputTokens": tokens, "outputTokens": 0}},
+        }) + "\n")
+
+
+@when(parsers.parse('the price of "{pattern}" from "{date}" is posted'))
+def post_price(client, context, pattern, date):
+    context["response"] = client.post("/api/admin/pricing", json={
+        "pattern": pattern, "effective_from": date, "input": 1.0, "output": 1.0,
+    })
+
+
+@then(parsers.parse("the pricing response status should be {status:d}"))
+def pricing_status(context, status):
+    assert context["response"].status_code == status
+
+
+@then(parsers.parse('no price of "{pattern}" from "{date}" should be stored'))
+def price_not_stored(client, pattern, date):
+    prices = client.get("/api/admin/pricing").json()
+    assert all((p["pattern"], p["effective_from"]) != (pattern, date) for p in prices)
+
+
+@when("costs are recomputed as a dry run")
+def recompute_dry_run(client, context):
+    resp = client.post("/api/admin/pricing/recompute", params={"dry_run": True})
+    assert resp.status_code == 200
+    context["report"] = resp.json()
+
+
+@when("costs are recomputed")
+def recompute(client, context):
+    resp = client.post("/api/admin/pricing/recompute")
+    assert resp.status_code == 200
+    context["report"] = resp.json()
+
+
+@then(parsers.re(
+    r"the recompute should report (?P<rows>\d+) changed rows? and (?P<sessions>\d+) changed sessions?"
+))
+def recompute_counts(context, rows, sessions):
+    assert context["report"]["rows_changed"] == int(rows)
+    assert context["report"]["sessions_changed"] == int(sessions)
+
+
+@then(parsers.parse('the recompute should report session "{session_id}" going from {old:f} to {new:f}'))
+def recompute_session(context, session_id, old, new):
+    diff = next(s for s in context["report"]["sessions"] if s["session_id"] == session_id)
+    assert diff["old_cost"] == pytest.approx(old)
+    assert diff["new_cost"] == pytest.approx(new)
+    assert context["report"]["new_total_cost"] - context["report"]["old_total_cost"] == pytest.approx(new - old)
+
+
+@then(parsers.parse('session "{session_id}" should cost {cost:f}'))
+def session_cost(client, session_id, cost):
+    assert client.get(f"/api/sessions/{session_id}").json()["estimated_cost"] == pytest.approx(cost)
+
+
+@then(parsers.parse('the usage ledger of session "{session_id}" should cost {first:f} then {second:f}'))
+def ledger_costs(client, session_id, first, second):
+    rows = client.get(f"/api/sessions/{session_id}/usage").json()
+    assert [r["cost"] for r in rows] == pytest.approx([first, second])
+
+
+@then(parsers.parse("the hourly rollup should cost {cost:f}"))
+def hourly_cost(cost):
+    total = get_db().execute("SELECT SUM(cost) FROM usage_hourly").fetchone()[0]
+    assert total == pytest.approx(cost)
@@ -0,0 +1,105 @@
+"""Step definitions for query_profile.feature."""
+
+import logging
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor import query_profile
+from ai_monitor.config import settings
+from ai_monitor.db import get_db
+
+scenarios("../features/query_profile.feature")
+
+
+@pytest.fixture
+def context():
+    return {}
+
+
+@given("query profiling was reset")
+def reset_profile():
+    query_profile.stats.reset()
+
+
+@given(parsers.parse("the slow query threshold is {ms:d} ms"))
+def slow_threshold(monkeypatch, caplog, ms):
+    monkeypatch.setattr(settings, "slow_query_ms", ms)
+    caplog.set_level(logging.WARNING, logger="ai_monitor.query_profile")
+
+
+@given(parsers.parse("the N+1 threshold is {count:d}"))
+def n_plus_one_threshold(monkeypatch, count):
+    monkeypatch.setattr(settings, "query_n_plus_one_threshold", count)
+
+
+@when(parsers.parse('I request session "{session_id}"'))
+def request_session(client, session_id):
+    assert client.get(f"/api/sessions/{session_id}").status_code == 200
+
+
+@when("sessions are looked up by 2 ids and then by 5 ids")
+def lookup_in_lists():
+    db = get_db()
+    for ids in (["a", "b"], ["a", "b", "c", "d", "e"]):
+        placeholders = ", ".join("?" * len(ids))
+        db.execute(f"SELECT session_id FROM sessions WHERE session_id IN ({placeholders})", ids).fetchall()
+
+
+@when("I reset the query profile")
+def reset_via_api(client):
+    assert client.delete("/api/admin/queries").status_code == 204
+
+
+@when("I fetch the query profile")
+def fetch_profile(client, context):
+    resp = client.get("/api/admin/queries", params={"limit": 500})
+    assert resp.status_code == 200
+    context["profile"] = resp.json()
+
+
+def _route(context, route):
+    return next(r for r in context["profile"]["routes"] if r["route"] == route)
+
+
+@then("the statements should be ordered by total time")
+def ordered_by_total(context):
+    totals = [s["total_ms"] for s in context["profile"]["statements"]]
+    assert totals
+    assert totals == sorted(totals, reverse=True)
+
+
+@then(parsers.parse('route "{route}" should show 1 request with queries'))
+def route_counted(context, route):
+    entry = _route(context, route)
+    assert entry["requests"] == 1
+    assert entry["queries"] >= 1
+
+
+@then(parsers.parse('the statement "{sql}" should show {calls:d} calls'))
+def statement_calls(context, sql, calls):
+    entry = next(s for s in context["profile"]["statements"] if s["sql"] == sql)
+    assert entry["calls"] == calls
+
+
+@then("a statement on the sessions table should be slow with a plan using its index")
+def slow_with_plan(context):
+    assert any(
+        s["slow_calls"] and s["plan"] and any("SEARCH sessions" in step for step in s["plan"])
+        for s in context["profile"]["statements"]
+    )
+
+
+@then("a slow query should have been logged")
+def slow_logged(caplog):
+    assert any(r.getMessage().startswith("Slow query") for r in caplog.records)
+
+
+@then(parsers.parse('route "{route}" should have 1 N+1 request'))
+def n_plus_one_flagged(context, route):
+    assert _route(context, route)["n_plus_one_requests"] == 1
+
+
+@then("no route should have been profiled")
+def no_routes(context):
+    assert context["profile"]["routes"] == []
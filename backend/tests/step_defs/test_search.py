@@ -0,0 +1,57 @@
+"""Step definitions for search.feature."""
+
+import pytest
+from pytest_bdd import when, then, scenarios, parsers
+
+from ai_monitor.db import get_db, write_lock
+
+scenarios("../features/search.feature")
+
+
+@when(parsers.parse('I search for "{query}"'))
+def search_all(client, query):
+    resp = client.get("/api/search", params={"q": query})
+    assert resp.status_code == 200
+    pytest.fts_response = resp.json()
+
+
+@when(parsers.parse('the project of session "{session_id}" is moved to "{path}"'))
+def move_project(session_id, path):
+    with write_lock:
+        db = get_db()
+        db.execute(
+            """UPDATE projects SET path = ?, name = ?
+               WHERE id = (SELECT project_id FROM sessions WHERE session_id = ?)""",
+            (path, path.rsplit("/", 1)[-1], session_id),
+        )
+        db.commit()
+
+
+@when(parsers.parse('I search sessions with query "{query}"'))
+def search_sessions(client, query):
+    resp = client.get("/api/sessions", params={"search": query})
+    assert resp.status_code == 200
+    pytest.search_response = resp.json()
+
+
+@then(parsers.parse('the search should return a "{kind}" hit for session "{session_id}"'))
+def search_has_hit(kind, session_id):
+    hits = [(h["kind"], h["session_id"]) for h in pytest.fts_response]
+    assert (kind, session_id) in hits, f"No {kind} hit for '{session_id}' in {hits}"
+
+
+@then(parsers.parse('the search should return no hit for session "{session_id}"'))
+def search_has_no_hit(session_id):
+    hits = [(h["kind"], h["session_id"]) for h in pytest.fts_response]
+    assert all(hit_session != session_id for _, hit_session in hits), hits
+
+
+@then(parsers.parse('the first search hit snippet should highlight "{text}"'))
+def first_hit_highlighted(text):
+    snippet = pytest.fts_response[0]["snippet"]
+    assert f"<mark>{text}</mark>" in snippet, snippet
+
+
+@then(parsers.parse("the search response should contain {count:d} sessions"))
+def search_response_count(count):
+    assert pytest.search_response["total"] == count
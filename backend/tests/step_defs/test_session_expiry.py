@@ -0,0 +1,151 @@
+"""Step definitions for session_expiry.feature."""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor.config import settings
+from ai_monitor.db import get_db, write_lock
+from ai_monitor.services.session_reaper import SessionExpiry, session_expiry
+
+scenarios("../features/session_expiry.feature")
+
+
+@pytest.fixture
+def context():
+    return {}
+
+
+def _minutes_ago(minutes):
+    return (datetime.now(timezone.utc) - timedelta(minutes=minutes)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _session(session_id):
+    return get_db().execute(
+        "SELECT status, ended_at, last_event_at FROM sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+
+
+@given(parsers.parse("the stale session timeout is {seconds:f} seconds"))
+def stale_timeout(monkeypatch, seconds):
+    monkeypatch.setattr(settings, "session_stale_timeout_minutes", seconds / 60)
+
+
+@given(parsers.parse('an active session "{session_id}" whose last event was 15 minutes ago'))
+def stale_active_session(client, session_id):
+    db = get_db()
+    db.execute(
+        "INSERT INTO sessions (session_id, status, started_at, last_event_at) VALUES (?, 'active', ?, ?)",
+        (session_id, _minutes_ago(20), _minutes_ago(15)),
+    )
+    db.commit()
+
+
+@when(parsers.parse('a deadline from 15 minutes ago for session "{session_id}" comes due'))
+def stale_deadline_due(context, session_id):
+    expiry = SessionExpiry()
+    expiry.touch(session_id, _minutes_ago(15))
+    with expiry._cond:
+        due = expiry._due()
+    assert due == [session_id]
+    expiry._expire(due)
+    context["expiry"] = expiry
+
+
+@when(parsers.parse('another writer holds the database write lock with an uncommitted session "{session_id}"'))
+def writer_holds_lock(context, session_id):
+    write_lock.acquire()
+    context["writer_locked"] = True
+    get_db().execute(
+        "INSERT INTO sessions (session_id, status, started_at) VALUES (?, 'active', ?)",
+        (session_id, _minutes_ago(0)),
+    )
+
+
+@when(parsers.parse('the deadline for session "{session_id}" comes due meanwhile'))
+def deadline_due_meanwhile(context, session_id):
+    expiry = SessionExpiry()
+    thread = threading.Thread(target=expiry._expire, args=([session_id],))
+    thread.start()
+    thread.join(0.5)
+    # Still waiting for the write lock, nothing of the writer's committed
+    assert thread.is_alive()
+    context["expiry_thread"] = thread
+
+
+@when("the other writer rolls back")
+def writer_rolls_back(context):
+    get_db().rollback()
+    write_lock.release()
+    context["writer_locked"] = False
+    context["expiry_thread"].join(5)
+
+
+@pytest.fixture(autouse=True)
+def _release_write_lock(context):
+    yield
+    if context.get("writer_locked"):
+        get_db().rollback()
+        write_lock.release()
+
+
+@when("the session deadlines are rebuilt")
+def rebuild_deadlines():
+    assert session_expiry.rebuild() >= 1
+
+
+@when(parsers.parse('I post a SessionEnd event for session "{session_id}"'))
+def post_session_end(client, session_id):
+    resp = client.post("/api/events", json={"session_id": session_id, "hook_event_name": "SessionEnd"})
+    assert resp.status_code == 200
+    time.sleep(0.2)
+
+
+@then(parsers.parse('session "{session_id}" should end within {seconds:d} seconds'))
+def session_ends(context, session_id, seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        row = _session(session_id)
+        if row["status"] == "ended":
+            context["session"] = row
+            return
+        time.sleep(0.1)
+    raise AssertionError(f"session {session_id} still active after {seconds}s")
+
+
+@then("its ended_at should be its last event time")
+def ended_at_last_event(context):
+    assert context["session"]["ended_at"] == context["session"]["last_event_at"]
+
+
+@then(parsers.parse("the reaper should have expired {count:d} session"))
+def reaper_expired(client, count):
+    metrics = client.get("/api/admin/reaper").json()
+    assert metrics["expired"] == count
+    assert metrics["batches"] >= 1
+
+
+@then(parsers.parse('the deadline of session "{session_id}" should have been re-armed'))
+def deadline_rearmed(context, session_id):
+    expiry = context["expiry"]
+    assert expiry.rearmed == 1
+    assert expiry.expired == 0
+    assert expiry.metrics()["tracked_sessions"] == 1
+
+
+@then(parsers.parse("the reaper should track {count:d} sessions"))
+def reaper_tracks(client, count):
+    assert client.get("/api/admin/reaper").json()["tracked_sessions"] == count
+
+
+@then(parsers.parse('session "{session_id}" should still be active'))
+def session_active(session_id):
+    assert _session(session_id)["status"] == "active"
+
+
+@then(parsers.parse('session "{session_id}" should not exist'))
+def session_missing(session_id):
+    assert _session(session_id) is None
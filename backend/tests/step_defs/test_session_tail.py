@@ -0,0 +1,126 @@
+"""Step definitions for session_tail.feature."""
+
+import json
+import time
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor.config import settings
+from ai_monitor.services.session_tail import TailSubscriber, tail_hub
+
+scenarios("../features/session_tail.feature")
+
+
+@pytest.fixture
+def tail_subscribers(monkeypatch):
+    monkeypatch.setattr(settings, "tail_coalesce_seconds", settings.tail_coalesce_seconds)
+    created = []
+    yield created
+    for subscriber in created:
+        tail_hub.unsubscribe(subscriber)
+
+
+@pytest.fixture
+def tail_socket():
+    opened = {}
+    yield opened
+    if "context" in opened:
+        opened["context"].__exit__(None, None, None)
+
+
+def _post(client, session_id, hook_event, tool):
+    resp = client.post("/api/events", json={
+        "session_id": session_id,
+        "hook_event_name": hook_event,
+        "tool_name": tool,
+    })
+    assert resp.status_code == 200
+
+
+def _topic(client, session_id):
+    metrics = client.get("/api/admin/tail").json()
+    return next(t for t in metrics["topics"] if t["session_id"] == session_id)
+
+
+@given(parsers.parse("the tail coalescing window is {seconds:f} seconds"))
+def coalescing_window(tail_subscribers, seconds):
+    settings.tail_coalesce_seconds = seconds
+
+
+@given(parsers.parse('{count:d} tail subscribers for session "{session_id}"'))
+def tail_subscribers_for(tail_subscribers, count, session_id):
+    for _ in range(count):
+        tail_subscribers.append(tail_hub.subscribe(TailSubscriber(session_id)))
+
+
+@given(parsers.parse('a tail subscriber for session "{session_id}" with a queue of {size:d}'))
+def bounded_tail_subscriber(tail_subscribers, session_id, size):
+    tail_subscribers.append(tail_hub.subscribe(TailSubscriber(session_id, maxlen=size)))
+
+
+@when(parsers.parse('I post a PreToolUse and a PostToolUse event for session "{session_id}" with tool "{tool}"'))
+def post_burst(client, session_id, tool):
+    _post(client, session_id, "PreToolUse", tool)
+    _post(client, session_id, "PostToolUse", tool)
+    time.sleep(settings.tail_coalesce_seconds + 0.3)
+
+
+@when(parsers.parse('I post a {hook_event} event for session "{session_id}" with tool "{tool}" and wait'))
+def post_and_wait(client, hook_event, session_id, tool):
+    _post(client, session_id, hook_event, tool)
+    time.sleep(settings.tail_coalesce_seconds + 0.2)
+
+
+@then(parsers.parse("every tail subscriber should have received {deltas:d} delta with {tool_calls:d} tool call"))
+def every_subscriber_received(tail_subscribers, deltas, tool_calls):
+    payloads = [subscriber.drain() for subscriber in tail_subscribers]
+    # The very same serialized update goes to every viewer
+    assert all(p == payloads[0] for p in payloads)
+    messages = [json.loads(p) for p in payloads[0]]
+    assert [m["type"] for m in messages] == ["delta"] * deltas
+    assert len(messages[0]["tool_calls"]) == tool_calls
+    assert messages[0]["tool_calls"][0]["status"] == "success"
+
+
+@then(parsers.parse('the tail metrics for session "{session_id}" should show {subscribers:d} subscribers, {updates:d} update and {queries:d} query'))
+def tail_metrics_counts(client, session_id, subscribers, updates, queries):
+    topic = _topic(client, session_id)
+    assert topic["subscriber_count"] == subscribers
+    assert topic["updates"] == updates
+    assert topic["queries"] == queries
+    assert all(s["lag_seq"] == 0 for s in topic["subscribers"])
+
+
+@then(parsers.parse('the tail subscriber should have received "{expected}"'))
+def tail_subscriber_received(tail_subscribers, expected):
+    messages = [json.loads(p) for p in tail_subscribers[0].drain()]
+    assert [m["type"] for m in messages] == expected.split(",")
+
+
+@then(parsers.parse('the tail metrics for session "{session_id}" should show {resyncs:d} resync'))
+def tail_metrics_resyncs(client, session_id, resyncs):
+    assert _topic(client, session_id)["subscribers"][0]["resyncs"] == resyncs
+
+
+@when(parsers.parse('I open a tail WebSocket for session "{session_id}" since sequence {since:d}'))
+def open_tail_socket(client, tail_subscribers, tail_socket, session_id, since):
+    context = client.websocket_connect(f"/api/sessions/{session_id}/tail?since={since}")
+    tail_socket["ws"] = context.__enter__()
+    tail_socket["context"] = context
+
+
+@then(parsers.parse('the first tail message should be a delta holding session "{session_id}"'))
+def first_tail_message(tail_socket, session_id):
+    message = tail_socket["ws"].receive_json()
+    assert message["type"] == "delta"
+    assert message["from_seq"] == 0
+    assert [s["session_id"] for s in message["sessions"]] == [session_id]
+
+
+@then(parsers.parse('a tool call posted for session "{session_id}" should arrive over the WebSocket'))
+def tool_call_over_socket(client, tail_socket, session_id):
+    _post(client, session_id, "PreToolUse", "Bash")
+    message = tail_socket["ws"].receive_json()
+    assert message["type"] == "delta"
+    assert [tc["tool_name"] for tc in message["tool_calls"]] == ["Bash"]
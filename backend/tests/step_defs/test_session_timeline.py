@@ -9,27 +9,6 @@ from pytest_bdd import given, when, then, scenarios, parsers
 scenarios("../features/session_timeline.feature")
 
 
-@given(parsers.parse("a tool call with input for session \"{session_id}\" with tool \"{tool}\" and input '{tool_input}'"))
-def tool_call_with_input(client, session_id, tool, tool_input):
-    input_data = json.loads(tool_input)
-    resp = client.post("/api/events", json={
-        "session_id": session_id,
-        "hook_event_name": "PreToolUse",
-        "tool_name": tool,
-        "tool_input": input_data,
-    })
-    assert resp.status_code == 200
-    time.sleep(0.2)
-    resp = client.post("/api/events", json={
-        "session_id": session_id,
-        "hook_event_name": "PostToolUse",
-        "tool_name": tool,
-        "tool_response": "ok",
-    })
-    assert resp.status_code == 200
-    time.sleep(0.2)
-
-
 @given(parsers.parse('an agent "{agent}" is started for session "{session_id}"'))
 def agent_started(client, session_id, agent):
     resp = client.post("/api/events", json={
@@ -46,7 +25,37 @@ def agent_started(client, session_id, agent):
 def request_timeline(client, session_id):
     resp = client.get(f"/api/sessions/{session_id}/timeline")
     assert resp.status_code == 200
-    pytest.timeline_response = resp.json()
+    pytest.timeline_response = resp.json()["items"]
+
+
+@when(parsers.parse('I request the full timeline for session "{session_id}"'))
+def request_full_timeline(client, session_id):
+    resp = client.get(f"/api/sessions/{session_id}/timeline", params={"fields": "full"})
+    assert resp.status_code == 200
+    pytest.timeline_response = resp.json()["items"]
+
+
+@when(parsers.parse('I page through the timeline for session "{session_id}" {limit:d} events at a time'))
+def page_timeline(client, session_id, limit):
+    pages = []
+    params = {"limit": limit}
+    while True:
+        resp = client.get(f"/api/sessions/{session_id}/timeline", params=params)
+        assert resp.status_code == 200
+        page = resp.json()
+        pages.append(page["items"])
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+    pytest.timeline_pages = pages
+
+
+@when("I request the first timeline tool call")
+def request_first_tool_call(client):
+    tool_call_id = pytest.timeline_response[0]["tool_call"]["id"]
+    resp = client.get(f"/api/tool_calls/{tool_call_id}")
+    assert resp.status_code == 200
+    pytest.tool_call_response = resp.json()
 
 
 @then(parsers.parse("the timeline should contain {count:d} events"))
@@ -66,6 +75,39 @@ def first_event_has_tool_input():
     assert event["tool_call"]["tool_input"] is not None
 
 
+@then(parsers.parse('the first timeline event should have input summary "{summary}"'))
+def first_event_has_input_summary(summary):
+    event = pytest.timeline_response[0]
+    assert event["tool_call"]["input_summary"].strip() == summary
+
+
+@then("the first timeline event should not include payloads")
+def first_event_has_no_payloads():
+    event = pytest.timeline_response[0]
+    assert event["tool_call"]["tool_input"] is None
+    assert event["tool_call"]["tool_response"] is None
+
+
+@then(parsers.parse("the timeline pages should contain {first:d} and {second:d} events"))
+def timeline_page_sizes(first, second):
+    assert [len(p) for p in pytest.timeline_pages] == [first, second]
+
+
+@then(parsers.parse('the paged timeline should list "{a}", "{b}", "{c}" in order'))
+def paged_timeline_order(a, b, c):
+    names = [
+        ev["tool_call"]["tool_name"] if ev["type"] == "tool_call" else ev["agent"]["agent_name"]
+        for page in pytest.timeline_pages
+        for ev in page
+    ]
+    assert names == [a, b, c], names
+
+
+@then("the tool call should have tool_input data")
+def tool_call_has_input():
+    assert pytest.tool_call_response["tool_input"] is not None
+
+
 @then(parsers.parse('the first timeline event should have error "{error}"'))
 def first_event_has_error(error):
     event = pytest.timeline_response[0]
@@ -60,3 +60,21 @@ def response_has_tool_calls(count):
 def response_includes_tool(tool):
     tools = [tc["tool_name"] for tc in pytest.session_detail["tool_calls"]]
     assert tool in tools, f"Tool '{tool}' not in {tools}"
+
+
+@then(parsers.parse('the first tool call should have an input preview containing "{text}"'))
+def first_tool_call_preview(text):
+    tc = pytest.session_detail["tool_calls"][0]
+    assert text in tc["tool_input_preview"]
+
+
+@then(parsers.parse("the first tool call should report an input size of {size:d} bytes"))
+def first_tool_call_input_size(size):
+    assert pytest.session_detail["tool_calls"][0]["tool_input_size"] == size
+
+
+@then("the first tool call should not include payloads")
+def first_tool_call_has_no_payloads():
+    tc = pytest.session_detail["tool_calls"][0]
+    assert tc["tool_input"] is None
+    assert tc["tool_response"] is None
@@ -0,0 +1,50 @@
+"""Step definitions for tool_payload.feature."""
+
+import pytest
+from pytest_bdd import when, then, scenarios, parsers
+
+from ai_monitor.db import get_db
+
+scenarios("../features/tool_payload.feature")
+
+
+def _latest_tool_call_id(session_id):
+    row = get_db().execute(
+        "SELECT id FROM tool_calls WHERE session_id = ? ORDER BY id DESC LIMIT 1",
+        (session_id,),
+    ).fetchone()
+    assert row is not None, f"No tool call for session '{session_id}'"
+    return row["id"]
+
+
+@when(parsers.parse('I request the input payload of the latest tool call in session "{session_id}"'))
+def request_payload(client, session_id):
+    tool_call_id = _latest_tool_call_id(session_id)
+    pytest.payload_response = client.get(
+        f"/api/tool_calls/{tool_call_id}/payload", params={"part": "input"}
+    )
+
+
+@when(parsers.parse('I request bytes "{byte_range}" of the input payload of the latest tool call in session "{session_id}"'))
+def request_payload_range(client, byte_range, session_id):
+    tool_call_id = _latest_tool_call_id(session_id)
+    pytest.payload_response = client.get(
+        f"/api/tool_calls/{tool_call_id}/payload",
+        params={"part": "input"},
+        headers={"Range": f"bytes={byte_range}"},
+    )
+
+
+@then(parsers.parse("the payload response status should be {status:d}"))
+def payload_status(status):
+    assert pytest.payload_response.status_code == status
+
+
+@then(parsers.parse("the payload body should be '{body}'"))
+def payload_body(body):
+    assert pytest.payload_response.text == body
+
+
+@then(parsers.parse('the payload Content-Range should be "{content_range}"'))
+def payload_content_range(content_range):
+    assert pytest.payload_response.headers["content-range"] == content_range
@@ -0,0 +1,152 @@
+"""Step definitions for transcript_tail.feature."""
+
+import json
+import os
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor.db import get_db
+from ai_monitor.services.transcript_parser import parse_transcript, scan_transcripts_dir
+
+scenarios("../features/transcript_tail.feature")
+
+
+@pytest.fixture
+def transcript(tmp_path):
+    return {"path": str(tmp_path / "transcript.jsonl")}
+
+
+def _line(session_id, input_tokens, output_tokens):
+    return json.dumps({
+        "sessionId": session_id,
+        "costTracker": {"claude-sonnet-4-5": {"inputTokens": input_tokens, "outputTokens": output_tokens}},
+    }) + "\n"
+
+
+@given(parsers.parse('a transcript for session "{session_id}" with usage {inp:d} in and {out:d} out'))
+def write_transcript(transcript, session_id, inp, out):
+    transcript["session_id"] = session_id
+    with open(transcript["path"], "w") as f:
+        f.write(_line(session_id, inp, out))
+
+
+@when("the transcript is parsed")
+def parse(transcript):
+    parse_transcript(transcript["path"])
+
+
+@when(parsers.parse("usage {inp:d} in and {out:d} out is appended to the transcript"))
+def append_usage(transcript, inp, out):
+    with open(transcript["path"], "a") as f:
+        f.write(_line(transcript["session_id"], inp, out))
+
+
+@when(parsers.parse("half a line with usage {inp:d} in and {out:d} out is appended to the transcript"))
+def append_partial(transcript, inp, out):
+    line = _line(transcript["session_id"], inp, out)
+    transcript["rest"] = line[len(line) // 2:]
+    with open(transcript["path"], "a") as f:
+        f.write(line[:len(line) // 2])
+
+
+@when("the rest of the line is appended to the transcript")
+def append_rest(transcript):
+    with open(transcript["path"], "a") as f:
+        f.write(transcript["rest"])
+
+
+@when(parsers.parse("the transcript is truncated and rewritten with usage {inp:d} in and {out:d} out"))
+def truncate(transcript, inp, out):
+    with open(transcript["path"], "w") as f:
+        f.write(_line(transcript["session_id"], inp, out))
+
+
+@when(parsers.parse(
+    "the transcript is rewritten in place with usage {inp1:d} in and {out1:d} out and {inp2:d} in and {out2:d} out"
+))
+def rewrite_in_place(transcript, inp1, out1, inp2, out2):
+    inode = os.stat(transcript["path"]).st_ino
+    with open(transcript["path"], "r+") as f:
+        f.write(_line(transcript["session_id"], inp1, out1))
+        f.write(_line(transcript["session_id"], inp2, out2))
+    assert os.stat(transcript["path"]).st_ino == inode
+
+
+@then(parsers.parse('session "{session_id}" should have {inp:d} input and {out:d} output tokens'))
+def session_tokens(client, session_id, inp, out):
+    data = client.get(f"/api/sessions/{session_id}").json()
+    assert data["input_tokens"] == inp
+    assert data["output_tokens"] == out
+
+
+@then("the saved offset should be the end of the transcript")
+def offset_at_end(transcript):
+    row = get_db().execute(
+        "SELECT offset, size FROM transcript_files WHERE path = ?", (transcript["path"],)
+    ).fetchone()
+    assert row["offset"] == row["size"] == os.path.getsize(transcript["path"])
+
+
+@pytest.fixture
+def projects(tmp_path):
+    return {"dir": tmp_path / "projects", "files": []}
+
+
+@given(parsers.parse("a projects directory with {count:d} transcripts"))
+def projects_directory(client, projects, count):
+    db = get_db()
+    for i in range(count):
+        session_id = f"scan-{i}"
+        db.execute("INSERT INTO sessions (session_id) VALUES (?)", (session_id,))
+        folder = projects["dir"] / f"project-{i % 4}"
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"{session_id}.jsonl"
+        path.write_text(_line(session_id, 100 + i, 10 + i))
+        projects["files"].append((session_id, path))
+    db.commit()
+
+
+@when("the projects directory is scanned")
+@when("the projects directory is scanned again")
+def scan_projects(projects):
+    projects["counts"] = scan_transcripts_dir(str(projects["dir"]), workers=1)
+
+
+@when(parsers.parse("the projects directory is scanned with {workers:d} workers"))
+def scan_projects_pool(projects, workers):
+    projects["counts"] = scan_transcripts_dir(str(projects["dir"]), workers=workers)
+
+
+@when(parsers.parse("usage {inp:d} in and {out:d} out is appended to transcript {index:d}"))
+def append_to_project_transcript(projects, inp, out, index):
+    session_id, path = projects["files"][index - 1]
+    with open(path, "a") as f:
+        f.write(_line(session_id, inp, out))
+
+
+@then(parsers.parse("the last scan should have skipped {skipped:d} and scanned {scanned:d} transcripts"))
+def last_scan_counts(projects, skipped, scanned):
+    assert projects["counts"]["skipped"] == skipped
+    assert projects["counts"]["scanned"] == scanned
+
+
+@then("every transcript session should have its usage applied")
+def usage_applied(projects):
+    assert projects["counts"]["scanned"] == len(projects["files"])
+    rows = get_db().execute(
+        "SELECT session_id, input_tokens, output_tokens FROM sessions WHERE session_id LIKE 'scan-%'"
+    ).fetchall()
+    usage = {r["session_id"]: (r["input_tokens"], r["output_tokens"]) for r in rows}
+    assert usage == {f"scan-{i}": (100 + i, 10 + i) for i in range(len(projects["files"]))}
+
+
+@given(parsers.parse('a transcript for session "{session_id}" whose first lines only mention the keys in nested content'))
+def write_nested_transcript(transcript, session_id):
+    transcript["session_id"] = session_id
+    nested = {"message": {"sessionId": "someone-else", "costTracker": {"m": {"inputTokens": 999}}}}
+    with open(transcript["path"], "w") as f:
+        f.write(json.dumps(nested) + "\n")
+        f.write('{"text": "a line mentioning \\"costTracker\\" and \\"sessionId\\" in a string"}\n')
+        f.write("not json at all\n")
+        f.write(_line(session_id, 40, 4))
@@ -0,0 +1,151 @@
+"""Step definitions for usage_ledger.feature."""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pytest_bdd import given, when, then, scenarios, parsers
+
+from ai_monitor.services.transcript_parser import parse_transcript
+
+scenarios("../features/usage_ledger.feature")
+
+SONNET = "claude-sonnet-4-5"
+OPUS = "claude-opus-4-1"
+
+
+@pytest.fixture
+def transcript(tmp_path):
+    return {"path": str(tmp_path / "transcript.jsonl")}
+
+
+def _hours_ago(hours):
+    # The middle of the hour, so a scenario running across an hour boundary still agrees
+    hour = datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0)
+    return (hour - timedelta(hours=hours)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _turn(session_id, hours, usage):
+    return json.dumps({
+        "sessionId": session_id,
+        "timestamp": _hours_ago(hours),
+        "costTracker": {model: {"inputTokens": n, "outputTokens": 0} for model, n in usage.items()},
+    }) + "\n"
+
+
+@given(parsers.parse(
+    'a transcript for session "{session_id}" with a turn {hours:d} hours ago '
+    "using {sonnet:d} sonnet and {opus:d} opus input tokens"
+))
+def write_transcript(transcript, session_id, hours, sonnet, opus):
+    transcript["session_id"] = session_id
+    with open(transcript["path"], "w") as f:
+        f.write(_turn(session_id, hours, {SONNET: sonnet, OPUS: opus}))
+
+
+@given(parsers.parse(
+    'a subagent transcript for session "{session_id}" with a turn {hours:d} hours ago '
+    "using {sonnet:d} sonnet input tokens"
+))
+def write_subagent_transcript(tmp_path, transcript, session_id, hours, sonnet):
+    # Subagents log to a transcript of their own under the parent's sessionId
+    (tmp_path / "subagents").mkdir()
+    transcript["subagent_path"] = str(tmp_path / "subagents" / "agent-1.jsonl")
+    with open(transcript["subagent_path"], "w") as f:
+        f.write(_turn(session_id, hours, {SONNET: sonnet}))
+
+
+@when("the transcript is parsed")
+def parse(transcript):
+    parse_transcript(transcript["path"])
+
+
+@when("both transcripts are parsed")
+def parse_both(transcript):
+    parse_transcript(transcript["path"])
+    parse_transcript(transcript["subagent_path"])
+
+
+@when(parsers.parse("the subagent transcript is rewritten with a turn {hours:d} hours ago using {sonnet:d} sonnet input tokens"))
+def rewrite_subagent(transcript, hours, sonnet):
+    with open(transcript["subagent_path"], "w") as f:
+        f.write(_turn(transcript["session_id"], hours, {SONNET: sonnet}))
+
+
+@when(parsers.parse("a turn {hours:d} hours ago using {sonnet:d} sonnet input tokens is appended"))
+def append_turn(transcript, hours, sonnet):
+    with open(transcript["path"], "a") as f:
+        f.write(_turn(transcript["session_id"], hours, {SONNET: sonnet}))
+
+
+@when(parsers.parse("the transcript is rewritten with a turn {hours:d} hours ago using {sonnet:d} sonnet input tokens"))
+def rewrite(transcript, hours, sonnet):
+    with open(transcript["path"], "w") as f:
+        f.write(_turn(transcript["session_id"], hours, {SONNET: sonnet}))
+
+
+@when(parsers.parse('the session "{session_id}" starts'))
+def session_starts(client, session_id):
+    resp = client.post("/api/events", json={
+        "session_id": session_id,
+        "hook_event_name": "SessionStart",
+        "cwd": f"/tmp/{session_id}",
+    })
+    assert resp.status_code == 200
+    time.sleep(0.2)
+
+
+def _ledger(client, session_id):
+    resp = client.get(f"/api/sessions/{session_id}/usage")
+    assert resp.status_code == 200
+    return resp.json()
+
+
+@then(parsers.parse('the usage ledger of session "{session_id}" should have {count:d} rows for turn {turn:d}'))
+def ledger_rows_for_turn(client, session_id, count, turn):
+    rows = [r for r in _ledger(client, session_id) if r["turn"] == turn]
+    assert len(rows) == count
+    assert {r["model"] for r in rows} == {SONNET, OPUS}
+
+
+@then(parsers.parse('the usage ledger of session "{session_id}" should have {count:d} rows'))
+def ledger_rows(client, session_id, count):
+    assert len(_ledger(client, session_id)) == count
+
+
+@then(parsers.parse('the usage ledger of session "{session_id}" should have turns {turns}'))
+def ledger_turns(client, session_id, turns):
+    expected = [int(t) for t in turns.split(",")]
+    assert sorted({r["turn"] for r in _ledger(client, session_id)}) == expected
+
+
+@then(parsers.parse('session "{session_id}" should have {inp:d} input tokens costing {cost:f}'))
+def session_cost(client, session_id, inp, cost):
+    data = client.get(f"/api/sessions/{session_id}").json()
+    assert data["input_tokens"] == inp
+    assert data["estimated_cost"] == pytest.approx(cost)
+
+
+@then(parsers.parse('session "{session_id}" should have {inp:d} input tokens'))
+def session_input(client, session_id, inp):
+    assert client.get(f"/api/sessions/{session_id}").json()["input_tokens"] == inp
+
+
+def _hourly(client, hours, by_model=False):
+    resp = client.get("/api/usage/hourly", params={"hours": hours, "by_model": by_model})
+    assert resp.status_code == 200
+    return resp.json()
+
+
+@then(parsers.parse("hourly usage over {hours:d} hours should be {counts}"))
+def hourly_usage(client, hours, counts):
+    expected = [int(n) for n in counts.removesuffix(" input tokens").split(" then ")]
+    assert [h["input_tokens"] for h in _hourly(client, hours)] == expected
+
+
+@then(parsers.parse("hourly sonnet usage over {hours:d} hours should be {counts}"))
+def hourly_sonnet_usage(client, hours, counts):
+    expected = [int(n) for n in counts.removesuffix(" input tokens").split(" then ")]
+    rows = [h for h in _hourly(client, hours, by_model=True) if h["model"] == SONNET]
+    assert [h["input_tokens"] for h in rows] == expected
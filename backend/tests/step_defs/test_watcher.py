@@ -0,0 +1,350 @@
+"""Step definitions for watcher.feature."""
+
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from pytest_bdd import given, when, then, scenarios, parsers
+from watchdog.observers import Observer
+
+from ai_monitor.config import settings
+from ai_monitor.db import get_db
+from ai_monitor.main import app
+from ai_monitor.models import HookEvent
+from ai_monitor.services.event_processor import process_event
+from ai_monitor.services.transcript_parser import parse_transcript
+from ai_monitor.watcher import ParseScheduler, WatchSet
+
+scenarios("../features/watcher.feature")
+
+
+@pytest.fixture
+def ctx():
+    state = {"calls": [], "active": set(), "overlap": False, "rescans": 0}
+    yield state
+    if "scheduler" in state:
+        state["scheduler"].stop()
+
+
+def _wait_idle(scheduler, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        metrics = scheduler.metrics()
+        if metrics["queue_depth"] == 0 and metrics["running"] == 0:
+            return
+        time.sleep(0.02)
+    raise AssertionError("scheduler did not drain")
+
+
+@given(parsers.parse("a parse scheduler with a {seconds:f} second coalescing window"))
+def coalescing_scheduler(ctx, seconds):
+    def parse(path):
+        ctx["calls"].append(path)
+        parse_transcript(path)
+
+    ctx["scheduler"] = ParseScheduler(parse=parse, workers=1, coalesce_seconds=seconds, max_delay_seconds=5.0)
+    ctx["scheduler"].start()
+
+
+@given("a parse scheduler with 2 workers and a slow parser")
+def slow_scheduler(ctx):
+    lock = threading.Lock()
+
+    def parse(path):
+        with lock:
+            if path in ctx["active"]:
+                ctx["overlap"] = True
+            ctx["active"].add(path)
+        ctx["calls"].append(path)
+        time.sleep(0.3)
+        with lock:
+            ctx["active"].discard(path)
+
+    ctx["scheduler"] = ParseScheduler(parse=parse, workers=2, coalesce_seconds=0.01, max_delay_seconds=1.0)
+    ctx["scheduler"].start()
+
+
+@given(parsers.parse("a parse scheduler holding at most {size:d} pending files"))
+def bounded_scheduler(ctx, size):
+    def rescan():
+        ctx["rescans"] += 1
+
+    ctx["scheduler"] = ParseScheduler(
+        parse=lambda path: None, rescan=rescan, workers=1,
+        coalesce_seconds=0.2, max_delay_seconds=1.0, max_pending=size,
+    )
+    ctx["scheduler"].start()
+
+
+@given(parsers.parse("a parse scheduler with {workers:d} workers parsing transcripts"))
+def parallel_scheduler(ctx, workers):
+    ctx["scheduler"] = ParseScheduler(
+        parse=parse_transcript, workers=workers, coalesce_seconds=0.0, max_delay_seconds=0.0,
+    )
+    ctx["scheduler"].start()
+
+
+@when(parsers.parse("{files:d} transcripts grow and are parsed while {events:d} hook events are ingested"))
+def parse_while_ingesting(ctx, tmp_path, files, events):
+    sessions = [f"mix-{n}" for n in range(files)]
+    for session_id in sessions:
+        process_event(HookEvent(session_id=session_id, hook_event_name="SessionStart", cwd="/tmp/mix"))
+
+    def ingest(worker):
+        for n in range(events // 4):
+            process_event(HookEvent(
+                session_id=sessions[(worker + n) % files], hook_event_name="PreToolUse", tool_name="Bash",
+            ))
+
+    ingesters = [threading.Thread(target=ingest, args=(w,)) for w in range(4)]
+    for thread in ingesters:
+        thread.start()
+    for _ in range(10):
+        for session_id in sessions:
+            path = str(tmp_path / f"{session_id}.jsonl")
+            with open(path, "a") as f:
+                f.write(json.dumps({
+                    "sessionId": session_id,
+                    "costTracker": {"claude-sonnet-4-5": {"inputTokens": 10, "outputTokens": 1}},
+                }) + "\n")
+            ctx["scheduler"].mark_dirty(path)
+        time.sleep(0.01)
+    for thread in ingesters:
+        thread.join()
+    time.sleep(0.1)
+    _wait_idle(ctx["scheduler"])
+    ctx["sessions"] = sessions
+
+
+@then("every transcript's session should have its tokens")
+def every_session_tokens(client, ctx):
+    assert ctx["scheduler"].metrics()["failed"] == 0
+    for session_id in ctx["sessions"]:
+        data = client.get(f"/api/sessions/{session_id}").json()
+        assert (data["input_tokens"], data["output_tokens"]) == (100, 10)
+
+
+@then(parsers.parse("{count:d} tool calls should have been ingested alongside"))
+def tool_calls_ingested(count):
+    assert get_db().execute("SELECT COUNT(*) FROM tool_calls").fetchone()[0] == count
+
+
+@when(parsers.parse('the transcript of session "{session_id}" gets {count:d} writes marked dirty in quick succession'))
+def burst_of_writes(ctx, tmp_path, session_id, count):
+    path = str(tmp_path / f"{session_id}.jsonl")
+    for _ in range(count):
+        with open(path, "a") as f:
+            f.write(json.dumps({
+                "sessionId": session_id,
+                "costTracker": {"claude-sonnet-4-5": {"inputTokens": 10, "outputTokens": 1}},
+            }) + "\n")
+        ctx["scheduler"].mark_dirty(path)
+        time.sleep(0.02)
+    time.sleep(0.3)
+    _wait_idle(ctx["scheduler"])
+
+
+@when("a file is marked dirty while it is being parsed")
+def dirty_during_parse(ctx):
+    scheduler = ctx["scheduler"]
+    scheduler.mark_dirty("/tmp/slow.jsonl")
+    time.sleep(0.1)
+    assert scheduler.metrics()["running"] == 1
+    scheduler.mark_dirty("/tmp/slow.jsonl")
+    time.sleep(0.1)
+    _wait_idle(scheduler)
+
+
+@when(parsers.parse("{count:d} different files are marked dirty"))
+def mark_different_files(ctx, count):
+    for n in range(count):
+        ctx["scheduler"].mark_dirty(f"/tmp/file-{n}.jsonl")
+    time.sleep(0.3)
+    _wait_idle(ctx["scheduler"])
+
+
+@when("I request the watcher metrics")
+def request_watcher_metrics(client, ctx):
+    ctx["response"] = client.get("/api/admin/watcher")
+
+
+@then(parsers.parse("the transcript should have been parsed {times:d} time"))
+def parsed_times(ctx, times):
+    assert len(ctx["calls"]) == times
+
+
+@then(parsers.parse('session "{session_id}" should have {inp:d} input and {out:d} output tokens from the watcher'))
+def watcher_tokens(client, session_id, inp, out):
+    data = client.get(f"/api/sessions/{session_id}").json()
+    assert (data["input_tokens"], data["output_tokens"]) == (inp, out)
+
+
+@then("the watcher metrics should show a queue depth of 0 and a parse latency")
+def watcher_metrics_after_parse(ctx):
+    metrics = ctx["scheduler"].metrics()
+    assert metrics["queue_depth"] == 0
+    assert metrics["parsed"] == 1
+    assert metrics["marked"] == 5
+    assert metrics["parse_ms_p50"] is not None
+    # Trailing edge: the wait covers the whole burst plus the quiet window
+    assert metrics["wait_ms_p50"] >= 200
+
+
+@then(parsers.parse("the file should have been parsed {times:d} times without overlap"))
+def parsed_without_overlap(ctx, times):
+    assert len(ctx["calls"]) == times
+    assert not ctx["overlap"]
+
+
+@then(parsers.parse("the scheduler should report {overflows:d} overflow and run {rescans:d} rescan"))
+def overflow_rescan(ctx, overflows, rescans):
+    metrics = ctx["scheduler"].metrics()
+    assert metrics["overflows"] == overflows
+    assert metrics["rescans"] == rescans
+    assert ctx["rescans"] == rescans
+    assert metrics["parsed"] == 2
+
+
+@then("the response should contain the queue depth and parse latency fields")
+def watcher_metrics_fields(ctx):
+    assert ctx["response"].status_code == 200
+    data = ctx["response"].json()
+    assert {"queue_depth", "running", "parse_ms_p50", "parse_ms_p95", "overflows"} <= data.keys()
+
+
+class _FailingObserver(Observer):
+    """A native observer out of watches (inotify ENOSPC)."""
+
+    def schedule(self, *args, **kwargs):
+        raise OSError(28, "inotify watch limit reached")
+
+
+@pytest.fixture
+def watch(tmp_path):
+    state = {"root": tmp_path / "projects", "marked": []}
+    yield state
+    if "watch_set" in state:
+        state["watch_set"].stop()
+    if "client" in state:
+        state["client"].__exit__(None, None, None)
+
+
+def _make_projects(watch, names):
+    for name in names.split(","):
+        (watch["root"] / name).mkdir(parents=True, exist_ok=True)
+
+
+def _watch_set(watch, **kwargs):
+    scheduler = ParseScheduler(parse=lambda path: None)
+    scheduler.mark_dirty = watch["marked"].append
+    watch["watch_set"] = WatchSet(scheduler, sweep_seconds=3600, **kwargs)
+    watch["watch_set"].start(str(watch["root"]))
+    return watch["watch_set"]
+
+
+def _usage_line(session_id, inp, out):
+    return json.dumps({
+        "sessionId": session_id,
+        "costTracker": {"claude-sonnet-4-5": {"inputTokens": inp, "outputTokens": out}},
+    }) + "\n"
+
+
+@given(parsers.parse('a projects directory with projects "{names}" watched by the server'))
+def server_watching_projects(watch, monkeypatch, names):
+    _make_projects(watch, names)
+    monkeypatch.setattr(settings, "claude_projects_dir", str(watch["root"]))
+    monkeypatch.setattr(settings, "watcher_coalesce_seconds", 0.05)
+    watch["client"] = TestClient(app, raise_server_exceptions=False).__enter__()
+
+
+@given(parsers.parse('a watch set over projects "{names}"'))
+def watch_set_over(watch, names):
+    _make_projects(watch, names)
+    _watch_set(watch)
+
+
+@given(parsers.parse('a watch set over projects "{names}" holding at most {size:d} hot directories'))
+def bounded_watch_set(watch, names, size):
+    _make_projects(watch, names)
+    _watch_set(watch, max_hot_dirs=size)
+
+
+@given(parsers.parse('a watch set over projects "{names}" whose native watches fail'))
+def failing_watch_set(watch, names):
+    _make_projects(watch, names)
+    _watch_set(watch, observer_factory=_FailingObserver)
+
+
+@when(parsers.parse('a hook event for session "{session_id}" names a transcript in project "{project}"'))
+def hook_event_with_transcript(watch, session_id, project):
+    watch["transcript"] = watch["root"] / project / f"{session_id}.jsonl"
+    watch["session_id"] = session_id
+    resp = watch["client"].post("/api/events", json={
+        "session_id": session_id,
+        "hook_event_name": "SessionStart",
+        "transcript_path": str(watch["transcript"]),
+    })
+    assert resp.status_code == 200
+
+
+@when(parsers.parse("usage {inp:d} in and {out:d} out is written to that transcript"))
+def write_hot_transcript(watch, inp, out):
+    time.sleep(0.2)
+    watch["transcript"].write_text(_usage_line(watch["session_id"], inp, out))
+
+
+@when(parsers.parse('a transcript in project "{project}" is written'))
+def write_cold_transcript(watch, project):
+    watch["transcript"] = watch["root"] / project / "cold.jsonl"
+    watch["transcript"].write_text(_usage_line("cold", 1, 1))
+
+
+@when("the watch set sweeps")
+def sweep(watch):
+    watch["watch_set"].sweep()
+
+
+@when(parsers.parse('projects "{names}" become active in that order'))
+def projects_become_active(watch, names):
+    for name in names.split(","):
+        watch["watch_set"].touch(str(watch["root"] / name))
+
+
+@then(parsers.parse("the watcher should have {count:d} hot directory"))
+def server_hot_dirs(watch, count):
+    assert watch["client"].get("/api/admin/watcher").json()["hot_dirs"] == count
+
+
+@then(parsers.parse('session "{session_id}" should reach {inp:d} input tokens from the watcher'))
+def session_reaches_tokens(watch, session_id, inp):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        data = watch["client"].get(f"/api/sessions/{session_id}").json()
+        if data["input_tokens"] == inp:
+            return
+        time.sleep(0.1)
+    raise AssertionError(f"session stuck at {data['input_tokens']} input tokens")
+
+
+@then(parsers.parse('the transcript in project "{project}" should be marked dirty'))
+def transcript_marked(watch, project):
+    assert watch["marked"] == [str(watch["transcript"])]
+
+
+@then(parsers.parse('the hot set should be "{names}"'))
+def hot_set(watch, names):
+    assert watch["watch_set"].hot_dirs() == [str(watch["root"] / n) for n in names.split(",")]
+
+
+@then(parsers.parse("the watch set should report {count:d} eviction"))
+def evictions(watch, count):
+    assert watch["watch_set"].metrics()["evictions"] == count
+
+
+@then("the watch set should be polling")
+def polling(watch):
+    metrics = watch["watch_set"].metrics()
+    assert metrics["polling"] is True
+    assert metrics["observer"] == "PollingObserver"
@@ -8,7 +8,7 @@ import ProjectDetailPage from "./pages/ProjectDetail.tsx";
 import { useAutoRefresh } from "./hooks/useAutoRefresh.ts";
 
 export default function App() {
-  const { enabled, setEnabled, lastUpdated } = useAutoRefresh();
+  const { enabled, setEnabled, connected, lastUpdated } = useAutoRefresh();
 
   return (
     <div className="flex h-screen bg-background">
@@ -17,6 +17,7 @@ export default function App() {
         <Header
           autoRefresh={enabled}
           onAutoRefreshToggle={setEnabled}
+          connected={connected}
           lastUpdated={lastUpdated}
         />
         <main className="flex-1 overflow-y-auto p-6">
@@ -1,12 +1,12 @@
 import { useLocation } from "react-router-dom";
 import { RefreshCw, Wifi, WifiOff } from "lucide-react";
-import { useEffect, useState } from "react";
 import { Button } from "@/components/ui/button.tsx";
 import { cn } from "@/lib/utils.ts";
 
 interface HeaderProps {
   autoRefresh: boolean;
   onAutoRefreshToggle: (enabled: boolean) => void;
+  connected: boolean;
   lastUpdated: Date;
 }
 
@@ -19,28 +19,10 @@ const titles: Record<string, string> = {
 export function Header({
   autoRefresh,
   onAutoRefreshToggle,
+  connected,
   lastUpdated,
 }: HeaderProps) {
   const location = useLocation();
-  const [connected, setConnected] = useState(false);
-
-  useEffect(() => {
-    let cancelled = false;
-    const check = async () => {
-      try {
-        const res = await fetch("/api/health");
-        if (!cancelled) setConnected(res.ok);
-      } catch {
-        if (!cancelled) setConnected(false);
-      }
-    };
-    check();
-    const timer = setInterval(check, 10000);
-    return () => {
-      cancelled = true;
-      clearInterval(timer);
-    };
-  }, []);
 
   const title =
     titles[location.pathname] ||
@@ -15,7 +15,6 @@ import {
   XCircle,
 } from "lucide-react";
 import type { SessionDetail as SessionDetailType, TimelineEvent, ToolCall } from "@/lib/api.ts";
-import { fetchTimeline } from "@/lib/api.ts";
 import {
   formatTokens,
   formatCost,
@@ -23,7 +22,7 @@ import {
   formatDuration,
   formatSessionOffset,
 } from "@/lib/utils.ts";
-import { usePollingData } from "@/hooks/useAutoRefresh.ts";
+import { useSessionTimeline } from "@/hooks/useSessionTimeline.ts";
 import { DetailPanel } from "./DetailPanel.tsx";
 import { TimelineBurstGroup } from "./TimelineBurstGroup.tsx";
 import { TimelinePhase } from "./TimelinePhase.tsx";
@@ -54,10 +53,7 @@ export function SessionDetail({ session, onBack }: Props) {
   const [showErrorsOnly, setShowErrorsOnly] = useState(false);
   const scrollRef = useRef<HTMLDivElement>(null);
 
-  const { data: timeline } = usePollingData<TimelineEvent[]>(
-    () => fetchTimeline(session.session_id),
-    [session.session_id]
-  );
+  const timeline = useSessionTimeline(session.session_id);
 
   // Reverse the timeline so newest events come first
   const reversedTimeline = useMemo(() => {
@@ -93,10 +89,11 @@ export function SessionDetail({ session, onBack }: Props) {
         if (ev.type === "tool_call" && ev.tool_call) {
           const tc = ev.tool_call;
           if (tc.tool_name.toLowerCase().includes(q)) return true;
-          // Also search tool_input for file paths etc.
-          const inputStr = typeof tc.tool_input === "string"
-            ? tc.tool_input
-            : JSON.stringify(tc.tool_input ?? "");
+          // Also search the input summary for file paths, commands etc.
+          const inputStr = tc.input_summary
+            ?? (typeof tc.tool_input === "string"
+              ? tc.tool_input
+              : JSON.stringify(tc.tool_input ?? ""));
           return inputStr.toLowerCase().includes(q);
         }
         if (ev.type === "agent" && ev.agent) {
@@ -212,7 +209,14 @@ export function SessionDetail({ session, onBack }: Props) {
         <StatCard label="Tokens In" value={formatTokens(session.input_tokens)} />
         <StatCard label="Tokens Out" value={formatTokens(session.output_tokens)} />
         <StatCard label="Cost" value={formatCost(session.estimated_cost)} />
-        <StatCard label="Tool Calls" value={String(session.tool_call_count)} />
+        <StatCard
+          label="Tool Calls"
+          value={String(
+            timeline
+              ? timeline.filter((ev) => ev.type === "tool_call").length
+              : session.tool_call_count
+          )}
+        />
       </div>
 
       {/* Tabs */}
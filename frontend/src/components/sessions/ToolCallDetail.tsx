@@ -1,8 +1,9 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { Badge } from "@/components/ui/badge.tsx";
 import { CheckCircle2, XCircle, Clock, Copy, Check, Code2 } from "lucide-react";
 import { Button } from "@/components/ui/button.tsx";
 import type { ToolCall } from "@/lib/api.ts";
+import { fetchToolCall } from "@/lib/api.ts";
 import { relativeTime } from "@/lib/utils.ts";
 import { getToolRenderer } from "./toolRenderers.tsx";
 
@@ -55,9 +56,29 @@ function JsonBlock({ label, data }: { label: string; data: unknown }) {
   );
 }
 
-export function ToolCallDetail({ toolCall: tc }: Props) {
+export function ToolCallDetail({ toolCall }: Props) {
   const [showRaw, setShowRaw] = useState(false);
-  const Renderer = getToolRenderer(tc.tool_name);
+  const [full, setFull] = useState<ToolCall | null>(null);
+  const Renderer = getToolRenderer(toolCall.tool_name);
+
+  // Timeline summaries omit payloads — load them on demand
+  const needsPayload =
+    toolCall.id != null && toolCall.tool_input == null && toolCall.tool_response == null;
+  useEffect(() => {
+    setFull(null);
+    if (!needsPayload || toolCall.id == null) return;
+    let cancelled = false;
+    fetchToolCall(toolCall.id)
+      .then((result) => {
+        if (!cancelled) setFull(result);
+      })
+      .catch(() => {});
+    return () => {
+      cancelled = true;
+    };
+  }, [toolCall.id, toolCall.status, needsPayload]);
+
+  const tc = full ?? toolCall;
 
   return (
     <div className="space-y-3">
@@ -1,34 +1,84 @@
-import { useState, useEffect, useCallback } from "react";
+import { useState, useEffect, useCallback, useRef } from "react";
+import type { ChangeNotification } from "@/lib/api.ts";
 
-const REFRESH_INTERVAL = 5000;
+const STREAM_URL = "/api/stream";
+// Bursts of notifications (e.g. a tool call start + stats delta) are
+// coalesced into a single refetch per listener.
+const REFETCH_DELAY = 300;
+
+export type ChangeFilter = (change: ChangeNotification) => boolean;
 
 export function useAutoRefresh() {
   const [enabled, setEnabled] = useState(true);
+  const [connected, setConnected] = useState(false);
   const [lastUpdated, setLastUpdated] = useState<Date>(new Date());
 
   useEffect(() => {
-    if (!enabled) return;
-    const timer = setInterval(() => {
+    if (!enabled) {
+      setConnected(false);
+      return;
+    }
+    const source = new EventSource(STREAM_URL);
+    let dropped = false;
+
+    source.onopen = () => {
+      setConnected(true);
+      // Anything may have changed while disconnected
+      if (dropped) {
+        dropped = false;
+        dispatchChange({ type: "resync" });
+      }
+    };
+    source.onerror = () => {
+      setConnected(false);
+      dropped = true;
+    };
+    source.onmessage = (message) => {
       setLastUpdated(new Date());
-      window.dispatchEvent(new CustomEvent("ai-monitor-refresh"));
-    }, REFRESH_INTERVAL);
-    return () => clearInterval(timer);
+      dispatchChange(JSON.parse(message.data) as ChangeNotification);
+    };
+    source.addEventListener("heartbeat", () => setConnected(true));
+
+    return () => source.close();
   }, [enabled]);
 
-  return { enabled, setEnabled, lastUpdated };
+  return { enabled, setEnabled, connected, lastUpdated };
 }
 
-export function useRefreshListener(callback: () => void) {
+function dispatchChange(change: ChangeNotification) {
+  window.dispatchEvent(new CustomEvent<ChangeNotification>("ai-monitor-refresh", { detail: change }));
+}
+
+export function useRefreshListener(callback: () => void, filter?: ChangeFilter) {
+  const filterRef = useRef(filter);
+  filterRef.current = filter;
+
   useEffect(() => {
-    const handler = () => callback();
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const handler = (event: Event) => {
+      const change = (event as CustomEvent<ChangeNotification>).detail;
+      if (change && change.type !== "resync" && filterRef.current && !filterRef.current(change)) {
+        return;
+      }
+      if (timer === undefined) {
+        timer = setTimeout(() => {
+          timer = undefined;
+          callback();
+        }, REFETCH_DELAY);
+      }
+    };
     window.addEventListener("ai-monitor-refresh", handler);
-    return () => window.removeEventListener("ai-monitor-refresh", handler);
+    return () => {
+      window.removeEventListener("ai-monitor-refresh", handler);
+      if (timer !== undefined) clearTimeout(timer);
+    };
   }, [callback]);
 }
 
 export function usePollingData<T>(
   fetcher: () => Promise<T>,
-  deps: unknown[] = []
+  deps: unknown[] = [],
+  filter?: ChangeFilter
 ) {
   const [data, setData] = useState<T | null>(null);
   const [loading, setLoading] = useState(true);
@@ -50,7 +100,7 @@ export function usePollingData<T>(
     load();
   }, [load]);
 
-  useRefreshListener(load);
+  useRefreshListener(load, filter);
 
   return { data, loading, error, refetch: load };
 }
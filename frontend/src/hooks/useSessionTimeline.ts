@@ -0,0 +1,118 @@
+import { useState, useEffect, useCallback, useRef } from "react";
+import { fetchChanges, sessionTailUrl } from "@/lib/api.ts";
+import type { Agent, ChangeSet, TailMessage, TimelineEvent, ToolCall } from "@/lib/api.ts";
+
+interface TimelineState {
+  seq: number;
+  toolCalls: Map<number, ToolCall>;
+  agents: Map<number, Agent>;
+}
+
+/** Merge rows into the state by id; true if anything changed. */
+function applyChanges(state: TimelineState, changes: ChangeSet): boolean {
+  for (const tc of changes.tool_calls) {
+    if (tc.id != null) state.toolCalls.set(tc.id, tc);
+  }
+  for (const agent of changes.agents) {
+    if (agent.id != null) state.agents.set(agent.id, agent);
+  }
+  state.seq = Math.max(state.seq, changes.seq);
+  return changes.tool_calls.length > 0 || changes.agents.length > 0;
+}
+
+function buildTimeline(state: TimelineState): TimelineEvent[] {
+  const events: TimelineEvent[] = [];
+  for (const tc of state.toolCalls.values()) {
+    events.push({ type: "tool_call", timestamp: tc.started_at, tool_call: tc, agent: null });
+  }
+  for (const agent of state.agents.values()) {
+    events.push({ type: "agent", timestamp: agent.started_at, tool_call: null, agent });
+  }
+  // Same order as the timeline endpoint: timestamp, tool calls before agents, id
+  return events.sort((a, b) => {
+    const ta = a.timestamp ?? "";
+    const tb = b.timestamp ?? "";
+    if (ta !== tb) return ta < tb ? -1 : 1;
+    if (a.type !== b.type) return a.type === "tool_call" ? -1 : 1;
+    const ia = (a.tool_call ?? a.agent)?.id ?? 0;
+    const ib = (b.tool_call ?? b.agent)?.id ?? 0;
+    return ia - ib;
+  });
+}
+
+/**
+ * A session's timeline kept in sync with /api/changes: the first load
+ * pulls every row, then the session tail pushes coalesced deltas that
+ * are merged in place. A resync from the tail falls back to fetching
+ * everything since the last applied sequence.
+ */
+export function useSessionTimeline(sessionId: string) {
+  const [timeline, setTimeline] = useState<TimelineEvent[] | null>(null);
+  const stateRef = useRef<TimelineState | null>(null);
+  const loadingRef = useRef(false);
+  const rerunRef = useRef(false);
+  const sessionRef = useRef(sessionId);
+
+  const sync = useCallback(async () => {
+    // One sync at a time; changes arriving meanwhile trigger one more pass
+    if (loadingRef.current) {
+      rerunRef.current = true;
+      return;
+    }
+    loadingRef.current = true;
+    try {
+      let state = stateRef.current;
+      if (!state) {
+        state = { seq: 0, toolCalls: new Map(), agents: new Map() };
+      }
+      let changed = stateRef.current === null;
+      let page: ChangeSet;
+      do {
+        page = await fetchChanges(sessionId, state.seq);
+        changed = applyChanges(state, page) || changed;
+      } while (page.has_more);
+      // Drop the result if the user switched sessions meanwhile
+      if (sessionRef.current !== sessionId) return;
+      stateRef.current = state;
+      if (changed) setTimeline(buildTimeline(state));
+    } finally {
+      loadingRef.current = false;
+    }
+    if (rerunRef.current) {
+      rerunRef.current = false;
+      syncRef.current();
+    }
+  }, [sessionId]);
+  const syncRef = useRef(sync);
+  syncRef.current = sync;
+
+  useEffect(() => {
+    sessionRef.current = sessionId;
+    stateRef.current = null;
+    setTimeline(null);
+
+    let source: EventSource | null = null;
+    let closed = false;
+    sync().then(() => {
+      const state = stateRef.current;
+      if (closed || !state) return;
+      source = new EventSource(sessionTailUrl(sessionId, state.seq));
+      source.onmessage = (message) => {
+        const update = JSON.parse(message.data) as TailMessage;
+        if (update.type === "resync") {
+          syncRef.current();
+        } else if (update.type === "delta" && stateRef.current) {
+          if (applyChanges(stateRef.current, update)) {
+            setTimeline(buildTimeline(stateRef.current));
+          }
+        }
+      };
+    });
+    return () => {
+      closed = true;
+      source?.close();
+    };
+  }, [sessionId, sync]);
+
+  return timeline;
+}
@@ -39,11 +39,17 @@ export interface ToolCall {
   tool_name: string;
   tool_input: unknown;
   tool_response: unknown;
+  input_summary: string | null;
+  tool_input_preview: string | null;
+  tool_response_preview: string | null;
+  tool_input_size: number | null;
+  tool_response_size: number | null;
   status: string;
   error: string | null;
   started_at: string | null;
   ended_at: string | null;
   duration_ms: number | null;
+  agent_id: number | null;
 }
 
 export interface Agent {
@@ -51,10 +57,15 @@ export interface Agent {
   session_id: string;
   agent_name: string | null;
   agent_type: string | null;
+  hook_agent_id: string | null;
+  parent_agent_id: number | null;
   task_tool_call_id: number | null;
   status: string;
   started_at: string | null;
   ended_at: string | null;
+  tool_call_count: number | null;
+  error_count: number | null;
+  total_duration_ms: number | null;
 }
 
 export interface AgentDetail extends Agent {
@@ -65,6 +76,31 @@ export interface AgentDetail extends Agent {
   task_response: unknown;
 }
 
+export interface AgentTreeNode extends Agent {
+  depth: number;
+  descendant_count: number;
+  subtree_tool_call_count: number;
+  subtree_error_count: number;
+  subtree_duration_ms: number;
+  subtree_started_at: string | null;
+  subtree_ended_at: string | null;
+  subtree_wall_seconds: number | null;
+  children: AgentTreeNode[];
+}
+
+export interface ChangeNotification {
+  seq?: number;
+  type: "session" | "tool_call" | "agent" | "stats" | "resync";
+  op?: string;
+  session_id?: string;
+  project_id?: number | null;
+  tool_call_id?: number;
+  agent_id?: number;
+  status?: string;
+  delta?: Record<string, number>;
+  dropped?: number;
+}
+
 export interface Project {
   id: number | null;
   name: string;
@@ -106,6 +142,24 @@ export interface TimelineEvent {
   agent: Agent | null;
 }
 
+export interface ChangeSet {
+  seq: number;
+  has_more: boolean;
+  sessions: Session[];
+  tool_calls: ToolCall[];
+  agents: Agent[];
+}
+
+export type TailMessage =
+  | ({ type: "delta"; from_seq: number } & ChangeSet)
+  | { type: "resync"; seq: number }
+  | { type: "heartbeat" };
+
+export interface TimelinePage {
+  items: TimelineEvent[];
+  next_cursor: string | null;
+}
+
 export interface ProjectDetail {
   id: number | null;
   name: string;
@@ -143,7 +197,30 @@ export async function fetchSession(id: string): Promise<SessionDetail> {
 }
 
 export async function fetchTimeline(sessionId: string): Promise<TimelineEvent[]> {
-  return fetchJson<TimelineEvent[]>(`/sessions/${sessionId}/timeline`);
+  // Summaries are payload-free, so walking every page stays cheap
+  const events: TimelineEvent[] = [];
+  let cursor: string | null = null;
+  do {
+    const qs: string = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+    const page: TimelinePage = await fetchJson<TimelinePage>(`/sessions/${sessionId}/timeline${qs}`);
+    events.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return events;
+}
+
+export async function fetchChanges(sessionId: string, since: number): Promise<ChangeSet> {
+  return fetchJson<ChangeSet>(
+    `/changes?since=${since}&session_id=${encodeURIComponent(sessionId)}`
+  );
+}
+
+export function sessionTailUrl(sessionId: string, since: number): string {
+  return `${API_BASE}/sessions/${encodeURIComponent(sessionId)}/tail?since=${since}`;
+}
+
+export async function fetchToolCall(id: number): Promise<ToolCall> {
+  return fetchJson<ToolCall>(`/tool_calls/${id}`);
 }
 
 export async function fetchProjects(): Promise<Project[]> {
@@ -162,6 +239,10 @@ export async function fetchDashboardStats(): Promise<DashboardStats> {
   return fetchJson<DashboardStats>("/dashboard/stats");
 }
 
+export async function fetchAgentTree(sessionId: string): Promise<AgentTreeNode[]> {
+  return fetchJson<AgentTreeNode[]>(`/sessions/${sessionId}/agents/tree`);
+}
+
 export async function fetchAgentDetail(sessionId: string, agentId: number): Promise<AgentDetail> {
   return fetchJson<AgentDetail>(`/sessions/${sessionId}/agents/${agentId}`);
 }
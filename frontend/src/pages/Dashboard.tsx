@@ -35,11 +35,13 @@ export default function Dashboard() {
   );
   const { data: toolStats } = usePollingData<ToolStats[]>(
     fetchToolStats,
-    []
+    [],
+    (change) => change.type === "tool_call"
   );
   const { data: sessionsRes } = usePollingData<{ items: Session[] }>(
     () => fetchSessions(),
-    []
+    [],
+    (change) => change.type === "session" || change.op === "start"
   );
   const sessions = sessionsRes?.items ?? null;
 
@@ -21,7 +21,8 @@ export default function ProjectDetailPage() {
 
   const { data: project, loading } = usePollingData<ProjectDetailType>(
     () => fetchProject(Number(id)),
-    [id]
+    [id],
+    (change) => change.project_id === Number(id)
   );
 
   if (loading || !project) {
@@ -15,7 +15,8 @@ export default function Projects() {
   const navigate = useNavigate();
   const { data: projects, loading } = usePollingData<Project[]>(
     fetchProjects,
-    []
+    [],
+    (change) => change.type === "session" || change.type === "stats"
   );
 
   if (loading) {
@@ -13,14 +13,20 @@ export default function Sessions() {
 
   const { data: sessionsRes, loading } = usePollingData<PaginatedResponse<Session>>(
     () => fetchSessions({ search: search || undefined }),
-    [search]
+    [search],
+    (change) => change.type === "session" || change.type === "stats"
   );
 
   const sessions = sessionsRes?.items ?? [];
 
   const { data: detail } = usePollingData<SessionDetailType>(
     () => (selectedId ? fetchSession(selectedId) : Promise.resolve(null as unknown as SessionDetailType)),
-    [selectedId]
+    [selectedId],
+    // Tool calls reach the open timeline as deltas; only refetch the
+    // detail for session and agent changes
+    (change) =>
+      change.session_id === selectedId &&
+      (change.type === "session" || change.type === "agent")
   );
 
   if (selectedId && detail) {